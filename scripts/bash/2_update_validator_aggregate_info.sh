@@ -49,79 +49,24 @@ else
     log "INFO" "📊 Using epoch number from user input: $epoch_number"
 fi
 
-# Create a persistent response file in the logs directory with the format 2_response_file.<epoch_number>
-# Use environment variable if set, otherwise use default
-LOG_DIR="${TRILLIUM_LEADERBOARD_LOGS:-${TRILLIUM_DATA}/logs}"
-mkdir -p "$LOG_DIR"
-response_file="$LOG_DIR/2_response_file.$epoch_number"
-
 # Check for the --skip-previous flag passed as the second parameter
 skip_previous=false
+stage_args="$epoch_number"
 if [ "${2:-}" = "--skip-previous" ]; then
     skip_previous=true
-    log "INFO" "⚡ Skip previous mode enabled - reduced processing"
+    stage_args="$epoch_number --skip-previous"
+    log "INFO" "⚡ Skip previous mode enabled - reduced processing (no vote latency load, no icons)"
 else
     log "INFO" "🔄 Full processing mode enabled"
 fi
 
-if [ "$skip_previous" = false ]; then
-    # Full processing mode: No prior full processing detected from 1_no-wait-for-jito-process_data.sh
-    log "INFO" "📈 Configuring for full processing mode"
-    
-    # Load the vote latency table for this epoch
-    execute_with_logging "python3 $TRILLIUM_SCRIPTS_PYTHON/92_vx-call.py $epoch_number" "vote latency table loading" "📊"
-
-    # Write responses to the temporary file for full processing
-    {
-        # Retrieve icons (y = yes)
-        printf "y\n"
-        # ONLY process icons (n = no)
-        printf "n\n"
-        # Starting epoch number
-        printf "%s\n" "$epoch_number"
-        # Ending epoch number
-        printf "%s\n" "$epoch_number"
-        # Retrieve aggregate info (y = yes)
-        printf "y\n"
-        # Retrieve stakenet info (y = yes)
-        printf "y\n"
-        # Process leader schedule info (y = yes)
-        printf "y\n"
-    } > "$response_file"
-    
-    log "INFO" "📝 Created full processing response file"
-else
-    # Reduced processing mode
-    log "INFO" "⚡ Configuring for reduced processing mode (--skip-previous)"
-
-    # Write responses to the temporary file for reduced processing
-    {
-        # Retrieve icons (n = no, already processed)
-        printf "n\n"
-        # Starting epoch number
-        printf "%s\n" "$epoch_number"
-        # Ending epoch number
-        printf "%s\n" "$epoch_number"
-        # Retrieve aggregate info (y = yes, still needed)
-        printf "y\n"
-        # Retrieve stakenet info (y = yes, still needed)
-        printf "y\n"
-        # Process leader schedule info (y = yes)
-        printf "y\n"
-    } > "$response_file"
-    
-    log "INFO" "📝 Created reduced processing response file"
-fi
-
-# Pipe the responses to the Python script to update validator aggregate info
-log "INFO" "🔄 Starting validator aggregate info update"
-if cat "$response_file" | python3 $TRILLIUM_SCRIPTS_PYTHON/92_update_validator_aggregate_info.py; then
-    log "INFO" "✅ Successfully completed validator aggregate info update"
-else
-    exit_code=$?
-    log "ERROR" "❌ Failed to update validator aggregate info (exit code: $exit_code)"
-    bash "$DISCORD_NOTIFY_SCRIPT" error "$script_name" "Validator aggregate info update" "cat \"$response_file\" | python3 $TRILLIUM_SCRIPTS_PYTHON/92_update_validator_aggregate_info.py" "$exit_code" "$epoch_number"
-    exit $exit_code
+# Run the 92 steps as a dependency graph: independent steps run in parallel and
+# completed steps are checkpointed, so rerunning after a failure resumes from the failed step.
+# Exit code 3 means only steps after aggregate_info failed; as before, log them and carry on.
+stage_exit=0
+execute_with_logging "python3 $TRILLIUM_SCRIPTS_PYTHON/92_run_stage.py $stage_args --jobs ${STAGE_JOBS:-4}" "92 enrichment stage" "🔄" || stage_exit=$?
+if [ "$stage_exit" -ne 0 ] && [ "$stage_exit" -ne 3 ]; then
+    exit $stage_exit
 fi
 
 # Check for Kobe API data availability
@@ -142,25 +87,6 @@ else
     log "INFO" "✅ Kobe data was successfully used for Epoch $epoch_number"
 fi
 
-# Execute remaining steps with logging and error handling
-execute_with_logging "bash $TRILLIUM_SCRIPTS_BASH/92_vote_latency_update_ead.sh $epoch_number" "vote latency epoch aggregate update" "⏱️"
-
-execute_with_logging "python3 $TRILLIUM_SCRIPTS_PYTHON/92_block_time_calculation.py $epoch_number" "average slot time calculation" "⏰"
-
-execute_with_logging "python3 $TRILLIUM_SCRIPTS_PYTHON/92_update_vs_inflation_reward.py $epoch_number" "validator inflation rewards update" "💰"
-
-execute_with_logging "python3 $TRILLIUM_SCRIPTS_PYTHON/92_update_ead_inflation_reward.py $epoch_number" "epoch aggregate inflation rewards update" "💵"
-
-execute_with_logging "python3 $TRILLIUM_SCRIPTS_PYTHON/92_calculate_apy.py $epoch_number" "APY calculations" "📈"
-
-execute_with_logging "python3 $TRILLIUM_SCRIPTS_PYTHON/92_ip_api.py $epoch_number" "geographic IP information gathering" "🌍"
-
-execute_with_logging "bash $TRILLIUM_SCRIPTS_BASH/92_run_sql_updates.sh" "SQL post-processing updates" "🗄️"
-
-execute_with_logging "bash $TRILLIUM_SCRIPTS_BASH/92_slot_duration.sh $epoch_number" "slot duration analysis" "⏱️"
-
-execute_with_logging "python3 $TRILLIUM_SCRIPTS_PYTHON/92_solana_block_laggards.py $epoch_number" "slot duration laggards analysis" "⏱️"
-
 log "INFO" "🎉 Validator aggregate info update process completed successfully for epoch $epoch_number"
 
 # Send success notification to Discord using centralized script
@@ -0,0 +1,403 @@
+#!/usr/bin/env python3
+"""
+Asyncio getBlock fetch engine for get_epoch_data_csv.py (--engine async).
+
+The threaded engine pushes every request through one global semaphore and one
+spacing lock, so total throughput is fixed no matter how many threads run.
+Here each RPC endpoint keeps its own in-flight limit which is tuned AIMD-style:
+the limit grows by roughly one request per round trip while latency stays near
+the best latency seen, and is cut multiplicatively on 429/5xx responses,
+timeouts or a sustained latency spike. Catch-up speed is then bounded by what
+the provider will actually serve rather than by a Python lock.
+"""
+import asyncio
+import json
+import time
+
+from block_decoder import loads
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+# AIMD tuning for per-endpoint in-flight limits
+AIMD_INITIAL_LIMIT = 4
+AIMD_MIN_LIMIT = 1
+AIMD_MAX_LIMIT = 48
+AIMD_BACKOFF_FACTOR = 0.5          # 429 / 5xx / timeout
+AIMD_LATENCY_BACKOFF_FACTOR = 0.9  # latency drifting above tolerance
+AIMD_LATENCY_TOLERANCE = 2.5       # x best observed latency before backing off
+LATENCY_EWMA_ALPHA = 0.2
+DEFAULT_RETRY_AFTER = 2.0          # seconds to pause an endpoint on 429 without Retry-After
+AUTH_ERROR_PAUSE = 15.0            # 401s are usually an auth issue that won't resolve quickly
+
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+SKIPPED_SLOT_ERROR_CODES = (-32007, -32009)
+
+GET_BLOCK_CONFIG = {
+    "encoding": "json",
+    "transactionDetails": "full",
+    "rewards": True,
+    "maxSupportedTransactionVersion": 1
+}
+
+def build_get_block_payload(slot, request_id):
+    """Build the getBlock JSON-RPC payload used by every fetch engine"""
+    return {
+        "jsonrpc": "2.0",
+        "id": request_id,
+        "method": "getBlock",
+        "params": [slot, GET_BLOCK_CONFIG]
+    }
+
+def build_get_block_batch_payload(slots):
+    """Build a JSON-RPC batch array of getBlock calls, using each slot as its request id"""
+    return [build_get_block_payload(slot, slot) for slot in slots]
+
+def split_batch_response(response_json):
+    """Map request id -> response element for a JSON-RPC batch response.
+
+    Providers that reject a batch outright answer with a single error object
+    instead of an array; that yields an empty mapping so every slot is retried.
+    """
+    if not isinstance(response_json, list):
+        return {}
+    return {element.get("id"): element for element in response_json if isinstance(element, dict)}
+
+class EndpointLimiter:
+    """In-flight limit and latency tracking for a single RPC endpoint"""
+
+    def __init__(self, url, domain, batch_size=1, initial_limit=AIMD_INITIAL_LIMIT,
+                 min_limit=AIMD_MIN_LIMIT, max_limit=AIMD_MAX_LIMIT):
+        self.url = url
+        self.domain = domain
+        self.batch_size = max(1, batch_size)
+        self.limit = float(initial_limit)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.in_flight = 0
+        self.latency_ewma = None
+        self.best_latency = None
+        self.paused_until = 0.0
+        self.last_backoff = 0.0
+        self.requests = 0
+        self.throttled = 0
+        self.errors = 0
+
+    def has_capacity(self, now):
+        return self.in_flight < int(self.limit) and now >= self.paused_until
+
+    def record_success(self, latency):
+        """Additive increase while latency is healthy, gentle decrease when it is not"""
+        self.requests += 1
+        if self.latency_ewma is None:
+            self.latency_ewma = latency
+        else:
+            self.latency_ewma += LATENCY_EWMA_ALPHA * (latency - self.latency_ewma)
+        if self.best_latency is None or latency < self.best_latency:
+            self.best_latency = latency
+
+        if self.latency_ewma > self.best_latency * AIMD_LATENCY_TOLERANCE:
+            self._back_off(AIMD_LATENCY_BACKOFF_FACTOR)
+        else:
+            self.limit = min(self.max_limit, self.limit + 1.0 / self.limit)
+
+    def record_throttle(self, retry_after=None):
+        """Multiplicative decrease on 429/5xx/timeouts, optionally pausing the endpoint"""
+        self.requests += 1
+        self.throttled += 1
+        self._back_off(AIMD_BACKOFF_FACTOR)
+        if retry_after is not None:
+            self.paused_until = max(self.paused_until, time.monotonic() + retry_after)
+
+    def record_error(self):
+        self.requests += 1
+        self.errors += 1
+
+    def _back_off(self, factor):
+        # Only back off once per round trip so a burst of failures from requests
+        # that were already in flight does not collapse the limit to the floor
+        now = time.monotonic()
+        window = self.latency_ewma or 1.0
+        if now - self.last_backoff < window:
+            return
+        self.last_backoff = now
+        self.limit = max(self.min_limit, self.limit * factor)
+
+    def summary(self):
+        ewma = f"{self.latency_ewma:.2f}s" if self.latency_ewma is not None else "n/a"
+        return (f"{self.domain}: limit={self.limit:.1f} batch={self.batch_size} in_flight={self.in_flight} "
+                f"ewma={ewma} req={self.requests} throttled={self.throttled} errors={self.errors}")
+
+def parse_retry_after(value):
+    if not value:
+        return DEFAULT_RETRY_AFTER
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        return DEFAULT_RETRY_AFTER
+
+class AsyncBlockFetcher:
+    """Fetch getBlock responses for a list of slots across endpoints with adaptive concurrency"""
+
+    def __init__(self, endpoints, domain_func, logger, bandwidth_logger,
+                 shutdown_event=None, max_retries=3, progress_interval=500, batch_sizes=None,
+                 max_limit=AIMD_MAX_LIMIT):
+        # Identical URLs share one limiter - they are the same provider quota.
+        # batch_sizes maps endpoint domain -> getBlock calls per JSON-RPC batch (1 = no batching)
+        batch_sizes = batch_sizes or {}
+        self.limiters = []
+        for url in dict.fromkeys(endpoints):
+            domain = domain_func(url)
+            self.limiters.append(EndpointLimiter(url, domain, batch_size=batch_sizes.get(domain, 1),
+                                                 initial_limit=min(AIMD_INITIAL_LIMIT, max_limit), max_limit=max_limit))
+        self.logger = logger
+        self.bandwidth_logger = bandwidth_logger
+        self.shutdown_event = shutdown_event
+        self.max_retries = max_retries
+        self.progress_interval = progress_interval
+        self._capacity = None
+        self._attempts = {}
+
+    async def _acquire(self):
+        async with self._capacity:
+            while True:
+                now = time.monotonic()
+                available = [l for l in self.limiters if l.has_capacity(now)]
+                if available:
+                    limiter = min(available, key=lambda l: l.in_flight / l.limit)
+                    limiter.in_flight += 1
+                    return limiter
+                # Wake up on the next release, or when a paused endpoint resumes
+                paused = [l.paused_until - now for l in self.limiters if l.paused_until > now]
+                timeout = min(paused) if paused else None
+                try:
+                    await asyncio.wait_for(self._capacity.wait(), timeout)
+                except asyncio.TimeoutError:
+                    pass
+
+    async def _release(self, limiter):
+        async with self._capacity:
+            limiter.in_flight -= 1
+            self._capacity.notify_all()
+
+    def _result(self, slot, status, limiter, size_mb=0.0, duration=0.0, error=None):
+        if error is not None:
+            error = dict(error, slot=slot, domain=limiter.domain, attempt=self._attempts.get(slot, 0) + 1)
+        return {'slot': slot, 'status': status, 'error': error, 'domain': limiter.domain,
+                'size_mb': size_mb, 'duration': duration}
+
+    async def _request(self, session, limiter, slots):
+        """Send one getBlock request (or JSON-RPC batch) for slots on an acquired limiter.
+
+        Always releases the limiter. Returns one result dict per slot with status
+        'ok' (with block_info), 'skipped', 'retry' or 'failed'. Errors are handled
+        per element, so a skipped slot never fails the rest of a batch.
+        """
+        batched = len(slots) > 1
+        payload = build_get_block_batch_payload(slots) if batched else build_get_block_payload(slots[0], slots[0])
+        request_start = time.monotonic()
+        try:
+            async with session.post(limiter.url, json=payload) as response:
+                body = await response.read()
+                status = response.status
+                reason = response.reason
+                retry_after = response.headers.get('Retry-After')
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            duration = time.monotonic() - request_start
+            limiter.record_throttle()
+            await self._release(limiter)
+            error = {'error_type': type(e).__name__, 'error_message': str(e)}
+            self.bandwidth_logger.error(f"Async[{limiter.domain}] - REQUEST_EXCEPTION - "
+                                        f"{json.dumps(dict(error, slots=len(slots), domain=limiter.domain))}")
+            return [self._result(slot, 'retry', limiter, duration=duration, error=error) for slot in slots]
+
+        duration = time.monotonic() - request_start
+        size_mb = len(body) / (1024 * 1024)
+        slot_size_mb = size_mb / len(slots)
+
+        if size_mb > 10:
+            self.logger.warning(f"LARGE_RESPONSE - Async[{limiter.domain}] - {size_mb:.1f}MB response ({len(slots)} slots)")
+            self.bandwidth_logger.info(f"Async[{limiter.domain}] - Size: {size_mb:.1f}MB, Duration: {duration:.2f}s, Slots: {len(slots)}")
+
+        if status != 200:
+            if status in RETRYABLE_STATUS_CODES:
+                limiter.record_throttle(parse_retry_after(retry_after) if status == 429 else None)
+            else:
+                limiter.record_error()
+                if status == 401:
+                    limiter.paused_until = max(limiter.paused_until, time.monotonic() + AUTH_ERROR_PAUSE)
+            await self._release(limiter)
+            error = {
+                'status_code': status,
+                'reason': reason,
+                'response_text': body[:100].decode('utf-8', errors='replace')
+            }
+            self.bandwidth_logger.error(f"Async[{limiter.domain}] - HTTP_ERROR - "
+                                        f"{json.dumps(dict(error, slots=len(slots), domain=limiter.domain))}")
+            outcome = 'retry' if status in RETRYABLE_STATUS_CODES or status == 401 else 'failed'
+            return [self._result(slot, outcome, limiter, slot_size_mb, duration, error) for slot in slots]
+
+        limiter.record_success(duration)
+        await self._release(limiter)
+
+        try:
+            response_json = loads(body)
+        except ValueError as e:
+            error = {'error_type': type(e).__name__, 'error_message': str(e)}
+            return [self._result(slot, 'retry', limiter, slot_size_mb, duration, error) for slot in slots]
+
+        if batched:
+            elements = split_batch_response(response_json)
+            if not elements:
+                self.logger.warning(f"Async[{limiter.domain}] - batch of {len(slots)} rejected: {body[:200]!r}")
+        else:
+            elements = {slots[0]: response_json}
+
+        results = []
+        for slot in slots:
+            element = elements.get(slot)
+            if element is None:
+                error = {'error_type': 'MissingBatchElement', 'error_message': 'No response element for slot'}
+                results.append(self._result(slot, 'retry', limiter, slot_size_mb, duration, error))
+                continue
+
+            if element.get("result") is not None:
+                result = self._result(slot, 'ok', limiter, slot_size_mb, duration)
+                result['block_info'] = element["result"]
+                results.append(result)
+                continue
+
+            error_info = element.get("error") or {}
+            error_code = error_info.get("code", -999)
+            error = {'error_code': error_code, 'error_message': error_info.get("message", "")}
+            outcome = 'skipped' if error_code in SKIPPED_SLOT_ERROR_CODES else 'retry'
+            results.append(self._result(slot, outcome, limiter, slot_size_mb, duration, error))
+        return results
+
+    async def _worker(self, session, queue, handle_result, counters):
+        while True:
+            if self.shutdown_event is not None and self.shutdown_event.is_set():
+                return
+            if queue.empty():
+                return
+
+            limiter = await self._acquire()
+            slots = []
+            while len(slots) < limiter.batch_size and not queue.empty():
+                slots.append(queue.get_nowait())
+            if not slots:
+                await self._release(limiter)
+                return
+
+            for result in await self._request(session, limiter, slots):
+                slot = result['slot']
+                if result['status'] == 'retry':
+                    self._attempts[slot] = self._attempts.get(slot, 0) + 1
+                    if self._attempts[slot] < self.max_retries and not (
+                            self.shutdown_event is not None and self.shutdown_event.is_set()):
+                        queue.put_nowait(slot)
+                        continue
+                    result['status'] = 'failed'
+
+                handle_result(result)
+                counters[result['status']] += 1
+                done = sum(counters.values())
+                if done % self.progress_interval == 0:
+                    self._log_progress(done, counters)
+
+    async def _follow_worker(self, session, queue, handle_result, counters, retry_delay):
+        loop = asyncio.get_running_loop()
+        while not (self.shutdown_event is not None and self.shutdown_event.is_set()):
+            # Wait for a slot before taking capacity: at the tip the queue is usually empty, and an idle
+            # worker holding an in-flight slot would skew endpoint choice and the AIMD limits
+            slots = [await queue.get()]
+            limiter = await self._acquire()
+            while len(slots) < limiter.batch_size and not queue.empty():
+                slots.append(queue.get_nowait())
+
+            for result in await self._request(session, limiter, slots):
+                slot = result['slot']
+                if result['status'] == 'retry':
+                    self._attempts[slot] = self._attempts.get(slot, 0) + 1
+                    if self._attempts[slot] < self.max_retries:
+                        # Blocks right at the root are often not servable yet; give the node time to catch up
+                        loop.call_later(retry_delay, queue.put_nowait, slot)
+                        continue
+                    result['status'] = 'failed'
+                self._attempts.pop(slot, None)
+                handle_result(result)
+                counters[result['status']] += 1
+
+    async def follow(self, queue, handle_result, worker_count, retry_delay=2.0):
+        """Fetch slots from an asyncio.Queue as they arrive, until cancelled.
+
+        Retries are re-queued after retry_delay instead of immediately. The
+        queue never drains for good, so callers track completion through
+        handle_result and cancel the task when they are done.
+        """
+        if aiohttp is None:
+            raise RuntimeError("aiohttp is required for the async fetch engine (pip install aiohttp)")
+
+        self._capacity = asyncio.Condition()
+        self._start_time = time.monotonic()
+        self._attempts = {}
+        counters = {'ok': 0, 'skipped': 0, 'failed': 0}
+
+        timeout = aiohttp.ClientTimeout(sock_connect=10, sock_read=30)
+        connector = aiohttp.TCPConnector(limit=max(worker_count, 1), ttl_dns_cache=300)
+        async with aiohttp.ClientSession(timeout=timeout, connector=connector,
+                                         headers={'Content-Type': 'application/json'}) as session:
+            workers = [asyncio.create_task(self._follow_worker(session, queue, handle_result, counters, retry_delay))
+                       for _ in range(max(1, worker_count))]
+            try:
+                await asyncio.gather(*workers)
+            finally:
+                for worker in workers:
+                    worker.cancel()
+                await asyncio.gather(*workers, return_exceptions=True)
+        return counters
+
+    def _log_progress(self, done, counters):
+        elapsed = time.monotonic() - self._start_time
+        rate = done / elapsed if elapsed > 0 else 0
+        pct = done / self._total if self._total else 1.0
+        self.logger.info(f"Async progress: {done:,}/{self._total:,} ({pct:.1%}) at {rate:.1f} s/s "
+                         f"- ok={counters['ok']:,} skipped={counters['skipped']:,} failed={counters['failed']:,}")
+        for limiter in self.limiters:
+            self.logger.info(f"  {limiter.summary()}")
+
+    async def run(self, slots, handle_result):
+        """Fetch all slots, calling handle_result(result) on the event loop as each one completes.
+
+        Returns a dict of counts by status ('ok', 'skipped', 'failed').
+        """
+        if aiohttp is None:
+            raise RuntimeError("aiohttp is required for the async fetch engine (pip install aiohttp)")
+
+        self._capacity = asyncio.Condition()
+        self._start_time = time.monotonic()
+        self._total = len(slots)
+        self._attempts = {}
+
+        queue = asyncio.Queue()
+        for slot in slots:
+            queue.put_nowait(slot)
+
+        counters = {'ok': 0, 'skipped': 0, 'failed': 0}
+        max_in_flight = sum(l.max_limit for l in self.limiters)
+        worker_count = max(1, min(len(slots), max_in_flight))
+
+        timeout = aiohttp.ClientTimeout(sock_connect=10, sock_read=30)
+        connector = aiohttp.TCPConnector(limit=max_in_flight, ttl_dns_cache=300)
+        async with aiohttp.ClientSession(timeout=timeout, connector=connector,
+                                         headers={'Content-Type': 'application/json'}) as session:
+            workers = [asyncio.create_task(self._worker(session, queue, handle_result, counters))
+                       for _ in range(worker_count)]
+            await asyncio.gather(*workers)
+
+        done = sum(counters.values())
+        if done % self.progress_interval != 0:
+            self._log_progress(done, counters)
+        return counters
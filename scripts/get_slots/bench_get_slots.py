@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+Offline benchmark for get_epoch_data_csv.py against mock_rpc_server.py.
+
+Starts the mock RPC server in-process, then runs the collector once per
+(engine, concurrency) combination in a fresh working directory with
+GET_SLOTS_RPC_ENDPOINTS pointing at the mock. Concurrency maps to
+--max-threads plus GET_SLOTS_MAX_CONCURRENT_REQUESTS for the threaded engine
+and to the per-endpoint AIMD ceiling (GET_SLOTS_ASYNC_MAX_INFLIGHT) for the
+async engine.
+
+For every run it reports:
+
+    slots/s     produced slots written to slot_data files / wall time
+    MB/s        uncompressed JSON bytes served by the mock / wall time
+    p50/p99     client-side request latency parsed from the collector's
+                "✓ [x.xMB/y.yys]" lines (includes semaphore and spacing waits),
+                and server-side latency from the mock (injected delay + serialisation)
+    RSS         peak resident set size of the collector process
+
+Example:
+    python bench_get_slots.py --synthetic-slots 3000 --latency-ms 80 --throttle-rate 0.02 \\
+        --engines threads,async --concurrency 2,4,8,16 --json bench.json
+"""
+import argparse
+import json
+import os
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent / "python"))
+
+from mock_rpc_server import add_fixture_arguments, build_server, percentile
+from slot_output import OUTPUT_FORMATS, find_output_files, count_rows
+
+COLLECTOR = str(Path(__file__).parent / "get_epoch_data_csv.py")
+SLOT_LINE_PATTERN = re.compile(r"✓ (?:\d+/\d+ )?\[([\d.]+)MB/([\d.]+)s\]")
+
+def run_collector(server, epoch, engine, concurrency, args):
+    """Run the collector once against the mock and return its metrics"""
+    run_dir = tempfile.mkdtemp(prefix=f"bench_{engine}_{concurrency}_", dir=args.work_dir)
+    env = dict(os.environ,
+               GET_SLOTS_RPC_ENDPOINTS=server.url,
+               GET_SLOTS_MAX_CONCURRENT_REQUESTS=str(concurrency),
+               GET_SLOTS_ASYNC_MAX_INFLIGHT=str(concurrency),
+               LOG_TO_FILE='false')
+    if args.request_spacing is not None:
+        env['GET_SLOTS_REQUEST_SPACING'] = str(args.request_spacing)
+    command = [sys.executable, COLLECTOR, str(epoch), '--engine', engine, '--max-threads', str(concurrency),
+               '--output-format', args.output_format]
+    if args.batch_size:
+        command += ['--batch-size', str(args.batch_size)]
+
+    server.reset_stats()
+    log_path = os.path.join(run_dir, "collector.log")
+    with open(log_path, 'w') as log_file:
+        # stdin from /dev/null is always readable, which skips the collector's start-up confirmation wait
+        process = subprocess.Popen(command, cwd=run_dir, env=env, stdin=subprocess.DEVNULL,
+                                   stdout=log_file, stderr=subprocess.STDOUT)
+        timer = threading.Timer(args.run_timeout, process.kill)
+        timer.start()
+        start = time.monotonic()
+        _, status, rusage = os.wait4(process.pid, 0)
+        elapsed = time.monotonic() - start
+        timer.cancel()
+        process.returncode = os.waitstatus_to_exitcode(status)
+
+    # Wall time includes collector start-up (imports, getEpochInfo, getBlocks pre-pass), as a real run does
+    slots = sum(count_rows(path) for path in find_output_files(run_dir, "slot_data"))
+    client_latencies = []
+    with open(log_path, encoding='utf-8', errors='replace') as f:
+        for line in f:
+            match = SLOT_LINE_PATTERN.search(line)
+            if match:
+                client_latencies.append(float(match.group(2)))
+    stats = server.snapshot()
+
+    if not args.keep:
+        shutil.rmtree(run_dir, ignore_errors=True)
+    return {
+        'engine': engine,
+        'concurrency': concurrency,
+        'exit_code': process.returncode,
+        'seconds': elapsed,
+        'slots': slots,
+        'slots_per_second': slots / elapsed if elapsed > 0 else 0.0,
+        'mb_per_second': stats['bytes_sent'] / (1024 * 1024) / elapsed if elapsed > 0 else 0.0,
+        'client_p50': percentile(client_latencies, 0.50),
+        'client_p99': percentile(client_latencies, 0.99),
+        'server_p50': stats['latency_p50'],
+        'server_p99': stats['latency_p99'],
+        'max_rss_mb': rusage.ru_maxrss / 1024,  # ru_maxrss is in KB on Linux
+        'requests': stats['requests'],
+        'throttled': stats['throttled'],
+        'skipped': stats['skipped'],
+        'run_dir': run_dir if args.keep else None,
+    }
+
+def format_seconds(value):
+    return f"{value * 1000:7.0f}ms" if value is not None else "      n/a"
+
+def print_results(results):
+    print(f"{'engine':<8} {'conc':>4} {'exit':>4} {'slots':>7} {'slots/s':>8} {'MB/s':>7} "
+          f"{'cli p50':>9} {'cli p99':>9} {'srv p50':>9} {'srv p99':>9} {'RSS MB':>7} {'429s':>6}")
+    for r in results:
+        print(f"{r['engine']:<8} {r['concurrency']:>4} {r['exit_code']:>4} {r['slots']:>7,} {r['slots_per_second']:>8.1f} "
+              f"{r['mb_per_second']:>7.1f} {format_seconds(r['client_p50'])} {format_seconds(r['client_p99'])} "
+              f"{format_seconds(r['server_p50'])} {format_seconds(r['server_p99'])} {r['max_rss_mb']:>7.0f} {r['throttled']:>6,}")
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark get_epoch_data_csv.py against a mock RPC server')
+    add_fixture_arguments(parser)
+    parser.add_argument('--engines', default='threads,async', help='Comma-separated fetch engines (default: threads,async)')
+    parser.add_argument('--concurrency', default='2,4,8', help='Comma-separated concurrency settings (default: 2,4,8)')
+    parser.add_argument('--request-spacing', type=float, default=None,
+                        help='GET_SLOTS_REQUEST_SPACING for the threaded engine (default: collector default)')
+    parser.add_argument('--batch-size', type=int, default=None, help='Pass --batch-size to the collector')
+    parser.add_argument('--output-format', choices=OUTPUT_FORMATS, default='csv')
+    parser.add_argument('--run-timeout', type=float, default=1800, help='Kill a collector run after this many seconds')
+    parser.add_argument('--work-dir', default=None, help='Parent directory for run directories (default: system temp)')
+    parser.add_argument('--keep', action='store_true', help='Keep run directories and collector logs')
+    parser.add_argument('--json', help='Also write the results to this JSON file')
+    args = parser.parse_args()
+
+    server = build_server(args)
+    fixtures = server.fixtures
+    url = server.start_in_thread()
+    print(f"Mock RPC server on {url}: E{fixtures.epoch} slots {fixtures.start_slot:,}-"
+          f"{fixtures.start_slot + fixtures.slot_count - 1:,}")
+
+    results = []
+    try:
+        for engine in [e.strip() for e in args.engines.split(',') if e.strip()]:
+            for concurrency in [int(c) for c in args.concurrency.split(',') if c.strip()]:
+                print(f"Running engine={engine} concurrency={concurrency}...", flush=True)
+                result = run_collector(server, fixtures.epoch, engine, concurrency, args)
+                print(f"  {result['slots']:,} slots in {result['seconds']:.1f}s "
+                      f"({result['slots_per_second']:.1f} slots/s, exit {result['exit_code']})", flush=True)
+                results.append(result)
+    finally:
+        server.stop()
+
+    print()
+    print_results(results)
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"Results written to {args.json}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+"""
+Compressed, slot-indexed archive of raw getBlock responses.
+
+With --archive the collector stores every block it fetches in the epoch
+directory under block_archive/:
+
+    meta.json          epoch number, first slot and slot count
+    blocks.idx         append-only 25-byte records (slot, chunk, offset, length, codec)
+    chunk_NNNN.dat     concatenated independently compressed frames, one per block
+
+Each block is its own zstd frame (zlib when the zstandard package is not
+installed; the codec is recorded per entry), so any slot can be read back with
+one seek. Every writer starts a new chunk and rolls over at CHUNK_MAX_BYTES, so
+an interrupted run never leaves a half-written frame in a chunk another run
+appends to. Entries for a slot written more than once resolve to the last one.
+
+--replay regenerates slot_data/epoch_votes files (CSV or Parquet) from the
+archive with a multiprocessing pool, one chunk file per task, instead of
+re-downloading the epoch from RPC.
+"""
+import glob
+import json
+import os
+import struct
+import threading
+import zlib
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+try:
+    import orjson
+    dumps = orjson.dumps
+except ImportError:
+    orjson = None
+    def dumps(obj):
+        return json.dumps(obj, separators=(',', ':')).encode()
+
+from block_decoder import decode_block_response
+from slot_output import SlotOutput
+
+ARCHIVE_DIR = "block_archive"
+META_FILE = "meta.json"
+INDEX_FILE = "blocks.idx"
+CHUNK_PATTERN = "chunk_{:04d}.dat"
+
+CODEC_ZLIB = 1
+CODEC_ZSTD = 2
+
+INDEX_RECORD = struct.Struct("<QIQIB")  # slot, chunk, offset, length, codec
+CHUNK_MAX_BYTES = 256 * 1024 * 1024
+ZSTD_LEVEL = 3
+ZLIB_LEVEL = 6
+
+def _decompress(frame, codec):
+    if codec == CODEC_ZSTD:
+        if zstandard is None:
+            raise RuntimeError("Archive entry is zstd-compressed but the zstandard package is not installed")
+        return zstandard.ZstdDecompressor().decompress(frame)
+    return zlib.decompress(frame)
+
+class BlockArchiveWriter:
+    """Thread-safe appender of raw getBlock responses for one epoch"""
+
+    def __init__(self, epoch_dir, epoch_number, start_slot, slot_count):
+        self.archive_dir = os.path.join(epoch_dir, ARCHIVE_DIR)
+        os.makedirs(self.archive_dir, exist_ok=True)
+        meta_path = os.path.join(self.archive_dir, META_FILE)
+        if os.path.exists(meta_path):
+            with open(meta_path) as f:
+                meta = json.load(f)
+            if meta['start_slot'] != start_slot:
+                raise ValueError(f"Block archive in {self.archive_dir} starts at {meta['start_slot']}, expected {start_slot}")
+        else:
+            with open(meta_path, 'w') as f:
+                json.dump({'epoch': epoch_number, 'start_slot': start_slot, 'slot_count': slot_count}, f)
+
+        if zstandard is not None:
+            self.codec = CODEC_ZSTD
+            self._compressor = zstandard.ZstdCompressor(level=ZSTD_LEVEL)
+        else:
+            self.codec = CODEC_ZLIB
+            self._compressor = None
+
+        self._lock = threading.Lock()
+        self._index = open(os.path.join(self.archive_dir, INDEX_FILE), 'ab')
+        self._chunk_id = None
+        self._chunk = None
+        self._open_next_chunk()
+        self.blocks_written = 0
+        self.bytes_written = 0
+
+    def _open_next_chunk(self):
+        existing = glob.glob(os.path.join(self.archive_dir, "chunk_*.dat"))
+        numbers = [int(os.path.basename(path)[6:10]) for path in existing]
+        self._chunk_id = max(numbers, default=-1) + 1
+        if self._chunk is not None:
+            self._chunk.close()
+        self._chunk = open(os.path.join(self.archive_dir, CHUNK_PATTERN.format(self._chunk_id)), 'ab')
+
+    def _compress(self, raw):
+        if self._compressor is not None:
+            return self._compressor.compress(raw)
+        return zlib.compress(raw, ZLIB_LEVEL)
+
+    def append(self, slot, raw_response):
+        """Archive the raw bytes of a single-slot getBlock JSON-RPC response"""
+        # zstandard compressors are not thread-safe, so compress under the lock as well
+        with self._lock:
+            frame = self._compress(raw_response)
+            if self._chunk.tell() + len(frame) > CHUNK_MAX_BYTES:
+                self._open_next_chunk()
+            offset = self._chunk.tell()
+            self._chunk.write(frame)
+            self._chunk.flush()
+            # Index after the frame is on disk so a crash never indexes a missing frame
+            self._index.write(INDEX_RECORD.pack(slot, self._chunk_id, offset, len(frame), self.codec))
+            self._index.flush()
+            self.blocks_written += 1
+            self.bytes_written += len(frame)
+
+    def append_element(self, slot, element):
+        """Archive a parsed JSON-RPC response object (e.g. one element of a batch response)"""
+        self.append(slot, dumps(element))
+
+    def close(self):
+        with self._lock:
+            if self._chunk is not None:
+                self._chunk.close()
+                self._chunk = None
+            self._index.close()
+
+class BlockArchive:
+    """Read-only view of an epoch's block archive"""
+
+    def __init__(self, epoch_dir):
+        self.archive_dir = os.path.join(epoch_dir, ARCHIVE_DIR)
+        with open(os.path.join(self.archive_dir, META_FILE)) as f:
+            self.meta = json.load(f)
+        self.entries = {}
+        with open(os.path.join(self.archive_dir, INDEX_FILE), 'rb') as f:
+            data = f.read()
+        data = data[:len(data) - len(data) % INDEX_RECORD.size]
+        for slot, chunk_id, offset, length, codec in INDEX_RECORD.iter_unpack(data):
+            self.entries[slot] = (chunk_id, offset, length, codec)
+
+    @staticmethod
+    def exists(epoch_dir):
+        return os.path.exists(os.path.join(epoch_dir, ARCHIVE_DIR, INDEX_FILE))
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __contains__(self, slot):
+        return slot in self.entries
+
+    def chunk_path(self, chunk_id):
+        return os.path.join(self.archive_dir, CHUNK_PATTERN.format(chunk_id))
+
+    def get(self, slot):
+        """Return the raw getBlock response bytes for a slot"""
+        chunk_id, offset, length, codec = self.entries[slot]
+        with open(self.chunk_path(chunk_id), 'rb') as f:
+            f.seek(offset)
+            return _decompress(f.read(length), codec)
+
+    def chunk_tasks(self, start_slot=None, end_slot=None):
+        """Group the live entries in [start_slot, end_slot] by chunk, in file order"""
+        chunks = {}
+        for slot, (chunk_id, offset, length, codec) in self.entries.items():
+            if start_slot is not None and slot < start_slot:
+                continue
+            if end_slot is not None and slot > end_slot:
+                continue
+            chunks.setdefault(chunk_id, []).append((offset, slot, length, codec))
+        return [(chunk_id, sorted(entries)) for chunk_id, entries in sorted(chunks.items())]
+
+def replay_chunk(task):
+    """Pool worker: decode every block of one chunk into its own slot_data/epoch_votes files"""
+    chunk_path, chunk_id, entries, epoch_number, output_format, vote_latency = task
+    produced_slots = []
+    failed_slots = []
+    vote_rows = 0
+
+    with open(chunk_path, 'rb') as chunk, \
+            SlotOutput(f"slot_data_thread_replay_file_{chunk_id}", f"epoch_votes_thread_replay_file_{chunk_id}",
+                       output_format, latency_base=f"vote_latency_thread_replay_file_{chunk_id}" if vote_latency else None) as output:
+        for offset, slot, length, codec in entries:
+            try:
+                chunk.seek(offset)
+                decoded = decode_block_response(_decompress(chunk.read(length), codec), slot, epoch_number, vote_latency)
+            except Exception:
+                failed_slots.append(slot)
+                continue
+            if decoded['error'] is not None:
+                failed_slots.append(slot)
+                continue
+            output.add(slot, decoded['slot_row'], decoded['vote_rows'], decoded['latency_rows'])
+            vote_rows += len(decoded['vote_rows'])
+            produced_slots.append(slot)
+
+    return chunk_id, produced_slots, failed_slots, vote_rows
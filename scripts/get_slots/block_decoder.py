@@ -0,0 +1,230 @@
+#!/usr/bin/env python3
+"""
+Field-selective getBlock decoder for get_epoch_data_csv.py.
+
+The raw response bytes are parsed once with orjson (falling back to the
+standard json module) and the transactions are walked a single time to produce
+everything the collector writes: fee/signature/CU totals, vote transaction
+counts and the epoch_votes rows. Previously extract_slot_data and
+extract_vote_data walked the transaction list three or four times per block.
+
+The same walk can also emit vote-latency rows (what vote_latency.py used to
+compute in a third pass): the vote instruction payloads of a block are
+collected during the walk and base58-decoded together, two digits per step via
+a pair lookup table over a memoryview, and the lockouts are read with a
+precompiled struct and an inline varint decoder.
+"""
+import json
+import struct
+import sys
+
+try:
+    import orjson
+    loads = orjson.loads
+except ImportError:
+    orjson = None
+    loads = json.loads
+
+VOTE_PROGRAM_ID = "Vote111111111111111111111111111111111111111"
+
+SIGNATURE_FEE_LAMPORTS = 5000
+VALIDATOR_SIGNATURE_FEE_LAMPORTS = 2500
+FULL_PRIORITY_FEE_EPOCH = 740  # after this epoch the leader keeps 100% of priority fees
+
+BASE58_ALPHABET = b"123456789ABCDEFGHJKLMNPQRSTUVWXYZabcdefghijkmnopqrstuvwxyz"
+_B58_INVALID = 0xFF
+_B58_DIGITS = bytearray([_B58_INVALID] * 256)
+for _value, _char in enumerate(BASE58_ALPHABET):
+    _B58_DIGITS[_char] = _value
+_B58_DIGITS = bytes(_B58_DIGITS)
+# Two digits per step: index is the native-endian uint16 of a digit pair, value is d0 * 58 + d1
+_B58_PAIRS = [0] * 65536
+for _d0 in range(58):
+    for _d1 in range(58):
+        _B58_PAIRS[int.from_bytes(bytes((_d0, _d1)), sys.byteorder)] = _d0 * 58 + _d1
+
+VOTE_HEADER = struct.Struct("<IQ")   # instruction discriminant, root slot
+LOCKOUTS_OFFSET = VOTE_HEADER.size
+
+def b58decode_many(encoded_strings):
+    """Base58-decode a list of strings; invalid entries decode to None"""
+    pairs = _B58_PAIRS
+    decoded = []
+    for encoded in encoded_strings:
+        digits = encoded.encode('ascii', 'replace').translate(_B58_DIGITS)
+        if _B58_INVALID in digits:
+            decoded.append(None)
+            continue
+        value = 0
+        if len(digits) % 2:
+            value = digits[0]
+            digits = digits[1:]
+        for pair in memoryview(digits).cast('H'):
+            value = value * 3364 + pairs[pair]
+        leading_zeros = len(encoded) - len(encoded.lstrip('1'))
+        decoded.append(b'\x00' * leading_zeros + value.to_bytes((value.bit_length() + 7) // 8, 'big'))
+    return decoded
+
+def decode_voted_slot(data):
+    """Slot voted on by a vote instruction, or None.
+
+    Every vote instruction is read with the compact vote-state-update layout,
+    as vote_latency.py always did: lockouts follow the root as a count byte
+    and (varint slot offset, confirmation count) pairs; the voted slot is the
+    last lockout with a confirmation count of 1.
+    """
+    if data is None or len(data) <= LOCKOUTS_OFFSET + 1:
+        return None
+    _, root = VOTE_HEADER.unpack_from(data, 0)
+    n_lockouts = data[LOCKOUTS_OFFSET]
+    offset = LOCKOUTS_OFFSET + 1
+    end = len(data)
+    current_slot = root
+    voted_slot = None
+    for lockout in range(n_lockouts):
+        increment = 0
+        shift = 0
+        while True:
+            if offset >= end:
+                return voted_slot
+            byte = data[offset]
+            offset += 1
+            increment |= (byte & 0x7F) << shift
+            if byte < 0x80:
+                break
+            shift += 7
+        if offset >= end:
+            return voted_slot
+        current_slot += increment
+        # The first lockout's count is the largest confirmation count, never the latest vote
+        if lockout and data[offset] == 1:
+            voted_slot = current_slot
+        offset += 1
+    return voted_slot
+
+def summarize_block(slot, block_data, epoch_number, latency_rows=None):
+    """Walk a block's transactions once and return (slot_row, vote_rows).
+
+    slot_row is None when the block has no rewards entry, matching the
+    behaviour of the original extract_slot_data. Pass a list as latency_rows
+    to also collect the block's vote-latency rows into it in the same walk.
+    """
+    block_hash = block_data['blockhash']
+    transactions = block_data.get('transactions') or []
+
+    total_fees = 0
+    total_cu = 0
+    total_signatures = 0
+    total_vote_tx = 0
+    vote_rows = []
+    vote_instructions = []   # (base58 data, vote program index, account keys, signature) for latency_rows
+
+    for tx in transactions:
+        meta = tx['meta']
+        total_fees += meta['fee']
+        total_cu += meta['computeUnitsConsumed']
+
+        transaction = tx['transaction']
+        total_signatures += len(transaction['signatures'])
+
+        message = transaction['message']
+        account_keys = message['accountKeys']
+        # Vote transactions nearly always list the vote program third; skip the scan for them
+        if len(account_keys) > 2 and account_keys[2] == VOTE_PROGRAM_ID:
+            vote_index = 2
+        else:
+            try:
+                vote_index = account_keys.index(VOTE_PROGRAM_ID)
+            except ValueError:
+                continue
+
+        total_vote_tx += 1
+        if vote_index >= 2:
+            vote_rows.append({
+                "epoch": epoch_number,
+                "block_slot": slot,
+                "block_hash": block_hash,
+                "identity_pubkey": account_keys[vote_index - 2],
+                "vote_account_pubkey": account_keys[vote_index - 1]
+            })
+            if latency_rows is not None:
+                for instruction in message.get('instructions', ()):
+                    if instruction['programIdIndex'] == vote_index:
+                        vote_instructions.append((instruction['data'], vote_index, account_keys, transaction['signatures'][0]))
+
+    if vote_instructions:
+        payloads = b58decode_many([data for data, _, _, _ in vote_instructions])
+        for payload, (_, vote_index, account_keys, signature) in zip(payloads, vote_instructions):
+            voted_slot = decode_voted_slot(payload)
+            if voted_slot is None:
+                continue
+            latency_rows.append({
+                "epoch": epoch_number,
+                "block_slot": slot,
+                "block_hash": block_hash,
+                "identity_pubkey": account_keys[vote_index - 2],
+                "vote_account_pubkey": account_keys[vote_index - 1],
+                "block_voted_on": voted_slot,
+                "signature": signature,
+                "latency": slot - voted_slot
+            })
+
+    rewards = block_data.get('rewards')
+    if not rewards:
+        return None, vote_rows
+
+    total_tx = len(transactions)
+    total_signature_fees = total_signatures * SIGNATURE_FEE_LAMPORTS
+    total_priority_fees = total_fees - total_signature_fees
+    total_validator_signature_fees = total_signatures * VALIDATOR_SIGNATURE_FEE_LAMPORTS
+    if epoch_number > FULL_PRIORITY_FEE_EPOCH:
+        total_validator_priority_fees = total_priority_fees
+    else:
+        total_validator_priority_fees = total_priority_fees // 2
+    total_validator_fees = total_validator_signature_fees + total_validator_priority_fees
+
+    reward = rewards[0]
+    slot_row = {
+        "identity_pubkey": reward['pubkey'],
+        "epoch": epoch_number,
+        "block_slot": slot,
+        "block_hash": block_hash,
+        "block_time": block_data['blockTime'],
+        "rewards": reward['lamports'],
+        "post_balance": reward['postBalance'],
+        "reward_type": reward['rewardType'],
+        "commission": reward['commission'],
+        "total_user_tx": total_tx - total_vote_tx,
+        "total_vote_tx": total_vote_tx,
+        "total_cu": total_cu,
+        "total_signature_fees": total_signature_fees,
+        "total_priority_fees": total_priority_fees,
+        "total_fees": total_fees,
+        "total_tx": total_tx,
+        "total_signatures": total_signatures,
+        "total_validator_fees": total_validator_fees,
+        "total_validator_signature_fees": total_validator_signature_fees,
+        "total_validator_priority_fees": total_validator_priority_fees,
+        "block_height": block_data['blockHeight'],
+        "parent_slot": block_data['parentSlot'],
+        "previous_block_hash": block_data['previousBlockhash']
+    }
+    return slot_row, vote_rows
+
+def decode_block_element(element, slot, epoch_number, vote_latency=False):
+    """Decode one parsed getBlock response object.
+
+    Returns a dict with 'slot_row', 'vote_rows' and 'latency_rows' (empty
+    unless vote_latency is set) on success, or with 'error' set to the
+    JSON-RPC error object when the block has no result.
+    """
+    block_data = element.get("result")
+    if block_data is None:
+        return {'slot_row': None, 'vote_rows': [], 'latency_rows': [], 'error': element.get("error") or {}}
+    latency_rows = [] if vote_latency else None
+    slot_row, vote_rows = summarize_block(slot, block_data, epoch_number, latency_rows)
+    return {'slot_row': slot_row, 'vote_rows': vote_rows, 'latency_rows': latency_rows or [], 'error': None}
+
+def decode_block_response(raw, slot, epoch_number, vote_latency=False):
+    """Decode a raw getBlock response body (bytes) for a single slot"""
+    return decode_block_element(loads(raw), slot, epoch_number, vote_latency)
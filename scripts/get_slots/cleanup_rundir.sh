@@ -31,6 +31,7 @@ log_info "📁 Created directory: $next_run_dir"
 
 # Move the specified files to the new directory
 mv *.csv solana_rpc_errors.log last_slots_to_process.txt "$next_run_dir"
+mv *.parquet "$next_run_dir" 2>/dev/null
 log_info "📦 Moved files to $next_run_dir"
 
 # Cleanup logging
@@ -1,6 +1,5 @@
 #!/usr/bin/env python3
 import os
-import csv
 import json
 import requests
 import time
@@ -15,6 +14,8 @@ import logging
 from datetime import datetime
 import signal
 import threading
+import asyncio
+import multiprocessing
 from requests.adapters import HTTPAdapter
 from urllib3.util.retry import Retry
 
@@ -26,6 +27,16 @@ from pathlib import Path
 sys.path.append(str(Path(__file__).parent.parent / "python"))
 sys.path.append("/home/smilax/api")
 
+from async_fetch import (AsyncBlockFetcher, build_get_block_payload, build_get_block_batch_payload,
+                         split_batch_response, SKIPPED_SLOT_ERROR_CODES, AIMD_MAX_LIMIT)
+from block_decoder import loads, decode_block_element, decode_block_response, summarize_block
+from slot_completion_index import SlotCompletionIndex, scan_epoch_outputs
+from rpc_client import RpcClient, RpcError
+from block_archive import BlockArchive, BlockArchiveWriter, replay_chunk
+from postgres_sink import PostgresSlotSink
+from slot_output import SlotOutput, OUTPUT_FORMATS, SLOT_DATA_FIELDNAMES, VOTE_DATA_FIELDNAMES
+from tip_follower import TipFollower, websocket_url, FOLLOW_WORKERS, FOLLOW_MAX_RETRIES
+
 # Import RPC_ENDPOINT
 try:
     from rpc_config import RPC_ENDPOINT
@@ -33,19 +44,41 @@ except ImportError:
     RPC_ENDPOINT = "https://api.mainnet-beta.solana.com"
     print(f"Warning: Could not import RPC_ENDPOINT, using default: {RPC_ENDPOINT}")
 
-# RPC Configuration
-RPC_ENDPOINT_1 = RPC_ENDPOINT
-RPC_ENDPOINT_2 = RPC_ENDPOINT
-#RPC_ENDPOINT_2 = "https://silent-frequent-firefly.solana-mainnet.quiknode.pro/2059a05165e13886cb8226c6b87081ad579860e3/"
-RPC_ENDPOINT_3 = RPC_ENDPOINT
+# Endpoint pool routed by rpc_client.RpcClient; defaults to the single RPC_ENDPOINT
+try:
+    from rpc_config import RPC_ENDPOINTS
+except ImportError:
+    RPC_ENDPOINTS = [RPC_ENDPOINT]
+
+# Optional per-endpoint JSON-RPC batch sizes, keyed by domain (e.g. {'alchemy.com': 10})
+try:
+    from rpc_config import RPC_BATCH_SIZES
+except ImportError:
+    RPC_BATCH_SIZES = {}
+
+# RPC Configuration - add providers to RPC_ENDPOINTS in rpc_config.py, e.g.
+# "https://silent-frequent-firefly.solana-mainnet.quiknode.pro/2059a05165e13886cb8226c6b87081ad579860e3/"
+RPC_ENDPOINTS = list(dict.fromkeys(RPC_ENDPOINTS))
+
+# Comma-separated endpoint override, e.g. to point the collector at mock_rpc_server.py for benchmarking
+if os.environ.get('GET_SLOTS_RPC_ENDPOINTS'):
+    RPC_ENDPOINTS = [url.strip() for url in os.environ['GET_SLOTS_RPC_ENDPOINTS'].split(',') if url.strip()]
+
+# Websocket endpoint for --follow (rootSubscribe); defaults to the first RPC endpoint over ws(s)://
+try:
+    from rpc_config import RPC_WS_ENDPOINT
+except ImportError:
+    RPC_WS_ENDPOINT = websocket_url(RPC_ENDPOINTS[0])
+RPC_WS_ENDPOINT = os.environ.get('GET_SLOTS_WS_ENDPOINT', RPC_WS_ENDPOINT)
 
 headers = {'Content-Type': 'application/json'}
 debug = True
 error_log_file = "solana_rpc_errors.log"
 
 # ENHANCED RATE LIMITING CONFIGURATION (more aggressive after observations)
-MAX_CONCURRENT_REQUESTS = 4  # 
-REQUEST_SPACING = 0.15       # Increased to 150ms between requests for better staggering
+# Both can be overridden from the environment so bench_get_slots.py can sweep them
+MAX_CONCURRENT_REQUESTS = int(os.environ.get('GET_SLOTS_MAX_CONCURRENT_REQUESTS', 4))
+REQUEST_SPACING = float(os.environ.get('GET_SLOTS_REQUEST_SPACING', 0.15))  # 150ms between requests for better staggering
 GLOBAL_REQUEST_SEMAPHORE = threading.Semaphore(MAX_CONCURRENT_REQUESTS)
 LAST_REQUEST_TIME = 0
 REQUEST_TIMING_LOCK = threading.Lock()
@@ -74,11 +107,21 @@ THREAD_ALLOCATION = {
     'EMERGENCY_CATCHUP': 2
 }
 
+# getBlocks pre-pass range per request (RPC nodes cap getBlocks at 500,000 slots)
+GET_BLOCKS_RANGE = 100000
+
 # Global state management
 shutdown_requested = threading.Event()
 current_thread_count = 2
 last_evaluation_time = 0
 evaluation_interval = 300  # Re-evaluate every 5 minutes
+completion_index = None    # SlotCompletionIndex for the epoch being collected
+block_archive = None       # BlockArchiveWriter when --archive is set
+db_sink = None             # PostgresSlotSink when --db-sink is set
+output_format = "csv"      # slot_data/epoch_votes file format (--output-format)
+vote_latency = False       # also write vote_latency files (--vote-latency)
+ASYNC_FILE_SLOTS = 2000    # async engine starts new output files every N blocks so Parquet files close regularly
+ASYNC_MAX_INFLIGHT = int(os.environ.get('GET_SLOTS_ASYNC_MAX_INFLIGHT', AIMD_MAX_LIMIT))  # per-endpoint AIMD ceiling
 
 # Optimized session for bandwidth management
 session = requests.Session()
@@ -90,6 +133,11 @@ adapter = HTTPAdapter(
 session.mount('https://', adapter)
 session.mount('http://', adapter)
 
+# Routes each request to the healthiest endpoint and opens a circuit breaker on repeated 401/429s,
+# so a throttled provider no longer stalls the threads that used to be pinned to it. No hedging: a hedged
+# getBlock downloads the same multi-MB block twice and bypasses GLOBAL_REQUEST_SEMAPHORE/REQUEST_SPACING
+rpc_client = RpcClient(RPC_ENDPOINTS, session=session, timeout=(10, 30), hedge=False)
+
 def setup_logging():
     """Setup enhanced logging with bandwidth monitoring focus"""
     # Create a completely clean logger
@@ -174,12 +222,16 @@ def get_domain_name(url):
             return '.'.join(parts[-2:])
         return domain
 
-def rate_limited_request(url, payload, thread_id, logger, bandwidth_logger):
-    """Enhanced rate-limited RPC request with better error reporting and URL prefix"""
+def rate_limited_request(url, payload, thread_id, logger, bandwidth_logger, batch_limits=None):
+    """Enhanced rate-limited RPC request with better error reporting and URL prefix.
+
+    url=None lets rpc_client pick (and hedge across) the healthiest endpoint;
+    batch_limits keeps a batch payload on endpoints that accept its size.
+    """
     global LAST_REQUEST_TIME
     
     request_start_time = time.time()
-    domain = get_domain_name(url)
+    domain = get_domain_name(url) if url else "pool"
     
     # More restrictive concurrent request limiting
     with GLOBAL_REQUEST_SEMAPHORE:
@@ -193,7 +245,8 @@ def rate_limited_request(url, payload, thread_id, logger, bandwidth_logger):
             LAST_REQUEST_TIME = time.time()
         
         try:
-            response = session.post(url, headers=headers, json=payload, timeout=(10, 30))
+            response, url = rpc_client.post(payload, endpoint=url, timeout=(10, 30), batch_limits=batch_limits)
+            domain = get_domain_name(url)
             
             # Calculate metrics
             request_duration = time.time() - request_start_time
@@ -219,7 +272,7 @@ def rate_limited_request(url, payload, thread_id, logger, bandwidth_logger):
             # Return response and metrics together
             return response, response_size_mb, request_duration
             
-        except requests.exceptions.RequestException as e:
+        except (requests.exceptions.RequestException, RpcError) as e:
             request_duration = time.time() - request_start_time
             error_details = {
                 'error_type': type(e).__name__,
@@ -248,6 +301,19 @@ def log_error(slot, error_code, error_details, logger):
         else:
             f.write(f"{slot},{error_code},{json.dumps(error_details)}\n")
 
+def open_task_output(slot_base, vote_base):
+    """Open one task's slot_data/epoch_votes (and vote_latency) files in the configured output format"""
+    latency_base = vote_base.replace("epoch_votes", "vote_latency", 1) if vote_latency else None
+    return SlotOutput(slot_base, vote_base, output_format, on_durable=record_produced_slot,
+                      report_rows=db_sink is not None, latency_base=latency_base)
+
+def record_produced_slot(slot, slot_row, vote_rows):
+    """Mark a slot produced once its CSV rows are flushed; with --db-sink, once its rows are committed"""
+    if db_sink is not None:
+        db_sink.add(slot, slot_row, vote_rows)
+    elif completion_index is not None:
+        completion_index.mark_produced(slot)
+
 def signal_handler(signum, frame):
     """Handle graceful shutdown signals with forced exit"""
     print(f"Received signal {signum}. Aborting process...")
@@ -262,11 +328,11 @@ signal.signal(signal.SIGQUIT, signal_handler)  # Add SIGQUIT handler
 
 def process_slot_data(thread_id, slots, file_index, epoch_number, rpc_endpoint, urgency_level, logger, bandwidth_logger):
     """Process slot data with simplified logging and better 401 error reporting"""
-    slot_data_file = f"slot_data_thread_{thread_id}_file_{file_index}.csv"
-    vote_data_file = f"epoch_votes_thread_{thread_id}_file_{file_index}.csv"
+    slot_data_file = f"slot_data_thread_{thread_id}_file_{file_index}"
+    vote_data_file = f"epoch_votes_thread_{thread_id}_file_{file_index}"
     
-    # Get domain for concise logging
-    domain = get_domain_name(rpc_endpoint)
+    # Get domain for concise logging ("pool" when rpc_client routes each request)
+    domain = get_domain_name(rpc_endpoint) if rpc_endpoint else "pool"
 
     # Simplified startup logging
     logger.info(f"E{epoch_number} T{thread_id}[{domain}] START: {len(slots)} slots")
@@ -278,16 +344,8 @@ def process_slot_data(thread_id, slots, file_index, epoch_number, rpc_endpoint,
     last_progress_time = time.time()
     
     try:
-        with open(slot_data_file, 'w', newline='') as slot_file, open(vote_data_file, 'w', newline='') as vote_file:
-            fieldnames = ["identity_pubkey", "epoch", "block_slot", "block_hash", "block_time", "rewards", "post_balance", "reward_type", "commission",
-                          "total_user_tx", "total_vote_tx", "total_cu", "total_signature_fees", "total_priority_fees", "total_fees",
-                          "total_tx", "total_signatures", "total_validator_fees", "total_validator_signature_fees", "total_validator_priority_fees",
-                          "block_height", "parent_slot", "previous_block_hash"]
-            slot_writer = csv.DictWriter(slot_file, fieldnames=fieldnames)
-            slot_writer.writeheader()
-
-            vote_writer = csv.DictWriter(vote_file, fieldnames=["epoch", "block_slot", "block_hash", "identity_pubkey", "vote_account_pubkey"])
-            vote_writer.writeheader()
+        with open_task_output(slot_data_file, vote_data_file) as output:
+            slot_data_file, vote_data_file = output.slot_path, output.vote_path
 
             for slot in slots:
                 # Check for shutdown request periodically
@@ -298,20 +356,7 @@ def process_slot_data(thread_id, slots, file_index, epoch_number, rpc_endpoint,
                 # Single line per slot processing - will be updated with success/fail status
                 slot_status = f"E{epoch_number} T{thread_id}[{domain}] Slot {slot} ({processed_slots + 1}/{total_slots})"
 
-                payload_block = {
-                    "jsonrpc": "2.0",
-                    "id": thread_id,
-                    "method": "getBlock",
-                    "params": [
-                        slot,
-                        {
-                            "encoding": "json",
-                            "transactionDetails": "full",
-                            "rewards": True,
-                            "maxSupportedTransactionVersion": 1
-                        }
-                    ]
-                }
+                payload_block = build_get_block_payload(slot, thread_id)
 
                 success = False
                 max_retries = 2  # Conservative retry count
@@ -325,25 +370,18 @@ def process_slot_data(thread_id, slots, file_index, epoch_number, rpc_endpoint,
                         response_block, size_mb, duration = rate_limited_request(rpc_endpoint, payload_block, thread_id, logger, bandwidth_logger)
                         
                         if response_block and response_block.status_code == 200:
-                            response_json = response_block.json()
-                            if "result" in response_json and response_json["result"] is not None:
-                                block_info = response_json["result"]
-                                
-                                slot_data_entry = extract_slot_data(slot, block_info, epoch_number)
-                                if slot_data_entry:
-                                    slot_writer.writerow(slot_data_entry)
-                                    slot_file.flush()
-                                
-                                vote_data = extract_vote_data(slot, block_info, epoch_number)
-                                for vote_entry in vote_data:
-                                    vote_writer.writerow(vote_entry)
-                                vote_file.flush()
+                            decoded = decode_block_response(response_block.content, slot, epoch_number, vote_latency)
+                            if decoded['error'] is None:
+                                if block_archive is not None:
+                                    block_archive.append(slot, response_block.content)
+                                output.add(slot, decoded['slot_row'], decoded['vote_rows'], decoded['latency_rows'])
+                                output.commit()
                                 
                                 success = True
                                 logger.info(f"{slot_status} ✓ [{size_mb:.1f}MB/{duration:.2f}s]")
                                 break
                             else:
-                                error_info = response_json.get("error", {})
+                                error_info = decoded['error']
                                 error_code = error_info.get("code", -999)
                                 
                                 # Enhanced error logging with more details
@@ -351,7 +389,7 @@ def process_slot_data(thread_id, slots, file_index, epoch_number, rpc_endpoint,
                                     'slot': slot,
                                     'error_code': error_code,
                                     'error_message': error_info.get("message", ""),
-                                    'domain': domain,
+                                    'domain': get_domain_name(response_block.url),
                                     'attempt': attempt + 1
                                 }
                                 log_error(slot, error_code, json.dumps(error_details), logger)
@@ -359,6 +397,8 @@ def process_slot_data(thread_id, slots, file_index, epoch_number, rpc_endpoint,
                                 # Special handling for certain error codes
                                 if error_code in [-32009, -32007]:
                                     logger.info(f"{slot_status} - SKIPPED")
+                                    if completion_index is not None:
+                                        completion_index.mark_skipped(slot)
                                     success = True
                                     break
                                 
@@ -370,7 +410,7 @@ def process_slot_data(thread_id, slots, file_index, epoch_number, rpc_endpoint,
                                 'status_code': response_block.status_code,
                                 'reason': response_block.reason,
                                 'response_text': response_block.text[:100] if response_block.text else '',
-                                'domain': domain,
+                                'domain': get_domain_name(response_block.url),
                                 'attempt': attempt + 1
                             }
                             
@@ -439,84 +479,240 @@ def process_slot_data(thread_id, slots, file_index, epoch_number, rpc_endpoint,
 
     return slot_data_file, vote_data_file
 
-def extract_slot_data(slot, block_data, epoch_number):
-    """Extract slot data from block response (unchanged)"""
-    if not block_data['rewards']:
-        return None
-
-    block_time = block_data['blockTime']
-    block_hash = block_data['blockhash']
-    block_height = block_data['blockHeight']
-    parent_slot = block_data['parentSlot']
-    previous_blockhash = block_data['previousBlockhash']
-    transactions = block_data.get('transactions', [])
-
-    total_fees = sum(tx['meta']['fee'] for tx in transactions)
-    total_tx = len(transactions)
-    total_signatures = sum(len(tx['transaction']['signatures']) for tx in transactions)
-    
-    total_signature_fees = total_signatures * 5000
-    total_priority_fees = total_fees - total_signature_fees
-    total_validator_signature_fees = total_signatures * 2500
-    if epoch_number > 740:
-        total_validator_priority_fees = total_priority_fees
-    else:
-        total_validator_priority_fees = total_priority_fees / 2
+def process_slot_data_batched(thread_id, slots, file_index, epoch_number, rpc_endpoint, batch_sizes, logger, bandwidth_logger):
+    """Process slot data with JSON-RPC batch getBlock requests.
 
-    total_validator_fees = total_validator_signature_fees + total_validator_priority_fees
+    batch_sizes maps endpoint domain to getBlock calls per HTTP POST. Each
+    batch is sized for the endpoint rpc_client currently ranks best and is
+    only routed to endpoints whose batch size covers it.
+    """
+    slot_data_file = f"slot_data_thread_{thread_id}_file_{file_index}"
+    vote_data_file = f"epoch_votes_thread_{thread_id}_file_{file_index}"
+    domain = get_domain_name(rpc_endpoint) if rpc_endpoint else "pool"
+    batch_limits = {url: batch_sizes.get(get_domain_name(url), 1) for url in rpc_client.endpoints}
 
-    total_vote_tx = sum(1 for tx in transactions if any(
-        pk == "Vote111111111111111111111111111111111111111" for pk in
-        tx['transaction']['message']['accountKeys']))
-    total_user_tx = total_tx - total_vote_tx
-    total_cu = sum(tx['meta']['computeUnitsConsumed'] for tx in transactions)
+    logger.info(f"E{epoch_number} T{thread_id}[{domain}] START: {len(slots)} slots (batch sizes {batch_sizes})")
 
-    reward = block_data['rewards'][0]
-    return {
-        "identity_pubkey": reward['pubkey'],
-        "epoch": epoch_number,
-        "block_slot": slot,
-        "block_hash": block_hash,
-        "block_time": block_time,
-        "rewards": reward['lamports'],
-        "post_balance": reward['postBalance'],
-        "reward_type": reward['rewardType'],
-        "commission": reward['commission'],
-        "total_user_tx": total_user_tx,
-        "total_vote_tx": total_vote_tx,
-        "total_cu": total_cu,
-        "total_signature_fees": total_signature_fees,
-        "total_priority_fees": total_priority_fees,
-        "total_fees": total_fees,
-        "total_tx": total_tx,
-        "total_signatures": total_signatures,
-        "total_validator_fees": total_validator_fees,
-        "total_validator_signature_fees": total_validator_signature_fees,
-        "total_validator_priority_fees": total_validator_priority_fees,
-        "block_height": block_height,
-        "parent_slot": parent_slot,
-        "previous_block_hash": previous_blockhash
-    }
+    thread_start_time = time.time()
+    processed_slots = 0
+    total_slots = len(slots)
+    max_retries = 2
+
+    try:
+        with open_task_output(slot_data_file, vote_data_file) as output:
+            slot_data_file, vote_data_file = output.slot_path, output.vote_path
+
+            batch_start = 0
+            while batch_start < total_slots:
+                if shutdown_requested.is_set():
+                    logger.info(f"E{epoch_number} T{thread_id}[{domain}]: Shutdown requested - aborting")
+                    break
+
+                if rpc_endpoint is not None:
+                    batch_size = batch_sizes.get(domain, 1)
+                else:
+                    batch_size = rpc_client.batch_endpoint(batch_limits)[1]
+                pending = slots[batch_start:batch_start + batch_size]
+                batch_label = f"E{epoch_number} T{thread_id}[{domain}] Batch {pending[0]}-{pending[-1]}"
+
+                for attempt in range(max_retries):
+                    if not pending or shutdown_requested.is_set():
+                        break
+
+                    # A lone slot goes out as a plain call so endpoints without batch support can take it
+                    if len(pending) > 1:
+                        payload = build_get_block_batch_payload(pending)
+                    else:
+                        payload = build_get_block_payload(pending[0], pending[0])
+                    response_batch, size_mb, duration = rate_limited_request(
+                        rpc_endpoint, payload, thread_id, logger, bandwidth_logger, batch_limits=batch_limits)
+
+                    if response_batch is None or response_batch.status_code != 200:
+                        if response_batch is not None:
+                            http_error_details = {
+                                'status_code': response_batch.status_code,
+                                'reason': response_batch.reason,
+                                'response_text': response_batch.text[:100] if response_batch.text else '',
+                                'domain': get_domain_name(response_batch.url),
+                                'attempt': attempt + 1
+                            }
+                            for slot in pending:
+                                log_error(slot, response_batch.status_code, json.dumps(dict(http_error_details, slot=slot)), logger)
+                            logger.warning(f"{batch_label} - HTTP {response_batch.status_code} ({len(pending)} slots)")
+                            retry_delay = 15 if response_batch.status_code == 401 else min(3 + attempt * 2, 10)
+                        else:
+                            logger.warning(f"{batch_label} - Request failed [{duration:.2f}s] ({len(pending)} slots)")
+                            retry_delay = min(3 + attempt * 2, 10)
+                        if attempt < max_retries - 1:
+                            time.sleep(retry_delay)
+                        continue
+
+                    try:
+                        body = loads(response_batch.content)
+                        elements = split_batch_response(body if isinstance(payload, list) else [body])
+                    except ValueError as e:
+                        logger.warning(f"{batch_label} - Invalid JSON: {e}")
+                        elements = {}
+                    if not elements:
+                        logger.warning(f"{batch_label} - Batch rejected by {get_domain_name(response_batch.url)}: {response_batch.text[:200]}")
+
+                    # Handle each element on its own so one skipped slot never fails the batch
+                    still_pending = []
+                    for slot in pending:
+                        element = elements.get(slot)
+                        if element is None:
+                            still_pending.append(slot)
+                            continue
+
+                        decoded = decode_block_element(element, slot, epoch_number, vote_latency)
+                        if decoded['error'] is None:
+                            output.add(slot, decoded['slot_row'], decoded['vote_rows'], decoded['latency_rows'])
+                            if block_archive is not None:
+                                block_archive.append_element(slot, element)
+                            continue
+
+                        error_info = decoded['error']
+                        error_code = error_info.get("code", -999)
+                        error_details = {
+                            'slot': slot,
+                            'error_code': error_code,
+                            'error_message': error_info.get("message", ""),
+                            'domain': get_domain_name(response_batch.url),
+                            'attempt': attempt + 1
+                        }
+                        log_error(slot, error_code, json.dumps(error_details), logger)
+                        if error_code in SKIPPED_SLOT_ERROR_CODES:
+                            logger.info(f"E{epoch_number} T{thread_id}[{domain}] Slot {slot} - SKIPPED")
+                            if completion_index is not None:
+                                completion_index.mark_skipped(slot)
+                        else:
+                            still_pending.append(slot)
+
+                    output.commit()
+                    done = len(pending) - len(still_pending)
+                    logger.info(f"{batch_label} ✓ {done}/{len(pending)} [{size_mb:.1f}MB/{duration:.2f}s]")
+
+                    pending = still_pending
+                    if pending and attempt < max_retries - 1:
+                        time.sleep(min(3 + attempt * 2, 10))
+
+                if pending and not shutdown_requested.is_set():
+                    for slot in pending:
+                        logger.error(f"E{epoch_number} T{thread_id}[{domain}] Slot {slot} - Failed after {max_retries} attempts")
+
+                batch_start += batch_size
+                processed_slots = min(batch_start, total_slots)
+                elapsed = time.time() - thread_start_time
+                rate = processed_slots / elapsed if elapsed > 0 else 0
+                logger.info(f"E{epoch_number} T{thread_id}[{domain}] Progress: {processed_slots}/{total_slots} "
+                            f"({processed_slots / total_slots * 100:.1f}%) at {rate:.1f} s/s")
+
+    except Exception as e:
+        logger.error(f"E{epoch_number} T{thread_id}[{domain}] - Fatal error: {str(e)}")
+        raise
+    finally:
+        thread_duration = time.time() - thread_start_time
+        final_rate = processed_slots / thread_duration if thread_duration > 0 else 0
+        logger.info(f"E{epoch_number} T{thread_id}[{domain}] DONE: {processed_slots}/{total_slots} slots in {thread_duration/60:.1f}m ({final_rate:.1f} s/s)")
+
+    return slot_data_file, vote_data_file
+
+def process_slots_async(slots, epoch_number, logger, bandwidth_logger, timeout_seconds=None, batch_sizes=None):
+    """Fetch slots with the asyncio engine and write the same slot_data/epoch_votes/error-log outputs as process_slot_data"""
+    fetcher = AsyncBlockFetcher(
+        RPC_ENDPOINTS,
+        get_domain_name,
+        logger,
+        bandwidth_logger,
+        shutdown_event=shutdown_requested,
+        batch_sizes=batch_sizes,
+        max_limit=ASYNC_MAX_INFLIGHT
+    )
+    logger.info(f"E{epoch_number} ASYNC START: {len(slots)} slots across {len(fetcher.limiters)} endpoint(s)")
+
+    handle_result, close_outputs = async_result_handler(epoch_number, "async", logger)
+    try:
+        async def run_fetcher():
+            if timeout_seconds is None:
+                return await fetcher.run(slots, handle_result)
+            return await asyncio.wait_for(fetcher.run(slots, handle_result), timeout_seconds)
+
+        counters = asyncio.run(run_fetcher())
+    finally:
+        close_outputs()
+
+    return counters
+
+def async_result_handler(epoch_number, label, logger):
+    """Return (handle_result, close) writing AsyncBlockFetcher results to rolling slot_data/epoch_votes files"""
+    outputs = {'file_index': 0, 'blocks': 0}
+    outputs['current'] = open_task_output(f"slot_data_thread_{label}_file_0", f"epoch_votes_thread_{label}_file_0")
+
+    def handle_result(result):
+        slot = result['slot']
+        slot_status = f"E{epoch_number} {label.upper()}[{result['domain']}] Slot {slot}"
+
+        if result['status'] == 'ok':
+            block_info = result.pop('block_info')
+            latency_rows = [] if vote_latency else None
+            slot_data_entry, vote_rows = summarize_block(slot, block_info, epoch_number, latency_rows)
+            if block_archive is not None:
+                block_archive.append_element(slot, {"jsonrpc": "2.0", "result": block_info, "id": slot})
+            output = outputs['current']
+            output.add(slot, slot_data_entry, vote_rows, latency_rows or ())
+            output.commit()
+            outputs['blocks'] += 1
+            if outputs['blocks'] % ASYNC_FILE_SLOTS == 0:
+                output.close()
+                outputs['file_index'] += 1
+                outputs['current'] = open_task_output(f"slot_data_thread_{label}_file_{outputs['file_index']}",
+                                                      f"epoch_votes_thread_{label}_file_{outputs['file_index']}")
+            logger.info(f"{slot_status} ✓ [{result['size_mb']:.1f}MB/{result['duration']:.2f}s]")
+            return
+
+        error_details = result['error'] or {'slot': slot, 'error_type': 'RequestError', 'domain': result['domain']}
+        error_code = error_details.get('error_code', error_details.get('status_code', -996))
+        log_error(slot, error_code, json.dumps(error_details), logger)
+        if result['status'] == 'skipped':
+            logger.info(f"{slot_status} - SKIPPED")
+            if completion_index is not None:
+                completion_index.mark_skipped(slot)
+        elif not shutdown_requested.is_set():
+            logger.error(f"{slot_status} - Failed after retries")
+
+    def close():
+        outputs['current'].close()
+
+    return handle_result, close
+
+def follow_epoch(epoch_number, end_slot, last_queued_slot, backlog, workers, logger, bandwidth_logger, batch_sizes=None):
+    """Fetch the backlog, then follow rooted slots over the websocket until end_slot (--follow)"""
+    fetcher = AsyncBlockFetcher(
+        RPC_ENDPOINTS,
+        get_domain_name,
+        logger,
+        bandwidth_logger,
+        shutdown_event=shutdown_requested,
+        max_retries=FOLLOW_MAX_RETRIES,
+        batch_sizes=batch_sizes,
+        max_limit=ASYNC_MAX_INFLIGHT
+    )
+    handle_result, close_outputs = async_result_handler(epoch_number, "follow", logger)
+    try:
+        follower = TipFollower(RPC_WS_ENDPOINT, fetcher, handle_result, end_slot, last_queued_slot, logger,
+                               backlog=backlog, workers=workers, shutdown_event=shutdown_requested)
+        counters = asyncio.run(follower.run())
+    finally:
+        close_outputs()
+    return counters
+
+def extract_slot_data(slot, block_data, epoch_number):
+    """Extract slot data from block response (see block_decoder.summarize_block)"""
+    return summarize_block(slot, block_data, epoch_number)[0]
 
 def extract_vote_data(slot, block_data, epoch_number):
-    """Extract vote data from block response (unchanged)"""
-    vote_data = []
-    transactions = block_data.get('transactions', [])
-    for tx in transactions:
-        account_keys = tx['transaction']['message']['accountKeys']
-        if "Vote111111111111111111111111111111111111111" in account_keys:
-            vote_index = account_keys.index("Vote111111111111111111111111111111111111111")
-            if vote_index >= 2:
-                vote_authority = account_keys[vote_index - 2]
-                vote_account = account_keys[vote_index - 1]
-                vote_data.append({
-                    "epoch": epoch_number,
-                    "block_slot": slot,
-                    "block_hash": block_data['blockhash'],
-                    "identity_pubkey": vote_authority,
-                    "vote_account_pubkey": vote_account
-                })
-    return vote_data
+    """Extract vote data from block response (see block_decoder.summarize_block)"""
+    return summarize_block(slot, block_data, epoch_number)[1]
 
 def calculate_true_catchup_time(slots_behind, processing_rate):
     """Calculate actual catch-up time accounting for ongoing network advancement"""
@@ -560,7 +756,7 @@ def get_epoch_info(epoch_number=None, logger=None, bandwidth_logger=None):
         "params": [None]
     }
     
-    response, _, _ = rate_limited_request(RPC_ENDPOINT_1, payload, "epoch_info", logger, bandwidth_logger)
+    response, _, _ = rate_limited_request(None, payload, "epoch_info", logger, bandwidth_logger)
     epoch_info = response.json()["result"]
 
     if epoch_number is None:
@@ -582,47 +778,91 @@ def get_epoch_info(epoch_number=None, logger=None, bandwidth_logger=None):
         "slotsInEpoch": epoch_info["slotsInEpoch"]
     }
 
-def find_missing_slots(epoch_start_slot, epoch_end_slot, logger):
-    """Find missing slots from previous runs"""
-    processed_slots = set()
-
-    logger.info("Scanning for previously processed slots...")
-    run_dirs = glob.glob('run*')
-    if not run_dirs:
-        logger.info("No run directories found - processing all slots in epoch")
-        return list(range(epoch_start_slot, epoch_end_slot + 1))
-
-    for run_dir in run_dirs:
-        csv_files = glob.glob(os.path.join(run_dir, "slot_data_thread_*.csv"))
-        for file in csv_files:
-            with open(file, "r") as f:
-                csv_reader = csv.DictReader(f)
-                for row in csv_reader:
-                    if 'block_slot' in row:
-                        try:
-                            slot = int(row['block_slot'])
-                            processed_slots.add(slot)
-                        except ValueError as e:
-                            logger.error(f"Failed to parse slot from CSV {file}, row: {row['block_slot']} - Error: {e}")
-                            continue
-
-        log_files = glob.glob(os.path.join(run_dir, "solana*rpc*errors.log"))
-        for file in log_files:
-            with open(file, "r") as f:
-                for line in f:
-                    if "-32007" in line or "-32009" in line:
-                        first_column = line.split(',')[0]
-                        if first_column.isdigit():
-                            slot = int(first_column)
-                            processed_slots.add(slot)
-                        else:
-                            continue
-
-    epoch_slots = set(range(epoch_start_slot, epoch_end_slot + 1))
-    missing_slots = list(epoch_slots - processed_slots)
-    missing_slots.sort()
+def get_produced_slots(start_slot, end_slot, logger, bandwidth_logger):
+    """Return the set of slots in [start_slot, end_slot] that produced a block, via getBlocks.
+
+    Returns None if the endpoint cannot serve the range (e.g. ledger not
+    available), in which case every slot has to be probed with getBlock.
+    """
+    produced_slots = set()
+    for range_start in range(start_slot, end_slot + 1, GET_BLOCKS_RANGE):
+        range_end = min(range_start + GET_BLOCKS_RANGE - 1, end_slot)
+        payload = {
+            "jsonrpc": "2.0",
+            "id": 1,
+            "method": "getBlocks",
+            "params": [range_start, range_end, {"commitment": "finalized"}]
+        }
+        response, size_mb, duration = rate_limited_request(None, payload, "get_blocks", logger, bandwidth_logger)
+        if response is None or response.status_code != 200:
+            status = response.status_code if response is not None else "no response"
+            logger.warning(f"getBlocks {range_start:,}-{range_end:,} failed ({status}) - falling back to per-slot probing")
+            return None
+
+        response_json = loads(response.content)
+        if response_json.get("result") is None:
+            error_info = response_json.get("error", {})
+            logger.warning(f"getBlocks {range_start:,}-{range_end:,} error {error_info.get('code')}: "
+                           f"{error_info.get('message', '')} - falling back to per-slot probing")
+            return None
+
+        produced_slots.update(response_json["result"])
+        logger.info(f"getBlocks {range_start:,}-{range_end:,}: {len(response_json['result']):,} blocks [{size_mb:.1f}MB/{duration:.2f}s]")
+
+    return produced_slots
+
+def record_skipped_slots(slots, domain):
+    """Write getBlocks-confirmed skipped slots to the error log and completion index in one pass"""
+    timestamp = datetime.now().isoformat()
+    with open(error_log_file, 'a') as f:
+        for slot in slots:
+            error_details = json.dumps({
+                'slot': slot,
+                'error_code': -32007,
+                'error_message': 'Slot skipped (not in getBlocks result)',
+                'domain': domain,
+                'attempt': 0
+            })
+            f.write(f"{slot},-32007,{error_details}\n")
+            f.write(f"ENHANCED,{timestamp},{slot},-32007,{domain},{error_details}\n")
+    if completion_index is not None:
+        completion_index.mark_skipped_many(slots)
+
+def filter_skipped_slots(slots_to_process, logger, bandwidth_logger):
+    """Drop slots that getBlocks shows were skipped so only produced blocks are fetched with getBlock"""
+    if not slots_to_process:
+        return slots_to_process
+
+    produced_slots = get_produced_slots(slots_to_process[0], slots_to_process[-1], logger, bandwidth_logger)
+    if not produced_slots:
+        return slots_to_process
+
+    # Slots after the last finalized block may simply not be final yet, so they stay queued
+    last_produced_slot = max(produced_slots)
+    skipped_slots = [slot for slot in slots_to_process if slot < last_produced_slot and slot not in produced_slots]
+    if skipped_slots:
+        record_skipped_slots(skipped_slots, "pool")
+
+    remaining_slots = [slot for slot in slots_to_process if slot in produced_slots or slot > last_produced_slot]
+    logger.info(f"getBlocks pre-pass: {len(skipped_slots):,} skipped slots recorded, {len(remaining_slots):,} blocks to fetch")
+    return remaining_slots
 
-    logger.info(f"Found {len(processed_slots):,} previously processed slots")
+def find_missing_slots(epoch_start_slot, epoch_end_slot, logger):
+    """Find missing slots from previous runs using the slot completion index"""
+    if completion_index is not None:
+        missing_slots = completion_index.missing_slots(epoch_start_slot, epoch_end_slot)
+        produced_count, skipped_count = completion_index.counts()
+        logger.info(f"Slot completion index: {produced_count:,} produced, {skipped_count:,} skipped")
+        processed_count = (epoch_end_slot - epoch_start_slot + 1) - len(missing_slots)
+    else:
+        logger.info("Scanning for previously processed slots...")
+        produced, skipped = scan_epoch_outputs('.', epoch_start_slot, epoch_end_slot, logger)
+        processed_slots = produced | skipped
+        epoch_slots = set(range(epoch_start_slot, epoch_end_slot + 1))
+        missing_slots = sorted(epoch_slots - processed_slots)
+        processed_count = len(processed_slots)
+
+    logger.info(f"Found {processed_count:,} previously processed slots")
     logger.info(f"Missing slots to process: {len(missing_slots):,}")
     if missing_slots:
         logger.info(f"Slot range: {missing_slots[0]:,} to {missing_slots[-1]:,}")
@@ -654,7 +894,7 @@ def evaluate_processing_situation(epoch_number, slots_to_process, logger, bandwi
             logger.info(f"Minutes behind: {minutes_behind:.1f}")
         
         # Simplified RPC endpoint logging
-        logger.info(f"RPC Endpoints: {get_domain_name(RPC_ENDPOINT_1)}, {get_domain_name(RPC_ENDPOINT_2)}, {get_domain_name(RPC_ENDPOINT_3)}")
+        logger.info(f"RPC Endpoints: {', '.join(get_domain_name(url) for url in rpc_client.ranked_endpoints())}")
         logger.info(f"===========================")
         
         return urgency_level, network_current_epoch, network_current_slot
@@ -663,6 +903,14 @@ def evaluate_processing_situation(epoch_number, slots_to_process, logger, bandwi
         logger.error(f"Error evaluating processing situation: {e}")
         return 'MAINTAINING', None, None
 
+def get_batch_sizes(default_batch_size=None):
+    """Resolve the JSON-RPC batch size for each configured endpoint domain"""
+    batch_sizes = {}
+    for endpoint in RPC_ENDPOINTS:
+        domain = get_domain_name(endpoint)
+        batch_sizes[domain] = max(1, RPC_BATCH_SIZES.get(domain, default_batch_size or 1))
+    return batch_sizes
+
 def get_optimal_thread_count(urgency_level, slots_remaining):
     """Get optimal thread count with conservative bandwidth management"""
     base_threads = THREAD_ALLOCATION.get(urgency_level, 4)
@@ -683,40 +931,15 @@ def verify_epoch_completion(epoch_number, epoch_info, logger):
     end_slot = epoch_info["end_slot"]
     total_epoch_slots = end_slot - start_slot + 1
     
-    # Count processed slots from all run directories
-    processed_slots = set()
-    
     logger.info(f"Verifying epoch {epoch_number} completion...")
-    run_dirs = glob.glob('run*')
     
-    for run_dir in run_dirs:
-        csv_files = glob.glob(os.path.join(run_dir, "slot_data_thread_*.csv"))
-        for file in csv_files:
-            try:
-                with open(file, "r") as f:
-                    csv_reader = csv.DictReader(f)
-                    for row in csv_reader:
-                        if 'block_slot' in row:
-                            slot = int(row['block_slot'])
-                            if start_slot <= slot <= end_slot:
-                                processed_slots.add(slot)
-            except Exception as e:
-                logger.warning(f"Error reading {file}: {e}")
-        
-        # Also count error slots that are legitimately skipped
-        log_files = glob.glob(os.path.join(run_dir, "solana*rpc*errors.log"))
-        for file in log_files:
-            try:
-                with open(file, "r") as f:
-                    for line in f:
-                        if "-32007" in line or "-32009" in line:  # Non-existent slots
-                            slot = int(line.split(',')[0])
-                            if start_slot <= slot <= end_slot:
-                                processed_slots.add(slot)
-            except Exception as e:
-                logger.warning(f"Error reading error log {file}: {e}")
+    # Produced slots plus slots legitimately skipped by the leader
+    if completion_index is not None:
+        processed_count = total_epoch_slots - len(completion_index.missing_slots(start_slot, end_slot))
+    else:
+        produced, skipped = scan_epoch_outputs('.', start_slot, end_slot, logger)
+        processed_count = len(produced | skipped)
     
-    processed_count = len(processed_slots)
     completion_percentage = (processed_count / total_epoch_slots) * 100
     
     # Simplified completion status
@@ -806,25 +1029,94 @@ def analyze_error_patterns(logger):
     except Exception as e:
         logger.error(f"Error analyzing error patterns: {e}")
 
+def replay_epoch(epoch_number, workers, logger):
+    """Regenerate slot_data/epoch_votes files from the block archive without touching RPC"""
+    if not BlockArchive.exists('.'):
+        logger.error(f"No block archive found in {os.getcwd()} - run the collector with --archive first")
+        return 1
+
+    archive = BlockArchive('.')
+    if archive.meta['epoch'] != epoch_number:
+        logger.error(f"Block archive is for epoch {archive.meta['epoch']}, not {epoch_number}")
+        return 1
+
+    index = SlotCompletionIndex.open_or_build('.', epoch_number, archive.meta['start_slot'],
+                                              archive.meta['slot_count'], logger)
+    tasks = [(archive.chunk_path(chunk_id), chunk_id, entries, epoch_number, output_format, vote_latency)
+             for chunk_id, entries in archive.chunk_tasks()]
+    logger.info(f"=== Replaying Epoch {epoch_number} from archive ===")
+    logger.info(f"{len(archive):,} archived blocks in {len(tasks)} chunk(s), {workers} worker(s)")
+
+    replay_start_time = time.time()
+    produced_total = 0
+    failed_total = 0
+    try:
+        with multiprocessing.Pool(processes=workers) as pool:
+            for chunk_id, produced_slots, failed_slots, vote_rows in pool.imap_unordered(replay_chunk, tasks):
+                for slot in produced_slots:
+                    index.mark_produced(slot)
+                produced_total += len(produced_slots)
+                failed_total += len(failed_slots)
+                elapsed = time.time() - replay_start_time
+                rate = produced_total / elapsed if elapsed > 0 else 0
+                logger.info(f"Chunk {chunk_id}: {len(produced_slots):,} blocks, {vote_rows:,} votes, "
+                            f"{len(failed_slots)} undecodable ({produced_total:,}/{len(archive):,} at {rate:.0f} s/s)")
+    finally:
+        index.close()
+
+    logger.info(f"Replay complete: {produced_total:,} blocks in {(time.time() - replay_start_time)/60:.1f}m, "
+                f"{failed_total} undecodable")
+    return 1 if failed_total else 0
+
 def main(logger, bandwidth_logger):
     """Main function that processes epoch data with clean logger instances"""
+    global completion_index, block_archive, db_sink, output_format, vote_latency
     parser = argparse.ArgumentParser()
     parser.add_argument('epoch_number', type=int, help='Epoch number to fetch')
     parser.add_argument('--max-threads', type=int, default=None, help='Maximum number of threads (override)')
     parser.add_argument('--timeout', type=int, default=3600, help='Timeout in seconds (default: 1 hour)')
+    parser.add_argument('--batch-size', type=int, default=None,
+                        help='getBlock calls per JSON-RPC batch for endpoints not listed in RPC_BATCH_SIZES (default: 1, no batching)')
+    parser.add_argument('--rebuild-index', action='store_true',
+                        help='Rebuild the slot completion index from run*/ CSVs and error logs before starting')
+    parser.add_argument('--no-skip-prepass', action='store_true',
+                        help='Probe every missing slot with getBlock instead of finding skipped slots via getBlocks first')
+    parser.add_argument('--engine', choices=['threads', 'async'], default=os.environ.get('GET_SLOTS_ENGINE', 'threads'),
+                        help='Fetch engine: threads (default) or async with per-endpoint adaptive concurrency')
+    parser.add_argument('--archive', action='store_true', default=os.environ.get('GET_SLOTS_ARCHIVE') == '1',
+                        help='Keep every fetched getBlock response in a compressed per-epoch block archive')
+    parser.add_argument('--db-sink', action='store_true', default=os.environ.get('GET_SLOTS_DB_SINK') == '1',
+                        help='Also stream rows into per-epoch Postgres staging tables (COPY) as slots complete')
+    parser.add_argument('--output-format', choices=OUTPUT_FORMATS, default=os.environ.get('GET_SLOTS_OUTPUT_FORMAT', 'csv'),
+                        help='slot_data/epoch_votes file format: csv (default) or parquet (typed, dictionary-encoded; needs pyarrow)')
+    parser.add_argument('--vote-latency', action='store_true', default=os.environ.get('GET_SLOTS_VOTE_LATENCY') == '1',
+                        help='Also write vote_latency files (voted slot and latency per vote instruction), decoded in the same pass')
+    parser.add_argument('--follow', action='store_true', default=os.environ.get('GET_SLOTS_FOLLOW') == '1',
+                        help='Current epoch only: fetch the backlog, then follow rooted slots via websocket until the epoch ends')
+    parser.add_argument('--follow-workers', type=int, default=FOLLOW_WORKERS,
+                        help=f'Fetch workers for --follow (default: {FOLLOW_WORKERS})')
+    parser.add_argument('--replay', action='store_true',
+                        help='Regenerate slot_data/epoch_votes files from the block archive instead of RPC')
+    parser.add_argument('--replay-workers', type=int, default=os.cpu_count() or 4,
+                        help='Worker processes for --replay (default: CPU count)')
     args = parser.parse_args()
 
     epoch_number = args.epoch_number
     timeout_seconds = args.timeout
+    output_format = args.output_format
+    vote_latency = args.vote_latency
+
+    if args.replay:
+        exit(replay_epoch(epoch_number, args.replay_workers, logger))
 
     try:
         # Simplified startup logging
         logger.info(f"=== Starting Epoch {epoch_number} Processing ===")
-        logger.info(f"RPC Endpoints: {get_domain_name(RPC_ENDPOINT_1)}, {get_domain_name(RPC_ENDPOINT_2)}, {get_domain_name(RPC_ENDPOINT_3)}")
+        logger.info(f"RPC Endpoints: {', '.join(get_domain_name(url) for url in rpc_client.ranked_endpoints())}")
         
         # Quick RPC endpoint health check
         logger.info("Performing RPC health check...")
-        for i, endpoint in enumerate([RPC_ENDPOINT_1, RPC_ENDPOINT_2, RPC_ENDPOINT_3], 1):
+        for i, endpoint in enumerate(rpc_client.endpoints, 1):
             domain = get_domain_name(endpoint)
             try:
                 health_payload = {"jsonrpc": "2.0", "id": 1, "method": "getHealth"}
@@ -843,6 +1135,20 @@ def main(logger, bandwidth_logger):
         current_epoch_info = get_epoch_info(logger=logger, bandwidth_logger=bandwidth_logger)
         
         logger.info(f"Network: E{current_epoch_info['epoch_number']}")
+
+        completion_index = SlotCompletionIndex.open_or_build(
+            '.', epoch_number, epoch_info["start_slot"], epoch_info["slotsInEpoch"], logger
+        )
+        if args.rebuild_index:
+            completion_index.rebuild(logger)
+        if args.archive:
+            block_archive = BlockArchiveWriter('.', epoch_number, epoch_info["start_slot"], epoch_info["slotsInEpoch"])
+            logger.info(f"Archiving raw blocks to {block_archive.archive_dir}")
+        if args.db_sink:
+            from db_config import db_params
+            db_sink = PostgresSlotSink(db_params, epoch_number, SLOT_DATA_FIELDNAMES, VOTE_DATA_FIELDNAMES,
+                                       completion_index, logger)
+            logger.info(f"Streaming rows to {db_sink.slot_table}/{db_sink.vote_table}")
         logger.info(f"Epoch slot range: {epoch_info['start_slot']:,} to {epoch_info['end_slot']:,}")
 
         # Determine processing end point
@@ -856,11 +1162,39 @@ def main(logger, bandwidth_logger):
                 end_slot = start_slot + epoch_info["slotIndex"]
                 logger.info(f"Current epoch - limiting end slot to {end_slot:,}")
 
+        if args.follow:
+            if epoch_number != current_epoch:
+                logger.error(f"--follow only applies to the current epoch (E{current_epoch}), not E{epoch_number}")
+                exit(1)
+            # Everything up to the current slot is backlog; later slots are queued as they are rooted
+            backlog_end = min(epoch_info["current_slot"], epoch_info["end_slot"])
+            logger.info(f"Follow mode: backlog {start_slot:,} to {backlog_end:,}, then roots to {epoch_info['end_slot']:,}")
+            backlog = find_missing_slots(start_slot, backlog_end, logger)
+            if not args.no_skip_prepass:
+                backlog = filter_skipped_slots(backlog, logger, bandwidth_logger)
+
+            processing_start_time = time.time()
+            counters = follow_epoch(epoch_number, epoch_info["end_slot"], backlog_end, backlog, args.follow_workers,
+                                    logger, bandwidth_logger, get_batch_sizes(args.batch_size))
+            total_processing_time = time.time() - processing_start_time
+
+            logger.info(f"=== Final Summary ===")
+            logger.info(f"Epoch {epoch_number}: {counters['ok']:,} blocks, {counters['skipped']:,} skipped, {counters['failed']:,} failed")
+            logger.info(f"Followed for {total_processing_time/60:.1f}m")
+            analyze_error_patterns(logger)
+
+            # Slots that never became servable are left to a normal re-run by rpc_get_block_data.sh
+            with open("last_slots_to_process.txt", 'w') as f:
+                f.write(str(counters['failed']))
+            exit(0)
+
         logger.info(f"Processing range: {start_slot:,} to {end_slot:,} ({end_slot - start_slot + 1:,} slots)")
 
         # Find slots to process with concise logging
         logger.info("Scanning for missing slots...")
         slots_to_process = find_missing_slots(start_slot, end_slot, logger)
+        if not args.no_skip_prepass:
+            slots_to_process = filter_skipped_slots(slots_to_process, logger, bandwidth_logger)
         logger.info(f"Found {len(slots_to_process):,} slots to process")
 
         if not slots_to_process:
@@ -903,6 +1237,11 @@ def main(logger, bandwidth_logger):
         with open(last_slots_file, 'w') as f:
             f.write(str(num_slots_to_process))
 
+        batch_sizes = get_batch_sizes(args.batch_size)
+        for batch_domain, batch_size in batch_sizes.items():
+            if batch_size > 1:
+                logger.info(f"JSON-RPC batching: {batch_domain} x{batch_size}")
+
         # Evaluate situation and determine thread count
         urgency_level, network_current_epoch, network_current_slot = evaluate_processing_situation(
             epoch_number, slots_to_process, logger, bandwidth_logger
@@ -912,7 +1251,7 @@ def main(logger, bandwidth_logger):
         is_past_epoch = epoch_number < current_epoch
         if is_past_epoch:
             logger.info(f"Past epoch detected (E{epoch_number} < E{current_epoch})")
-            optimal_threads = 12  # Maximum threads for past epochs
+            optimal_threads = args.max_threads or 12  # Maximum threads for past epochs unless overridden
             timeout_seconds = None  # No timeout for past epochs
         else:
             optimal_threads = get_optimal_thread_count(urgency_level, num_slots_to_process)
@@ -947,6 +1286,36 @@ def main(logger, bandwidth_logger):
             if os.sys.stdin in select.select([os.sys.stdin], [], [], 0)[0]:
                 break
 
+        if args.engine == 'async':
+            logger.info("Starting processing with async engine (per-endpoint adaptive concurrency)")
+            processing_start_time = time.time()
+            try:
+                counters = process_slots_async(slots_to_process, epoch_number, logger, bandwidth_logger, timeout_seconds, batch_sizes)
+            except asyncio.TimeoutError:
+                logger.error(f"Overall timeout after {timeout_seconds/60:.1f}m")
+                analyze_error_patterns(logger)
+                exit(1)
+
+            total_processing_time = time.time() - processing_start_time
+            handled = counters['ok'] + counters['skipped']
+            actual_processing_rate = handled / total_processing_time if total_processing_time > 0 else 0
+
+            logger.info(f"=== Final Summary ===")
+            logger.info(f"Epoch {epoch_number}: {counters['ok']:,} blocks, {counters['skipped']:,} skipped, {counters['failed']:,} failed")
+            logger.info(f"Time: {total_processing_time/60:.1f}m, Rate: {actual_processing_rate:.1f} s/s")
+
+            analyze_error_patterns(logger)
+
+            failure_rate = counters['failed'] / num_slots_to_process if num_slots_to_process > 0 else 0
+            if failure_rate > 0.5:
+                logger.error(f"High failure rate ({failure_rate:.1%}) - exiting with error")
+                exit(1)
+            elif counters['failed'] > 0:
+                logger.warning(f"Some slots failed ({failure_rate:.1%})")
+            else:
+                logger.info(f"All slots completed successfully!")
+            exit(0)
+
         # Initialize processing
         futures = []
         file_indices = [0] * optimal_threads
@@ -962,21 +1331,35 @@ def main(logger, bandwidth_logger):
                 thread_id = (i // slots_per_file) % optimal_threads + 1
                 thread_slots = slots_to_process[i:i + slots_per_file]
                 
-                # Rotate RPC endpoints
-                rpc_endpoint = RPC_ENDPOINT_1 if thread_id % 3 == 1 else (RPC_ENDPOINT_2 if thread_id % 3 == 2 else RPC_ENDPOINT_3)
-                domain = get_domain_name(rpc_endpoint)
+                # Requests are routed per call by rpc_client rather than pinning a thread to an endpoint;
+                # each batch is sized for the endpoint rpc_client picks for it
+                rpc_endpoint = None
+                domain = "pool"
                 
-                future = executor.submit(
-                    process_slot_data, 
-                    thread_id, 
-                    thread_slots, 
-                    file_indices[thread_id - 1], 
-                    epoch_number, 
-                    rpc_endpoint,
-                    urgency_level,
-                    logger,
-                    bandwidth_logger
-                )
+                if max(batch_sizes.values(), default=1) > 1:
+                    future = executor.submit(
+                        process_slot_data_batched,
+                        thread_id,
+                        thread_slots,
+                        file_indices[thread_id - 1],
+                        epoch_number,
+                        rpc_endpoint,
+                        batch_sizes,
+                        logger,
+                        bandwidth_logger
+                    )
+                else:
+                    future = executor.submit(
+                        process_slot_data, 
+                        thread_id, 
+                        thread_slots, 
+                        file_indices[thread_id - 1], 
+                        epoch_number, 
+                        rpc_endpoint,
+                        urgency_level,
+                        logger,
+                        bandwidth_logger
+                    )
                 futures.append((future, thread_id, len(thread_slots), domain))
                 file_indices[thread_id - 1] += 1
 
@@ -1074,6 +1457,9 @@ def main(logger, bandwidth_logger):
         else:
             logger.warning(f"Net progress: NEGATIVE (falling behind)")
 
+        logger.info("RPC endpoint health:")
+        rpc_client.log_health(logger)
+
         # Analyze error patterns at the end to show 401 issues
         analyze_error_patterns(logger)
 
@@ -1095,6 +1481,15 @@ def main(logger, bandwidth_logger):
     except Exception as e:
         logger.error(f"Fatal error in main: {str(e)}")
         raise
+    finally:
+        # Close the sink first: its final flush marks the last committed slots in the index
+        if db_sink is not None:
+            db_sink.close()
+        if completion_index is not None:
+            completion_index.close()
+        if block_archive is not None:
+            logger.info(f"Archived {block_archive.blocks_written:,} blocks ({block_archive.bytes_written / (1024 * 1024):.1f}MB compressed)")
+            block_archive.close()
 
 if __name__ == "__main__":
     # Set up proper logging without any inherited handlers
@@ -0,0 +1,447 @@
+#!/usr/bin/env python3
+"""
+Local stand-in Solana RPC server for benchmarking get_epoch_data_csv.py.
+
+Serves getBlock, getBlocks, getEpochInfo and getHealth (single requests and
+JSON-RPC batches) from one of two fixture sources:
+
+    --archive-dir DIR   replay the recorded blocks of an epoch directory's
+                        block_archive/ (written by the collector with --archive);
+                        slots in the archived range without an entry are skipped
+    --synthetic-slots N generate N slots of blocks with a lognormal
+                        transaction-count distribution (--tx-median/--tx-sigma)
+
+getEpochInfo describes a small "epoch" covering exactly the fixture slots and
+reports the network one epoch ahead, so the collector treats it as a past
+epoch and fetches the whole range.
+
+Faults are injected per request: lognormal latency (--latency-ms/--latency-sigma),
+a response bandwidth cap (--mbps), random 429s (--throttle-rate), a token-bucket
+request limit answered with 429 + Retry-After (--rps-limit) and -32007 skipped
+slots (--skip-rate, synthetic fixtures only). Counters and latency percentiles
+are available at GET /stats (POST /stats/reset clears them).
+
+With --tip-fraction the fixture epoch is instead the current one: the tip
+starts that far into the epoch and advances one slot every --slot-ms, blocks
+beyond it answer -32004, and rootSubscribe on the websocket at / streams
+rootNotification messages, which exercises the collector's --follow mode.
+
+Used by bench_get_slots.py; can also be run on its own and pointed at with
+GET_SLOTS_RPC_ENDPOINTS=http://127.0.0.1:8899 get_epoch_data_csv.py <epoch>.
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import math
+import random
+import threading
+import time
+
+try:
+    from aiohttp import web
+except ImportError:
+    web = None
+
+try:
+    import orjson
+    dumps = orjson.dumps
+except ImportError:
+    orjson = None
+    def dumps(obj):
+        return json.dumps(obj, separators=(',', ':')).encode()
+
+from block_decoder import loads, VOTE_PROGRAM_ID
+
+DEFAULT_PORT = 8899
+SYNTHETIC_START_SLOT = 300_000_000
+SYNTHETIC_EPOCH = 700
+SYNTHETIC_TEMPLATES = 32           # distinct transaction lists shared across synthetic slots
+SYNTHETIC_VALIDATORS = 400
+SKIPPED_SLOT_ERROR_CODE = -32007
+BLOCK_NOT_AVAILABLE_ERROR_CODE = -32004
+BASE58_ALPHABET = "123456789ABCDEFGHJKLMNPQRSTUVWXYZabcdefghijkmnopqrstuvwxyz"
+
+def _base58(rng, length):
+    return "".join(rng.choice(BASE58_ALPHABET) for _ in range(length))
+
+def _slot_hash(slot):
+    digest = hashlib.sha256(str(slot).encode()).digest()
+    return "".join(BASE58_ALPHABET[b % 58] for b in digest[:32]) + "1" * 12
+
+def percentile(values, fraction):
+    """Nearest-rank percentile of a list (None when empty)"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, math.ceil(fraction * len(ordered)) - 1))]
+
+class ArchiveFixtures:
+    """Blocks replayed from an epoch directory's block archive"""
+
+    def __init__(self, epoch_dir):
+        from block_archive import BlockArchive
+        self.archive = BlockArchive(epoch_dir)
+        if not len(self.archive):
+            raise ValueError(f"Block archive in {epoch_dir} is empty")
+        self.epoch = self.archive.meta['epoch']
+        self.start_slot = min(self.archive.entries)
+        self.slot_count = max(self.archive.entries) - self.start_slot + 1
+        self._produced = sorted(self.archive.entries)
+
+    def produced_slots(self, start_slot, end_slot):
+        return [slot for slot in self._produced if start_slot <= slot <= end_slot]
+
+    def block_result(self, slot):
+        """Return the getBlock result as JSON bytes, or None for a skipped slot"""
+        if slot not in self.archive:
+            return None
+        # Recorded responses carry the original request id; the result is re-serialised under the new one
+        element = loads(self.archive.get(slot))
+        if element.get("result") is None:
+            return None
+        return dumps(element["result"])
+
+class SyntheticFixtures:
+    """Generated blocks with a configurable size distribution"""
+
+    def __init__(self, slot_count, start_slot=SYNTHETIC_START_SLOT, epoch=SYNTHETIC_EPOCH, skip_rate=0.0,
+                 tx_median=1200, tx_sigma=0.4, vote_fraction=0.7, seed=1):
+        self.epoch = epoch
+        self.start_slot = start_slot
+        self.slot_count = slot_count
+        rng = random.Random(seed)
+        self.validators = [(_base58(rng, 44), _base58(rng, 44)) for _ in range(SYNTHETIC_VALIDATORS)]
+
+        self.skipped = {start_slot + i for i in range(slot_count) if rng.random() < skip_rate}
+        self._produced = [slot for slot in range(start_slot, start_slot + slot_count) if slot not in self.skipped]
+        # slot -> (parent slot, block height) so served blocks form a consistent chain
+        self._chain = {}
+        previous = start_slot - 1
+        for height, slot in enumerate(self._produced, start=start_slot):
+            self._chain[slot] = (previous, height)
+            previous = slot
+
+        # Pre-serialise a pool of transaction lists so serving a block costs a dict dump, not a generation
+        self.templates = []
+        for _ in range(SYNTHETIC_TEMPLATES):
+            tx_count = max(1, int(rng.lognormvariate(math.log(tx_median), tx_sigma)))
+            self.templates.append(dumps([self._transaction(rng, rng.random() < vote_fraction) for _ in range(tx_count)]))
+
+    def _transaction(self, rng, is_vote):
+        if is_vote:
+            # Same key layout as a real vote transaction: identity, vote account, vote program
+            identity, vote_account = rng.choice(self.validators)
+            account_keys = [identity, vote_account, VOTE_PROGRAM_ID]
+            signatures = [_base58(rng, 88)]
+            fee, compute_units = 5000, 2100
+            logs = [f"Program {VOTE_PROGRAM_ID} invoke [1]", f"Program {VOTE_PROGRAM_ID} success"]
+        else:
+            account_keys = [_base58(rng, 44) for _ in range(rng.randint(3, 12))]
+            signatures = [_base58(rng, 88) for _ in range(rng.randint(1, 2))]
+            fee = 5000 * len(signatures) + rng.choice([0, 0, 1000, 25000, 150000])
+            compute_units = rng.randint(20_000, 400_000)
+            logs = [f"Program {key} invoke [1]" for key in account_keys[-3:]] + ["Program log: Instruction: Swap"]
+        balances = [rng.randint(1_000_000, 10_000_000_000) for _ in account_keys]
+        return {
+            "meta": {
+                "computeUnitsConsumed": compute_units, "err": None, "fee": fee,
+                "innerInstructions": [], "logMessages": logs,
+                "postBalances": balances, "preBalances": balances,
+                "postTokenBalances": [], "preTokenBalances": [], "rewards": [], "status": {"Ok": None},
+            },
+            "transaction": {
+                "message": {
+                    "accountKeys": account_keys,
+                    "header": {"numReadonlySignedAccounts": 0, "numReadonlyUnsignedAccounts": 1,
+                               "numRequiredSignatures": len(signatures)},
+                    "instructions": [{"accounts": [0, 1], "data": _base58(rng, 64), "programIdIndex": len(account_keys) - 1}],
+                    "recentBlockhash": _base58(rng, 44),
+                },
+                "signatures": signatures,
+            },
+            "version": "legacy",
+        }
+
+    def produced_slots(self, start_slot, end_slot):
+        return [slot for slot in self._produced if start_slot <= slot <= end_slot]
+
+    def block_result(self, slot):
+        """Return the getBlock result as JSON bytes, or None for a skipped slot"""
+        if slot not in self._chain:
+            return None
+        leader = self.validators[(slot // 4) % len(self.validators)][0]
+        parent, height = self._chain[slot]
+        header = dumps({
+            "blockHeight": height,
+            "blockTime": 1_700_000_000 + (slot - self.start_slot) * 2 // 5,
+            "blockhash": _slot_hash(slot),
+            "parentSlot": parent,
+            "previousBlockhash": _slot_hash(parent),
+            "rewards": [{"commission": None, "lamports": 10_000_000 + slot % 5_000_000, "postBalance": 50_000_000_000,
+                         "pubkey": leader, "rewardType": "Fee"}],
+        })
+        return header[:-1] + b',"transactions":' + self.templates[slot % len(self.templates)] + b'}'
+
+class MockRpcServer:
+    """aiohttp JSON-RPC server replaying fixtures with injected latency, throttling and skips"""
+
+    def __init__(self, fixtures, latency_ms=50.0, latency_sigma=0.5, mbps=None, throttle_rate=0.0,
+                 rps_limit=None, seed=1, tip_fraction=None, slot_ms=400.0):
+        if web is None:
+            raise RuntimeError("aiohttp is required for the mock RPC server (pip install aiohttp)")
+        self.fixtures = fixtures
+        self.latency_ms = latency_ms
+        self.latency_sigma = latency_sigma
+        self.mbps = mbps
+        self.throttle_rate = throttle_rate
+        self.rps_limit = rps_limit
+        self._rng = random.Random(seed)
+        self._tokens = float(rps_limit or 0)
+        self._token_time = time.monotonic()
+        self.tip_fraction = tip_fraction
+        self.slot_ms = slot_ms
+        self._tip_origin = time.monotonic()
+        self._stats_lock = threading.Lock()
+        self._runner = None
+        self._loop = None
+        self._thread = None
+        self.url = None
+        self.reset_stats()
+
+    def reset_stats(self):
+        with self._stats_lock:
+            self.stats = {'requests': 0, 'calls': {}, 'bytes_sent': 0, 'throttled': 0, 'skipped': 0, 'latencies': []}
+
+    def snapshot(self):
+        """Counters plus server-side request latency percentiles (seconds)"""
+        with self._stats_lock:
+            stats = dict(self.stats, calls=dict(self.stats['calls']))
+            latencies = stats.pop('latencies')
+        stats['latency_p50'] = percentile(latencies, 0.50)
+        stats['latency_p99'] = percentile(latencies, 0.99)
+        return stats
+
+    def tip_slot(self):
+        """Current (rooted) slot when simulating the tip, else None"""
+        if self.tip_fraction is None:
+            return None
+        fixtures = self.fixtures
+        elapsed_slots = int((time.monotonic() - self._tip_origin) * 1000 / self.slot_ms)
+        return min(fixtures.start_slot + int(fixtures.slot_count * self.tip_fraction) + elapsed_slots,
+                   fixtures.start_slot + fixtures.slot_count + 1000)
+
+    def epoch_info(self):
+        fixtures = self.fixtures
+        tip = self.tip_slot()
+        if tip is not None and tip < fixtures.start_slot + fixtures.slot_count:
+            return {
+                "absoluteSlot": tip,
+                "blockHeight": tip,
+                "epoch": fixtures.epoch,
+                "slotIndex": tip - fixtures.start_slot,
+                "slotsInEpoch": fixtures.slot_count,
+                "transactionCount": None,
+            }
+        slot_index = tip - fixtures.start_slot - fixtures.slot_count if tip is not None else 1000
+        return {
+            "absoluteSlot": fixtures.start_slot + fixtures.slot_count + slot_index,
+            "blockHeight": fixtures.start_slot + fixtures.slot_count + slot_index,
+            "epoch": fixtures.epoch + 1,
+            "slotIndex": slot_index,
+            "slotsInEpoch": fixtures.slot_count,
+            "transactionCount": None,
+        }
+
+    def _take_token(self):
+        if not self.rps_limit:
+            return True
+        now = time.monotonic()
+        self._tokens = min(float(self.rps_limit), self._tokens + (now - self._token_time) * self.rps_limit)
+        self._token_time = now
+        if self._tokens < 1.0:
+            return False
+        self._tokens -= 1.0
+        return True
+
+    def _answer(self, request):
+        """Serialised JSON-RPC response element for one request object"""
+        request_id = dumps(request.get("id"))
+        method = request.get("method")
+        params = request.get("params") or []
+        with self._stats_lock:
+            self.stats['calls'][method] = self.stats['calls'].get(method, 0) + 1
+
+        tip = self.tip_slot()
+        if method == "getBlock":
+            slot = params[0]
+            if tip is not None and slot > tip:
+                return dumps({"jsonrpc": "2.0", "id": request.get("id"), "error": {
+                    "code": BLOCK_NOT_AVAILABLE_ERROR_CODE, "message": f"Block not available for slot {slot}"}})
+            result = self.fixtures.block_result(slot)
+            if result is None:
+                with self._stats_lock:
+                    self.stats['skipped'] += 1
+                return dumps({"jsonrpc": "2.0", "id": request.get("id"), "error": {
+                    "code": SKIPPED_SLOT_ERROR_CODE,
+                    "message": f"Slot {slot} was skipped, or missing due to ledger jump to recent snapshot"}})
+        elif method == "getBlocks":
+            # getBlocks takes an optional end slot before the config object
+            end_slot = params[1] if len(params) > 1 and isinstance(params[1], int) else params[0] + 500_000
+            if tip is not None:
+                end_slot = min(end_slot, tip)
+            result = dumps(self.fixtures.produced_slots(params[0], end_slot))
+        elif method == "getEpochInfo":
+            result = dumps(self.epoch_info())
+        elif method == "getHealth":
+            result = b'"ok"'
+        else:
+            return dumps({"jsonrpc": "2.0", "id": request.get("id"),
+                          "error": {"code": -32601, "message": "Method not found"}})
+        return b'{"jsonrpc":"2.0","result":' + result + b',"id":' + request_id + b'}'
+
+    async def handle(self, http_request):
+        start = time.monotonic()
+        body = loads(await http_request.read())
+        with self._stats_lock:
+            self.stats['requests'] += 1
+
+        if not self._take_token() or (self.throttle_rate and self._rng.random() < self.throttle_rate):
+            with self._stats_lock:
+                self.stats['throttled'] += 1
+            return web.Response(status=429, text="Too Many Requests", headers={"Retry-After": "1"})
+
+        if isinstance(body, list):
+            payload = b'[' + b','.join(self._answer(element) for element in body) + b']'
+        else:
+            payload = self._answer(body)
+
+        delay = self._rng.lognormvariate(math.log(self.latency_ms / 1000.0), self.latency_sigma) if self.latency_ms else 0.0
+        if self.mbps:
+            delay += len(payload) / (self.mbps * 1024 * 1024)
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+        with self._stats_lock:
+            self.stats['bytes_sent'] += len(payload)
+            self.stats['latencies'].append(time.monotonic() - start)
+        return web.Response(body=payload, content_type="application/json")
+
+    async def handle_websocket(self, http_request):
+        """rootSubscribe: push a rootNotification for every slot the simulated tip advances"""
+        ws = web.WebSocketResponse(heartbeat=30)
+        await ws.prepare(http_request)
+        message = await ws.receive()
+        if message.type != web.WSMsgType.TEXT or loads(message.data).get("method") != "rootSubscribe":
+            await ws.close()
+            return ws
+        request_id = loads(message.data).get("id")
+        await ws.send_bytes(dumps({"jsonrpc": "2.0", "result": 0, "id": request_id}))
+
+        last_root = None
+        while not ws.closed:
+            root = self.tip_slot()
+            if root is not None and root != last_root:
+                await ws.send_str(dumps({"jsonrpc": "2.0", "method": "rootNotification",
+                                         "params": {"result": root, "subscription": 0}}).decode())
+                last_root = root
+            try:
+                # Reading (rather than sleeping) lets aiohttp answer the client's close frame
+                message = await ws.receive(timeout=self.slot_ms / 1000.0)
+            except asyncio.TimeoutError:
+                continue
+            if message.type in (web.WSMsgType.CLOSE, web.WSMsgType.CLOSING, web.WSMsgType.CLOSED, web.WSMsgType.ERROR):
+                break
+        return ws
+
+    async def handle_stats(self, http_request):
+        if http_request.method == "POST":
+            self.reset_stats()
+        return web.json_response(self.snapshot())
+
+    def make_app(self):
+        app = web.Application(client_max_size=16 * 1024 * 1024)
+        app.router.add_post("/", self.handle)
+        app.router.add_get("/", self.handle_websocket)
+        app.router.add_get("/stats", self.handle_stats)
+        app.router.add_post("/stats/reset", self.handle_stats)
+        return app
+
+    async def start(self, host="127.0.0.1", port=DEFAULT_PORT):
+        self._runner = web.AppRunner(self.make_app(), access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, host, port)
+        await site.start()
+        port = self._runner.addresses[0][1]
+        self.url = f"http://{host}:{port}"
+        return self.url
+
+    def start_in_thread(self, host="127.0.0.1", port=0):
+        """Run the server on its own event loop in a daemon thread and return its URL"""
+        self._loop = asyncio.new_event_loop()
+        started = threading.Event()
+
+        def run():
+            asyncio.set_event_loop(self._loop)
+            self._loop.run_until_complete(self.start(host, port))
+            started.set()
+            self._loop.run_forever()
+
+        self._thread = threading.Thread(target=run, name="mock_rpc_server", daemon=True)
+        self._thread.start()
+        started.wait()
+        return self.url
+
+    def stop(self):
+        if self._loop is None:
+            return
+        asyncio.run_coroutine_threadsafe(self._runner.cleanup(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+
+def add_fixture_arguments(parser):
+    """Fixture and fault-injection options shared by the server and bench_get_slots.py"""
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument('--archive-dir', help='Epoch directory whose block_archive/ is replayed')
+    source.add_argument('--synthetic-slots', type=int, help='Number of synthetic slots to serve')
+    parser.add_argument('--skip-rate', type=float, default=0.05, help='Fraction of synthetic slots that are skipped (default: 0.05)')
+    parser.add_argument('--tx-median', type=int, default=1200, help='Median transactions per synthetic block (default: 1200)')
+    parser.add_argument('--tx-sigma', type=float, default=0.4, help='Lognormal sigma of transactions per block (default: 0.4)')
+    parser.add_argument('--latency-ms', type=float, default=50.0, help='Median injected latency per request (default: 50)')
+    parser.add_argument('--latency-sigma', type=float, default=0.5, help='Lognormal sigma of injected latency (default: 0.5)')
+    parser.add_argument('--mbps', type=float, default=None, help='Per-response bandwidth cap in MB/s (default: none)')
+    parser.add_argument('--throttle-rate', type=float, default=0.0, help='Fraction of requests answered with HTTP 429')
+    parser.add_argument('--rps-limit', type=float, default=None, help='Requests/s allowed before HTTP 429 (token bucket)')
+    parser.add_argument('--seed', type=int, default=1, help='Random seed for fixtures and injected faults')
+    parser.add_argument('--tip-fraction', type=float, default=None,
+                        help='Simulate the current epoch with the tip this far in (0-1) and rootSubscribe support')
+    parser.add_argument('--slot-ms', type=float, default=400.0, help='Tip advance interval with --tip-fraction (default: 400)')
+
+def build_server(args):
+    """Create a MockRpcServer from parsed add_fixture_arguments() options"""
+    if args.archive_dir:
+        fixtures = ArchiveFixtures(args.archive_dir)
+    else:
+        fixtures = SyntheticFixtures(args.synthetic_slots, skip_rate=args.skip_rate, tx_median=args.tx_median,
+                                     tx_sigma=args.tx_sigma, seed=args.seed)
+    return MockRpcServer(fixtures, latency_ms=args.latency_ms, latency_sigma=args.latency_sigma, mbps=args.mbps,
+                         throttle_rate=args.throttle_rate, rps_limit=args.rps_limit, seed=args.seed,
+                         tip_fraction=args.tip_fraction, slot_ms=args.slot_ms)
+
+def main():
+    parser = argparse.ArgumentParser(description='Mock Solana RPC server replaying block fixtures')
+    add_fixture_arguments(parser)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    args = parser.parse_args()
+
+    server = build_server(args)
+    fixtures = server.fixtures
+    print(f"Serving E{fixtures.epoch}: slots {fixtures.start_slot:,}-{fixtures.start_slot + fixtures.slot_count - 1:,} "
+          f"on http://{args.host}:{args.port}")
+    print(f"Point the collector at it with GET_SLOTS_RPC_ENDPOINTS=http://{args.host}:{args.port} "
+          f"python get_epoch_data_csv.py {fixtures.epoch}")
+    web.run_app(server.make_app(), host=args.host, port=args.port, access_log=None, print=None)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+Direct-to-Postgres sink for get_epoch_data_csv.py.
+
+With --db-sink the collector streams every extracted block into two per-epoch
+staging tables as it runs:
+
+    slot_stream_validator_data_<epoch>   LIKE validator_data
+    slot_stream_epoch_votes_<epoch>      same columns as temp_epoch_votes
+    slot_stream_slots_<epoch>            every committed slot, including blocks
+                                         that yield no validator_data row
+
+Rows are buffered and written with COPY FROM STDIN in one transaction per
+flush. A slot is marked produced in the completion index only after its rows
+are committed, so the index never claims a slot the database does not have.
+Each flush first deletes the batch's slots from the staging tables, which keeps
+re-fetched slots (retries, re-runs after a crash between commit and index
+write) from being loaded twice.
+
+91_load_consolidated_csv.py promotes the staging tables instead of re-reading
+the run*/ CSVs when slot_stream_slots_<epoch> covers every produced slot. The CSVs are still written, so a failed sink
+(after SINK_MAX_FAILURES consecutive flush errors it disables itself) costs
+nothing but the shortcut.
+"""
+import csv
+import io
+import threading
+import time
+
+try:
+    import psycopg2
+except ImportError:
+    psycopg2 = None
+
+SINK_FLUSH_SLOTS = 500       # blocks buffered before a flush
+SINK_FLUSH_SECONDS = 10.0    # maximum age of buffered rows
+SINK_MAX_FAILURES = 3        # consecutive failed flushes before the sink disables itself
+
+def staging_table_names(epoch_number):
+    """Return (validator_data, epoch_votes, slots) staging table names for an epoch"""
+    return (f"slot_stream_validator_data_{int(epoch_number)}", f"slot_stream_epoch_votes_{int(epoch_number)}",
+            f"slot_stream_slots_{int(epoch_number)}")
+
+class PostgresSlotSink:
+    """Buffered COPY of slot_data/epoch_votes rows into per-epoch staging tables"""
+
+    def __init__(self, db_params, epoch_number, slot_fieldnames, vote_fieldnames, completion_index, logger):
+        if psycopg2 is None:
+            raise RuntimeError("psycopg2 is required for --db-sink (pip install psycopg2-binary)")
+        self.epoch_number = epoch_number
+        self.slot_fieldnames = slot_fieldnames
+        self.vote_fieldnames = vote_fieldnames
+        self.completion_index = completion_index
+        self.logger = logger
+        self.slot_table, self.vote_table, self.done_table = staging_table_names(epoch_number)
+
+        self.conn = psycopg2.connect(**db_params)
+        self._create_tables()
+
+        self._lock = threading.Lock()
+        self._slots = []
+        self._slot_rows = []
+        self._vote_rows = []
+        self._last_flush = time.time()
+        self._failures = 0
+        self.enabled = True
+        self.slots_committed = 0
+        self.votes_committed = 0
+
+    def _create_tables(self):
+        with self.conn.cursor() as cursor:
+            cursor.execute(f"CREATE TABLE IF NOT EXISTS {self.slot_table} (LIKE validator_data)")
+            cursor.execute(f"""
+                CREATE TABLE IF NOT EXISTS {self.vote_table} (
+                    epoch SMALLINT,
+                    block_slot INTEGER,
+                    block_hash TEXT,
+                    identity_pubkey CHAR(44),
+                    vote_account_pubkey CHAR(44)
+                )
+            """)
+            # Blocks without rewards produce no validator_data row, so completeness is judged from this table
+            cursor.execute(f"CREATE TABLE IF NOT EXISTS {self.done_table} (block_slot INTEGER PRIMARY KEY)")
+            cursor.execute(f"CREATE INDEX IF NOT EXISTS {self.slot_table}_slot_idx ON {self.slot_table} (block_slot)")
+            cursor.execute(f"CREATE INDEX IF NOT EXISTS {self.vote_table}_slot_idx ON {self.vote_table} (block_slot)")
+        self.conn.commit()
+
+    def add(self, slot, slot_row, vote_rows):
+        """Buffer one produced block; the slot is marked in the completion index once committed"""
+        if not self.enabled:
+            if self.completion_index is not None:
+                self.completion_index.mark_produced(slot)
+            return
+        with self._lock:
+            self._slots.append(slot)
+            if slot_row:
+                self._slot_rows.append(slot_row)
+            self._vote_rows.extend(vote_rows)
+            if len(self._slots) >= SINK_FLUSH_SLOTS or time.time() - self._last_flush >= SINK_FLUSH_SECONDS:
+                self._flush_locked()
+
+    def flush(self):
+        with self._lock:
+            self._flush_locked()
+
+    def _copy(self, cursor, table, fieldnames, rows):
+        if not rows:
+            return
+        buffer = io.StringIO()
+        writer = csv.DictWriter(buffer, fieldnames=fieldnames, extrasaction='ignore')
+        writer.writerows(rows)
+        buffer.seek(0)
+        cursor.copy_expert(f"COPY {table} ({', '.join(fieldnames)}) FROM STDIN WITH CSV", buffer)
+
+    def _flush_locked(self):
+        self._last_flush = time.time()
+        if not self._slots:
+            return
+        slots, slot_rows, vote_rows = self._slots, self._slot_rows, self._vote_rows
+
+        try:
+            with self.conn.cursor() as cursor:
+                cursor.execute(f"DELETE FROM {self.slot_table} WHERE block_slot = ANY(%s)", (slots,))
+                cursor.execute(f"DELETE FROM {self.vote_table} WHERE block_slot = ANY(%s)", (slots,))
+                self._copy(cursor, self.slot_table, self.slot_fieldnames, slot_rows)
+                self._copy(cursor, self.vote_table, self.vote_fieldnames, vote_rows)
+                cursor.execute(f"INSERT INTO {self.done_table} (block_slot) SELECT unnest(%s::integer[]) "
+                               f"ON CONFLICT DO NOTHING", (slots,))
+            self.conn.commit()
+        except psycopg2.Error as e:
+            self.conn.rollback()
+            self._failures += 1
+            self.logger.error(f"DB sink flush of {len(slots)} slots failed ({self._failures}/{SINK_MAX_FAILURES}): {e}")
+            if self._failures >= SINK_MAX_FAILURES:
+                # CSVs hold the same rows; fall back to them rather than buffering votes without bound
+                self.logger.error("DB sink disabled - 91_load_consolidated_csv.py will load this epoch from CSV")
+                self.enabled = False
+                self._mark_produced(slots)
+                self._reset_buffers()
+            return
+
+        self._failures = 0
+        self._mark_produced(slots)
+        self.slots_committed += len(slots)
+        self.votes_committed += len(vote_rows)
+        self._reset_buffers()
+
+    def _mark_produced(self, slots):
+        if self.completion_index is not None:
+            for slot in slots:
+                self.completion_index.mark_produced(slot)
+
+    def _reset_buffers(self):
+        self._slots = []
+        self._slot_rows = []
+        self._vote_rows = []
+
+    def close(self):
+        """Flush what is buffered and close the connection"""
+        with self._lock:
+            if self.enabled:
+                self._flush_locked()
+            self.conn.close()
+        self.logger.info(f"DB sink: {self.slots_committed:,} blocks and {self.votes_committed:,} votes committed "
+                         f"to {self.slot_table}/{self.vote_table}")
@@ -63,6 +63,7 @@ next_run_dir="run$next_run"
 log_info "Creating run directory: $next_run_dir"
 mkdir "$next_run_dir"
 mv *.csv solana_rpc_errors.log "$next_run_dir" 2>/dev/null
+mv *.parquet "$next_run_dir" 2>/dev/null
 
 # Check if re-run is needed based on remaining slots
 last_slots_file="last_slots_to_process.txt"
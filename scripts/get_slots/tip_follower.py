@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+"""
+Live tip-following for the current epoch (get_epoch_data_csv.py --follow).
+
+Instead of relaunching the collector, re-scanning for missing slots and
+re-evaluating urgency every few minutes, the follower subscribes to the RPC
+node's rootNotification websocket stream. Every time the root advances, the
+newly rooted slots (including any the root jumped over, which getBlock then
+reports as skipped) are queued and fetched by a small, steady
+AsyncBlockFetcher worker pool. Roots are used rather than processed slots
+because getBlock defaults to finalized commitment; a block that is not yet
+servable is retried after a short delay.
+
+The backlog found at start-up is queued first, so a restart only has to catch
+up on the minutes it was down. On a websocket disconnect the follower
+reconnects with backoff; the first root after reconnecting queues every slot
+missed in between. It returns once the last slot of the epoch has been
+handled, leaving the epoch transition to the wrapper script.
+"""
+import asyncio
+import time
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+try:
+    import orjson
+    loads = orjson.loads
+except ImportError:
+    import json
+    loads = json.loads
+
+FOLLOW_WORKERS = 4               # steady fetch pool at the tip (~2.5 new slots/s)
+FOLLOW_MAX_RETRIES = 10          # per slot, FOLLOW_RETRY_DELAY apart
+FOLLOW_RETRY_DELAY = 2.0
+FOLLOW_STATUS_INTERVAL = 60.0    # seconds between lag reports
+RECONNECT_MIN_DELAY = 1.0
+RECONNECT_MAX_DELAY = 60.0
+SLOT_TIME = 0.4
+
+def websocket_url(http_url):
+    """Derive the PubSub websocket URL from an HTTP RPC URL"""
+    if http_url.startswith("https://"):
+        return "wss://" + http_url[len("https://"):]
+    if http_url.startswith("http://"):
+        return "ws://" + http_url[len("http://"):]
+    return http_url
+
+class TipFollower:
+    """Queue rooted slots from rootSubscribe and fetch them until the epoch ends"""
+
+    def __init__(self, ws_url, fetcher, handle_result, end_slot, last_queued_slot, logger,
+                 backlog=(), workers=FOLLOW_WORKERS, shutdown_event=None):
+        if aiohttp is None:
+            raise RuntimeError("aiohttp is required for --follow (pip install aiohttp)")
+        self.ws_url = ws_url
+        self.fetcher = fetcher
+        self.handle_result = handle_result
+        self.end_slot = end_slot
+        self.last_queued_slot = last_queued_slot
+        self.logger = logger
+        self.backlog = list(backlog)
+        self.workers = workers
+        self.shutdown_event = shutdown_event
+
+        self.outstanding = set()
+        self.counters = {'ok': 0, 'skipped': 0, 'failed': 0}
+        self.last_root = None
+        self._queue = None
+        self._done = None
+        self._fetch_task = None
+
+    def _shutting_down(self):
+        return self.shutdown_event is not None and self.shutdown_event.is_set()
+
+    def _enqueue(self, slot):
+        self.outstanding.add(slot)
+        self._queue.put_nowait(slot)
+
+    def _handle(self, result):
+        self.outstanding.discard(result['slot'])
+        self.counters[result['status']] += 1
+        self.handle_result(result)
+        self._check_done()
+
+    def _check_done(self):
+        if self.last_queued_slot >= self.end_slot and not self.outstanding:
+            self._done.set()
+
+    def _on_root(self, root):
+        self.last_root = root
+        target = min(root, self.end_slot)
+        for slot in range(self.last_queued_slot + 1, target + 1):
+            self._enqueue(slot)
+        self.last_queued_slot = max(self.last_queued_slot, target)
+        self._check_done()
+
+    def lag_seconds(self):
+        """Approximate seconds between the root and the oldest slot not yet handled"""
+        if self.last_root is None or not self.outstanding:
+            return 0.0
+        return max(0, self.last_root - min(self.outstanding)) * SLOT_TIME
+
+    def log_status(self):
+        root = f"{self.last_root:,}" if self.last_root is not None else "n/a"
+        self.logger.info(f"FOLLOW root={root} queued_to={self.last_queued_slot:,} pending={len(self.outstanding):,} "
+                         f"lag={self.lag_seconds():.1f}s - ok={self.counters['ok']:,} "
+                         f"skipped={self.counters['skipped']:,} failed={self.counters['failed']:,}")
+        for limiter in self.fetcher.limiters:
+            self.logger.info(f"  {limiter.summary()}")
+
+    async def _subscribe(self, session):
+        """Consume rootNotification messages until the socket closes or the epoch is done"""
+        async with session.ws_connect(self.ws_url, heartbeat=30) as ws:
+            await ws.send_json({"jsonrpc": "2.0", "id": 1, "method": "rootSubscribe"})
+            self.logger.info(f"FOLLOW subscribed to roots on {self.ws_url.split('://', 1)[-1].split('/')[0]}")
+            next_status = time.monotonic() + FOLLOW_STATUS_INTERVAL
+            while not self._done.is_set() and not self._shutting_down() and not self._fetch_task.done():
+                try:
+                    message = await ws.receive(timeout=1.0)
+                except asyncio.TimeoutError:
+                    message = None
+
+                if message is not None:
+                    if message.type in (aiohttp.WSMsgType.CLOSE, aiohttp.WSMsgType.CLOSED, aiohttp.WSMsgType.ERROR):
+                        raise ConnectionError(f"websocket closed ({message.type.name})")
+                    if message.type == aiohttp.WSMsgType.TEXT:
+                        data = loads(message.data)
+                        if data.get("method") == "rootNotification":
+                            self._on_root(data["params"]["result"])
+                        elif "error" in data:
+                            raise ConnectionError(f"rootSubscribe failed: {data['error']}")
+
+                if time.monotonic() >= next_status:
+                    self.log_status()
+                    next_status = time.monotonic() + FOLLOW_STATUS_INTERVAL
+
+    async def run(self):
+        """Follow the tip until every slot up to end_slot is handled; returns counts by status"""
+        self._queue = asyncio.Queue()
+        self._done = asyncio.Event()
+        for slot in self.backlog:
+            self._enqueue(slot)
+        self.logger.info(f"FOLLOW start: {len(self.backlog):,} backlog slots, following roots to slot {self.end_slot:,} "
+                         f"with {self.workers} workers")
+        self._check_done()
+
+        fetch_task = asyncio.create_task(self.fetcher.follow(self._queue, self._handle, self.workers, FOLLOW_RETRY_DELAY))
+        self._fetch_task = fetch_task
+        reconnect_delay = RECONNECT_MIN_DELAY
+        try:
+            async with aiohttp.ClientSession() as session:
+                while not self._done.is_set() and not self._shutting_down():
+                    if fetch_task.done():
+                        fetch_task.result()  # re-raise a worker crash
+                        break
+                    connected_at = time.monotonic()
+                    try:
+                        await self._subscribe(session)
+                    except (aiohttp.ClientError, ConnectionError, asyncio.TimeoutError) as e:
+                        if time.monotonic() - connected_at > RECONNECT_MAX_DELAY:
+                            reconnect_delay = RECONNECT_MIN_DELAY
+                        self.logger.warning(f"FOLLOW websocket error: {e} - reconnecting in {reconnect_delay:.0f}s")
+                        await asyncio.sleep(reconnect_delay)
+                        reconnect_delay = min(RECONNECT_MAX_DELAY, reconnect_delay * 2)
+        finally:
+            fetch_task.cancel()
+            await asyncio.gather(fetch_task, return_exceptions=True)
+
+        self.log_status()
+        return self.counters
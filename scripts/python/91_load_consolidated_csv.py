@@ -32,6 +32,13 @@ start_time_1 = time.time()
 
 # PostgreSQL database connection parameters
 from db_config import db_params
+from slot_completion_index import SlotCompletionIndex
+from slot_output import find_output_files, count_rows, open_as_csv
+from parallel_copy import parallel_copy
+from slot_chain import verify_slot_chain, format_report
+from epoch_partitions import is_partitioned, create_epoch_table, swap_epoch_partition, ensure_epoch_partition
+from load_manifest import LoadManifest
+from fix_epochs import fix_table_epochs
 
 # Construct the base directory dynamically
 # Use the TRILLIUM_DATA_EPOCHS environment variable or fall back to the standard path
@@ -66,8 +73,42 @@ cursor.execute("CREATE TABLE temp_validator_data (LIKE validator_data);")
 conn.commit()
 logger.info("✅ Temp tables created successfully")
 
+# Rows streamed by get_epoch_data_csv.py --db-sink are already in per-epoch staging tables.
+# Promote them with server-side INSERT ... SELECT instead of re-reading every run*/ CSV when
+# the sink committed every produced slot in the completion index (LOAD_FROM_STREAM=0 forces the CSV path).
+stream_slot_table = f"slot_stream_validator_data_{int(epoch_number)}"
+stream_vote_table = f"slot_stream_epoch_votes_{int(epoch_number)}"
+stream_done_table = f"slot_stream_slots_{int(epoch_number)}"
+load_from_stream = False
+# LOAD_INCREMENTAL=1 loads only run*/ files that load_manifest has not seen (or whose content changed)
+# and upserts just their slots; see load_manifest.py
+load_incremental = os.environ.get('LOAD_INCREMENTAL', '0') == '1'
+if os.environ.get('LOAD_FROM_STREAM', '1') != '0' and not load_incremental:
+    cursor.execute("SELECT to_regclass(%s), to_regclass(%s), to_regclass(%s)",
+                   (stream_slot_table, stream_vote_table, stream_done_table))
+    slot_exists, vote_exists, done_exists = cursor.fetchone()
+    if slot_exists and vote_exists and not done_exists:
+        logger.warning(f"⚠️ {stream_slot_table} exists without {stream_done_table} - "
+                       f"cannot tell which slots were streamed, loading from CSV")
+    elif slot_exists and vote_exists:
+        # Count committed slots, not validator_data rows: blocks without rewards stream no slot row
+        cursor.execute(f"SELECT COUNT(*) FROM {stream_done_table}")
+        streamed_slots = cursor.fetchone()[0]
+        index = SlotCompletionIndex.load(base_directory)
+        produced_slots = index.counts()[0] if index is not None else None
+        if produced_slots is not None and streamed_slots >= produced_slots:
+            load_from_stream = True
+        else:
+            logger.warning(f"⚠️ {stream_done_table} has {streamed_slots:,} slots but the completion index has "
+                           f"{produced_slots if produced_slots is not None else 'no'} produced slots - loading from CSV")
+
 # Search for directories matching the pattern "run*"
 run_directories = sorted(glob.glob(os.path.join(base_directory, "run*")), key=lambda x: [int(y) if y.isdigit() else y.lower() for y in re.split(r'(\d+)', os.path.basename(x))])
+if load_from_stream:
+    logger.info(f"📡 Loading from streamed staging tables {stream_slot_table}/{stream_vote_table} - skipping run*/ CSVs")
+    cursor.execute(f"INSERT INTO temp_epoch_votes SELECT epoch, block_slot, block_hash, identity_pubkey, vote_account_pubkey FROM {stream_vote_table}")
+    cursor.execute(f"INSERT INTO temp_validator_data SELECT * FROM {stream_slot_table}")
+    run_directories = []
 total_run_directories = len(run_directories)
 logger.info(f"📁 Found {total_run_directories} run directories")
 
@@ -77,19 +118,25 @@ mismatch_found = False
 # Initialize a counter for total rows in CSV files
 total_csv_rows = 0
 
+# Opt-in: LOAD_JOBS > 1 collects every run directory's files and COPYs them over that many
+# connections into unlogged staging tables, merged at the end. Unset or 1 is the serial load.
+load_jobs = int(os.environ.get('LOAD_JOBS', 1))
+parallel_epoch_votes_files = []
+parallel_slot_data_files = []
+
 # Iterate over the run directories
 for index, run_directory in enumerate(run_directories, start=1):
     logger.info(f"🔄 Processing run directory {index} of {total_run_directories}: {run_directory}")
 
-    # Find all epoch_votes CSV files in the run directory
-    epoch_votes_files = glob.glob(os.path.join(run_directory, "epoch_votes_*.csv"))
+    # Find all epoch_votes files (CSV or Parquet) in the run directory
+    epoch_votes_files = find_output_files(run_directory, "epoch_votes")
     epoch_votes_count = len(epoch_votes_files)
-    logger.info(f"📊 Found {epoch_votes_count} epoch_votes CSV files")
+    logger.info(f"📊 Found {epoch_votes_count} epoch_votes files")
 
-    # Find all slot_data CSV files in the run directory
-    slot_data_files = glob.glob(os.path.join(run_directory, "slot_data_*.csv"))
+    # Find all slot_data files (CSV or Parquet) in the run directory
+    slot_data_files = find_output_files(run_directory, "slot_data")
     slot_data_count = len(slot_data_files)
-    logger.info(f"📊 Found {slot_data_count} slot_data CSV files")
+    logger.info(f"📊 Found {slot_data_count} slot_data files")
 
     # Sanity check
     count_difference = epoch_votes_count - slot_data_count
@@ -100,19 +147,23 @@ for index, run_directory in enumerate(run_directories, start=1):
             print("Exiting the script.")
             exit()
 
-    print("Process epoch_votes CSV files")
+    if load_jobs > 1 or load_incremental:
+        parallel_epoch_votes_files.extend(epoch_votes_files)
+        parallel_slot_data_files.extend(slot_data_files)
+        continue
+
+    # Parquet files are converted to CSV in memory and loaded with the same COPY
+    print("Process epoch_votes files")
     for epoch_votes_file in epoch_votes_files:
-        with open(epoch_votes_file, "r") as file:
+        with open_as_csv(epoch_votes_file) as file:
             cursor.copy_expert("COPY temp_epoch_votes FROM STDIN WITH CSV HEADER", file)
 
-    print("Process slot_data CSV files")
+    print("Process slot_data files")
     for slot_data_file in slot_data_files:
-        with open(slot_data_file, "r") as file:
-            # Count the number of rows in the CSV file (subtract 1 for the header)
-            csv_row_count = sum(1 for row in file) - 1
-            total_csv_rows += csv_row_count
-            print(f"Processing {slot_data_file} - {csv_row_count} rows")
-            file.seek(0)  # Reset file pointer to the beginning
+        csv_row_count = count_rows(slot_data_file)
+        total_csv_rows += csv_row_count
+        print(f"Processing {slot_data_file} - {csv_row_count} rows")
+        with open_as_csv(slot_data_file) as file:
             cursor.copy_expert("COPY temp_validator_data FROM STDIN WITH CSV HEADER", file)
 
     # Get the size of the temp_epoch_votes table
@@ -133,10 +184,25 @@ for index, run_directory in enumerate(run_directories, start=1):
         print("Skipping to the next run directory due to empty temp tables.")
         continue
 
+if load_incremental:
+    manifest = LoadManifest(conn, epoch_number, base_directory)
+    pending_votes = manifest.pending(parallel_epoch_votes_files)
+    pending_slots = manifest.pending(parallel_slot_data_files)
+    logger.info(f"📒 Incremental load: {len(pending_slots)} of {len(parallel_slot_data_files)} slot_data and "
+                f"{len(pending_votes)} of {len(parallel_epoch_votes_files)} epoch_votes files are new or changed")
+    manifest.load_vote_files(db_params, pending_votes, load_jobs, logger)
+    total_csv_rows += parallel_copy(conn, db_params, "temp_validator_data", [entry[0] for entry in pending_slots], load_jobs, logger, count=True)
+elif parallel_epoch_votes_files or parallel_slot_data_files:
+    logger.info(f"🚀 Loading {len(parallel_epoch_votes_files)} epoch_votes and {len(parallel_slot_data_files)} slot_data files over {load_jobs} connections")
+    parallel_copy(conn, db_params, "temp_epoch_votes", parallel_epoch_votes_files, load_jobs, logger)
+    total_csv_rows += parallel_copy(conn, db_params, "temp_validator_data", parallel_slot_data_files, load_jobs, logger, count=True)
+
 # jrh 2024-10-14 debugging to see why we are losing so many slots
 # After loading all CSV files, check the count in temp_validator_data
 cursor.execute("SELECT COUNT(*) FROM temp_validator_data")
 temp_table_count = cursor.fetchone()[0]
+if load_from_stream:
+    total_csv_rows = temp_table_count
 
 print(f"Total rows in CSV files: {total_csv_rows}")
 print(f"Rows in temp_validator_data: {temp_table_count}")
@@ -155,50 +221,10 @@ print(f"Distinct block_slots in temp_validator_data: {distinct_slots}")
 # luckily I had the default as 1964 to find this error
 # let's fix it here for now
 
-# Constants for epoch calculation
-STARTING_BLOCK_SLOT = 259200000
-SLOTS_PER_EPOCH = 432000
-EPOCH_OFFSET = 600
-
-# Function to calculate the correct epoch for a given block slot
-def calculate_epoch(block_slot):
-    return ((block_slot - STARTING_BLOCK_SLOT) // SLOTS_PER_EPOCH) + EPOCH_OFFSET
-
-# Function to perform the update for a given table
-def update_table_epoch(table_name):
-    # Fetch block_slot and epoch values from the specified table for the given range
-    query = f"""
-        SELECT block_slot, epoch 
-        FROM {table_name} 
-    """
-    cursor.execute(query)
-    records = cursor.fetchall()
-
-    # List to hold the records that need updating
-    updates = []
-
-    # Check if the stored epoch matches the calculated epoch
-    for block_slot, stored_epoch in records:
-        calculated_epoch = calculate_epoch(block_slot)
-        if stored_epoch != calculated_epoch:
-            updates.append((calculated_epoch, block_slot))
-
-    # Update the table with the correct epoch where necessary
-    if updates:
-        update_query = f"""
-            UPDATE {table_name} 
-            SET epoch = %s 
-            WHERE block_slot = %s
-        """
-        cursor.executemany(update_query, updates)
-
-    # Commit the transaction to save the changes
-    conn.commit()
-
-# Call the function for both tables
-# jrh 2024-10-19 the problem seems to be resolved 
-# update_table_epoch('temp_validator_data')
-# update_table_epoch('temp_epoch_votes')
+# fix_epochs.py recomputes epoch from block_slot with one set-based UPDATE per epoch
+# jrh 2024-10-19 the problem seems to be resolved
+# fix_table_epochs(conn, 'temp_validator_data', logger)
+# fix_table_epochs(conn, 'temp_epoch_votes', logger)
 
 # Check for potential duplicates
 cursor.execute("""
@@ -225,15 +251,7 @@ if usr_input != 'y':
 # Start the timer for processing slot_data chain verification
 start_time_2 = time.time()
 
-# Get a list of block_slot and parent_slot from temp_validator_data
-# to verify the chain links are all there and in order
-cursor.execute("SELECT block_slot, parent_slot FROM temp_validator_data")
-slots = cursor.fetchall()
-# Sort slots in descending order by block_slot
-slots.sort(key=lambda x: x[0], reverse=True)
-# Convert the list to a dictionary for quick lookup
-slot_dict = {block_slot: parent_slot for block_slot, parent_slot in slots}
-# Check to see if we are missing any slots in the chain
+# Verify the parent-slot chain server-side; only counts and a few examples per finding come back
 error_found = False
 
 # Set up logging
@@ -244,54 +262,25 @@ log_dir = os.path.expanduser('~/log')
 # Construct the full log file path
 log_file = os.path.join(log_dir, f"{script_name}.log")
 
-# jrh 2025-05-19 -- this was used for skip blame -- no longer needed
-#output_file = f"epoch_{epoch_number}_ordered_slots.csv"
-#print("Save the ordered list to a CSV file for later inspection")
-#with open(output_file, 'w', newline='') as csvfile:
-#    csv_writer = csv.writer(csvfile)
-#    csv_writer.writerow(['block_slot', 'parent_slot'])
-#    for block_slot, parent_slot in slots:
-#        csv_writer.writerow([block_slot, parent_slot])
-
-print("Walk the slot chain list to find any missing parent slots and duplicate slots")
+print("Verify the slot chain for missing parent slots and duplicate slots")
+chain_table = "temp_validator_data"
+if load_incremental:
+    # Verify the epoch as it will be after the upsert: loaded rows not being replaced plus the new rows
+    chain_table = "incremental_chain_rows"
+    cursor.execute(f"""
+        CREATE OR REPLACE TEMPORARY VIEW {chain_table} AS
+        SELECT * FROM validator_data v
+        WHERE v.epoch = {int(epoch_number)}
+          AND NOT EXISTS (SELECT 1 FROM temp_validator_data t WHERE t.block_slot = v.block_slot)
+        UNION ALL
+        SELECT * FROM temp_validator_data
+    """)
+chain_results = verify_slot_chain(cursor, chain_table)
 with open(log_file, 'w') as log:
-    min_block_slot = min(slot_dict.keys())
-    missing_parent_slots = []
-    duplicate_slots = {}
-
-    # First pass: identify duplicate slots
-    for block_slot, parent_slot in slots:
-        if block_slot in duplicate_slots:
-            duplicate_slots[block_slot].append(parent_slot)
-        else:
-            duplicate_slots[block_slot] = [parent_slot]
-
-    # Second pass: check for missing parent slots and report duplicates
-    for block_slot in slot_dict:
-        parent_slot = slot_dict[block_slot]
-        if parent_slot not in slot_dict:
-            if block_slot == min_block_slot:
-                log.write(f"Warning: Parent slot {parent_slot} not found for the lowest numbered block slot {block_slot}. This is expected and will be ignored.\n")
-            else:
-                log.write(f"Error: Parent slot {parent_slot} not found for block slot {block_slot}\n")
-                missing_parent_slots.append(parent_slot)
-        
-        # Report duplicate slots
-        if len(duplicate_slots[block_slot]) > 1:
-            log.write(f"Warning: Duplicate entries found for block slot {block_slot}. Parent slots: {', '.join(map(str, duplicate_slots[block_slot]))}\n")
-
-    if len(missing_parent_slots) > 20:
+    log.write(format_report(chain_results) + "\n")
+    missing_parent_count = sum(result['missing_parents'] for result in chain_results.values())
+    if missing_parent_count > 20:
         error_found = True
-        log.write(f"Total missing parent slots (excluding the lowest numbered block slot): {len(missing_parent_slots)}\n")
-    else:
-        log.write("No missing parent slots found (excluding the lowest numbered block slot).\n")
-
-    duplicate_slot_count = sum(len(parents) > 1 for parents in duplicate_slots.values())
-    if duplicate_slot_count > 0:
-        log.write(f"Total number of slots with duplicates: {duplicate_slot_count}\n")
-    else:
-        log.write("No duplicate slots found.\n")
-
 with open(log_file, 'r') as log:
     log_contents = log.read()
     if log_contents.strip():
@@ -315,15 +304,34 @@ if not error_found:
     before_insert = cursor.fetchone()[0]
     print(f"Rows in validator_data for epoch {epoch_number} before insert: {before_insert}")
 
-    print("Delete existing data for the epoch")
-    cursor.execute(f"DELETE FROM validator_data WHERE epoch = {epoch_number}")
+    if load_incremental:
+        # Upsert only the slots from new or changed files, then record those files as ingested
+        print("Upsert the slots from new or changed files into validator_data")
+        if is_partitioned(cursor, "validator_data"):
+            ensure_epoch_partition(conn, "validator_data", epoch_number)
+        cursor.execute("""
+            DELETE FROM validator_data v
+            WHERE v.epoch = %s
+              AND EXISTS (SELECT 1 FROM temp_validator_data t WHERE t.block_slot = v.block_slot)
+        """, (epoch_number,))
+        cursor.execute("INSERT INTO validator_data SELECT * FROM temp_validator_data WHERE epoch = %s", (epoch_number,))
+        manifest.record_slot_files(pending_slots)
+    elif is_partitioned(cursor, "validator_data"):
+        # Build the epoch into a standalone table and swap it in instead of a mass DELETE + INSERT
+        print("Build the epoch partition from the temporary table and swap it into validator_data")
+        staging_table = create_epoch_table(conn, "validator_data", epoch_number)
+        cursor.execute(f"INSERT INTO {staging_table} SELECT * FROM temp_validator_data WHERE epoch = %s", (epoch_number,))
+        swap_epoch_partition(conn, "validator_data", epoch_number, staging_table, logger)
+    else:
+        print("Delete existing data for the epoch")
+        cursor.execute(f"DELETE FROM validator_data WHERE epoch = {epoch_number}")
 
-    print("Copy data from the temporary table to the validator_data table")
-    cursor.execute("""
-        INSERT INTO validator_data 
-        SELECT * FROM temp_validator_data 
-        WHERE epoch = %s
-    """, (epoch_number,))
+        print("Copy data from the temporary table to the validator_data table")
+        cursor.execute("""
+            INSERT INTO validator_data 
+            SELECT * FROM temp_validator_data 
+            WHERE epoch = %s
+        """, (epoch_number,))
 
     cursor.execute("SELECT COUNT(*) FROM validator_data WHERE epoch = %s", (epoch_number,))
     after_insert = cursor.fetchone()[0]
@@ -331,6 +339,11 @@ if not error_found:
 
     print(f"Difference: {after_insert - before_insert}")
     cursor.execute("CREATE INDEX IF NOT EXISTS idx_validator_data_epoch_identity_pubkey ON validator_data (epoch, identity_pubkey)")
+
+    cursor.execute("SELECT to_regclass('load_manifest')")
+    if not load_incremental and cursor.fetchone()[0] is not None:
+        # The epoch was replaced wholesale, so per-file manifest entries no longer describe it
+        LoadManifest(conn, epoch_number, base_directory).clear_epoch()
     print(f"Data loaded successfully into validator_data")
 else:
     print(f"Errors found during temp_validator_data parent_slot chain check. Data loading aborted. Check the log file '{log_file}' for details.")
@@ -353,13 +366,23 @@ if not error_found:
     """)
 
     print("Insert aggregated vote counts into the temporary table")
-    cursor.execute("""
-        INSERT INTO temp_validator_stats (identity_pubkey, vote_account_pubkey, epoch, votes_cast)
-        SELECT identity_pubkey, vote_account_pubkey, %s, COUNT(*) AS votes_cast
-        FROM temp_epoch_votes
-        WHERE epoch = %s
-        GROUP BY identity_pubkey, vote_account_pubkey
-    """, (epoch_number, epoch_number))
+    if load_incremental:
+        # Per-file vote counts cover every file ingested so far, not just this run's
+        cursor.execute("""
+            INSERT INTO temp_validator_stats (identity_pubkey, vote_account_pubkey, epoch, votes_cast)
+            SELECT identity_pubkey, vote_account_pubkey, %s, SUM(votes_cast) AS votes_cast
+            FROM load_manifest_votes
+            WHERE epoch = %s
+            GROUP BY identity_pubkey, vote_account_pubkey
+        """, (epoch_number, epoch_number))
+    else:
+        cursor.execute("""
+            INSERT INTO temp_validator_stats (identity_pubkey, vote_account_pubkey, epoch, votes_cast)
+            SELECT identity_pubkey, vote_account_pubkey, %s, COUNT(*) AS votes_cast
+            FROM temp_epoch_votes
+            WHERE epoch = %s
+            GROUP BY identity_pubkey, vote_account_pubkey
+        """, (epoch_number, epoch_number))
 
     print("Merge data from the temporary table into the validator_stats table, choosing the rows where votes_cast is large and ignoring any rows where votes_cast <=5")
     print(f"Starting merge for epoch {epoch_number}: Merging data from temp_validator_stats into validator_stats.")
@@ -446,6 +469,12 @@ if not error_found:
         conn.commit()
         print(f"Epoch {epoch_number}: Data loaded successfully into validator_stats and transaction committed.")
 
+        if load_from_stream:
+            # The run*/ CSVs remain the fallback for any re-load of this epoch
+            cursor.execute(f"DROP TABLE IF EXISTS {stream_slot_table}, {stream_vote_table}, {stream_done_table}")
+            conn.commit()
+            logger.info(f"🧹 Dropped streamed staging tables {stream_slot_table}/{stream_vote_table}/{stream_done_table}")
+
     except psycopg2.Error as e:
         print(f"Epoch {epoch_number}: A database error occurred: {e}")
         print(f"SQL Error Code: {e.pgcode}")
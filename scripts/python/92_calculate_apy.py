@@ -2,6 +2,7 @@ import psycopg2
 from decimal import Decimal
 from typing import Dict, List
 from db_config import db_params
+from epoch_merge import EpochMerge, MATCH_VOTE
 import sys
 import os
 import importlib.util
@@ -18,6 +19,25 @@ from math import isinf, isnan
 
 LAMPORTS_PER_SOL = 1_000_000_000
 
+APY_COLUMNS = (
+    'delegator_mev_apy',
+    'delegator_compound_mev_apy',
+    'delegator_total_apy',
+    'delegator_compound_total_apy',
+    'validator_block_rewards_apy',
+    'validator_compound_block_rewards_apy',
+    'validator_inflation_apy',
+    'validator_compound_inflation_apy',
+    'validator_mev_apy',
+    'validator_compound_mev_apy',
+    'validator_total_apy',
+    'validator_compound_total_apy',
+    'delegator_inflation_apy',
+    'delegator_compound_inflation_apy',
+    'total_overall_apy',
+    'compound_overall_apy',
+)
+
 # Logging already configured via unified logging system above
 
 def validate_result(result):
@@ -60,7 +80,8 @@ def update_validator_stats(epoch: int, results: List[Dict]):
             (epoch,)
         )
 
-        # Update only validators with valid APYs
+        # Update only validators with valid APYs: stage them with one COPY and apply a single joined UPDATE
+        rows = []
         for result in results:
             is_valid, invalid_key = validate_result(result)
             if not is_valid:
@@ -69,49 +90,13 @@ def update_validator_stats(epoch: int, results: List[Dict]):
             if 'validator_block_rewards_apy' not in result or result['validator_block_rewards_apy'] is None:
                 logger.warning(f"Skipping update for {result['vote_account_pubkey']} in epoch {epoch}: validator_block_rewards_apy is missing or None")
                 continue
-            cur.execute(
-                """
-                UPDATE validator_stats
-                SET 
-                    delegator_mev_apy = %s,
-                    delegator_compound_mev_apy = %s,
-                    delegator_total_apy = %s,
-                    delegator_compound_total_apy = %s,
-                    validator_block_rewards_apy = %s,
-                    validator_compound_block_rewards_apy = %s,
-                    validator_inflation_apy = %s,
-                    validator_compound_inflation_apy = %s,
-                    validator_mev_apy = %s,
-                    validator_compound_mev_apy = %s,
-                    validator_total_apy = %s,
-                    validator_compound_total_apy = %s,
-                    delegator_inflation_apy = %s,
-                    delegator_compound_inflation_apy = %s,
-                    total_overall_apy = %s,
-                    compound_overall_apy = %s
-                WHERE epoch = %s AND vote_account_pubkey = %s
-                """,
-                (
-                    result['delegator_mev_apy'],
-                    result['delegator_compound_mev_apy'],
-                    result['delegator_total_apy'],
-                    result['delegator_compound_total_apy'],
-                    result['validator_block_rewards_apy'],
-                    result['validator_compound_block_rewards_apy'],
-                    result['validator_inflation_apy'],
-                    result['validator_compound_inflation_apy'],
-                    result['validator_mev_apy'],
-                    result['validator_compound_mev_apy'],
-                    result['validator_total_apy'],
-                    result['validator_compound_total_apy'],
-                    result['delegator_inflation_apy'],
-                    result['delegator_compound_inflation_apy'],
-                    result['total_overall_apy'],
-                    result['compound_overall_apy'],
-                    epoch,
-                    result['vote_account_pubkey']
-                )
-            )
+            rows.append([result['vote_account_pubkey']] + [result[column] for column in APY_COLUMNS])
+
+        merge = EpochMerge(conn, epoch, logger)
+        merge.stage("temp_validator_apy",
+                    [("vote_account_pubkey", "TEXT")] + [(column, "NUMERIC") for column in APY_COLUMNS], rows)
+        merge.update("APYs", "temp_validator_apy",
+                     ", ".join(f"{column} = src.{column}" for column in APY_COLUMNS), match=MATCH_VOTE)
 
         conn.commit()
         cur.close()
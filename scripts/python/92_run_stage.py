@@ -0,0 +1,247 @@
+#!/usr/bin/env python3
+"""
+Dependency-graph runner for the 92 enrichment stage.
+
+2_update_validator_aggregate_info.sh used to run every 92 step one after the
+other, although most of them read and write disjoint tables or columns. Here
+each step declares the resources it reads and writes ("validator_stats" is the
+whole table, "validator_stats.apy" one group of its columns) and the runner
+derives the graph from the declaration order: a step waits for every earlier
+step whose writes overlap its reads or writes, or whose reads overlap its
+writes. That keeps the results identical to the sequential run while
+independent steps run at the same time, each in its own process with its own
+DB connections.
+
+Completed steps are checkpointed in {LOG_DIR}/92_stage_state.<epoch>.<mode>.json
+(mode "full" or "skip_previous"), so rerunning after a failure resumes from the
+failed step (use --restart to run everything again). A failed step only holds
+back the steps that depend on it; the others still run and every failure is
+reported at the end. The exit code is 1 when aggregate_info failed or could not
+run (the old script stopped there too) and PARTIAL_FAILURE_EXIT when only
+other steps failed, which the old script logged and ran past. The checkpoint is deleted
+once the whole stage succeeds: it only serves crash resume, and the pipeline's
+second --skip-previous pass for the same epoch must run every step again to pick
+up the Kobe/MEV data. Each step's output goes to {LOG_DIR}/92_stage.<epoch>.<step>.log.
+
+Usage:
+    python3 92_run_stage.py 812
+    python3 92_run_stage.py 812 --skip-previous --jobs 4
+    python3 92_run_stage.py 812 --restart
+    python3 92_run_stage.py 812 --plan          # print the graph and exit
+"""
+import argparse
+import importlib.util
+import json
+import os
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+SCRIPTS_PYTHON = os.environ.get('TRILLIUM_SCRIPTS_PYTHON', os.path.dirname(os.path.abspath(__file__)))
+SCRIPTS_BASH = os.environ.get('TRILLIUM_SCRIPTS_BASH', os.path.join(os.path.dirname(SCRIPTS_PYTHON), 'bash'))
+LOG_DIR = os.environ.get('TRILLIUM_LEADERBOARD_LOGS',
+                         os.path.join(os.environ.get('TRILLIUM_DATA', '/home/smilax/trillium_api/data'), 'logs'))
+
+PARTIAL_FAILURE_EXIT = 3
+
+class Step:
+    """One 92 step: a command plus the resources it reads and writes"""
+
+    def __init__(self, name, command, reads=(), writes=(), stdin=None, required=False):
+        self.name = name
+        self.command = command
+        self.reads = set(reads)
+        self.writes = set(writes)
+        self.stdin = stdin
+        self.required = required
+        self.depends_on = set()
+
+def _overlap(a, b):
+    """True when resource a and b name the same table/column group or one contains the other"""
+    return a == b or a.startswith(f"{b}.") or b.startswith(f"{a}.")
+
+def _conflicts(first, second):
+    return any(_overlap(a, b) for a in first for b in second)
+
+def aggregate_info_responses(epoch, skip_previous):
+    """Answers 92_update_validator_aggregate_info.py expects on stdin"""
+    if skip_previous:
+        # icons no, start, end, aggregate info, stakenet, leader schedule
+        return f"n\n{epoch}\n{epoch}\ny\ny\ny\n"
+    # icons yes, icons only no, start, end, aggregate info, stakenet, leader schedule
+    return f"y\nn\n{epoch}\n{epoch}\ny\ny\ny\n"
+
+def build_steps(epoch, skip_previous=False):
+    """The 92 steps in their original sequential order"""
+    python = lambda script: ["python3", os.path.join(SCRIPTS_PYTHON, script), str(epoch)]
+    bash = lambda script: ["bash", os.path.join(SCRIPTS_BASH, script), str(epoch)]
+    steps = []
+    if not skip_previous:
+        steps.append(Step("vote_latency_load", python("92_vx-call.py"),
+                          reads={"validator_stats"}, writes={"votes_table"}))
+    steps += [
+        Step("aggregate_info", ["python3", os.path.join(SCRIPTS_PYTHON, "92_update_validator_aggregate_info.py")],
+             reads={"validator_data", "validator_info"},
+             writes={"validator_stats", "validator_info", "leader_schedule", "epoch_aggregate_data"},
+             stdin=aggregate_info_responses(epoch, skip_previous), required=True),
+        Step("vote_latency_ead", bash("92_vote_latency_update_ead.sh"),
+             reads={"votes_table", "validator_xshin"}, writes={"epoch_aggregate_data.vote_latency"}),
+        Step("block_time", python("92_block_time_calculation.py"),
+             reads={"validator_data"}, writes={"epoch_aggregate_data.block_time"}),
+        Step("vs_inflation_reward", python("92_update_vs_inflation_reward.py"),
+             reads={"validator_stats.identity", "stake_accounts"}, writes={"validator_stats.inflation"}),
+        Step("ead_inflation_reward", python("92_update_ead_inflation_reward.py"),
+             reads={"validator_stats.inflation"}, writes={"epoch_aggregate_data.inflation"}),
+        Step("apy", python("92_calculate_apy.py"),
+             reads={"validator_stats.rewards", "validator_stats.inflation", "epoch_aggregate_data.epochs_per_year"},
+             writes={"validator_stats.apy"}),
+        Step("ip_api", python("92_ip_api.py"),
+             reads={"validator_stats.network"}, writes={"validator_stats.geo"}),
+        # No epoch argument: the SQL updates run against MAX(epoch) in validator_stats, as they always did
+        Step("sql_updates", ["bash", os.path.join(SCRIPTS_BASH, "92_run_sql_updates.sh")],
+             reads={"validator_stats"}, writes={"validator_stats.geo", "validator_stats_low_votes"}),
+        Step("slot_duration", bash("92_slot_duration.sh"),
+             reads={"leader_schedule"},
+             writes={"validator_stats_slot_duration", "validator_stats.slot_duration", "epoch_aggregate_data.slot_duration"}),
+        Step("block_laggards", python("92_solana_block_laggards.py"),
+             reads={"validator_stats_slot_duration", "validator_stats", "validator_info"},
+             writes={"validator_stats_slot_duration"}),
+    ]
+    for n, step in enumerate(steps):
+        for earlier in steps[:n]:
+            if (_conflicts(earlier.writes, step.reads | step.writes) or _conflicts(earlier.reads, step.writes)):
+                step.depends_on.add(earlier.name)
+    # Keep only direct edges so the plan stays readable
+    for step in steps:
+        indirect = set()
+        for name in step.depends_on:
+            indirect |= _ancestors(steps, name)
+        step.depends_on -= indirect
+    return steps
+
+def _ancestors(steps, name):
+    by_name = {step.name: step for step in steps}
+    seen, pending = set(), list(by_name[name].depends_on)
+    while pending:
+        current = pending.pop()
+        if current not in seen:
+            seen.add(current)
+            pending.extend(by_name[current].depends_on)
+    return seen
+
+class Checkpoint:
+    """Completed steps of one epoch's run in one mode, persisted after every step"""
+
+    def __init__(self, epoch, skip_previous=False, restart=False):
+        mode = "skip_previous" if skip_previous else "full"
+        self.path = os.path.join(LOG_DIR, f"92_stage_state.{epoch}.{mode}.json")
+        self.completed = {}
+        if not restart and os.path.exists(self.path):
+            with open(self.path) as f:
+                self.completed = json.load(f).get("completed", {})
+
+    def mark(self, name, seconds):
+        self.completed[name] = {"finished_at": int(time.time()), "seconds": round(seconds, 1)}
+        with open(f"{self.path}.tmp", "w") as f:
+            json.dump({"completed": self.completed}, f, indent=2)
+        os.replace(f"{self.path}.tmp", self.path)
+
+    def clear(self):
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+def run_step(step, epoch):
+    """Run one step in its own process; returns (exit code, seconds, log path)"""
+    log_path = os.path.join(LOG_DIR, f"92_stage.{epoch}.{step.name}.log")
+    start = time.time()
+    with open(log_path, "w") as log_file:
+        result = subprocess.run(step.command, input=step.stdin, text=True, stdout=log_file, stderr=subprocess.STDOUT)
+    return result.returncode, time.time() - start, log_path
+
+def _tail(path, lines=20):
+    with open(path, errors="replace") as f:
+        return "".join(f.readlines()[-lines:])
+
+def run_stage(epoch, logger, skip_previous=False, jobs=4, restart=False):
+    """Run the 92 steps as a graph; returns (failed step names, names of steps blocked by a failure)"""
+    os.makedirs(LOG_DIR, exist_ok=True)
+    steps = build_steps(epoch, skip_previous)
+    checkpoint = Checkpoint(epoch, skip_previous, restart)
+    done = {step.name for step in steps if step.name in checkpoint.completed}
+    if done:
+        logger.info(f"⏭️ Resuming epoch {epoch}: already completed {', '.join(sorted(done))}")
+    pending = [step for step in steps if step.name not in done]
+    failed = []
+    blocked = []
+    start = time.time()
+
+    with ThreadPoolExecutor(max_workers=max(1, jobs)) as executor:
+        running = {}
+        while pending or running:
+            # Steps downstream of a failure can never run; everything else keeps going
+            unrunnable = True
+            while unrunnable:
+                unrunnable = [step for step in pending if step.depends_on & (set(failed) | set(blocked))]
+                for step in unrunnable:
+                    pending.remove(step)
+                    blocked.append(step.name)
+                    logger.warning(f"⏭️ Not starting {step.name}: "
+                                   f"{', '.join(sorted(step.depends_on & (set(failed) | set(blocked))))} failed or did not run")
+            for step in [step for step in pending if step.depends_on <= done]:
+                if len(running) >= max(1, jobs):
+                    break
+                pending.remove(step)
+                logger.info(f"🚀 Starting {step.name}: {' '.join(step.command)}")
+                running[executor.submit(run_step, step, epoch)] = step
+            if not running:
+                break
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                step = running.pop(future)
+                code, seconds, log_path = future.result()
+                if code == 0:
+                    done.add(step.name)
+                    checkpoint.mark(step.name, seconds)
+                    logger.info(f"✅ {step.name} finished in {seconds:.1f}s")
+                else:
+                    failed.append(step.name)
+                    logger.error(f"❌ {step.name} failed (exit code {code}) after {seconds:.1f}s, see {log_path}:\n{_tail(log_path)}")
+
+    if failed:
+        logger.error(f"❌ 92 stage for epoch {epoch} finished with failures in {time.time() - start:.1f}s: "
+                     f"failed {', '.join(failed)}; not started {', '.join(blocked) or 'none'}. Rerun to resume.")
+    else:
+        # Only a failed run is resumed; the next run for this epoch starts from scratch
+        checkpoint.clear()
+        logger.info(f"🎉 92 stage for epoch {epoch} completed in {time.time() - start:.1f}s")
+    return failed, blocked
+
+def main():
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+    spec = importlib.util.spec_from_file_location("logging_config", os.path.join(script_dir, "999_logging_config.py"))
+    logging_config = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(logging_config)
+    logger = logging_config.setup_logging(os.path.basename(__file__).replace('.py', ''))
+
+    parser = argparse.ArgumentParser(description='Run the 92 enrichment steps for an epoch as a dependency graph')
+    parser.add_argument('epoch', type=int, help='Epoch to process')
+    parser.add_argument('--skip-previous', action='store_true', help='Reduced processing: no vote latency load, no icons')
+    parser.add_argument('--jobs', type=int, default=4, help='Steps to run at the same time (default: 4)')
+    parser.add_argument('--restart', action='store_true', help='Ignore the checkpoint and run every step')
+    parser.add_argument('--plan', action='store_true', help='Print the steps and their dependencies, then exit')
+    args = parser.parse_args()
+
+    if args.plan:
+        for step in build_steps(args.epoch, args.skip_previous):
+            print(f"{step.name:<22} after: {', '.join(sorted(step.depends_on)) or '-'}")
+        return
+
+    failed, blocked = run_stage(args.epoch, logger, args.skip_previous, args.jobs, args.restart)
+    required = {step.name for step in build_steps(args.epoch, args.skip_previous) if step.required}
+    if required & (set(failed) | set(blocked)):
+        sys.exit(1)
+    sys.exit(PARTIAL_FAILURE_EXIT if failed else 0)
+
+if __name__ == "__main__":
+    main()
@@ -43,6 +43,11 @@ from requests.exceptions import ConnectionError, RequestException, Timeout, TooM
 from urllib3.util.retry import Retry
 
 from rpc_config import RPC_ENDPOINT  # Import the centralized RPC endpoint
+from validator_history import fetch_epoch_entries
+from stakenet_staging import StakenetStaging
+from epoch_merge import EpochMerge, MATCH_IDENTITY, MATCH_VOTE_IDENTITY
+from icon_fetcher import refresh_icons
+from epoch_partitions import is_partitioned, create_epoch_table, swap_epoch_partition
 
 DEBUG = True  # Set to False to disable debug printing
 
@@ -58,7 +63,6 @@ thread_local = threading.local()
 SOLANA_CMD = "/home/smilax/agave/bin/solana"
 PSQL_CMD = '/usr/bin/psql'
 CURL_CMD = '/usr/bin/curl'
-VALIDATOR_HISTORY_CLI = '/home/smilax/stakenet/target/release/validator-history-cli'
 MAX_WORKERS = 10  # Adjust based on system resources and API rate limits
 
 # PostgreSQL database connection parameters
@@ -181,8 +185,18 @@ def import_leader_schedule(db_params, file_path):
 
         logger.info(f"Prepared {len(insert_entries)} entries for insertion")
 
-        execute_batch(cur, insert_query, insert_entries)
-        conn.commit()
+        if is_partitioned(cur, "leader_schedule"):
+            # COPY the whole schedule into a fresh table and swap it in as the epoch's partition
+            buffer = StringIO()
+            csv.writer(buffer).writerows(insert_entries)
+            buffer.seek(0)
+            staging_table = create_epoch_table(conn, "leader_schedule", epoch)
+            cur.copy_expert(f"COPY {staging_table} (epoch, block_slot, identity_pubkey, block_produced) FROM STDIN WITH CSV", buffer)
+            conn.commit()
+            swap_epoch_partition(conn, "leader_schedule", epoch, staging_table, logger)
+        else:
+            execute_batch(cur, insert_query, insert_entries)
+            conn.commit()
         logger.info(f"Imported {len(insert_entries)} entries for epoch {epoch} from file {file_path}")
 
         if mismatches:
@@ -247,11 +261,9 @@ def update_validator_skip_rates(conn, epoch):
     cur = conn.cursor()
 
     try:
-        update_query = sql.SQL("""
-            WITH skip_rate_calc AS (
+        updated_rows = EpochMerge(conn, epoch, logger).update("skip rates", """(
                 SELECT 
                     identity_pubkey,
-                    epoch,
                     COUNT(*) AS total_slots,
                     SUM(CASE WHEN block_produced THEN 1 ELSE 0 END) AS blocks_produced,
                     ROUND(
@@ -259,23 +271,14 @@ def update_validator_skip_rates(conn, epoch):
                         2
                     ) AS skip_rate
                 FROM leader_schedule
-                WHERE epoch = {}
-                GROUP BY identity_pubkey, epoch
-            )
-            UPDATE validator_stats vs
-            SET 
+                WHERE epoch = %s
+                GROUP BY identity_pubkey
+            )""", """
                 skip_rate = src.skip_rate,
                 blocks_produced = src.blocks_produced,
                 leader_slots = src.total_slots
-            FROM skip_rate_calc src
-            WHERE 
-                vs.identity_pubkey = src.identity_pubkey 
-                AND vs.epoch = src.epoch
-            RETURNING vs.identity_pubkey, vs.leader_slots, vs.blocks_produced, vs.skip_rate;
-        """).format(sql.Literal(epoch))
-
-        cur.execute(update_query)
-        updated_rows = cur.fetchall()
+            """, match=MATCH_IDENTITY, source_params=(epoch,),
+            returning="vs.identity_pubkey, vs.leader_slots, vs.blocks_produced, vs.skip_rate")
         conn.commit()
         logger.info(f"Updated validator_stats table for epoch {epoch}")
         logger.info(f"Number of rows updated: {len(updated_rows)}")
@@ -296,171 +299,8 @@ def update_validator_skip_rates(conn, epoch):
     finally:
         cur.close()
 
-def fetch_icon_url_from_keybase(keybase_username):
-    url = f"https://keybase.io/_/api/1.0/user/lookup.json?username={keybase_username}"
-    headers = {"Content-Type": "application/json"}
-
-    try:
-        response = requests.get(url, headers=headers, timeout=5)
-        if response.status_code == 200:
-            json_response = response.json()
-            pictures = json_response.get("them", {}).get("pictures", {})
-            primary_url = pictures.get("primary", {}).get("url")
-            if primary_url:
-                return primary_url
-            else:
-                return None
-        else:
-            return None
-    except requests.exceptions.RequestException as e:
-        return None
-
 def fetch_and_store_icons(conn, cur):
-    icon_dir = "/home/smilax/trillium_api/static/images"
-    os.makedirs(icon_dir, exist_ok=True)
-
-    # Read existing 92_icon_url_errors.list to create a set of identity_pubkeys to skip
-    skip_pubkeys = set()
-    error_list_path = "./data/configs/92_icon_url_errors.list"
-    os.makedirs("./data/configs", exist_ok=True)
-    try:
-        with open(error_list_path, "r", newline="") as error_file:
-            csv_reader = csv.reader(error_file)
-            next(csv_reader)  # Skip header row
-            for row in csv_reader:
-                if row:  # Check if row is not empty
-                    continue # jrh -- let's try them all every epoch
-                    #skip_pubkeys.add(row[0])  # Add identity_pubkey to skip set
-    except FileNotFoundError:
-        logger.info(f"{error_list_path} not found. Creating a new file.")
-
-    # Open 92_icon_url_errors.list in append mode
-    csv_file = open(error_list_path, "a", newline="")
-    csv_writer = csv.writer(csv_file)
-
-    # Write header only if the file is empty
-    if csv_file.tell() == 0:
-        csv_writer.writerow(["identity_pubkey", "icon_url", "error"])
-
-    cur.execute("SELECT identity_pubkey, icon_url, keybase_username FROM validator_info")
-    rows = cur.fetchall()
-
-    for row in rows:
-        identity_pubkey, icon_url, keybase_username = row
-
-        if identity_pubkey in skip_pubkeys:
-            logger.info(f"Skipping {identity_pubkey} (in error list)")
-            continue
-
-        if not icon_url:
-            if keybase_username:
-                icon_url = fetch_icon_url_from_keybase(keybase_username)
-                if icon_url:
-                    cur.execute(
-                        "UPDATE validator_info SET icon_url = %s WHERE identity_pubkey = %s",
-                        (icon_url, identity_pubkey),
-                    )
-                    conn.commit()
-                else:
-                    csv_writer.writerow([identity_pubkey, "", f"No icon_url found for {keybase_username}"])
-                    cur.execute(
-                        "UPDATE validator_info SET logo = %s WHERE identity_pubkey = %s",
-                        ("no-image-available12.webp", identity_pubkey),
-                    )
-                    conn.commit()
-                    continue
-            else:
-                csv_writer.writerow([identity_pubkey, "", "No icon_url and no keybase_username found"])
-                cur.execute(
-                    "UPDATE validator_info SET logo = %s WHERE identity_pubkey = %s",
-                    ("no-image-available12.webp", identity_pubkey),
-                )
-                conn.commit()
-                continue
-
-        # Validate icon_url format
-        parsed = urlparse(icon_url)
-        if not (parsed.scheme in ('http', 'https') and parsed.netloc):
-            error_message = f"Invalid URL format: {icon_url}"
-            logger.error(error_message)
-            csv_writer.writerow([identity_pubkey, icon_url, error_message])
-            cur.execute(
-                "UPDATE validator_info SET logo = %s WHERE identity_pubkey = %s",
-                ("no-image-available12.webp", identity_pubkey),
-            )
-            conn.commit()
-            continue
-
-        filename = os.path.basename(unquote(parsed.path))
-        file_extension = os.path.splitext(filename)[1]
-
-        # If no file extension, we will determine it later
-        filename = f"{identity_pubkey}{file_extension}"
-        file_path = os.path.join(icon_dir, filename)
-        headers = {
-            'Accept': 'image/png,image/*',
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/129.0.0.0 Safari/537.36'
-        }
-        try:
-            response = requests.get(icon_url, headers=headers, timeout=5, allow_redirects=True)
-
-            if response.status_code == 200:
-                # Step 1: Try to determine the extension using the Content-Type header
-                content_type = response.headers.get("Content-Type")
-                extension = None
-                
-                if content_type:
-                    extension = mimetypes.guess_extension(content_type)
-
-                # Step 2: If no extension is found from Content-Type, use filetype
-                if not extension:
-                    kind = filetype.guess(response.content)
-                    if kind and kind.mime.startswith('image/'):
-                        extension = f".{kind.extension}"
-                    else:
-                        extension = ""  # No extension if filetype fails
-
-                # Build the final filename
-                filename = f"{identity_pubkey}{extension}"
-                file_path = os.path.join(icon_dir, filename)
-
-                # Save the image with the determined extension
-                with open(file_path, "wb") as file:
-                    file.write(response.content)
-
-                # Sanitize logo filename
-                if not filename.endswith(('.png', '.jpg', '.jpeg', '.webp', '.gif')):
-                    filename = "no-image-available12.webp"
-                    logger.info(f"Invalid image extension for {identity_pubkey}, using default logo")
-
-                cur.execute(
-                    "UPDATE validator_info SET logo = %s WHERE identity_pubkey = %s",
-                    (filename, identity_pubkey),
-                )
-                conn.commit()
-
-            else:
-                error_message = f"Error: Failed to fetch '{icon_url}' (status code: {response.status_code})"
-                logger.error(error_message)
-                csv_writer.writerow([identity_pubkey, icon_url, error_message])
-                cur.execute(
-                    "UPDATE validator_info SET logo = %s WHERE identity_pubkey = %s",
-                    ("no-image-available12.webp", identity_pubkey),
-                )
-                conn.commit()
-
-        except requests.exceptions.RequestException as e:
-            error_message = f"Error: {e}"
-            logger.info(error_message)
-            csv_writer.writerow([identity_pubkey, icon_url, error_message])
-            cur.execute(
-                "UPDATE validator_info SET logo = %s WHERE identity_pubkey = %s",
-                ("no-image-available12.webp", identity_pubkey),
-            )
-            conn.commit()
-
-    csv_file.close()
-    logger.info("Validator icons processing completed.")
+    refresh_icons(conn, logger)
 
 def fetch_and_store_gossip_data(rpc_url, output_file="92_gossip.json"):
     """Fetch gossip data using solana gossip command and save to a JSON file."""
@@ -531,20 +371,16 @@ def update_validator_stats_with_gossip(db_params, start_epoch, end_epoch, gossip
         
         os.unlink(temp_file_path)  # Clean up temporary file
 
+        # Give the planner real row counts for the per-epoch hash joins
+        cur.execute("ANALYZE temp_gossip_data")
+
         # Update validator_stats for the specified epoch range
         for epoch in range(start_epoch, end_epoch + 1):
             logger.info(f"Updating validator_stats with gossip data for epoch {epoch}")
-            cur.execute("""
-                UPDATE validator_stats vs
-                SET
-                    ip = COALESCE(tgd.ip, vs.ip),
-                    version = COALESCE(tgd.version, vs.version)
-                FROM temp_gossip_data tgd
-                WHERE
-                    vs.identity_pubkey = tgd.identity_pubkey
-                    AND vs.epoch = %s
-            """, (epoch,))
-            affected_rows = cur.rowcount
+            affected_rows = EpochMerge(conn, epoch, logger).update("gossip", "temp_gossip_data", """
+                    ip = COALESCE(src.ip, vs.ip),
+                    version = COALESCE(src.version, vs.version)
+            """, match=MATCH_IDENTITY)
             logger.info(f"Updated {affected_rows} rows in validator_stats for epoch {epoch}")
 
         conn.commit()
@@ -557,11 +393,6 @@ def update_validator_stats_with_gossip(db_params, start_epoch, end_epoch, gossip
         cur.close()
         conn.close()
 
-def fetch_validator_history(vote_pubkey):
-    cmd = [VALIDATOR_HISTORY_CLI, '--json-rpc-url', RPC_URL, 'history', '--print-json', vote_pubkey]
-    result = subprocess.run(cmd, capture_output=True, text=True)
-    return vote_pubkey, result
-
 def check_kobe_api_mev_data(epoch):
     """Check if Kobe API has valid MEV data for the given epoch."""
     # turns out Jito1 validator is "experimental" and not reliable.
@@ -745,11 +576,11 @@ def fetch_and_store_data(start_epoch, end_epoch, process_validator_icons, proces
         # Initialize skip_vote_pubkeys to avoid UnboundLocalError
         skip_vote_pubkeys = set()
 
-        ## Print statement 1: Confirm pubkeys before CLI calls
+        ## Print statement 1: Confirm pubkeys before fetching validator history
         if DEBUG:
             for pubkey in target_pubkeys:
                 if pubkey in vote_account_pubkeys and pubkey not in skip_vote_pubkeys:
-                    print(f"Pubkey {pubkey} will be processed by fetch_validator_history.")
+                    print(f"Pubkey {pubkey} will be processed by fetch_epoch_entries.")
                 else:
                     print(f"Pubkey {pubkey} will NOT be processed (in skip list or not in vote_account_pubkeys).")
 
@@ -765,146 +596,30 @@ def fetch_and_store_data(start_epoch, end_epoch, process_validator_icons, proces
             logger.info(f"{stakenet_error_list_path} not found. Creating a new file.")
             open(stakenet_error_list_path, 'w').close()
 
-        # Parallel CLI calls
-        logger.info("Fetching validator history in parallel")
-        with ThreadPoolExecutor(max_workers=16) as executor:
-            results = list(executor.map(fetch_validator_history, [pk for pk in vote_account_pubkeys if pk not in skip_vote_pubkeys]))
-
-        # Process CLI results into in-memory buffers
-        csv_buffers = {}
-        for vote_pubkey, result in results:
-            if result.stderr:
-                logger.info(f"Error for {vote_pubkey}: {result.stderr}")
-                with open(stakenet_error_list_path, 'a') as error_file:
-                    error_file.write(f"{vote_pubkey}\n")
-                continue
-                
-            # Parse JSON output
-            try:
-                json_data = json.loads(result.stdout)
-            except json.JSONDecodeError as e:
-                logger.error(f"Failed to parse JSON for {vote_pubkey}: {e}")
-                with open(stakenet_error_list_path, 'a') as error_file:
-                    error_file.write(f"{vote_pubkey}\n")
-                continue
-            
-            # Handle both old format (list) and new format (dict with 'epochs' key)
-            if isinstance(json_data, dict) and 'epochs' in json_data:
-                # New format: extract the epochs list
-                epochs_list = json_data['epochs']
-            elif isinstance(json_data, list):
-                # Old format: already a list
-                epochs_list = json_data
-            else:
-                logger.error(f"Unexpected JSON format for {vote_pubkey}: expected list or dict with 'epochs' key, got {type(json_data).__name__}")
-                logger.debug(f"JSON data: {json_data}")
-                with open(stakenet_error_list_path, 'a') as error_file:
-                    error_file.write(f"{vote_pubkey}\n")
-                continue
-            
-            csv_buffer = StringIO()
-            csv_buffer.write("vote_account_pubkey,epoch,commission,epoch_credits,mev_commission,mev_earned,stake,jito_rank,superminority,ip,client_type,client_version\n")
-            
-            # Find data for the target epoch
-            epoch_found = False
-            for epoch_data in epochs_list:
-                # Ensure epoch_data is a dictionary
-                if not isinstance(epoch_data, dict):
-                    logger.warning(f"Skipping non-dict epoch_data for {vote_pubkey}: {type(epoch_data).__name__}")
-                    continue
-                
-                # Handle both old and new format
-                if 'validator_history' in epoch_data:
-                    # New format with nested validator_history
-                    epoch_num = epoch_data.get('epoch')
-                    validator_history = epoch_data.get('validator_history', {})
-                else:
-                    # Old format - flat structure
-                    epoch_num = epoch_data.get('epoch')
-                    validator_history = epoch_data
-                
-                if epoch_num == start_epoch:
-                    epoch_found = True
-                    
-                    # Extract values and handle None/null values
-                    commission = validator_history.get('commission') or '[NULL]'
-                    epoch_credits = validator_history.get('epoch_credits') or '[NULL]'
-                    mev_commission = validator_history.get('mev_commission') or '[NULL]'
-                    
-                    # Handle mev_earned - convert from SOL to lamports if it's a float
-                    mev_earned_raw = validator_history.get('mev_earned')
-                    if mev_earned_raw is not None:
-                        try:
-                            mev_earned = str(int(float(mev_earned_raw) * 1_000_000_000))
-                        except (ValueError, TypeError):
-                            mev_earned = '[NULL]'
-                    else:
-                        mev_earned = '[NULL]'
-                    
-                    # Handle activated_stake (new format uses activated_stake_lamports)
-                    activated_stake = validator_history.get('activated_stake') or validator_history.get('activated_stake_lamports') or '[NULL]'
-                    
-                    # Handle jito_rank (new format uses 'rank')
-                    jito_rank = validator_history.get('jito_rank') or validator_history.get('rank') or '[NULL]'
-                    
-                    # Handle superminority (new format uses is_superminority)
-                    if 'superminority' in validator_history:
-                        superminority = 1 if validator_history.get('superminority') else 0
-                    elif 'is_superminority' in validator_history:
-                        # New format stores it as a string "0" or "1"
-                        is_super = validator_history.get('is_superminority')
-                        if is_super is not None:
-                            superminority = int(is_super)
-                        else:
-                            superminority = 0
-                    else:
-                        superminority = 0
-                    
-                    ip = validator_history.get('ip') or '[NULL]'
-                    client_type = validator_history.get('client_type') or '[NULL]'
-                    
-                    # Handle client_version (new format uses 'version')
-                    client_version = validator_history.get('client_version') or validator_history.get('version') or '[NULL]'
-                    
-                    # Convert values to strings and handle None values properly
-                    commission = str(commission) if commission != '[NULL]' else '[NULL]'
-                    epoch_credits = str(epoch_credits) if epoch_credits != '[NULL]' else '[NULL]'
-                    mev_commission = str(mev_commission) if mev_commission != '[NULL]' else '[NULL]'
-                    activated_stake = str(activated_stake) if activated_stake != '[NULL]' else '[NULL]'
-                    jito_rank = str(jito_rank) if jito_rank != '[NULL]' else '[NULL]'
-                    client_type = str(client_type) if client_type != '[NULL]' else '[NULL]'
-                    ip = str(ip) if ip != '[NULL]' else '[NULL]'
-                    client_version = str(client_version) if client_version != '[NULL]' else '[NULL]'
-                    
-                    # Print statement 2: Log activated_stake after parsing CLI output
-                    if DEBUG:
-                        if vote_pubkey in target_pubkeys:
-                            print(f"Pubkey {vote_pubkey}, Epoch {start_epoch}: activated_stake={activated_stake}, mev_earned={mev_earned}")
-                    
-                    csv_buffer.write(f"{vote_pubkey},{start_epoch},{commission},{epoch_credits},{mev_commission},{mev_earned},{activated_stake},{jito_rank},{superminority},{ip},{client_type},{client_version}\n")
-                    break
-            
-            if not epoch_found:
+        # Read every validator history account in bulk and decode only the target epoch's entry
+        logger.info("Fetching validator history accounts")
+        history_entries, missing_history = fetch_epoch_entries(
+            [pk for pk in vote_account_pubkeys if pk not in skip_vote_pubkeys], start_epoch, logger=logger)
+        for vote_pubkey in missing_history:
+            logger.info(f"No validator history account for {vote_pubkey}")
+            with open(stakenet_error_list_path, 'a') as error_file:
+                error_file.write(f"{vote_pubkey}\n")
+
+        # Stage the history entries column-wise, typed, with None for unset values
+        staging = StakenetStaging(start_epoch)
+        for vote_pubkey, validator_history in history_entries.items():
+            if validator_history is None:
                 logger.info(f"No data found for {vote_pubkey} in epoch {start_epoch}")
-                
-            csv_buffer.seek(0)
-            csv_buffers[vote_pubkey] = csv_buffer
+                continue
+            staging.add_history(vote_pubkey, validator_history)
 
-        # Print statement 3: Check CSV buffer content for target pubkeys
+        # Print statement 3: Check staged values for target pubkeys
         for pubkey in target_pubkeys:
-            if pubkey in csv_buffers:
-                csv_buffer = csv_buffers[pubkey]
-                csv_buffer.seek(0)
-                lines = csv_buffer.readlines()[1:]  # Skip header
-                for line in lines:
-                    fields = line.strip().split(',')
-                    if len(fields) > 6:  # Ensure activated_stake field exists
-                        if DEBUG:
-                            print(f"CSV buffer for {pubkey}: activated_stake={fields[6]}")
-                csv_buffer.seek(0)
-            else:
-                if DEBUG:
-                    print(f"No CSV buffer created for {pubkey}.")
+            if DEBUG:
+                if pubkey in staging:
+                    print(f"Staged row for {pubkey}: activated_stake={staging.get(pubkey, 'activated_stake')}, mev_earned={staging.get(pubkey, 'mev_earned')}")
+                else:
+                    print(f"No staged row for {pubkey}.")
 
         # Check Kobe API for MEV data availability
         jito_data = {}
@@ -924,44 +639,17 @@ def fetch_and_store_data(start_epoch, end_epoch, process_validator_icons, proces
         else:
             logger.error(f"Using fetch_validator_history data for epoch {start_epoch} due to missing Kobe API MEV data")
 
-        # Update buffers with Jito data if available
-        for vote_pubkey, csv_buffer in csv_buffers.items():
-            if vote_pubkey in jito_data:
-                validator_data = jito_data[vote_pubkey]
-                csv_buffer.seek(0)
-                lines = csv_buffer.readlines()
-                csv_buffer.seek(0)
-                csv_buffer.truncate()
-                csv_buffer.write(lines[0])  # Header
-                for line in lines[1:]:
-                    parts = line.strip().split(',')
-                    parts[4] = str(validator_data['mev_commission_bps'])
-                    parts[5] = str(validator_data['mev_rewards'])
-                    csv_buffer.write(','.join(parts) + '\n')
-                csv_buffer.seek(0)
-                # Print statement 4: Check updated CSV buffer for target pubkeys
-                if vote_pubkey in target_pubkeys:
-                    csv_buffer.seek(0)
-                    updated_lines = csv_buffer.readlines()[1:]  # Skip header
-                    for updated_line in updated_lines:
-                        fields = updated_line.strip().split(',')
-                        if len(fields) > 6:
-                            if DEBUG:
-                                print(f"Updated CSV buffer for {vote_pubkey}: activated_stake={fields[6]}, mev_earned={fields[5]}")
-                    csv_buffer.seek(0)
-
-        # Load all data into one temp table
-        cur.execute("DROP TABLE IF EXISTS temp_validator_stats;")
-        cur.execute("""
-            CREATE TEMPORARY TABLE temp_validator_stats (
-                vote_account_pubkey TEXT, epoch INTEGER, commission TEXT, epoch_credits TEXT,
-                mev_commission TEXT, mev_earned TEXT, activated_stake TEXT, jito_rank TEXT,
-                superminority TEXT, ip TEXT, client_type TEXT, version TEXT
-            );
-        """)
-        for vote_pubkey, csv_buffer in csv_buffers.items():
-            cur.copy_expert("COPY temp_validator_stats FROM STDIN WITH CSV HEADER", csv_buffer)
-            csv_buffer.close()
+        # Merge Jito Kobe MEV commission/rewards by vote account in one pass
+        merged = staging.merge_kobe(jito_data)
+        logger.info(f"Merged Jito Kobe MEV data into {merged} of {len(staging)} staged rows")
+        # Print statement 4: Check merged values for target pubkeys
+        for pubkey in target_pubkeys:
+            if DEBUG and pubkey in jito_data and pubkey in staging:
+                print(f"Merged row for {pubkey}: activated_stake={staging.get(pubkey, 'activated_stake')}, mev_earned={staging.get(pubkey, 'mev_earned')}")
+
+        # Load all data into one typed temp table with a single COPY
+        staging.create_table(cur)
+        staging.copy_to(cur)
 
         # Print statement 5: Query temp_validator_stats for target pubkeys
         for pubkey in target_pubkeys:
@@ -976,30 +664,25 @@ def fetch_and_store_data(start_epoch, end_epoch, process_validator_icons, proces
             else:
                 if DEBUG:
                     print(f"No data in temp_validator_stats for {pubkey} in epoch {start_epoch}.")
-        cur.execute("SELECT * FROM temp_validator_stats WHERE commission = '[NULL]' OR epoch_credits = '[NULL]' OR mev_commission = '[NULL]' OR jito_rank = '[NULL]' OR superminority = '[NULL]' OR client_type = '[NULL]' LIMIT 1;")
+        cur.execute("SELECT * FROM temp_validator_stats WHERE commission IS NULL OR epoch_credits IS NULL OR mev_commission IS NULL OR jito_rank IS NULL OR client_type IS NULL LIMIT 1;")
         problematic_row = cur.fetchone()
         if problematic_row:
             logger.info(f"Found problematic row: {problematic_row}")
 
-        # Update validator_stats
-        cur.execute("""
-            UPDATE validator_stats vs
-            SET
-                vote_account_pubkey = tvs.vote_account_pubkey,
-                activated_stake = CAST(NULLIF(NULLIF(NULLIF(tvs.activated_stake, 'None'), '[NULL]'), '') AS BIGINT),
-                commission = CAST(NULLIF(NULLIF(tvs.commission, '[NULL]'), '') AS INTEGER),
-                epoch_credits = CAST(NULLIF(NULLIF(tvs.epoch_credits, '[NULL]'), '') AS BIGINT),
-                mev_commission = CAST(NULLIF(NULLIF(tvs.mev_commission, '[NULL]'), '') AS INTEGER),
-                mev_earned = CAST(NULLIF(NULLIF(tvs.mev_earned, '[NULL]'), '') AS DOUBLE PRECISION),
-                jito_rank = CAST(NULLIF(NULLIF(tvs.jito_rank, '[NULL]'), '') AS INTEGER),
-                ip = tvs.ip,
-                client_type = CAST(NULLIF(NULLIF(tvs.client_type, '[NULL]'), '') AS INTEGER),
-                version = tvs.version,
-                superminority = CAST(NULLIF(NULLIF(tvs.superminority, '[NULL]'), '') AS INTEGER)
-            FROM temp_validator_stats tvs
-            WHERE vs.identity_pubkey = (SELECT identity_pubkey FROM validator_stats WHERE vote_account_pubkey = tvs.vote_account_pubkey AND epoch = %s LIMIT 1)
-            AND vs.epoch = %s
-        """, (start_epoch, start_epoch))
+        # Update validator_stats: one hash join through the epoch's vote -> identity map
+        EpochMerge(conn, start_epoch, logger).update("stakenet", "temp_validator_stats", """
+                vote_account_pubkey = src.vote_account_pubkey,
+                activated_stake = src.activated_stake,
+                commission = src.commission,
+                epoch_credits = src.epoch_credits,
+                mev_commission = src.mev_commission,
+                mev_earned = src.mev_earned,
+                jito_rank = src.jito_rank,
+                ip = src.ip,
+                client_type = src.client_type,
+                version = src.version,
+                superminority = src.superminority
+        """, match=MATCH_VOTE_IDENTITY)
 
         # Print statement 6: Query validator_stats after update for target pubkeys
         for pubkey in target_pubkeys:
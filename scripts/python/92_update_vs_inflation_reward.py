@@ -1,5 +1,4 @@
 import psycopg2
-import requests
 import sys
 import os
 import time
@@ -7,7 +6,9 @@ import importlib.util
 from typing import List, Dict, Tuple, Set
 from concurrent.futures import ThreadPoolExecutor, as_completed
 from db_config import db_params
-from rpc_config import RPC_ENDPOINT  # Default Alchemy RPC endpoint
+from rpc_config import RPC_ENDPOINTS  # Configured RPC endpoint pool
+from rpc_client import RpcClient
+from epoch_merge import EpochMerge, MATCH_VOTE
 
 # Setup unified logging
 script_dir = os.path.dirname(os.path.abspath(__file__))
@@ -18,8 +19,8 @@ spec.loader.exec_module(logging_config)
 logger = logging_config.setup_logging(os.path.basename(__file__).replace('.py', ''))
 
 # Define RPC endpoints
-DEFAULT_RPC_URL = RPC_ENDPOINT  # e.g., https://solana-mainnet.g.alchemy.com/v2/97zE6cvElUYwOp_zVSqMXt5H7dYSYxtW
 QUICKNODE_RPC_URL = "https://side-silent-county.solana-mainnet.quiknode.pro/2ffa9d32adcd0102e7b78a8ba107f5c49b9420d8/"
+rpc_client = RpcClient(RPC_ENDPOINTS + [QUICKNODE_RPC_URL], logger=logger)
 
 # Constants
 MAX_ACCOUNTS_PER_REQUEST = 32 
@@ -111,41 +112,14 @@ def get_all_top_stake_accounts(epoch: int, vote_pubkeys: List[str]) -> Dict[str,
                 stake_accounts_dict[vote_pubkey] = []
             stake_accounts_dict[vote_pubkey].append((stake_pubkey, active_stake if active_stake is not None else 0))
 
-        logging.info(f"Fetched top stake accounts for {len(stake_accounts_dict)} vote accounts in epoch {epoch}")
+        logger.info(f"Fetched top stake accounts for {len(stake_accounts_dict)} vote accounts in epoch {epoch}")
         return stake_accounts_dict
     except Exception as e:
-        logging.error(f"Failed to fetch all top stake accounts: {e}")
+        logger.error(f"Failed to fetch all top stake accounts: {e}")
         return {}
 
 def get_all_inflation_rewards(pubkeys: List[str], epoch: int) -> Dict[str, int]:
-    """Fetch inflation rewards for all public keys in one optimized batch process with RPC fallback."""
-    headers = {"Content-Type": "application/json"}
-    
-    # Test RPC URLs with a single vote account
-    test_payload = {
-        "jsonrpc": "2.0",
-        "id": 1,
-        "method": "getInflationReward",
-        "params": [["tri1cHBy47fPyhCvrCf6FnR7Mz6XdSoSBah2FsZVQeT"], {"epoch": epoch}]
-    }
-    selected_rpc_url = None
-
-    for rpc_url in [DEFAULT_RPC_URL, QUICKNODE_RPC_URL]:
-        try:
-            response = requests.post(rpc_url, headers=headers, json=test_payload, timeout=10)
-            if response.status_code == 200 and 'result' in response.json() and response.json()['result'] is not None:
-                selected_rpc_url = rpc_url
-                logging.info(f"Selected RPC URL {rpc_url} after successful test")
-                break
-            else:
-                logging.warning(f"Test request failed for {rpc_url}: status {response.status_code}, response {response.json()}")
-        except Exception as e:
-            logging.warning(f"Test request failed for {rpc_url}: {e}")
-    
-    if not selected_rpc_url:
-        logging.error("All RPC URLs failed the test request")
-        sys.exit(1)
-
+    """Fetch inflation rewards for all public keys in batches, routed across RPC endpoints by health."""
     rewards_by_pubkey = {}
     total_batches = (len(pubkeys) + MAX_ACCOUNTS_PER_REQUEST - 1) // MAX_ACCOUNTS_PER_REQUEST
 
@@ -161,10 +135,13 @@ def get_all_inflation_rewards(pubkeys: List[str], epoch: int) -> Dict[str, int]:
 
         retry_count = 0
         success = False
+        rpc_url = None
 
         while retry_count < 5 and not success:
             try:
-                response = requests.post(selected_rpc_url, headers=headers, json=payload, timeout=10)
+                # Routed to the healthiest endpoint; an endpoint without history for this
+                # epoch is marked bad so the retry goes elsewhere
+                response, rpc_url = rpc_client.post(payload, timeout=10)
                 if response.status_code == 200:
                     results = response.json().get('result', [])
                     if results is not None:
@@ -172,22 +149,24 @@ def get_all_inflation_rewards(pubkeys: List[str], epoch: int) -> Dict[str, int]:
                             rewards_by_pubkey[pubkey] = result.get('amount', 0) if result else 0
                         success = True
                     else:
-                        logging.warning(f"Batch {batch_num}/{total_batches} - No 'result' in response from {selected_rpc_url}. Retrying...")
+                        rpc_client.report_bad_result(rpc_url)
+                        logger.warning(f"Batch {batch_num}/{total_batches} - No 'result' in response from {rpc_url}. Retrying...")
                         retry_count += 1
                 else:
-                    logging.warning(f"Batch {batch_num}/{total_batches} - Invalid response code {response.status_code} from {selected_rpc_url}. Retrying...")
+                    logger.warning(f"Batch {batch_num}/{total_batches} - Invalid response code {response.status_code} from {rpc_url}. Retrying...")
                     retry_count += 1
                 time.sleep(1)
             except Exception as e:
-                logging.error(f"Batch {batch_num}/{total_batches} - Error retrieving rewards from {selected_rpc_url} (attempt {retry_count + 1}/5): {e}")
+                logger.error(f"Batch {batch_num}/{total_batches} - Error retrieving rewards (attempt {retry_count + 1}/5): {e}")
                 retry_count += 1
                 time.sleep(1)
 
         if not success:
-            logging.error(f"Batch {batch_num}/{total_batches} - Failed to retrieve rewards from {selected_rpc_url} after 5 attempts")
+            logger.error(f"Batch {batch_num}/{total_batches} - Failed to retrieve rewards after 5 attempts")
+            rpc_client.log_health(logger)
             sys.exit(1)
 
-        logging.info(f"Completed batch {batch_num}/{total_batches} - Processed {len(pubkey_group)} pubkeys using {selected_rpc_url}")
+        logger.info(f"Completed batch {batch_num}/{total_batches} - Processed {len(pubkey_group)} pubkeys using {rpc_url}")
         time.sleep(RATE_LIMIT_SLEEP)
 
     return rewards_by_pubkey
@@ -210,27 +189,27 @@ def process_vote_account_chunk(
         stake_pubkeys = [account[0] for account in stake_accounts]
         if not stake_pubkeys:
             delegator_rewards[vote_pubkey] = 0
-            logging.info(f"Vote account {vote_pubkey}: No stake accounts found for epoch {epoch}")
+            logger.info(f"Vote account {vote_pubkey}: No stake accounts found for epoch {epoch}")
             continue
 
         total_sampled_stake = sum(account[1] or 0 for account in stake_accounts)
         total_activated_stake = vote_account_data.get(vote_pubkey, 0) or 0
 
         if total_sampled_stake is None or total_activated_stake is None:
-            logging.warning(f"Vote account {vote_pubkey}: Unexpected None in stake data (sampled: {total_sampled_stake}, activated: {total_activated_stake})")
+            logger.warning(f"Vote account {vote_pubkey}: Unexpected None in stake data (sampled: {total_sampled_stake}, activated: {total_activated_stake})")
 
         if total_sampled_stake > 0 and total_activated_stake > 0:
             total_sampled_reward = sum(all_rewards.get(pubkey, 0) for pubkey in stake_pubkeys)
             reward_rate = total_sampled_reward / total_sampled_stake
             delegator_reward = int(reward_rate * total_activated_stake)
             delegator_rewards[vote_pubkey] = delegator_reward
-            logging.info(
+            logger.info(
                 f"Vote account {vote_pubkey}: Validator reward {validator_rewards[vote_pubkey]}, "
                 f"Delegator reward {delegator_reward} (extrapolated from {len(stake_accounts)} stake accounts)"
             )
         else:
             delegator_rewards[vote_pubkey] = 0
-            logging.info(f"Vote account {vote_pubkey}: Insufficient stake data for extrapolation (sampled: {total_sampled_stake}, activated: {total_activated_stake})")
+            logger.info(f"Vote account {vote_pubkey}: Insufficient stake data for extrapolation (sampled: {total_sampled_stake}, activated: {total_activated_stake})")
 
     return validator_rewards, delegator_rewards
 
@@ -259,13 +238,13 @@ def calculate_inflation_rewards(vote_account_data: Dict[str, int], epoch: int, a
             prev_epoch = cur.fetchone()[0]
             cur.close()
             if prev_epoch is None:
-                logging.warning(f"No stake account data available for epoch {epoch} or any previous epoch. Processing validator rewards only.")
+                logger.warning(f"No stake account data available for epoch {epoch} or any previous epoch. Processing validator rewards only.")
                 stake_accounts_dict = {}
             else:
-                logging.warning(f"No stake account data available for epoch {epoch}. Using stake accounts from previous epoch {prev_epoch}.")
+                logger.warning(f"No stake account data available for epoch {epoch}. Using stake accounts from previous epoch {prev_epoch}.")
                 stake_accounts_dict = get_all_top_stake_accounts(prev_epoch, vote_account_pubkeys)
         except Exception as e:
-            logging.error(f"Failed to fetch previous epoch for {epoch}: {e}")
+            logger.error(f"Failed to fetch previous epoch for {epoch}: {e}")
             stake_accounts_dict = {}
     else:
         stake_accounts_dict = get_all_top_stake_accounts(epoch, vote_account_pubkeys)
@@ -301,43 +280,27 @@ def calculate_inflation_rewards(vote_account_data: Dict[str, int], epoch: int, a
 
 def update_inflation_rewards(epoch: int, validator_rewards: Dict[str, int], delegator_rewards: Dict[str, int]):
     """Update validator_stats with both validator and delegator inflation rewards in bulk for all rows."""
+    conn = None
     try:
         conn = psycopg2.connect(**db_params)
-        cur = conn.cursor()
-
-        reward_data = [
-            (vote_pubkey, validator_rewards[vote_pubkey], delegator_rewards[vote_pubkey], epoch)
-            for vote_pubkey in validator_rewards.keys()
-        ]
-
-        query = """
-        UPDATE validator_stats AS vs
-        SET 
-            validator_inflation_reward = temp.validator_reward,
-            delegator_inflation_reward = temp.delegator_reward,
-            total_inflation_reward = temp.validator_reward + temp.delegator_reward
-        FROM (VALUES %s) AS temp (vote_pubkey, validator_reward, delegator_reward, epoch)
-        WHERE vs.epoch = temp.epoch AND vs.vote_account_pubkey = temp.vote_pubkey
-        """
-
-        from psycopg2.extras import execute_values
-        execute_values(
-            cur,
-            query,
-            reward_data,
-            template="(%s, %s, %s, %s)",
-            page_size=1000
-        )
+        merge = EpochMerge(conn, epoch, logger)
+        merge.stage("temp_inflation_rewards",
+                    [("vote_account_pubkey", "TEXT"), ("validator_reward", "BIGINT"), ("delegator_reward", "BIGINT")],
+                    ((vote_pubkey, validator_rewards[vote_pubkey], delegator_rewards[vote_pubkey])
+                     for vote_pubkey in validator_rewards.keys()))
+        merge.update("inflation rewards", "temp_inflation_rewards", """
+            validator_inflation_reward = src.validator_reward,
+            delegator_inflation_reward = src.delegator_reward,
+            total_inflation_reward = src.validator_reward + src.delegator_reward
+        """, match=MATCH_VOTE)
         conn.commit()
-
-        cur.close()
-        conn.close()
-        logging.info(f"Successfully updated inflation rewards for epoch {epoch} in bulk")
+        logger.info(f"Successfully updated inflation rewards for epoch {epoch} in bulk")
     except Exception as e:
-        logging.error(f"Failed to update inflation rewards: {e}")
+        logger.error(f"Failed to update inflation rewards: {e}")
         if conn:
             conn.rollback()
-            cur.close()
+    finally:
+        if conn:
             conn.close()
 
 def get_max_epoch(conn) -> int:
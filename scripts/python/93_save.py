@@ -3,6 +3,7 @@
 DEBUG = False  # Set to False to disable debug printing
 
 # Standard library imports
+import argparse
 import os
 import json
 import random
@@ -33,6 +34,8 @@ from sqlalchemy import create_engine, text
 
 # Custom modules
 from db_config import db_params
+from epoch_pool import run_epochs, atomic_write, atomic_to_csv, file_lock
+from stats_export import stream_frames, records, format_lamport_columns, format_number_columns, format_text_columns, map_column, write_json_records
 
 # Setup logging
 # Logging config moved to unified configurations - %(levelname)s - %(message)s')
@@ -108,11 +111,83 @@ def save_chart_html(fig, chart_title, output_filename):
     </html>
     """
 
-    with open(output_filename, "w") as f:
+    with atomic_write(output_filename) as f:
         f.write(html_full)
 
     print(f"*** HTML file created - {output_filename}")
 
+CLIENT_TYPE_MAP = {
+    0: 'Solana Labs',
+    1: 'Jito Labs',
+    2: 'Firedancer',
+    3: 'Agave',
+    4: 'Paladin',
+    None: 'Unknown',
+}
+
+VALIDATOR_LAMPORT_FIELDS = [
+    ('total_block_rewards_before_burn', 5),
+    ('total_block_rewards_after_burn', 5),
+    ('validator_priority_fees', 5),
+    ('validator_signature_fees', 5),
+    ('validator_inflation_reward', 5),
+    ('delegator_inflation_reward', 5),
+    ('vote_cost', 5),
+    ('mev_earned', 5),
+    ('mev_to_validator', 5),
+    ('mev_to_jito_block_engine', 5),
+    ('mev_to_jito_tip_router', 5),
+    ('mev_to_stakers', 5),
+    ('avg_mev_per_block', 7),
+    ('avg_priority_fees_per_block', 7),
+    ('avg_rewards_per_block', 7),
+    ('avg_signature_fees_per_block', 7),
+    ('activated_stake', 0),
+    ('rewards', 5),
+    ('total_inflation_reward', 5)
+]
+
+VALIDATOR_NUMBER_FIELDS = [
+    ('avg_cu_per_block', 0),
+    ('avg_tx_per_block', 0),
+    ('avg_user_tx_per_block', 0),
+    ('avg_vote_tx_per_block', 0),
+    ('avg_votes_cast_per_block', 0),
+    ('mean_vote_latency', 3),
+    ('avg_credit_per_voted_slot', 5),
+    ('avg_latency_per_voted_slot', 5),
+    ('median_vote_latency', 5),
+    ('delegator_inflation_apy', 5),
+    ('delegator_compound_inflation_apy', 5),
+    ('delegator_mev_apy', 5),
+    ('delegator_compound_mev_apy', 5),
+    ('delegator_total_apy', 5),
+    ('delegator_compound_total_apy', 5),
+    ('total_overall_apy', 5),
+    ('compound_overall_apy', 5),
+    ('validator_inflation_apy', 5),
+    ('validator_mev_apy', 5),
+    ('validator_block_rewards_apy', 5),
+    ('validator_total_apy', 5),
+    ('validator_compound_inflation_apy', 5),
+    ('validator_compound_mev_apy', 5),
+    ('validator_compound_block_rewards_apy', 5),
+    ('validator_compound_total_apy', 5)
+]
+
+DURATION_NANOSECOND_FIELDS = [
+    'slot_duration_min',
+    'slot_duration_max',
+    'slot_duration_mean',
+    'slot_duration_median',
+    'slot_duration_stddev'
+]
+
+DURATION_MILLISECOND_FIELDS = [
+    'slot_duration_confidence_interval_lower_ms',
+    'slot_duration_confidence_interval_upper_ms'
+]
+
 def get_validator_stats(epoch, engine):
     # The query includes the slot duration statistics fields and metro/client_type from validator_stats
     query = """
@@ -151,128 +226,42 @@ def get_validator_stats(epoch, engine):
         AND vs.activated_stake > 0;
     """
 
-    with engine.connect() as conn:
-        results = conn.execute(text(query), {"epoch": epoch}).fetchall()
-        columns = conn.execute(text(query), {"epoch": epoch}).keys()
-
-    data = []
-    for row in results:
-        record = dict(zip(columns, row))
-
-        if DEBUG and record['identity_pubkey'] == '5pPRHniefFjkiaArbGX3Y8NUysJmQ9tMZg3FrFGwHzSm':
-            print(f"Debug - Epoch: {record['epoch']}, "
-                  f"Name: {record['name']}, "
-                  f"Identity Pubkey: {record['identity_pubkey']}, "
-                  f"Commission: {record['commission']}, "
-                  f"Validator Inflation Reward: {record['validator_inflation_reward']}")
-
-        lamport_fields = [
-            ('total_block_rewards_before_burn', 5),
-            ('total_block_rewards_after_burn', 5),
-            ('validator_priority_fees', 5),
-            ('validator_signature_fees', 5),
-            ('validator_inflation_reward', 5),
-            ('delegator_inflation_reward', 5),
-            ('vote_cost', 5),
-            ('mev_earned', 5),
-            ('mev_to_validator', 5),
-            ('mev_to_jito_block_engine', 5),
-            ('mev_to_jito_tip_router', 5),
-            ('mev_to_stakers', 5),
-            ('avg_mev_per_block', 7),
-            ('avg_priority_fees_per_block', 7),
-            ('avg_rewards_per_block', 7),
-            ('avg_signature_fees_per_block', 7),
-            ('activated_stake', 0),
-            ('rewards', 5),
-            ('total_inflation_reward', 5)
-        ]
-
-        for field, precision in lamport_fields:
-            if field in record and record[field] is not None:
-                record[field] = format_lamports_to_sol(record[field], precision)
+    # One execution through a server-side cursor; each chunk is formatted a column at a time
+    for frame in stream_frames(engine, query, {"epoch": epoch}):
+        if DEBUG:
+            for record in records(frame[frame['identity_pubkey'] == '5pPRHniefFjkiaArbGX3Y8NUysJmQ9tMZg3FrFGwHzSm']):
+                print(f"Debug - Epoch: {record['epoch']}, "
+                      f"Name: {record['name']}, "
+                      f"Identity Pubkey: {record['identity_pubkey']}, "
+                      f"Commission: {record['commission']}, "
+                      f"Validator Inflation Reward: {record['validator_inflation_reward']}")
 
-        number_fields = [
-            ('avg_cu_per_block', 0),
-            ('avg_tx_per_block', 0),
-            ('avg_user_tx_per_block', 0),
-            ('avg_vote_tx_per_block', 0),
-            ('avg_votes_cast_per_block', 0),
-            ('mean_vote_latency', 3),
-            ('avg_credit_per_voted_slot', 5),
-            ('avg_latency_per_voted_slot', 5),
-            ('median_vote_latency', 5),
-            ('delegator_inflation_apy', 5),
-            ('delegator_compound_inflation_apy', 5),
-            ('delegator_mev_apy', 5),
-            ('delegator_compound_mev_apy', 5),
-            ('delegator_total_apy', 5),
-            ('delegator_compound_total_apy', 5),
-            ('total_overall_apy', 5),
-            ('compound_overall_apy', 5),
-            ('validator_inflation_apy', 5),
-            ('validator_mev_apy', 5),
-            ('validator_block_rewards_apy', 5),
-            ('validator_total_apy', 5),
-            ('validator_compound_inflation_apy', 5),
-            ('validator_compound_mev_apy', 5),
-            ('validator_compound_block_rewards_apy', 5),
-            ('validator_compound_total_apy', 5)
-        ]
-        for field, precision in number_fields:
-            if field in record and record[field] is not None:
-                record[field] = format_number(record[field], precision)
+        format_lamport_columns(frame, VALIDATOR_LAMPORT_FIELDS)
+        format_number_columns(frame, VALIDATOR_NUMBER_FIELDS)
 
-        # Format slot duration fields
-        duration_fields = [
-            'slot_duration_min',
-            'slot_duration_max',
-            'slot_duration_mean',
-            'slot_duration_median',
-            'slot_duration_stddev',
-            'slot_duration_confidence_interval_lower_ms',
-            'slot_duration_confidence_interval_upper_ms'
-        ]
-        for field in duration_fields:
-            if field in record and record[field] is not None:
-                # Convert to float to handle Decimal from numeric type, then to milliseconds
-                milliseconds = float(record[field]) / 1000000.0 if field in ['slot_duration_min', 'slot_duration_max', 'slot_duration_mean', 'slot_duration_median', 'slot_duration_stddev'] else float(record[field])
-                # Format to 5 decimal places and update the record
-                record[field] = f"{milliseconds:.5f}"
+        # Slot durations: nanoseconds to milliseconds, confidence intervals are already in milliseconds
+        format_text_columns(frame, DURATION_NANOSECOND_FIELDS, "%.5f", divisor=1000000.0)
+        format_text_columns(frame, DURATION_MILLISECOND_FIELDS, "%.5f")
 
         # Format p-value to 7 decimal places or "N/A"
-        if 'slot_duration_p_value' in record and record['slot_duration_p_value'] is not None:
-            record['slot_duration_p_value'] = f"{record['slot_duration_p_value']:.7f}"
-        else:
-            record['slot_duration_p_value'] = "N/A"
+        format_text_columns(frame, ['slot_duration_p_value'], "%.7f", missing="N/A", exact_decimal=True)
 
         # Map client_type to string
-        if 'client_type' in record:
-            record['client_type'] = CLIENT_TYPE_MAP.get(record['client_type'], 'Unknown')
+        map_column(frame, 'client_type', CLIENT_TYPE_MAP, 'Unknown')
 
-        if epoch > 0:  # was missing active stake prior to epoch 632 -- we have it now
-            if (record['activated_stake'] is not None and 
-                record['leader_slots'] is not None and 
-                float(record['leader_slots']) > 0):
-                try:
-                    avg_stake_per_leader_slot = float(record['activated_stake']) / float(record['leader_slots'])
-                    record['avg_stake_per_leader_slot'] = int(avg_stake_per_leader_slot)
-                except (ValueError, TypeError):
-                    record['avg_stake_per_leader_slot'] = None
-            else:
-                record['avg_stake_per_leader_slot'] = None
-        else:
-            record['avg_stake_per_leader_slot'] = None
+        # was missing active stake prior to epoch 632 -- we have it now; activated_stake is in SOL at this point
+        stake = pd.to_numeric(frame['activated_stake'], errors='coerce')
+        leader_slots = pd.to_numeric(frame['leader_slots'], errors='coerce')
+        per_slot = (stake / leader_slots).where((leader_slots > 0) & stake.notna() & (epoch > 0))
+        frame['avg_stake_per_leader_slot'] = pd.Series(
+            [None if pd.isna(value) else int(value) for value in per_slot.tolist()], index=frame.index, dtype=object)
 
-        data.append(record)
-
-    return data
+        yield from records(frame)
 
 def write_validator_stats_to_json(epoch, data):
     filename = f"epoch{epoch}_validator_rewards.json"
-    data_with_attribution = add_trillium_attribution(data)
-    with open(filename, 'w') as f:
-        json.dump(data, f, indent=4, default=decimal_default)
+    # data may be the get_validator_stats generator: records are attributed and written as they stream in
+    write_json_records(filename, (add_trillium_attribution(record) for record in data), default=decimal_default)
     print(f"*** file created - {filename}")
 
 def get_epoch_aggregate_data(epoch, engine):
@@ -408,7 +397,7 @@ def get_epoch_aggregate_data(epoch, engine):
 def write_epoch_aggregate_data_to_json(epoch, data):
     filename = f"epoch{epoch}_epoch_aggregate_data.json"
     data_with_attribution = add_trillium_attribution(data)
-    with open(filename, 'w') as f:
+    with atomic_write(filename) as f:
         json.dump(data, f, indent=4, default=decimal_default)
     print(f"*** file created - {filename}")
 
@@ -1156,25 +1145,28 @@ def get_persistent_color_map(items, filename='country_colors.json'):
         '#CD853F', '#BC8F8F', '#2F4F4F', '#D3D3D3', '#00BFFF', '#8A2BE2'
     ]
 
-    color_map = {}
-    if os.path.exists(filename):
-        with open(filename, 'r') as f:
-            color_map = json.load(f)
-    else:
+    # Epoch workers share this file: hold the lock across read and write so a new
+    # country gets one colour, and never read a half-written file
+    with file_lock(filename):
         color_map = {}
-
-    for item in items:
-        if item not in color_map:
-            if item == 'Unknown':
-                color_map[item] = '#CCCCCC'
-            else:
-                available_colors = [c for c in colors if c not in color_map.values()]
-                if not available_colors:
-                    available_colors = colors
-                color_map[item] = random.choice(available_colors)
-
-    with open(filename, 'w') as f:
-        json.dump(color_map, f)
+        if os.path.exists(filename):
+            with open(filename, 'r') as f:
+                color_map = json.load(f)
+
+        known = len(color_map)
+        for item in items:
+            if item not in color_map:
+                if item == 'Unknown':
+                    color_map[item] = '#CCCCCC'
+                else:
+                    available_colors = [c for c in colors if c not in color_map.values()]
+                    if not available_colors:
+                        available_colors = colors
+                    color_map[item] = random.choice(available_colors)
+
+        if len(color_map) != known or not os.path.exists(filename):
+            with atomic_write(filename) as f:
+                json.dump(color_map, f)
     return color_map
 
 def calculate_stake_statistics(epoch, max_epoch, engine):
@@ -1403,26 +1395,26 @@ def calculate_stake_statistics(epoch, max_epoch, engine):
 
         # Safely write CSV files
         try:
-            country_df.to_csv(f'epoch{epoch}_country_stats.csv', index=True)
+            atomic_to_csv(country_df, f'epoch{epoch}_country_stats.csv', index=True)
             logger.info(f"country_df epoch{epoch}_country_stats.csv")
         except Exception as e:
             logger.error(f"Error writing country_df to CSV for epoch {epoch}: {e}")
             # Create an empty CSV file to avoid further errors
-            pd.DataFrame().to_csv(f'epoch{epoch}_country_stats.csv')
+            atomic_to_csv(pd.DataFrame(), f'epoch{epoch}_country_stats.csv')
 
         try:
-            continent_df.to_csv(f'epoch{epoch}_continent_stats.csv', index=True)
+            atomic_to_csv(continent_df, f'epoch{epoch}_continent_stats.csv', index=True)
             logger.info(f"continent_df epoch{epoch}_continent_stats.csv")
         except Exception as e:
             logger.error(f"Error writing continent_df to CSV for epoch {epoch}: {e}")
-            pd.DataFrame().to_csv(f'epoch{epoch}_continent_stats.csv')
+            atomic_to_csv(pd.DataFrame(), f'epoch{epoch}_continent_stats.csv')
 
         try:
-            region_df.to_csv(f'epoch{epoch}_region_stats.csv', index=True)
+            atomic_to_csv(region_df, f'epoch{epoch}_region_stats.csv', index=True)
             logger.info(f"region_df epoch{epoch}_region_stats.csv")
         except Exception as e:
             logger.error(f"Error writing region_df to CSV for epoch {epoch}: {e}")
-            pd.DataFrame().to_csv(f'epoch{epoch}_region_stats.csv')
+            atomic_to_csv(pd.DataFrame(), f'epoch{epoch}_region_stats.csv')
 
         return country_df, continent_df, region_df
     
@@ -1443,9 +1435,9 @@ def calculate_stake_statistics(epoch, max_epoch, engine):
         empty_df.index.name = 'Area'
         
         # Write empty CSVs to prevent downstream errors
-        empty_df.to_csv(f'epoch{epoch}_country_stats.csv', index=True)
-        empty_df.to_csv(f'epoch{epoch}_continent_stats.csv', index=True)
-        empty_df.to_csv(f'epoch{epoch}_region_stats.csv', index=True)
+        atomic_to_csv(empty_df, f'epoch{epoch}_country_stats.csv', index=True)
+        atomic_to_csv(empty_df, f'epoch{epoch}_continent_stats.csv', index=True)
+        atomic_to_csv(empty_df, f'epoch{epoch}_region_stats.csv', index=True)
         
         return empty_df.copy(), empty_df.copy(), empty_df.copy()
 
@@ -1651,14 +1643,14 @@ def calculate_stake_statistics_metro(epoch, max_epoch, engine):
             logger.error(f"Figure traceback: {traceback.format_exc()}")
 
         try:
-            country_df.to_csv(f'epoch{epoch}_country_stats_metro.csv', index=True)
+            atomic_to_csv(country_df, f'epoch{epoch}_country_stats_metro.csv', index=True)
             logger.info(f"country_df epoch{epoch}_country_stats_metro.csv")
-            metro_df.to_csv(f'epoch{epoch}_metro_stats_metro.csv', index=True)
+            atomic_to_csv(metro_df, f'epoch{epoch}_metro_stats_metro.csv', index=True)
             logger.info(f"metro_df epoch{epoch}_metro_stats_metro.csv")
         except Exception as e:
             logger.error(f"Error writing CSVs for epoch {epoch}: {e}")
-            pd.DataFrame().to_csv(f'epoch{epoch}_country_stats_metro.csv')
-            pd.DataFrame().to_csv(f'epoch{epoch}_metro_stats_metro.csv')
+            atomic_to_csv(pd.DataFrame(), f'epoch{epoch}_country_stats_metro.csv')
+            atomic_to_csv(pd.DataFrame(), f'epoch{epoch}_metro_stats_metro.csv')
 
         return country_df, metro_df
     
@@ -1677,8 +1669,8 @@ def calculate_stake_statistics_metro(epoch, max_epoch, engine):
         }, index=['Unknown'])
         empty_df.index.name = 'Area'
         
-        empty_df.to_csv(f'epoch{epoch}_country_stats_metro.csv', index=True)
-        empty_df.to_csv(f'epoch{epoch}_metro_stats_metro.csv', index=True)
+        atomic_to_csv(empty_df, f'epoch{epoch}_country_stats_metro.csv', index=True)
+        atomic_to_csv(empty_df, f'epoch{epoch}_metro_stats_metro.csv', index=True)
         
         return empty_df.copy(), empty_df.copy()
 
@@ -2238,7 +2230,34 @@ def plot_epoch_metrics_with_stake_colors(epoch,max_epoch):
     except json.JSONDecodeError:
         print("Error: Could not decode JSON from the file.")
         
-def main(start_epoch=None, end_epoch=None):
+def process_epoch(epoch, max_epoch, engine):
+    """Build one epoch's JSON and stake statistics files; returns False when epoch_aggregate_data is missing"""
+    print(f"Processing epoch: {epoch}")
+    try:
+        logger.info(f" get_validator_stats for epoch {epoch}")
+        validator_stats = get_validator_stats(epoch, engine)
+        logger.info(f"write_validator_stats_to_json for epoch {epoch}")
+        write_validator_stats_to_json(epoch, validator_stats)
+        epoch_aggregate_data = get_epoch_aggregate_data(epoch, engine)
+        if epoch_aggregate_data is not None:
+            logger.info(f"write_epoch_aggregate_data_to_json for epoch {epoch}")
+            write_epoch_aggregate_data_to_json(epoch, epoch_aggregate_data)
+        else:
+            logger.warning(f"Skipping epoch_aggregate_data for epoch {epoch} due to missing data")
+
+        logger.info(f"country_df - calculate_stake_statistics for epoch {epoch}")
+        # Writes the epoch{epoch}_*_stats.csv files itself
+        calculate_stake_statistics(epoch, max_epoch, engine)
+
+        logger.info(f"calculate_stake_statistics_metro for epoch {epoch}")
+        calculate_stake_statistics_metro(epoch, max_epoch, engine)
+        return epoch_aggregate_data is not None
+
+    except Exception as e:
+        logger.error(f"93_build_leaderboard_json.py Failed to process epoch {epoch}: {str(e)}")
+        return None
+
+def main(start_epoch=None, end_epoch=None, jobs=1):
     engine = create_engine(
         f"postgresql+psycopg2://{db_params['user']}@{db_params['host']}:{db_params['port']}/{db_params['database']}?sslmode={db_params['sslmode']}"
     )
@@ -2287,41 +2306,7 @@ def main(start_epoch=None, end_epoch=None):
                     print("Please enter a valid integer.")
 
     epochs = range(start_epoch, end_epoch + 1)
-    missing_data_epochs = []
-
-    for epoch in epochs:
-        print(f"Processing epoch: {epoch}")
-        try:
-            logger.info(f" get_validator_stats for epoch {epoch}")
-            validator_stats = get_validator_stats(epoch, engine)
-            logger.info(f"write_validator_stats_to_json for epoch {epoch}")
-            write_validator_stats_to_json(epoch, validator_stats)
-            epoch_aggregate_data = get_epoch_aggregate_data(epoch, engine)
-            if epoch_aggregate_data is not None:
-                logger.info(f"write_epoch_aggregate_data_to_json for epoch {epoch}")
-                write_epoch_aggregate_data_to_json(epoch, epoch_aggregate_data)
-            else:
-                logger.warning(f"Skipping epoch_aggregate_data for epoch {epoch} due to missing data")
-                missing_data_epochs.append(epoch)
-
-            logger.info(f"country_df - calculate_stake_statistics for epoch {epoch}")
-            country_df, continent_df, region_df = calculate_stake_statistics(epoch, max_epoch, engine)
-            logger.info(f"country_df epoch{epoch}_country_stats.csv")
-            country_df.to_csv(f'epoch{epoch}_country_stats.csv', index=True)
-            logger.info(f"country_df epoch{epoch}_continent_stats.csv")
-            continent_df.to_csv(f'epoch{epoch}_continent_stats.csv', index=True)
-            logger.info(f"country_df epoch{epoch}_region_stats.csv")
-            region_df.to_csv(f'epoch{epoch}_region_stats.csv', index=True)
-
-            logger.info(f"calculate_stake_statistics_metro for epoch {epoch}")
-            country_df_metro, metro_df = calculate_stake_statistics_metro(epoch, max_epoch, engine)
-            logger.info(f"country_df epoch{epoch}_country_stats_metro.csv")
-            country_df_metro.to_csv(f'epoch{epoch}_country_stats_metro.csv', index=True)
-            logger.info(f"metro_df epoch{epoch}_metro_stats_metro.csv")
-            metro_df.to_csv(f'epoch{epoch}_metro_stats_metro.csv', index=True)
-
-        except Exception as e:
-            logger.error(f"93_build_leaderboard_json.py Failed to process epoch {epoch}: {str(e)}")
+    missing_data_epochs = run_epochs(process_epoch, epochs, max_epoch, engine, jobs, logger)
 
     if max_epoch not in epochs:
         try:
@@ -2348,20 +2333,24 @@ def main(start_epoch=None, end_epoch=None):
     print("Processing complete.")
 
 if __name__ == '__main__':
-    if len(sys.argv) > 2:
+    parser = argparse.ArgumentParser(description='Build leaderboard JSON, CSV and chart files for a range of epochs')
+    parser.add_argument('epochs', nargs='*', help='[start_epoch] end_epoch (prompted for when omitted)')
+    parser.add_argument('--jobs', type=int, default=1, help='Epochs to build in parallel worker processes (default: 1)')
+    args = parser.parse_args()
+    if len(args.epochs) >= 2:
         try:
-            start_epoch = int(sys.argv[1])
-            end_epoch = int(sys.argv[2])
-            main(start_epoch, end_epoch)
+            start_epoch = int(args.epochs[0])
+            end_epoch = int(args.epochs[1])
+            main(start_epoch, end_epoch, jobs=args.jobs)
         except ValueError:
             print("Error: Please provide valid integer epochs as command-line arguments (start_epoch end_epoch).")
-            main()
-    elif len(sys.argv) == 2:
+            main(jobs=args.jobs)
+    elif len(args.epochs) == 1:
         try:
-            end_epoch = int(sys.argv[1])
-            main(end_epoch=end_epoch)
+            end_epoch = int(args.epochs[0])
+            main(end_epoch=end_epoch, jobs=args.jobs)
         except ValueError:
             print("Error: Please provide a valid integer epoch as a command-line argument.")
-            main()
+            main(jobs=args.jobs)
     else:
-        main()
\ No newline at end of file
+        main(jobs=args.jobs)
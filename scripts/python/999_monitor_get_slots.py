@@ -1,5 +1,4 @@
 import os
-import csv
 import json
 import requests
 import importlib.util
@@ -19,6 +18,8 @@ import glob
 # Add the directory containing rpc_config.py to sys.path
 sys.path.append("/home/smilax/api")
 from rpc_config import RPC_ENDPOINT  # Import the centralized RPC endpoint
+from slot_completion_index import SlotCompletionIndex
+from slot_output import find_output_files, read_column
 
 # Alchemy RPC from Kiln
 RPC_ENDPOINT_1 = RPC_ENDPOINT
@@ -79,24 +80,33 @@ def get_epoch_info(epoch_number=None):
     }
 
 def find_missing_slots(epoch_start_slot, epoch_end_slot):
+    # Prefer the collector's slot completion index over rescanning every CSV
+    try:
+        index = SlotCompletionIndex.load('.')
+    except Exception as e:
+        logger.warning(f"Could not read slot completion index: {e}")
+        index = None
+    if index is not None and index.start_slot <= epoch_start_slot <= index.end_slot:
+        missing_slots = index.missing_slots(epoch_start_slot, epoch_end_slot)
+        logger.info(f"Number of missing slots (from completion index): {len(missing_slots)}")
+        if missing_slots:
+            logger.info(f"Range of missing slots: {missing_slots[0]} to {missing_slots[-1]}")
+        return missing_slots
+
     processed_slots = set()
 
     logger.info("Iterating over all run directories and current directory...")
     # Check run* directories
     run_dirs = glob.glob('run*')
     for run_dir in run_dirs:
-        csv_files = glob.glob(os.path.join(run_dir, "slot_data_thread_*.csv"))
+        csv_files = find_output_files(run_dir, "slot_data_thread")
         for file in csv_files:
-            with open(file, "r") as f:
-                csv_reader = csv.DictReader(f)
-                for row in csv_reader:
-                    if 'block_slot' in row:
-                        try:
-                            slot = int(row['block_slot'])
-                            processed_slots.add(slot)
-                        except ValueError as e:
-                            logger.error(f"Failed to parse slot from CSV {file}, row: {row['block_slot']} - Error: {e}")
-                            continue
+            for value in read_column(file, 'block_slot'):
+                try:
+                    processed_slots.add(int(value))
+                except ValueError as e:
+                    logger.error(f"Failed to parse slot from {file}, row: {value} - Error: {e}")
+                    continue
 
         log_files = glob.glob(os.path.join(run_dir, "solana*rpc*errors.log"))
         for file in log_files:
@@ -112,18 +122,14 @@ def find_missing_slots(epoch_start_slot, epoch_end_slot):
                             continue
 
     # Check CSV files in the current directory
-    current_dir_csv_files = glob.glob("slot_data_thread_*.csv")
+    current_dir_csv_files = find_output_files(".", "slot_data_thread")
     for file in current_dir_csv_files:
-        with open(file, "r") as f:
-            csv_reader = csv.DictReader(f)
-            for row in csv_reader:
-                if 'block_slot' in row:
-                    try:
-                        slot = int(row['block_slot'])
-                        processed_slots.add(slot)
-                    except ValueError as e:
-                        logger.error(f"Failed to parse slot from CSV {file}, row: {row['block_slot']} - Error: {e}")
-                        continue
+        for value in read_column(file, 'block_slot'):
+            try:
+                processed_slots.add(int(value))
+            except ValueError as e:
+                logger.error(f"Failed to parse slot from {file}, row: {value} - Error: {e}")
+                continue
 
     # Check error log files in the current directory
     current_dir_log_files = glob.glob("solana*rpc*errors.log")
@@ -1,6 +1,5 @@
 import os
 import sys
-import csv
 import glob
 import importlib.util
 
@@ -12,11 +11,41 @@ logging_config = importlib.util.module_from_spec(spec)
 spec.loader.exec_module(logging_config)
 logger = logging_config.setup_logging(os.path.basename(__file__).replace('.py', ''))
 import json
+from slot_completion_index import SlotCompletionIndex
+from slot_output import find_output_files, read_column
 
 # Debug flag
 DEBUG = False
 
+def check_run0_json_files(epoch_dir):
+    run_dir = os.path.join(epoch_dir, 'run0')
+    if not os.path.isdir(run_dir):
+        return
+    good_exists = os.path.exists(os.path.join(run_dir, 'good.json'))
+    poor_exists = os.path.exists(os.path.join(run_dir, 'poor.json'))
+    
+    if not good_exists and not poor_exists:
+        logger.warning(f"ALERT: Both good.json and poor.json files are missing from run0")
+    elif not good_exists:
+        logger.warning(f"ALERT: good.json file is missing from run0")
+    elif not poor_exists:
+        logger.warning(f"ALERT: poor.json file is missing from run0")
+    else:
+        logger.info(f"Both good.json and poor.json files found in run0")
+
 def count_collected_slots(epoch_dir):
+    # The collector keeps a per-epoch completion index; read it instead of every CSV
+    try:
+        index = SlotCompletionIndex.load(epoch_dir)
+    except Exception as e:
+        logger.warning(f"Could not read slot completion index in {epoch_dir}: {str(e)}")
+        index = None
+    if index is not None:
+        produced, skipped = index.counts()
+        logger.info(f"Slot completion index: {produced} produced, {skipped} skipped slots in {epoch_dir}.")
+        check_run0_json_files(epoch_dir)
+        return produced
+
     collected_slots = set()
     logger.info(f"Scanning {epoch_dir} for collected slots...")
     
@@ -29,20 +58,16 @@ def count_collected_slots(epoch_dir):
     # Scan main epoch directory for CSV files
     main_dir_slots_before = len(collected_slots)
     try:
-        csv_files = glob.glob("slot_data_thread_*.csv")
-        logger.info(f"Main epoch directory: Found {len(csv_files)} CSV files")
+        csv_files = find_output_files(".", "slot_data_thread")
+        logger.info(f"Main epoch directory: Found {len(csv_files)} slot_data files")
         
         if not csv_files:
-            logger.info(f"No CSV files found in main epoch directory {epoch_dir}")
+            logger.info(f"No slot_data files found in main epoch directory {epoch_dir}")
         else:
             for file in csv_files:
                 try:
-                    with open(file, "r") as f:
-                        csv_reader = csv.DictReader(f)
-                        for row in csv_reader:
-                            if 'block_slot' in row:
-                                slot = int(row['block_slot'])
-                                collected_slots.add(slot)
+                    for value in read_column(file, 'block_slot'):
+                        collected_slots.add(int(value))
                 except Exception as e:
                     logger.error(f"Error reading CSV file {file}: {str(e)}")
         
@@ -70,21 +95,17 @@ def count_collected_slots(epoch_dir):
                     logger.error(f"No read/execute access to {run_dir}")
                     continue
                 
-                csv_files = glob.glob(os.path.join(run_dir, "slot_data_thread_*.csv"))
-                logger.info(f"{run_dir}: Found {len(csv_files)} CSV files")
+                csv_files = find_output_files(run_dir, "slot_data_thread")
+                logger.info(f"{run_dir}: Found {len(csv_files)} slot_data files")
                 
                 if not csv_files:
-                    logger.info(f"No CSV files found in {run_dir}")
+                    logger.info(f"No slot_data files found in {run_dir}")
                     continue
                     
                 for file in csv_files:
                     try:
-                        with open(file, "r") as f:
-                            csv_reader = csv.DictReader(f)
-                            for row in csv_reader:
-                                if 'block_slot' in row:
-                                    slot = int(row['block_slot'])
-                                    collected_slots.add(slot)
+                        for value in read_column(file, 'block_slot'):
+                            collected_slots.add(int(value))
                     except Exception as e:
                         # Suppress error for interrupted processing (invalid int conversion)
                         if "invalid literal for int() with base 10:" in str(e):
@@ -97,20 +118,7 @@ def count_collected_slots(epoch_dir):
                 
                 # Check for good.json and poor.json files specifically in run0
                 if run_dir == 'run0':
-                    good_json_path = os.path.join(run_dir, 'good.json')
-                    poor_json_path = os.path.join(run_dir, 'poor.json')
-                    
-                    good_exists = os.path.exists(good_json_path)
-                    poor_exists = os.path.exists(poor_json_path)
-                    
-                    if not good_exists and not poor_exists:
-                        logger.warning(f"ALERT: Both good.json and poor.json files are missing from {run_dir}")
-                    elif not good_exists:
-                        logger.warning(f"ALERT: good.json file is missing from {run_dir}")
-                    elif not poor_exists:
-                        logger.warning(f"ALERT: poor.json file is missing from {run_dir}")
-                    else:
-                        logger.info(f"Both good.json and poor.json files found in {run_dir}")
+                    check_run0_json_files(epoch_dir)
                     
             except Exception as e:
                 logger.error(f"Error accessing run directory {run_dir}: {str(e)}")
@@ -2,7 +2,6 @@ import os
 import json
 import subprocess
 import psycopg2
-import requests
 import importlib.util
 
 # Setup unified logging
@@ -14,10 +13,10 @@ spec.loader.exec_module(logging_config)
 logger = logging_config.setup_logging(os.path.basename(__file__).replace('.py', ''))
 import time
 from db_config import db_params
-from rpc_config import RPC_ENDPOINT  # Import the centralized RPC endpoint
+from rpc_config import RPC_ENDPOINTS  # Import the centralized RPC endpoint pool
+from rpc_client import RpcClient, RpcError
 
-# Use the imported RPC endpoint
-RPC_URL = RPC_ENDPOINT
+# Use the configured endpoints, with QuickNode as the last-resort fallback
 RPC_URL2 = "https://silent-frequent-firefly.solana-mainnet.quiknode.pro/2059a05165e13886cb8226c6b87081ad579860e3/"
 
 # Directory configurations
@@ -30,7 +29,8 @@ SOLANA_BIN = "/home/smilax/agave/bin/solana"
 MAX_RETRIES = 3
 RETRY_DELAY = 5  # Seconds between retries
 
-headers = {"Content-Type": "application/json"}
+# Breaker warnings go to the rpc_client logger: this file's formatters expect an epoch field
+rpc_client = RpcClient(RPC_ENDPOINTS + [RPC_URL2], hedge=False)
 
 # Configure logging
 # Logger setup moved to unified configuration
@@ -68,29 +68,47 @@ def log_with_epoch(message, epoch, level="info"):
 def get_db_connection_string(db_params):
     return f"postgresql://{db_params['user']}@{db_params['host']}:{db_params['port']}/{db_params['database']}?sslmode={db_params['sslmode']}"
 
-def get_epoch_info(rpc_url):
-    payload = {
-        "jsonrpc": "2.0",
-        "id": 1,
-        "method": "getEpochInfo",
-        "params": []
-    }
+def get_epoch_info():
+    try:
+        epoch = rpc_client.call("getEpochInfo", [], retries=MAX_RETRIES, retry_delay=RETRY_DELAY)["epoch"]
+    except RpcError as e:
+        raise Exception(f"Failed to fetch epoch info: {e}")
+    log_with_epoch(f"Fetched epoch info: {epoch}", epoch)
+    return epoch
+
+def run_stakes_command(rpc_url, output_file, epoch):
+    """Run `solana stakes` against one endpoint, retrying MAX_RETRIES times"""
+    solana_command = f"{SOLANA_BIN} stakes --output json --url {rpc_url}"
+    log_with_epoch(f"Running command: {solana_command} > {output_file}", epoch)
+    last_error = None
     for attempt in range(MAX_RETRIES):
+        start_time = time.monotonic()
         try:
-            response = requests.post(rpc_url, headers=headers, json=payload)
-            log_with_epoch(f"getEpochInfo attempt {attempt + 1} on {rpc_url}: status {response.status_code}", None)
-            if response.status_code == 200 and "result" in response.json():
-                epoch = response.json()["result"]["epoch"]
-                log_with_epoch(f"Fetched epoch info: {epoch}", epoch)
-                return epoch
-            else:
-                log_with_epoch(f"Failed to fetch epoch info from {rpc_url}: {response.text}", None, "error")
+            result = subprocess.run(
+                solana_command,
+                shell=True,
+                check=True,
+                capture_output=True,
+                text=True
+            )
+            with open(output_file, 'w') as f:
+                f.write(result.stdout)
+            rpc_client.record(rpc_url, time.monotonic() - start_time)
+            log_with_epoch(f"Successfully executed solana command with {rpc_url}, output written to {output_file}", epoch)
+            return
+        except subprocess.CalledProcessError as e:
+            last_error = f"Error executing solana command with {rpc_url} (attempt {attempt + 1}): exit code {e.returncode}, stderr: {e.stderr}, stdout: {e.stdout}"
+            # The CLI reports throttling in stderr; feed it to the breaker like an HTTP 429
+            status_code = 429 if "429" in (e.stderr or "") else None
+            rpc_client.record(rpc_url, time.monotonic() - start_time, status_code, ok=False)
+            log_with_epoch(last_error, epoch, "error")
         except Exception as e:
-            log_with_epoch(f"Error fetching epoch info from {rpc_url} (attempt {attempt + 1}): {e}", None, "error")
+            last_error = f"Unexpected error executing solana command with {rpc_url} (attempt {attempt + 1}): {e}"
+            log_with_epoch(last_error, epoch, "error")
         if attempt < MAX_RETRIES - 1:
-            log_with_epoch(f"Retrying getEpochInfo on {rpc_url} after {RETRY_DELAY} seconds", None)
+            log_with_epoch(f"Retrying solana command with {rpc_url} after {RETRY_DELAY} seconds", epoch)
             time.sleep(RETRY_DELAY)
-    raise Exception(f"Failed to fetch epoch info from {rpc_url} after retries")
+    raise Exception(f"Failed to execute solana command with {rpc_url} after {MAX_RETRIES} attempts: {last_error}")
 
 def load_stake_data():
     # Ensure log directory exists
@@ -99,82 +117,22 @@ def load_stake_data():
     # Fetch the current epoch
     epoch = None
     try:
-        try:
-            epoch = get_epoch_info(RPC_URL)
-        except Exception as e:
-            log_with_epoch(f"WARNING: Failed to fetch epoch info from {RPC_URL}: {e}. Falling back to {RPC_URL2}", None, "warning")
-            epoch = get_epoch_info(RPC_URL2)
+        epoch = get_epoch_info()
 
         OUTPUT_FILE = os.path.join(SCRIPT_DIR, f"solana-stakes_{epoch}.json")
-        solana_command = f"{SOLANA_BIN} stakes --output json --url {RPC_URL}"
 
-        # Try RPC_URL first
-        success = False
+        # Try endpoints healthiest-first; getEpochInfo above has already scored them
         last_error = None
-        try:
-            log_with_epoch(f"Running command: {solana_command} > {OUTPUT_FILE}", epoch)
-            for attempt in range(MAX_RETRIES):
-                try:
-                    result = subprocess.run(
-                        solana_command,
-                        shell=True,
-                        check=True,
-                        capture_output=True,
-                        text=True
-                    )
-                    with open(OUTPUT_FILE, 'w') as f:
-                        f.write(result.stdout)
-                    log_with_epoch(f"Successfully executed solana command, output written to {OUTPUT_FILE}", epoch)
-                    success = True
-                    break
-                except subprocess.CalledProcessError as e:
-                    error_msg = f"Error executing solana command (attempt {attempt + 1}): exit code {e.returncode}, stderr: {e.stderr}, stdout: {e.stdout}"
-                    log_with_epoch(error_msg, epoch, "error")
-                    last_error = error_msg
-                    if attempt < MAX_RETRIES - 1:
-                        log_with_epoch(f"Retrying solana command after {RETRY_DELAY} seconds", epoch)
-                        time.sleep(RETRY_DELAY)
-                except Exception as e:
-                    log_with_epoch(f"Unexpected error executing solana command (attempt {attempt + 1}): {e}", epoch, "error")
-                    last_error = str(e)
-                    if attempt < MAX_RETRIES - 1:
-                        log_with_epoch(f"Retrying solana command after {RETRY_DELAY} seconds", epoch)
-                        time.sleep(RETRY_DELAY)
-            if not success:
-                raise Exception(f"Failed to execute solana command with {RPC_URL}: {last_error}")
-        except Exception as e:
-            log_with_epoch(f"WARNING: Failed to execute solana command with {RPC_URL}: {e}. Falling back to {RPC_URL2}", epoch, "warning")
-            solana_command = f"{SOLANA_BIN} stakes --output json --url {RPC_URL2}"
-            log_with_epoch(f"Running command: {solana_command} > {OUTPUT_FILE}", epoch)
-            for attempt in range(MAX_RETRIES):
-                try:
-                    result = subprocess.run(
-                        solana_command,
-                        shell=True,
-                        check=True,
-                        capture_output=True,
-                        text=True
-                    )
-                    with open(OUTPUT_FILE, 'w') as f:
-                        f.write(result.stdout)
-                    log_with_epoch(f"Successfully executed solana command with {RPC_URL2}, output written to {OUTPUT_FILE}", epoch)
-                    success = True
-                    break
-                except subprocess.CalledProcessError as e:
-                    error_msg = f"Error executing solana command with {RPC_URL2} (attempt {attempt + 1}): exit code {e.returncode}, stderr: {e.stderr}, stdout: {e.stdout}"
-                    log_with_epoch(error_msg, epoch, "error")
-                    if attempt < MAX_RETRIES - 1:
-                        log_with_epoch(f"Retrying solana command with {RPC_URL2} after {RETRY_DELAY} seconds", epoch)
-                        time.sleep(RETRY_DELAY)
-                    else:
-                        raise Exception(f"Failed to execute solana command with {RPC_URL2} after {MAX_RETRIES} attempts: {error_msg}")
-                except Exception as e:
-                    log_with_epoch(f"Unexpected error executing solana command with {RPC_URL2} (attempt {attempt + 1}): {e}", epoch, "error")
-                    if attempt < MAX_RETRIES - 1:
-                        log_with_epoch(f"Retrying solana command with {RPC_URL2} after {RETRY_DELAY} seconds", epoch)
-                        time.sleep(RETRY_DELAY)
-                    else:
-                        raise
+        for rpc_url in rpc_client.ranked_endpoints():
+            try:
+                run_stakes_command(rpc_url, OUTPUT_FILE, epoch)
+                last_error = None
+                break
+            except Exception as e:
+                last_error = e
+                log_with_epoch(f"WARNING: {e}. Trying next RPC endpoint", epoch, "warning")
+        if last_error is not None:
+            raise last_error
 
         # Read the generated JSON file
         log_with_epoch(f"Reading stake data from {OUTPUT_FILE}", epoch)
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Per-epoch enrichment merges into validator_stats.
+
+The 92_* steps enrich one epoch of validator_stats at a time from stakenet,
+gossip, leader-schedule skip rates, inflation rewards and APYs. Matching by
+vote account used a correlated subquery per candidate row
+(`vs.identity_pubkey = (SELECT identity_pubkey FROM validator_stats WHERE
+vote_account_pubkey = ... LIMIT 1)`), and some steps sent one UPDATE per
+validator. EpochMerge instead:
+
+    - resolves the epoch's vote account -> identity mapping once into an
+      indexed, analyzed temp table (epoch_vote_identity)
+    - stages Python rows with a single COPY into a typed temp table (stage)
+    - applies each enrichment as one UPDATE ... FROM joined on identity,
+      vote account, or vote account through the mapping, so the planner can
+      hash-join the source against the epoch's rows (update)
+
+Every merge logs its EXPLAIN plan, the rows it updated and how long it took.
+"""
+import csv
+import io
+import time
+
+MATCH_IDENTITY = "identity"        # source has identity_pubkey
+MATCH_VOTE = "vote"                # source has vote_account_pubkey, matched on validator_stats.vote_account_pubkey
+MATCH_VOTE_IDENTITY = "vote_identity"  # source has vote_account_pubkey, matched to the identity that owns it this epoch
+
+class EpochMerge:
+    """Apply set-based enrichment UPDATEs to one epoch of validator_stats"""
+
+    def __init__(self, conn, epoch, logger, explain=True):
+        self.conn = conn
+        self.epoch = int(epoch)
+        self.logger = logger
+        self.explain = explain
+        self._vote_identity = None
+
+    def vote_identity_table(self):
+        """Build (once) the indexed vote account -> identity map for the epoch"""
+        if self._vote_identity is None:
+            table = "epoch_vote_identity"
+            with self.conn.cursor() as cursor:
+                cursor.execute(f"DROP TABLE IF EXISTS {table}")
+                cursor.execute(f"""
+                    CREATE TEMPORARY TABLE {table} AS
+                    SELECT DISTINCT ON (vote_account_pubkey) vote_account_pubkey, identity_pubkey
+                    FROM validator_stats
+                    WHERE epoch = %s AND vote_account_pubkey IS NOT NULL
+                    ORDER BY vote_account_pubkey, identity_pubkey
+                """, (self.epoch,))
+                cursor.execute(f"CREATE UNIQUE INDEX ON {table} (vote_account_pubkey)")
+                cursor.execute(f"ANALYZE {table}")
+            self._vote_identity = table
+        return self._vote_identity
+
+    def stage(self, table, columns, rows):
+        """COPY rows into a new typed temp table; columns are (name, SQL type) pairs, None is NULL"""
+        buffer = io.StringIO()
+        count = 0
+        writer = csv.writer(buffer)
+        for row in rows:
+            writer.writerow(row)
+            count += 1
+        buffer.seek(0)
+        with self.conn.cursor() as cursor:
+            cursor.execute(f"DROP TABLE IF EXISTS {table}")
+            cursor.execute(f"CREATE TEMPORARY TABLE {table} ("
+                           + ", ".join(f"{name} {sql_type}" for name, sql_type in columns) + ")")
+            cursor.copy_expert(f"COPY {table} ({', '.join(name for name, _ in columns)}) FROM STDIN WITH (FORMAT csv)", buffer)
+            cursor.execute(f"ANALYZE {table}")
+        return count
+
+    def update(self, label, source, set_clause, match=MATCH_IDENTITY, source_params=(), returning=None):
+        """UPDATE validator_stats vs SET <set_clause> FROM <source> src for this epoch
+
+        source is a table name or a parenthesised subquery whose columns set_clause
+        references as src.<column>. Returns the RETURNING rows when returning is given,
+        otherwise the number of rows updated.
+        """
+        join = ""
+        if match == MATCH_IDENTITY:
+            condition = "vs.identity_pubkey = src.identity_pubkey"
+        elif match == MATCH_VOTE:
+            condition = "vs.vote_account_pubkey = src.vote_account_pubkey"
+        elif match == MATCH_VOTE_IDENTITY:
+            join = f"JOIN {self.vote_identity_table()} vi ON vi.vote_account_pubkey = src.vote_account_pubkey"
+            condition = "vs.identity_pubkey = vi.identity_pubkey"
+        else:
+            raise ValueError(f"Unknown match mode: {match}")
+
+        query = (f"UPDATE validator_stats vs SET {set_clause} FROM {source} src {join} "
+                 f"WHERE vs.epoch = %s AND {condition}")
+        if returning:
+            query += f" RETURNING {returning}"
+        params = tuple(source_params) + (self.epoch,)
+        return self.execute(label, query, params, fetch=bool(returning))
+
+    def execute(self, label, query, params=(), fetch=False):
+        """Run one merge statement, logging its plan, row count and timing"""
+        with self.conn.cursor() as cursor:
+            if self.explain:
+                cursor.execute(f"EXPLAIN {query}", params)
+                plan = "\n".join(f"    {row[0]}" for row in cursor.fetchall())
+                self.logger.info(f"EXPLAIN {label} (epoch {self.epoch}):\n{plan}")
+            start = time.time()
+            cursor.execute(query, params)
+            result = cursor.fetchall() if fetch else cursor.rowcount
+            rows = len(result) if fetch else result
+        self.logger.info(f"⏱️ {label} (epoch {self.epoch}): {rows:,} rows in {time.time() - start:.3f}s")
+        return result
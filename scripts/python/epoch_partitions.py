@@ -0,0 +1,263 @@
+#!/usr/bin/env python3
+"""
+Epoch range partitions for validator_data, epoch_votes and leader_schedule.
+
+Once a table is declaratively partitioned by RANGE (epoch), one partition
+{table}_e{epoch} per epoch, an epoch reload no longer has to DELETE hundreds
+of thousands of rows and re-INSERT them into the same heap (bloat, WAL, an
+autovacuum storm afterwards). Instead the loader:
+
+    1. create_epoch_table()    builds an empty standalone {table}_e{epoch}_new
+    2. (caller)                fills it with INSERT ... SELECT or COPY
+    3. swap_epoch_partition()  adds a CHECK (epoch = N) constraint and the
+                               parent's indexes/unique constraints, then in one
+                               short transaction detaches and drops the old
+                               partition and attaches the new one
+
+Readers see either the old epoch or the new one, never a half-loaded one, and
+the CHECK constraint lets ATTACH skip its validation scan. Queries filtering on
+epoch (93_save.py, update_leader_schedule_block_produced.py, ...) get partition
+pruning without changes.
+
+Existing tables are converted once with:
+
+    python3 epoch_partitions.py migrate validator_data leader_schedule epoch_votes
+    python3 epoch_partitions.py status
+
+migrate renames the table to {table}_unpartitioned, creates the partitioned
+parent with the same columns, indexes and constraint names, and copies every
+epoch into its own partition in a single transaction. The old table is kept
+for the operator to drop after checking the row counts.
+"""
+import argparse
+import os
+import re
+import sys
+import importlib.util
+
+import psycopg2
+
+from db_config import db_params
+
+PARTITIONED_TABLES = ("validator_data", "epoch_votes", "leader_schedule")
+
+INDEX_DEF_PATTERN = re.compile(r"^CREATE (UNIQUE )?INDEX \S+ ON (?:ONLY )?\S+ ")
+
+def partition_name(table, epoch):
+    return f"{table}_e{int(epoch)}"
+
+def is_partitioned(cursor, table):
+    """True when table exists and is a declaratively partitioned parent"""
+    cursor.execute("SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(%s)", (table,))
+    return cursor.fetchone() is not None
+
+def _parent_constraints(cursor, table):
+    """PRIMARY KEY/UNIQUE constraints of table as (name, definition, index oid)"""
+    cursor.execute("""
+        SELECT conname, pg_get_constraintdef(oid), conindid
+        FROM pg_constraint
+        WHERE conrelid = %s::regclass AND contype IN ('p', 'u')
+        ORDER BY conname
+    """, (table,))
+    return cursor.fetchall()
+
+def _unique_keys_without_epoch(cursor, table):
+    """Unique indexes (PRIMARY KEY/UNIQUE constraints included) of table that do not cover epoch, as (name, definition)"""
+    cursor.execute("""
+        SELECT c.relname, pg_get_indexdef(i.indexrelid)
+        FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid
+        WHERE i.indrelid = %s::regclass AND i.indisunique
+          AND NOT EXISTS (
+              SELECT 1 FROM pg_attribute a
+              WHERE a.attrelid = i.indrelid AND a.attname = 'epoch' AND a.attnum = ANY(i.indkey)
+          )
+        ORDER BY c.relname
+    """, (table,))
+    return cursor.fetchall()
+
+def _parent_indexes(cursor, table, exclude_oids=()):
+    """Non-constraint indexes of table as (name, CREATE INDEX statement)"""
+    cursor.execute("""
+        SELECT c.relname, pg_get_indexdef(i.indexrelid), i.indexrelid
+        FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid
+        WHERE i.indrelid = %s::regclass
+        ORDER BY c.relname
+    """, (table,))
+    return [(name, definition) for name, definition, oid in cursor.fetchall() if oid not in exclude_oids]
+
+def _in_transaction(conn, statements):
+    """Run (sql, params) pairs as one transaction regardless of the connection's autocommit setting"""
+    autocommit = conn.autocommit
+    conn.autocommit = False
+    try:
+        with conn.cursor() as cursor:
+            for statement, params in statements:
+                cursor.execute(statement, params)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.autocommit = autocommit
+
+def create_epoch_table(conn, table, epoch):
+    """Create an empty standalone table shaped like the partitioned parent; returns its name"""
+    staging = f"{partition_name(table, epoch)}_new"
+    with conn.cursor() as cursor:
+        cursor.execute(f"DROP TABLE IF EXISTS {staging}")
+        cursor.execute(f"CREATE TABLE {staging} (LIKE {table} INCLUDING DEFAULTS)")
+    if not conn.autocommit:
+        conn.commit()
+    return staging
+
+def swap_epoch_partition(conn, table, epoch, staging, logger):
+    """Index a filled staging table and atomically replace the epoch's partition with it"""
+    epoch = int(epoch)
+    partition = partition_name(table, epoch)
+    with conn.cursor() as cursor:
+        # Build everything ATTACH would otherwise do under lock: the bound check and the indexes
+        cursor.execute(f"ALTER TABLE {staging} ADD CONSTRAINT {staging}_epoch_check CHECK (epoch IS NOT NULL AND epoch = {epoch})")
+        constraints = _parent_constraints(cursor, table)
+        renames = []
+        for n, (name, definition, _) in enumerate(constraints):
+            cursor.execute(f"ALTER TABLE {staging} ADD CONSTRAINT {staging}_c{n} {definition}")
+            renames.append((f"{staging}_c{n}", f"{partition}_c{n}"))
+        for n, (name, definition) in enumerate(_parent_indexes(cursor, table, {oid for _, _, oid in constraints})):
+            cursor.execute(INDEX_DEF_PATTERN.sub(lambda m: f"CREATE {m.group(1) or ''}INDEX {staging}_i{n} ON {staging} ", definition))
+            renames.append((f"{staging}_i{n}", f"{partition}_i{n}"))
+        cursor.execute(f"ANALYZE {staging}")
+        cursor.execute("SELECT to_regclass(%s) IS NOT NULL", (partition,))
+        replacing = cursor.fetchone()[0]
+    if not conn.autocommit:
+        conn.commit()
+
+    statements = []
+    if replacing:
+        statements += [(f"ALTER TABLE {table} DETACH PARTITION {partition}", None),
+                       (f"DROP TABLE {partition}", None)]
+    statements.append((f"ALTER TABLE {staging} RENAME TO {partition}", None))
+    statements += [(f"ALTER INDEX {old} RENAME TO {new}", None) for old, new in renames]
+    statements += [(f"ALTER TABLE {table} ATTACH PARTITION {partition} FOR VALUES FROM ({epoch}) TO ({epoch + 1})", None),
+                   (f"ALTER TABLE {partition} DROP CONSTRAINT {staging}_epoch_check", None)]
+    _in_transaction(conn, statements)
+    logger.info(f"🔁 {'Replaced' if replacing else 'Attached'} partition {partition}")
+
+def ensure_epoch_partition(conn, table, epoch):
+    """Create the epoch's partition if it does not exist yet, for row-level upserts into the parent"""
+    epoch = int(epoch)
+    with conn.cursor() as cursor:
+        cursor.execute(f"CREATE TABLE IF NOT EXISTS {partition_name(table, epoch)} PARTITION OF {table} "
+                       f"FOR VALUES FROM ({epoch}) TO ({epoch + 1})")
+    if not conn.autocommit:
+        conn.commit()
+
+def _dependent_views(cursor, table):
+    cursor.execute("""
+        SELECT DISTINCT v.relname
+        FROM pg_depend d
+        JOIN pg_rewrite r ON r.oid = d.objid
+        JOIN pg_class v ON v.oid = r.ev_class
+        WHERE d.refobjid = %s::regclass AND v.oid <> d.refobjid
+        ORDER BY v.relname
+    """, (table,))
+    return [row[0] for row in cursor.fetchall()]
+
+def migrate_table(conn, table, logger):
+    """Convert a plain table into an epoch-partitioned one in a single transaction"""
+    old_table = f"{table}_unpartitioned"
+    with conn.cursor() as cursor:
+        if is_partitioned(cursor, table):
+            logger.info(f"✅ {table} is already partitioned by epoch")
+            return
+        cursor.execute("SELECT to_regclass(%s), to_regclass(%s)", (table, old_table))
+        current, previous = cursor.fetchone()
+        if current is None:
+            raise RuntimeError(f"Table {table} does not exist")
+        if previous is not None:
+            raise RuntimeError(f"{old_table} already exists - drop it or finish the previous migration first")
+        views = _dependent_views(cursor, table)
+        if views:
+            # Views bind to the table's oid and would keep reading the renamed copy
+            raise RuntimeError(f"Views depend on {table} and must be dropped and recreated around the migration: {', '.join(views)}")
+
+        keys = _unique_keys_without_epoch(cursor, table)
+        if keys:
+            # Postgres only accepts unique keys on a RANGE (epoch) parent when they include epoch
+            raise RuntimeError(f"Unique keys on {table} must include epoch before it can be partitioned - add epoch to: "
+                               + "; ".join(f"{name} ({definition})" for name, definition in keys))
+
+        constraints = _parent_constraints(cursor, table)
+        indexes = _parent_indexes(cursor, table, {oid for _, _, oid in constraints})
+        cursor.execute(f"SELECT DISTINCT epoch FROM {table} WHERE epoch IS NOT NULL ORDER BY epoch")
+        epochs = [row[0] for row in cursor.fetchall()]
+        cursor.execute(f"SELECT COUNT(*) FROM {table} WHERE epoch IS NULL")
+        null_rows = cursor.fetchone()[0]
+    if null_rows:
+        logger.warning(f"⚠️ {null_rows:,} rows in {table} have no epoch and will stay in {old_table}")
+
+    statements = [(f"ALTER TABLE {table} RENAME TO {old_table}", None)]
+    # Free the index and constraint names so the partitioned parent keeps them
+    statements += [(f"ALTER INDEX {name} RENAME TO {name}_unpartitioned", None) for name, _, _ in constraints]
+    statements += [(f"ALTER INDEX {name} RENAME TO {name}_unpartitioned", None) for name, _ in indexes]
+    statements.append((f"CREATE TABLE {table} (LIKE {old_table} INCLUDING DEFAULTS INCLUDING IDENTITY INCLUDING GENERATED) "
+                       f"PARTITION BY RANGE (epoch)", None))
+    statements += [(f"ALTER TABLE {table} ADD CONSTRAINT {name} {definition}", None) for name, definition, _ in constraints]
+    statements += [(INDEX_DEF_PATTERN.sub(lambda m, name=name: f"CREATE {m.group(1) or ''}INDEX {name} ON {table} ", definition), None)
+                   for name, definition in indexes]
+    for epoch in epochs:
+        partition = partition_name(table, epoch)
+        statements += [(f"CREATE TABLE {partition} PARTITION OF {table} FOR VALUES FROM ({epoch}) TO ({epoch + 1})", None),
+                       (f"INSERT INTO {partition} SELECT * FROM {old_table} WHERE epoch = %s", (epoch,))]
+    logger.info(f"🚀 Migrating {table}: {len(epochs)} epochs, {len(constraints)} constraints, {len(indexes)} indexes")
+    _in_transaction(conn, statements)
+    logger.info(f"✅ {table} is now partitioned by epoch - verify row counts, then DROP TABLE {old_table}")
+
+def partition_status(conn, table):
+    """(partition, epoch range, rows estimate) for each partition of table"""
+    with conn.cursor() as cursor:
+        cursor.execute("""
+            SELECT c.relname, pg_get_expr(c.relpartbound, c.oid), c.reltuples::bigint
+            FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid
+            WHERE i.inhparent = %s::regclass
+            ORDER BY c.relname
+        """, (table,))
+        return cursor.fetchall()
+
+def main():
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+    spec = importlib.util.spec_from_file_location("logging_config", os.path.join(script_dir, "999_logging_config.py"))
+    logging_config = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(logging_config)
+    logger = logging_config.setup_logging(os.path.basename(__file__).replace('.py', ''))
+
+    parser = argparse.ArgumentParser(description='Manage epoch range partitions')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    migrate_parser = subparsers.add_parser('migrate', help='Convert tables to epoch range partitioning')
+    migrate_parser.add_argument('tables', nargs='*', default=list(PARTITIONED_TABLES), choices=PARTITIONED_TABLES)
+    status_parser = subparsers.add_parser('status', help='List epoch partitions')
+    status_parser.add_argument('tables', nargs='*', default=list(PARTITIONED_TABLES), choices=PARTITIONED_TABLES)
+    args = parser.parse_args()
+
+    conn = psycopg2.connect(**db_params)
+    try:
+        for table in args.tables:
+            if args.command == 'migrate':
+                migrate_table(conn, table, logger)
+                continue
+            with conn.cursor() as cursor:
+                partitioned = is_partitioned(cursor, table)
+            if not partitioned:
+                logger.info(f"{table}: not partitioned")
+                continue
+            partitions = partition_status(conn, table)
+            logger.info(f"{table}: {len(partitions)} partitions")
+            for name, bound, rows in partitions:
+                logger.info(f"  {name:<32} {bound:<40} ~{max(rows, 0):,} rows")
+    except Exception as e:
+        logger.error(f"❌ {e}")
+        sys.exit(1)
+    finally:
+        conn.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Parallel per-epoch builds for the leaderboard backfills.
+
+93_save.py and solana_leaderboard/build_leaderboard.py build every epoch in a
+range one after the other: validator stats JSON, epoch aggregate JSON and the
+stake statistics CSV/HTML files. Epochs are independent, so with --jobs N they
+run in a pool of N forked worker processes, each with its own SQLAlchemy
+engine (engines and their pooled connections must not cross a fork). The
+cross-epoch outputs (ten-epoch files, plots) still run once, in the parent,
+after every epoch has finished.
+
+Outputs are written through atomic_write / atomic_to_csv: the data goes to a
+temporary file next to the target and is renamed over it once complete, so the
+web server never serves a half-written file while a backfill runs. Files the
+workers share (country_colors.json) are read-modified-written under file_lock.
+"""
+import fcntl
+import multiprocessing
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from contextlib import contextmanager
+
+from sqlalchemy import create_engine
+
+_worker_engine = None
+
+@contextmanager
+def atomic_write(path, mode="w"):
+    """Open a temporary file next to path and rename it over path when the block succeeds"""
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, temp_path = tempfile.mkstemp(dir=directory, prefix=f".{os.path.basename(path)}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, mode) as f:
+            yield f
+        os.chmod(temp_path, 0o644)
+        os.replace(temp_path, path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.unlink(temp_path)
+        raise
+
+@contextmanager
+def file_lock(path):
+    """Exclusive flock on path + ".lock" for a read-modify-write shared by the epoch workers"""
+    with open(f"{path}.lock", "a") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+def atomic_to_csv(frame, path, **kwargs):
+    """DataFrame.to_csv through atomic_write"""
+    with atomic_write(path, "w") as f:
+        frame.to_csv(f, **kwargs)
+
+def _init_worker(engine_url):
+    global _worker_engine
+    _worker_engine = create_engine(engine_url)
+
+def _run_epoch(process_epoch, epoch, max_epoch):
+    return epoch, process_epoch(epoch, max_epoch, _worker_engine)
+
+def run_epochs(process_epoch, epochs, max_epoch, engine, jobs, logger):
+    """Call process_epoch(epoch, max_epoch, engine) for every epoch, in jobs worker processes when jobs > 1
+
+    process_epoch must be a module-level function; it returns False when the epoch had no
+    epoch_aggregate_data. Returns the sorted epochs that reported missing data.
+    """
+    missing = []
+    if jobs <= 1:
+        for epoch in epochs:
+            if process_epoch(epoch, max_epoch, engine) is False:
+                missing.append(epoch)
+        return missing
+
+    # Children build their own engine; don't hand them the parent's pooled connections
+    engine.dispose()
+    engine_url = engine.url.render_as_string(hide_password=False)
+    logger.info(f"🚀 Building {len(epochs)} epochs in {jobs} worker processes")
+    with ProcessPoolExecutor(max_workers=jobs, mp_context=multiprocessing.get_context("fork"),
+                             initializer=_init_worker, initargs=(engine_url,)) as executor:
+        futures = [executor.submit(_run_epoch, process_epoch, epoch, max_epoch) for epoch in epochs]
+        for done, future in enumerate(as_completed(futures), 1):
+            try:
+                epoch, result = future.result()
+            except Exception as e:
+                logger.error(f"❌ Epoch worker failed: {e}")
+                continue
+            if result is False:
+                missing.append(epoch)
+            logger.info(f"✅ Epoch {epoch} built ({done}/{len(epochs)})")
+    return sorted(missing)
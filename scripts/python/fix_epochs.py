@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+"""
+Set-based repair of epoch numbers derived from block_slot.
+
+Early automation runs stored some rows with the wrong epoch (999, or the
+1964 default). The epoch of a block is a pure function of its slot:
+
+    epoch = (block_slot - 259200000) / 432000 + 600
+
+so a repair is one UPDATE per unit of work instead of fetching every
+(block_slot, epoch) pair into Python and sending corrections back a row at
+a time. Work is split so units never touch the same rows and run in
+parallel, one connection each:
+
+    plain tables        one unit per epoch-sized block_slot range:
+                        UPDATE t SET epoch = N WHERE block_slot in [start, end)
+                        AND epoch IS DISTINCT FROM N
+    partitioned tables  one unit per stored epoch (partition), updated through
+                        the parent so wrongly filed rows move to the right
+                        partition; missing target partitions are created first
+
+Usage:
+    python3 fix_epochs.py validator_data epoch_votes --jobs 8
+    python3 fix_epochs.py validator_data --epoch 999          # only rows stored as epoch 999
+    python3 fix_epochs.py leader_schedule --start-epoch 600 --end-epoch 700 --dry-run
+"""
+import argparse
+import importlib.util
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import psycopg2
+
+from db_config import db_params
+from epoch_partitions import is_partitioned, ensure_epoch_partition
+
+STARTING_BLOCK_SLOT = 259200000
+SLOTS_PER_EPOCH = 432000
+EPOCH_OFFSET = 600
+
+EPOCH_EXPRESSION = f"((block_slot - {STARTING_BLOCK_SLOT}) / {SLOTS_PER_EPOCH} + {EPOCH_OFFSET})"
+
+def calculate_epoch(block_slot):
+    """Epoch of a block slot"""
+    return ((block_slot - STARTING_BLOCK_SLOT) // SLOTS_PER_EPOCH) + EPOCH_OFFSET
+
+def epoch_slot_range(epoch):
+    """[first_slot, next epoch's first slot) for an epoch"""
+    first_slot = STARTING_BLOCK_SLOT + (epoch - EPOCH_OFFSET) * SLOTS_PER_EPOCH
+    return first_slot, first_slot + SLOTS_PER_EPOCH
+
+def _slot_range(start_epoch=None, end_epoch=None):
+    """WHERE fragment (leading " AND ...") and params limiting block_slot to start_epoch..end_epoch"""
+    where, params = "", []
+    if start_epoch is not None:
+        where += " AND block_slot >= %s"
+        params.append(epoch_slot_range(start_epoch)[0])
+    if end_epoch is not None:
+        where += " AND block_slot < %s"
+        params.append(epoch_slot_range(end_epoch)[1])
+    return where, params
+
+def _work_units(cursor, table, stored_epoch=None, start_epoch=None, end_epoch=None):
+    """(description, WHERE clause, params, SET expression) per independent UPDATE"""
+    if is_partitioned(cursor, table) or stored_epoch is not None:
+        # One unit per stored epoch: partition pruning keeps each UPDATE inside one partition
+        if stored_epoch is not None:
+            epochs = [stored_epoch]
+        else:
+            cursor.execute(f"SELECT DISTINCT epoch FROM {table} ORDER BY epoch")
+            epochs = [row[0] for row in cursor.fetchall()]
+        units = []
+        for epoch in epochs:
+            slot_where, slot_params = _slot_range(start_epoch, end_epoch)
+            where, params = f"epoch = %s{slot_where}", [epoch] + slot_params
+            units.append((f"stored epoch {epoch}", f"{where} AND epoch IS DISTINCT FROM {EPOCH_EXPRESSION}",
+                          tuple(params), EPOCH_EXPRESSION))
+        return units
+
+    # One unit per epoch-sized slot range: the correct epoch is a constant within it
+    cursor.execute(f"SELECT MIN(block_slot), MAX(block_slot) FROM {table}")
+    min_slot, max_slot = cursor.fetchone()
+    if min_slot is None:
+        return []
+    first = max(calculate_epoch(min_slot), start_epoch) if start_epoch is not None else calculate_epoch(min_slot)
+    last = min(calculate_epoch(max_slot), end_epoch) if end_epoch is not None else calculate_epoch(max_slot)
+    units = []
+    for epoch in range(first, last + 1):
+        start_slot, end_slot = epoch_slot_range(epoch)
+        units.append((f"epoch {epoch} slots", "block_slot >= %s AND block_slot < %s AND epoch IS DISTINCT FROM %s",
+                      (start_slot, end_slot, epoch), str(epoch)))
+    return units
+
+def _run_unit(table, unit, dry_run):
+    description, where, params, expression = unit
+    conn = psycopg2.connect(**db_params)
+    try:
+        with conn.cursor() as cursor:
+            if dry_run:
+                cursor.execute(f"SELECT COUNT(*) FROM {table} WHERE {where}", params)
+                count = cursor.fetchone()[0]
+            else:
+                cursor.execute(f"UPDATE {table} SET epoch = {expression} WHERE {where}", params)
+                count = cursor.rowcount
+        conn.commit()
+    finally:
+        conn.close()
+    return description, count
+
+def fix_table_epochs(conn, table, logger, jobs=4, stored_epoch=None, start_epoch=None, end_epoch=None, dry_run=False):
+    """Set epoch from block_slot wherever it differs; returns the number of rows corrected (or found with dry_run)"""
+    start = time.time()
+    with conn.cursor() as cursor:
+        units = _work_units(cursor, table, stored_epoch, start_epoch, end_epoch)
+        partitioned = is_partitioned(cursor, table)
+        if partitioned and not dry_run:
+            # Row movement needs every target partition to exist before the UPDATEs run
+            only_epoch = "" if stored_epoch is None else f"epoch = {int(stored_epoch)} AND "
+            slot_where, slot_params = _slot_range(start_epoch, end_epoch)
+            cursor.execute(f"SELECT DISTINCT {EPOCH_EXPRESSION} FROM {table} "
+                           f"WHERE {only_epoch}epoch IS DISTINCT FROM {EPOCH_EXPRESSION}{slot_where}", slot_params)
+            targets = [row[0] for row in cursor.fetchall()]
+    if not conn.autocommit:
+        conn.commit()
+    if partitioned and not dry_run:
+        for epoch in targets:
+            ensure_epoch_partition(conn, table, epoch)
+
+    total = 0
+    with ThreadPoolExecutor(max_workers=max(1, jobs)) as executor:
+        for description, count in executor.map(lambda unit: _run_unit(table, unit, dry_run), units):
+            if count:
+                logger.info(f"  {table} {description}: {count:,} rows {'to fix' if dry_run else 'fixed'}")
+            total += count
+    logger.info(f"{'🔍' if dry_run else '✅'} {table}: {total:,} rows with a wrong epoch "
+                f"{'found' if dry_run else 'corrected'} in {len(units)} units over {jobs} connections ({time.time() - start:.1f}s)")
+    return total
+
+def main():
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+    spec = importlib.util.spec_from_file_location("logging_config", os.path.join(script_dir, "999_logging_config.py"))
+    logging_config = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(logging_config)
+    logger = logging_config.setup_logging(os.path.basename(__file__).replace('.py', ''))
+
+    parser = argparse.ArgumentParser(description='Recompute epoch from block_slot wherever it is wrong')
+    parser.add_argument('tables', nargs='+', help='Tables with block_slot and epoch columns')
+    parser.add_argument('--jobs', type=int, default=4, help='Parallel connections (default: 4)')
+    parser.add_argument('--epoch', type=int, default=None, help='Only repair rows stored with this epoch (e.g. 999)')
+    parser.add_argument('--start-epoch', type=int, default=None, help='Only repair slots from this epoch on')
+    parser.add_argument('--end-epoch', type=int, default=None, help='Only repair slots up to this epoch')
+    parser.add_argument('--dry-run', action='store_true', help='Count rows with a wrong epoch without changing them')
+    args = parser.parse_args()
+
+    conn = psycopg2.connect(**db_params)
+    conn.autocommit = True
+    try:
+        for table in args.tables:
+            fix_table_epochs(conn, table, logger, args.jobs, args.epoch, args.start_epoch, args.end_epoch, args.dry_run)
+    except psycopg2.Error as e:
+        logger.error(f"❌ Database error: {e}")
+        sys.exit(1)
+    finally:
+        conn.close()
+
+if __name__ == "__main__":
+    main()
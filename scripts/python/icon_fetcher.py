@@ -0,0 +1,263 @@
+#!/usr/bin/env python3
+"""
+Concurrent, cached validator icon refresh for validator_info.logo.
+
+fetch_and_store_icons used to walk validator_info one row at a time: a
+blocking keybase lookup, a full image download and an UPDATE plus COMMIT per
+validator, every epoch, for thousands of icons that almost never change.
+refresh_icons instead:
+
+    - runs keybase lookups and image downloads as asyncio tasks over one
+      aiohttp session, bounded by ICON_CONCURRENCY requests in flight
+    - caches keybase username -> picture URL lookups on disk for
+      KEYBASE_TTL seconds (KEYBASE_MISS_TTL for users without a picture)
+    - caches image bytes on disk keyed by URL along with the ETag and
+      Last-Modified the server sent, and revalidates them with
+      If-None-Match / If-Modified-Since; a 304 reuses the cached bytes
+    - rewrites static/images/{identity}{ext} only when its bytes changed
+    - writes discovered icon_url values and every logo back with one
+      UPDATE ... FROM (VALUES ...) statement each, skipping unchanged rows
+
+Cache layout (CACHE_DIR):
+
+    keybase.json        {username: {"url": str|null, "fetched_at": epoch seconds}}
+    images.json         {url: {"file": str, "etag": str, "last_modified": str, "content_type": str}}
+    images/<sha256>     cached image bytes, named by the URL's sha256
+"""
+import asyncio
+import csv
+import hashlib
+import json
+import mimetypes
+import os
+import time
+from urllib.parse import urlparse
+
+import filetype
+from psycopg2.extras import execute_values
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+ICON_DIR = "/home/smilax/trillium_api/static/images"
+CACHE_DIR = "./data/cache/icons"
+ERROR_LIST_PATH = "./data/configs/92_icon_url_errors.list"
+DEFAULT_LOGO = "no-image-available12.webp"
+VALID_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.webp', '.gif')
+
+ICON_CONCURRENCY = 32
+ICON_TIMEOUT = 5
+KEYBASE_TTL = 7 * 24 * 3600
+KEYBASE_MISS_TTL = 24 * 3600
+KEYBASE_LOOKUP_URL = "https://keybase.io/_/api/1.0/user/lookup.json"
+
+IMAGE_HEADERS = {
+    'Accept': 'image/png,image/*',
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/129.0.0.0 Safari/537.36'
+}
+
+class IconCache:
+    """On-disk keybase and image caches"""
+
+    def __init__(self, cache_dir=CACHE_DIR):
+        self.cache_dir = cache_dir
+        self.image_dir = os.path.join(cache_dir, "images")
+        os.makedirs(self.image_dir, exist_ok=True)
+        self.keybase = self._load("keybase.json")
+        self.images = self._load("images.json")
+
+    def _load(self, name):
+        try:
+            with open(os.path.join(self.cache_dir, name)) as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+    def _store(self, name, data):
+        path = os.path.join(self.cache_dir, name)
+        with open(f"{path}.tmp", "w") as f:
+            json.dump(data, f)
+        os.replace(f"{path}.tmp", path)
+
+    def save(self):
+        self._store("keybase.json", self.keybase)
+        self._store("images.json", self.images)
+
+    def keybase_url(self, username):
+        """(hit, url) for a cached keybase lookup that has not expired"""
+        entry = self.keybase.get(username)
+        if entry is None:
+            return False, None
+        ttl = KEYBASE_TTL if entry.get("url") else KEYBASE_MISS_TTL
+        if time.time() - entry.get("fetched_at", 0) > ttl:
+            return False, None
+        return True, entry.get("url")
+
+    def remember_keybase(self, username, url):
+        self.keybase[username] = {"url": url, "fetched_at": int(time.time())}
+
+    def image(self, url):
+        """(metadata, bytes) for a cached image, or (None, None)"""
+        meta = self.images.get(url)
+        if meta is None:
+            return None, None
+        try:
+            with open(os.path.join(self.image_dir, meta["file"]), "rb") as f:
+                return meta, f.read()
+        except FileNotFoundError:
+            return None, None
+
+    def remember_image(self, url, content, headers):
+        name = hashlib.sha256(url.encode()).hexdigest()
+        with open(os.path.join(self.image_dir, name), "wb") as f:
+            f.write(content)
+        self.images[url] = {
+            "file": name,
+            "etag": headers.get("ETag"),
+            "last_modified": headers.get("Last-Modified"),
+            "content_type": headers.get("Content-Type"),
+        }
+
+def image_extension(content_type, content):
+    """Extension from the Content-Type header, falling back to sniffing the bytes"""
+    extension = mimetypes.guess_extension(content_type.split(";")[0].strip()) if content_type else None
+    if not extension:
+        kind = filetype.guess(content)
+        extension = f".{kind.extension}" if kind and kind.mime.startswith('image/') else ""
+    return extension
+
+def write_if_changed(path, content):
+    """Write content to path unless the file already holds exactly those bytes; True if written"""
+    try:
+        if os.path.getsize(path) == len(content):
+            with open(path, "rb") as f:
+                if f.read() == content:
+                    return False
+    except FileNotFoundError:
+        pass
+    with open(path, "wb") as f:
+        f.write(content)
+    return True
+
+async def lookup_keybase(session, cache, username):
+    """Keybase primary picture URL for a username, via the cache"""
+    hit, url = cache.keybase_url(username)
+    if hit:
+        return url
+    url = None
+    try:
+        async with session.get(KEYBASE_LOOKUP_URL, params={"username": username},
+                               headers={"Content-Type": "application/json"}) as response:
+            if response.status == 200:
+                json_response = await response.json(content_type=None)
+                url = json_response.get("them", {}).get("pictures", {}).get("primary", {}).get("url")
+            else:
+                return None  # Not cached: retry next run
+    except (aiohttp.ClientError, asyncio.TimeoutError, ValueError):
+        return None
+    cache.remember_keybase(username, url)
+    return url
+
+async def fetch_image(session, cache, url):
+    """(status, content_type, bytes) for url, revalidating a cached copy with a conditional GET"""
+    meta, cached = cache.image(url)
+    headers = dict(IMAGE_HEADERS)
+    if meta:
+        if meta.get("etag"):
+            headers["If-None-Match"] = meta["etag"]
+        if meta.get("last_modified"):
+            headers["If-Modified-Since"] = meta["last_modified"]
+    async with session.get(url, headers=headers, allow_redirects=True) as response:
+        if response.status == 304 and meta:
+            return 304, meta.get("content_type"), cached
+        if response.status != 200:
+            return response.status, None, None
+        content = await response.read()
+        cache.remember_image(url, content, response.headers)
+        return 200, response.headers.get("Content-Type"), content
+
+async def _process_validator(session, semaphore, cache, icon_dir, row, stats):
+    """(identity, icon_url to store or None, logo, error or None) for one validator_info row"""
+    identity_pubkey, icon_url, keybase_username = row
+    async with semaphore:
+        discovered = None
+        if not icon_url:
+            if not keybase_username:
+                return identity_pubkey, None, DEFAULT_LOGO, ("", "No icon_url and no keybase_username found")
+            icon_url = await lookup_keybase(session, cache, keybase_username)
+            if not icon_url:
+                return identity_pubkey, None, DEFAULT_LOGO, ("", f"No icon_url found for {keybase_username}")
+            discovered = icon_url
+
+        parsed = urlparse(icon_url)
+        if not (parsed.scheme in ('http', 'https') and parsed.netloc):
+            return identity_pubkey, discovered, DEFAULT_LOGO, (icon_url, f"Invalid URL format: {icon_url}")
+
+        try:
+            status, content_type, content = await fetch_image(session, cache, icon_url)
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            return identity_pubkey, discovered, DEFAULT_LOGO, (icon_url, f"Error: {e!r}")
+        if content is None:
+            return identity_pubkey, discovered, DEFAULT_LOGO, (icon_url, f"Error: Failed to fetch '{icon_url}' (status code: {status})")
+        stats["not_modified" if status == 304 else "downloaded"] += 1
+
+    filename = f"{identity_pubkey}{image_extension(content_type, content)}"
+    if write_if_changed(os.path.join(icon_dir, filename), content):
+        stats["written"] += 1
+    if not filename.endswith(VALID_EXTENSIONS):
+        filename = DEFAULT_LOGO
+    return identity_pubkey, discovered, filename, None
+
+async def _process_all(rows, cache, icon_dir, concurrency, stats):
+    semaphore = asyncio.Semaphore(concurrency)
+    timeout = aiohttp.ClientTimeout(total=ICON_TIMEOUT * 2, sock_connect=ICON_TIMEOUT, sock_read=ICON_TIMEOUT)
+    connector = aiohttp.TCPConnector(limit=concurrency, ttl_dns_cache=300)
+    async with aiohttp.ClientSession(timeout=timeout, connector=connector) as session:
+        return await asyncio.gather(*(_process_validator(session, semaphore, cache, icon_dir, row, stats) for row in rows))
+
+def _batch_update(cursor, column, values):
+    """Set validator_info.<column> for many identities in one statement; returns rows changed"""
+    if not values:
+        return 0
+    execute_values(cursor, f"""
+        UPDATE validator_info vi SET {column} = v.value
+        FROM (VALUES %s) AS v (identity_pubkey, value)
+        WHERE vi.identity_pubkey = v.identity_pubkey AND vi.{column} IS DISTINCT FROM v.value
+    """, values, page_size=len(values))
+    return cursor.rowcount
+
+def refresh_icons(conn, logger, icon_dir=ICON_DIR, cache_dir=CACHE_DIR, concurrency=ICON_CONCURRENCY):
+    """Fetch every validator's icon concurrently and store the logo filenames in validator_info"""
+    if aiohttp is None:
+        raise RuntimeError("aiohttp is required for icon processing (pip install aiohttp)")
+    start = time.time()
+    os.makedirs(icon_dir, exist_ok=True)
+    cache = IconCache(cache_dir)
+
+    with conn.cursor() as cursor:
+        cursor.execute("SELECT identity_pubkey, icon_url, keybase_username FROM validator_info")
+        rows = cursor.fetchall()
+
+    stats = {"downloaded": 0, "not_modified": 0, "written": 0}
+    results = asyncio.run(_process_all(rows, cache, icon_dir, concurrency, stats))
+    cache.save()
+
+    os.makedirs(os.path.dirname(ERROR_LIST_PATH), exist_ok=True)
+    errors = [(identity, *error) for identity, _, _, error in results if error]
+    with open(ERROR_LIST_PATH, "a", newline="") as error_file:
+        writer = csv.writer(error_file)
+        if error_file.tell() == 0:
+            writer.writerow(["identity_pubkey", "icon_url", "error"])
+        writer.writerows(errors)
+
+    with conn.cursor() as cursor:
+        icon_urls = _batch_update(cursor, "icon_url", [(identity, url) for identity, url, _, _ in results if url])
+        logos = _batch_update(cursor, "logo", [(identity, logo) for identity, _, logo, _ in results])
+    conn.commit()
+
+    logger.info(f"🖼️ Icons for {len(rows):,} validators in {time.time() - start:.1f}s: {stats['downloaded']:,} downloaded, "
+                f"{stats['not_modified']:,} not modified, {stats['written']:,} files written, {len(errors):,} errors; "
+                f"{icon_urls:,} icon_url and {logos:,} logo values changed")
+    return stats
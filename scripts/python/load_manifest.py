@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+"""
+Ingest manifest for incremental loads of an epoch's run*/ output files.
+
+91_load_consolidated_csv.py normally reloads the whole epoch from every run*/
+directory. With LOAD_INCREMENTAL=1 it consults two tables instead:
+
+    load_manifest        one row per ingested slot_data/epoch_votes file:
+                         epoch, path (relative to the epoch directory), kind,
+                         size, mtime, content hash and row count
+    load_manifest_votes  per-file vote counts by (identity, vote account)
+
+A file is loaded when it is not in the manifest or when its size or mtime
+changed and its content hash no longer matches (a file whose mtime changed
+but whose content did not is just re-stamped). slot_data rows are upserted by
+block_slot, so only the slots in new or changed files are touched. Vote files
+are not kept row by row: each one is aggregated on its own and its counts
+replace the file's previous contribution, so votes_cast for the epoch is the
+SUM over load_manifest_votes and stays exact when a file is reloaded.
+
+A full (non-incremental) load clears the epoch from the manifest, so the next
+incremental run starts over from a consistent state.
+"""
+import hashlib
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import psycopg2
+
+from parallel_copy import balance_files
+from slot_output import count_rows, open_as_csv
+
+HASH_BLOCK_SIZE = 1024 * 1024
+
+MANIFEST_DDL = """
+    CREATE TABLE IF NOT EXISTS load_manifest (
+        epoch SMALLINT NOT NULL,
+        path TEXT NOT NULL,
+        kind TEXT NOT NULL,
+        size BIGINT NOT NULL,
+        mtime DOUBLE PRECISION NOT NULL,
+        content_hash TEXT NOT NULL,
+        row_count INTEGER NOT NULL,
+        loaded_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+        PRIMARY KEY (epoch, path)
+    );
+    CREATE TABLE IF NOT EXISTS load_manifest_votes (
+        epoch SMALLINT NOT NULL,
+        path TEXT NOT NULL,
+        identity_pubkey CHAR(44),
+        vote_account_pubkey CHAR(44),
+        votes_cast INTEGER NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS idx_load_manifest_votes_epoch_path ON load_manifest_votes (epoch, path);
+"""
+
+def content_hash(path):
+    """blake2b digest of a file's contents"""
+    digest = hashlib.blake2b(digest_size=20)
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(HASH_BLOCK_SIZE), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+class LoadManifest:
+    """Tracks which of an epoch's output files have been ingested"""
+
+    def __init__(self, conn, epoch, base_directory):
+        self.conn = conn
+        self.epoch = int(epoch)
+        self.base_directory = base_directory
+        with conn.cursor() as cursor:
+            cursor.execute(MANIFEST_DDL)
+        if not conn.autocommit:
+            conn.commit()
+
+    def relative(self, path):
+        return os.path.relpath(path, self.base_directory)
+
+    def pending(self, paths):
+        """Return (path, size, mtime, hash) for files that are new or whose content changed"""
+        with self.conn.cursor() as cursor:
+            cursor.execute("SELECT path, size, mtime, content_hash FROM load_manifest WHERE epoch = %s", (self.epoch,))
+            known = {path: (size, mtime, digest) for path, size, mtime, digest in cursor.fetchall()}
+
+        pending = []
+        restamped = []
+        for path in paths:
+            stat = os.stat(path)
+            entry = known.get(self.relative(path))
+            if entry is not None and entry[0] == stat.st_size and entry[1] == stat.st_mtime:
+                continue
+            digest = content_hash(path)
+            if entry is not None and entry[2] == digest:
+                restamped.append((stat.st_size, stat.st_mtime, self.epoch, self.relative(path)))
+                continue
+            pending.append((path, stat.st_size, stat.st_mtime, digest))
+
+        if restamped:
+            with self.conn.cursor() as cursor:
+                cursor.executemany("UPDATE load_manifest SET size = %s, mtime = %s WHERE epoch = %s AND path = %s", restamped)
+            if not self.conn.autocommit:
+                self.conn.commit()
+        return pending
+
+    def _record(self, cursor, kind, path, size, mtime, digest, row_count):
+        cursor.execute("""
+            INSERT INTO load_manifest (epoch, path, kind, size, mtime, content_hash, row_count)
+            VALUES (%s, %s, %s, %s, %s, %s, %s)
+            ON CONFLICT (epoch, path) DO UPDATE SET
+                kind = EXCLUDED.kind, size = EXCLUDED.size, mtime = EXCLUDED.mtime,
+                content_hash = EXCLUDED.content_hash, row_count = EXCLUDED.row_count, loaded_at = now()
+        """, (self.epoch, self.relative(path), kind, size, mtime, digest, row_count))
+
+    def record_slot_files(self, entries):
+        """Record slot_data files once their rows are committed to validator_data; returns total rows"""
+        total_rows = 0
+        with self.conn.cursor() as cursor:
+            for path, size, mtime, digest in entries:
+                row_count = count_rows(path)
+                total_rows += row_count
+                self._record(cursor, "slot_data", path, size, mtime, digest, row_count)
+        if not self.conn.autocommit:
+            self.conn.commit()
+        return total_rows
+
+    def _vote_worker(self, db_params, worker, entries):
+        """Worker: aggregate each vote file on its own and replace its contribution, one transaction per file"""
+        scratch = f"load_manifest_votes_scratch_{worker}"
+        conn = psycopg2.connect(**db_params)
+        vote_rows = 0
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute(f"DROP TABLE IF EXISTS {scratch}")
+                cursor.execute(f"CREATE UNLOGGED TABLE {scratch} (LIKE temp_epoch_votes)")
+                conn.commit()
+                for path, size, mtime, digest in entries:
+                    cursor.execute(f"TRUNCATE {scratch}")
+                    with open_as_csv(path) as file:
+                        cursor.copy_expert(f"COPY {scratch} FROM STDIN WITH CSV HEADER", file)
+                    cursor.execute(f"SELECT COUNT(*) FROM {scratch}")
+                    row_count = cursor.fetchone()[0]
+                    cursor.execute("DELETE FROM load_manifest_votes WHERE epoch = %s AND path = %s",
+                                   (self.epoch, self.relative(path)))
+                    cursor.execute(f"""
+                        INSERT INTO load_manifest_votes (epoch, path, identity_pubkey, vote_account_pubkey, votes_cast)
+                        SELECT %s, %s, identity_pubkey, vote_account_pubkey, COUNT(*)
+                        FROM {scratch}
+                        WHERE epoch = %s
+                        GROUP BY identity_pubkey, vote_account_pubkey
+                    """, (self.epoch, self.relative(path), self.epoch))
+                    self._record(cursor, "epoch_votes", path, size, mtime, digest, row_count)
+                    conn.commit()
+                    vote_rows += row_count
+                cursor.execute(f"DROP TABLE IF EXISTS {scratch}")
+                conn.commit()
+        finally:
+            conn.close()
+        return len(entries), vote_rows
+
+    def load_vote_files(self, db_params, entries, jobs, logger):
+        """Aggregate new/changed epoch_votes files into load_manifest_votes over `jobs` connections"""
+        by_path = {entry[0]: entry for entry in entries}
+        groups = [[by_path[path] for path in group] for group in balance_files(list(by_path), jobs)]
+        if not groups:
+            return 0
+        start = time.time()
+        vote_rows = 0
+        with ThreadPoolExecutor(max_workers=len(groups)) as executor:
+            futures = [executor.submit(self._vote_worker, db_params, worker, group) for worker, group in enumerate(groups)]
+            for future in futures:
+                vote_rows += future.result()[1]
+        logger.info(f"✅ Aggregated {len(entries)} epoch_votes files ({vote_rows:,} votes) over {len(groups)} connections "
+                    f"in {time.time() - start:.1f}s")
+        return vote_rows
+
+    def clear_epoch(self):
+        """Forget the epoch after a full reload so the next incremental run starts from scratch"""
+        with self.conn.cursor() as cursor:
+            cursor.execute("DELETE FROM load_manifest_votes WHERE epoch = %s", (self.epoch,))
+            cursor.execute("DELETE FROM load_manifest WHERE epoch = %s", (self.epoch,))
+        if not self.conn.autocommit:
+            self.conn.commit()
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Parallel COPY of slot_data / epoch_votes files into a loader table.
+
+A single COPY ... FROM STDIN is bound by one backend parsing CSV and forming
+tuples, so loading an epoch's files one after another on one connection leaves
+every other core idle. parallel_copy() splits the files into `jobs` groups of
+roughly equal size (largest first, each onto the lightest group), and each
+worker thread opens its own connection and COPYs its group into its own
+UNLOGGED staging table (no WAL, no contention on the target's relation
+extension lock). Once every worker has finished, the staging tables are
+merged into the target with one INSERT ... SELECT ... UNION ALL on the
+caller's connection and dropped.
+
+Staging tables are named {target}_stage_{n} and are dropped before use, so a
+crashed load never leaves rows a later load would merge.
+"""
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import psycopg2
+
+from slot_output import count_rows, open_as_csv
+
+def balance_files(files, jobs):
+    """Split files into at most `jobs` groups of roughly equal total size"""
+    groups = [[] for _ in range(max(1, min(jobs, len(files))))]
+    sizes = [0] * len(groups)
+    for path in sorted(files, key=os.path.getsize, reverse=True):
+        lightest = sizes.index(min(sizes))
+        groups[lightest].append(path)
+        sizes[lightest] += os.path.getsize(path)
+    return [group for group in groups if group]
+
+def stage_table_name(target_table, worker):
+    return f"{target_table}_stage_{worker}"
+
+def _copy_worker(db_params, target_table, stage_table, files, count):
+    """Worker: COPY one group of files into its own unlogged staging table"""
+    start = time.time()
+    file_rows = 0
+    conn = psycopg2.connect(**db_params)
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute(f"DROP TABLE IF EXISTS {stage_table}")
+            cursor.execute(f"CREATE UNLOGGED TABLE {stage_table} (LIKE {target_table})")
+            for path in files:
+                if count:
+                    file_rows += count_rows(path)
+                with open_as_csv(path) as file:
+                    cursor.copy_expert(f"COPY {stage_table} FROM STDIN WITH CSV HEADER", file)
+        conn.commit()
+    finally:
+        conn.close()
+    return stage_table, len(files), file_rows, time.time() - start
+
+def parallel_copy(conn, db_params, target_table, files, jobs, logger, count=False):
+    """COPY files into target_table over `jobs` connections and merge on conn
+
+    Returns the number of data rows in the files when count is set, otherwise 0.
+    """
+    groups = balance_files(files, jobs)
+    if not groups:
+        return 0
+    stage_tables = [stage_table_name(target_table, worker) for worker in range(len(groups))]
+    start = time.time()
+    total_rows = 0
+    try:
+        with ThreadPoolExecutor(max_workers=len(groups)) as executor:
+            futures = [executor.submit(_copy_worker, db_params, target_table, stage_table, group, count)
+                       for stage_table, group in zip(stage_tables, groups)]
+            # result() re-raises the first worker failure; the finally below drops every staging table
+            for future in futures:
+                stage_table, file_count, file_rows, elapsed = future.result()
+                total_rows += file_rows
+                logger.info(f"  ✓ {stage_table}: {file_count} files in {elapsed:.1f}s")
+        copy_elapsed = time.time() - start
+
+        with conn.cursor() as cursor:
+            cursor.execute(f"INSERT INTO {target_table} " +
+                           " UNION ALL ".join(f"SELECT * FROM {stage_table}" for stage_table in stage_tables))
+            merged_rows = cursor.rowcount
+        conn.commit()
+        logger.info(f"✅ {target_table}: {len(files)} files over {len(groups)} connections in {copy_elapsed:.1f}s, "
+                    f"merged {merged_rows:,} rows in {time.time() - start - copy_elapsed:.1f}s")
+    finally:
+        conn.rollback()  # leave a failed merge's aborted transaction before cleaning up
+        with conn.cursor() as cursor:
+            for stage_table in stage_tables:
+                cursor.execute(f"DROP TABLE IF EXISTS {stage_table}")
+        conn.commit()
+    return total_rows
@@ -0,0 +1,295 @@
+#!/usr/bin/env python3
+"""
+Shared health-scored Solana RPC client.
+
+Endpoints come from rpc_config.py (RPC_ENDPOINTS, falling back to
+RPC_ENDPOINT) or are passed in explicitly. For every endpoint the client keeps
+a latency EWMA, an error-rate EWMA and the remaining request quota reported in
+rate-limit response headers, and routes each request to the healthiest one.
+Repeated 401/429 responses trip a per-endpoint circuit breaker so a provider
+that is throttling or rejecting us is left alone for a cooldown period
+instead of stalling the callers pinned to it. Slow requests can be hedged:
+if the first endpoint has not answered after a latency-derived delay, the
+same request is sent to the next-best endpoint and the first good answer wins.
+"""
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+import requests
+
+try:
+    from rpc_config import RPC_ENDPOINTS
+except ImportError:
+    try:
+        from rpc_config import RPC_ENDPOINT
+        RPC_ENDPOINTS = [RPC_ENDPOINT]
+    except ImportError:
+        RPC_ENDPOINTS = ["https://api.mainnet-beta.solana.com"]
+
+LATENCY_EWMA_ALPHA = 0.2
+ERROR_EWMA_ALPHA = 0.1
+DEFAULT_LATENCY = 1.0            # assumed latency before an endpoint has been measured
+ERROR_PENALTY = 5.0              # seconds added to the score per unit of error rate
+REROUTE_STATUS_CODES = {401, 429, 500, 502, 503, 504}
+
+BREAKER_THRESHOLD = 3            # consecutive 401/429 responses before the breaker opens
+BREAKER_COOLDOWN = 30.0          # seconds, doubled on each re-trip
+BREAKER_MAX_COOLDOWN = 300.0
+
+HEDGE_LATENCY_FACTOR = 3.0       # hedge once a request takes this many times the endpoint EWMA
+HEDGE_MIN_DELAY = 2.0
+LOW_QUOTA_FRACTION = 0.1         # penalise endpoints reporting less than 10% of quota left
+
+QUOTA_REMAINING_HEADERS = ("x-ratelimit-remaining", "x-ratelimit-remaining-second", "ratelimit-remaining")
+QUOTA_LIMIT_HEADERS = ("x-ratelimit-limit", "x-ratelimit-limit-second", "ratelimit-limit")
+
+class RpcError(Exception):
+    """Raised when no endpoint could answer a request"""
+
+class EndpointHealth:
+    """Health statistics and circuit-breaker state for one RPC endpoint"""
+
+    def __init__(self, url):
+        self.url = url
+        self.latency_ewma = None
+        self.error_rate = 0.0
+        self.quota_remaining = None
+        self.quota_limit = None
+        self.consecutive_rejections = 0
+        self.breaker_open_until = 0.0
+        self.breaker_cooldown = BREAKER_COOLDOWN
+        self.requests = 0
+        self.failures = 0
+
+    def is_available(self, now):
+        return now >= self.breaker_open_until
+
+    def score(self):
+        """Lower is better: expected latency plus an error-rate penalty, inflated when quota is low"""
+        latency = self.latency_ewma if self.latency_ewma is not None else DEFAULT_LATENCY
+        score = latency + ERROR_PENALTY * self.error_rate
+        if self.quota_remaining is not None and self.quota_limit:
+            if self.quota_remaining / self.quota_limit < LOW_QUOTA_FRACTION:
+                score *= 4.0
+        return score
+
+    def summary(self):
+        latency = f"{self.latency_ewma:.2f}s" if self.latency_ewma is not None else "n/a"
+        quota = f"{self.quota_remaining}/{self.quota_limit}" if self.quota_remaining is not None else "n/a"
+        state = "open" if time.monotonic() < self.breaker_open_until else "closed"
+        return (f"latency={latency} error_rate={self.error_rate:.1%} quota={quota} "
+                f"breaker={state} requests={self.requests} failures={self.failures}")
+
+class RpcClient:
+    """Route JSON-RPC requests across endpoints by health, with hedging and circuit breakers"""
+
+    def __init__(self, endpoints=None, session=None, timeout=(10, 30), hedge=True, logger=None):
+        endpoints = [url for url in dict.fromkeys(endpoints or RPC_ENDPOINTS) if url]
+        if not endpoints:
+            raise ValueError("RpcClient needs at least one endpoint")
+        self.health = {url: EndpointHealth(url) for url in endpoints}
+        self.session = session or requests.Session()
+        self.timeout = timeout
+        self.hedge = hedge and len(endpoints) > 1
+        self.logger = logger or logging.getLogger(__name__)
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max(4, 2 * len(endpoints)),
+                                            thread_name_prefix="rpc_hedge") if self.hedge else None
+
+    @property
+    def endpoints(self):
+        return list(self.health)
+
+    def ranked_endpoints(self):
+        """Endpoints ordered best-first; endpoints with an open breaker go last"""
+        now = time.monotonic()
+        with self._lock:
+            available = [h for h in self.health.values() if h.is_available(now)]
+            tripped = [h for h in self.health.values() if not h.is_available(now)]
+            available.sort(key=lambda h: h.score())
+            tripped.sort(key=lambda h: h.breaker_open_until)
+        return [h.url for h in available + tripped]
+
+    def best_endpoint(self):
+        return self.ranked_endpoints()[0]
+
+    def _update_quota(self, health, response):
+        headers = response.headers
+        for name in QUOTA_REMAINING_HEADERS:
+            if name in headers:
+                try:
+                    health.quota_remaining = int(headers[name])
+                except ValueError:
+                    pass
+                break
+        for name in QUOTA_LIMIT_HEADERS:
+            if name in headers:
+                try:
+                    health.quota_limit = int(headers[name])
+                except ValueError:
+                    pass
+                break
+
+    def record(self, url, latency=None, status_code=None, ok=True, response=None):
+        """Feed the outcome of a request back into the endpoint's health"""
+        with self._lock:
+            health = self.health.get(url)
+            if health is None:
+                return
+            health.requests += 1
+            # Only successful requests feed the latency EWMA: fast 429s would make a throttled endpoint look good
+            if ok and latency is not None:
+                if health.latency_ewma is None:
+                    health.latency_ewma = latency
+                else:
+                    health.latency_ewma += LATENCY_EWMA_ALPHA * (latency - health.latency_ewma)
+            health.error_rate += ERROR_EWMA_ALPHA * ((0.0 if ok else 1.0) - health.error_rate)
+            if response is not None:
+                self._update_quota(health, response)
+
+            if ok:
+                health.consecutive_rejections = 0
+                health.breaker_cooldown = BREAKER_COOLDOWN
+                return
+
+            health.failures += 1
+            if status_code in (401, 429):
+                health.consecutive_rejections += 1
+                if health.consecutive_rejections >= BREAKER_THRESHOLD:
+                    health.breaker_open_until = time.monotonic() + health.breaker_cooldown
+                    self.logger.warning(f"RPC circuit breaker open for {health.breaker_cooldown:.0f}s: "
+                                        f"{_domain(url)} after {health.consecutive_rejections} x HTTP {status_code}")
+                    health.breaker_cooldown = min(BREAKER_MAX_COOLDOWN, health.breaker_cooldown * 2)
+                    # Allow a single probe once the cooldown expires
+                    health.consecutive_rejections = BREAKER_THRESHOLD - 1
+
+    def report_bad_result(self, url):
+        """Mark a 200 response whose JSON-RPC result was unusable (e.g. missing history) as a failure"""
+        self.record(url, ok=False)
+
+    def _post_once(self, url, payload, timeout):
+        start = time.monotonic()
+        try:
+            response = self.session.post(url, json=payload, timeout=timeout,
+                                         headers={'Content-Type': 'application/json'})
+        except requests.exceptions.RequestException:
+            self.record(url, time.monotonic() - start, ok=False)
+            raise
+        latency = time.monotonic() - start
+        self.record(url, latency, response.status_code, ok=response.status_code == 200, response=response)
+        return response
+
+    def _hedge_delay(self, url):
+        with self._lock:
+            latency = self.health[url].latency_ewma
+        if latency is None:
+            return None
+        return max(HEDGE_MIN_DELAY, latency * HEDGE_LATENCY_FACTOR)
+
+    def batch_endpoint(self, batch_limits):
+        """Return (url, batch_size) for the healthiest endpoint, batch_size taken from batch_limits (default 1)"""
+        url = self.best_endpoint()
+        return url, max(1, batch_limits.get(url, 1))
+
+    def post(self, payload, endpoint=None, timeout=None, batch_limits=None):
+        """POST a JSON-RPC payload and return (response, endpoint_url).
+
+        With endpoint=None the healthiest endpoint is used, falling through to
+        the next one on transport errors and 401/429/5xx responses; if hedging
+        is enabled a slow request is duplicated to the runner-up. Passing endpoint pins the request to
+        that URL (health is still recorded). batch_limits maps endpoint URL to
+        the largest JSON-RPC batch it accepts; a batch payload is then only
+        routed (and hedged) to endpoints whose limit covers it. The response
+        may be a non-200 HTTP response - callers keep their own status handling.
+        """
+        timeout = timeout or self.timeout
+        if endpoint is not None:
+            return self._post_once(endpoint, payload, timeout), endpoint
+
+        ranked = self.ranked_endpoints()
+        if batch_limits is not None and isinstance(payload, list):
+            eligible = [url for url in ranked if batch_limits.get(url, 1) >= len(payload)]
+            ranked = eligible or ranked
+        last_error = None
+        rejected = None
+        for position, url in enumerate(ranked):
+            runner_up = ranked[position + 1] if position + 1 < len(ranked) else None
+            try:
+                if self.hedge and runner_up is not None:
+                    response, answered_by = self._post_hedged(url, runner_up, payload, timeout)
+                else:
+                    response, answered_by = self._post_once(url, payload, timeout), url
+            except requests.exceptions.RequestException as e:
+                last_error = e
+                self.logger.warning(f"RPC request to {_domain(url)} failed: {type(e).__name__} - trying next endpoint")
+                continue
+            if response.status_code not in REROUTE_STATUS_CODES:
+                return response, answered_by
+            rejected = rejected or (response, answered_by)
+        if rejected is not None:
+            # Every endpoint refused; hand back the first rejection so the caller can back off
+            return rejected
+        raise RpcError(f"All RPC endpoints failed: {last_error}")
+
+    def _post_hedged(self, primary, secondary, payload, timeout):
+        delay = self._hedge_delay(primary)
+        futures = {self._executor.submit(self._post_once, primary, payload, timeout): primary}
+        done, _ = wait(futures, timeout=delay)
+        if not done:
+            futures[self._executor.submit(self._post_once, secondary, payload, timeout)] = secondary
+
+        pending = set(futures)
+        last_error = None
+        fallback = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                try:
+                    response = future.result()
+                except requests.exceptions.RequestException as e:
+                    last_error = e
+                    continue
+                if response.status_code == 200:
+                    return response, futures[future]
+                fallback = fallback or (response, futures[future])
+        if fallback is not None:
+            return fallback
+        raise last_error
+
+    def call(self, method, params=None, endpoint=None, timeout=None, retries=3, retry_delay=1.0):
+        """Make a JSON-RPC call and return its result, retrying across endpoints.
+
+        Raises RpcError if every attempt fails or returns a JSON-RPC error.
+        """
+        payload = {"jsonrpc": "2.0", "id": 1, "method": method}
+        if params is not None:
+            payload["params"] = params
+
+        last_error = None
+        for attempt in range(retries):
+            try:
+                response, url = self.post(payload, endpoint=endpoint, timeout=timeout)
+            except RpcError as e:
+                last_error = str(e)
+            else:
+                if response.status_code == 200:
+                    body = response.json()
+                    if body.get("result") is not None:
+                        return body["result"]
+                    last_error = f"{_domain(url)}: {body.get('error', 'empty result')}"
+                    self.report_bad_result(url)
+                else:
+                    last_error = f"{_domain(url)}: HTTP {response.status_code}"
+            if attempt < retries - 1:
+                time.sleep(retry_delay)
+        raise RpcError(f"{method} failed after {retries} attempts: {last_error}")
+
+    def log_health(self, logger=None):
+        logger = logger or self.logger
+        for url, health in self.health.items():
+            logger.info(f"  {_domain(url)}: {health.summary()}")
+
+def _domain(url):
+    return url.split('://', 1)[-1].split('/')[0]
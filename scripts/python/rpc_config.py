@@ -1,2 +1,10 @@
 # Centralized RPC endpoint configuration
 RPC_ENDPOINT = "https://solana-mainnet.g.alchemy.com/v2/97zE6cvElUYwOp_zVSqMXt5H7dYSYxtW"
+
+# getBlock calls per JSON-RPC batch for get_epoch_data_csv.py, keyed by provider domain
+# (e.g. {'alchemy.com': 10}); endpoints not listed send one request per slot
+RPC_BATCH_SIZES = {}
+
+# Endpoint pool for rpc_client.RpcClient, which routes each request to the healthiest
+# endpoint; add further providers here to spread load and survive throttling
+RPC_ENDPOINTS = [RPC_ENDPOINT]
@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+Set-based slot-chain verification for validator_data-shaped tables.
+
+Every produced block names its parent_slot; in a complete epoch every parent
+except the one of the first block is itself a produced block in the table.
+Instead of pulling every (block_slot, parent_slot) row into Python, the checks
+run server-side, grouped by epoch, and only counts plus a few examples per
+epoch come back:
+
+    missing parents  anti-join of parent_slot against block_slot (the first
+                     block of each epoch is exempt - its parent is in the
+                     previous epoch)
+    duplicates       block_slot values loaded more than once
+    chain breaks     parent_slot differs from the previous produced slot
+                     (LAG over block_slot) although the parent is present,
+                     i.e. a fork block or an out-of-order parent
+
+91_load_consolidated_csv.py runs it on temp_validator_data after the COPY; it
+also sweeps validator_data across many epochs:
+
+    python3 slot_chain.py 700 750
+"""
+import argparse
+import importlib.util
+import os
+import sys
+
+EXAMPLE_LIMIT = 20
+
+def _where(epochs):
+    if epochs is None:
+        return "", ()
+    return "WHERE epoch = ANY(%s)", (list(epochs),)
+
+def _examples(cursor, query, params, limit):
+    """Run a per-epoch finding query; returns {epoch: (total, [example rows])}"""
+    cursor.execute(f"""
+        SELECT * FROM (
+            SELECT f.*,
+                   ROW_NUMBER() OVER (PARTITION BY f.epoch ORDER BY f.block_slot) AS rn,
+                   COUNT(*) OVER (PARTITION BY f.epoch) AS total
+            FROM ({query}) f
+        ) ranked
+        WHERE rn <= %s
+        ORDER BY epoch, block_slot
+    """, params + (limit,))
+    findings = {}
+    for row in cursor.fetchall():
+        epoch, total = row[0], row[-1]
+        findings.setdefault(epoch, (total, []))[1].append(row[1:-2])
+    return findings
+
+def verify_slot_chain(cursor, table="validator_data", epochs=None, limit=EXAMPLE_LIMIT):
+    """Verify the parent-slot chain of table per epoch; returns {epoch: summary dict}"""
+    where, params = _where(epochs)
+    cursor.execute(f"""
+        SELECT epoch, COUNT(*), COUNT(DISTINCT block_slot), MIN(block_slot), MAX(block_slot)
+        FROM {table} {where}
+        GROUP BY epoch
+        ORDER BY epoch
+    """, params)
+    results = {}
+    for epoch, rows, slots, first_slot, last_slot in cursor.fetchall():
+        results[epoch] = {'epoch': epoch, 'rows': rows, 'slots': slots, 'first_slot': first_slot, 'last_slot': last_slot,
+                          'missing_parents': 0, 'duplicates': 0, 'chain_breaks': 0,
+                          'missing_examples': [], 'duplicate_examples': [], 'break_examples': []}
+
+    missing = _examples(cursor, f"""
+        SELECT c.epoch, c.block_slot, c.parent_slot
+        FROM (SELECT epoch, block_slot, parent_slot, MIN(block_slot) OVER (PARTITION BY epoch) AS first_slot
+              FROM {table} {where}) c
+        WHERE c.block_slot <> c.first_slot
+          AND NOT EXISTS (SELECT 1 FROM {table} p WHERE p.epoch = c.epoch AND p.block_slot = c.parent_slot)
+    """, params, limit)
+    duplicates = _examples(cursor, f"""
+        SELECT epoch, block_slot, array_agg(parent_slot ORDER BY parent_slot) AS parent_slots
+        FROM {table} {where}
+        GROUP BY epoch, block_slot
+        HAVING COUNT(*) > 1
+    """, params, limit)
+    breaks = _examples(cursor, f"""
+        SELECT epoch, block_slot, parent_slot, previous_slot
+        FROM (SELECT epoch, block_slot, parent_slot,
+                     LAG(block_slot) OVER (PARTITION BY epoch ORDER BY block_slot, parent_slot) AS previous_slot
+              FROM {table} {where}) c
+        WHERE previous_slot IS NOT NULL AND previous_slot <> block_slot AND parent_slot <> previous_slot
+          AND EXISTS (SELECT 1 FROM {table} p WHERE p.epoch = c.epoch AND p.block_slot = c.parent_slot)
+    """, params, limit)
+
+    for key, findings in (('missing', missing), ('duplicate', duplicates), ('break', breaks)):
+        count_key = {'missing': 'missing_parents', 'duplicate': 'duplicates', 'break': 'chain_breaks'}[key]
+        for epoch, (total, examples) in findings.items():
+            if epoch in results:
+                results[epoch][count_key] = total
+                results[epoch][f'{key}_examples'] = examples
+    return results
+
+def format_report(results):
+    """Compact text report: one summary line per epoch plus example findings"""
+    lines = []
+    for result in results.values():
+        lines.append(f"Epoch {result['epoch']}: {result['slots']:,} slots ({result['rows']:,} rows) "
+                     f"{result['first_slot']}-{result['last_slot']} - missing parents: {result['missing_parents']:,}, "
+                     f"duplicate slots: {result['duplicates']:,}, chain breaks: {result['chain_breaks']:,}")
+        for block_slot, parent_slot in result['missing_examples']:
+            lines.append(f"  Error: Parent slot {parent_slot} not found for block slot {block_slot}")
+        for block_slot, parent_slots in result['duplicate_examples']:
+            lines.append(f"  Warning: Duplicate entries found for block slot {block_slot}. Parent slots: {', '.join(map(str, parent_slots))}")
+        for block_slot, parent_slot, previous_slot in result['break_examples']:
+            lines.append(f"  Warning: Block slot {block_slot} has parent {parent_slot} but the previous block is {previous_slot}")
+        shown = len(result['missing_examples']) + len(result['duplicate_examples']) + len(result['break_examples'])
+        hidden = result['missing_parents'] + result['duplicates'] + result['chain_breaks'] - shown
+        if hidden > 0:
+            lines.append(f"  ... {hidden:,} more findings not shown")
+    return "\n".join(lines)
+
+def main():
+    import psycopg2
+    from db_config import db_params
+
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+    spec = importlib.util.spec_from_file_location("logging_config", os.path.join(script_dir, "999_logging_config.py"))
+    logging_config = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(logging_config)
+    logger = logging_config.setup_logging(os.path.basename(__file__).replace('.py', ''))
+
+    parser = argparse.ArgumentParser(description='Verify the parent-slot chain per epoch')
+    parser.add_argument('start_epoch', type=int)
+    parser.add_argument('end_epoch', type=int, nargs='?', help='Last epoch to verify (default: start_epoch)')
+    parser.add_argument('--table', default='validator_data')
+    parser.add_argument('--examples', type=int, default=EXAMPLE_LIMIT, help='Example findings per epoch and check')
+    args = parser.parse_args()
+    end_epoch = args.end_epoch if args.end_epoch is not None else args.start_epoch
+
+    conn = psycopg2.connect(**db_params)
+    try:
+        with conn.cursor() as cursor:
+            results = verify_slot_chain(cursor, args.table, range(args.start_epoch, end_epoch + 1), args.examples)
+    finally:
+        conn.close()
+
+    print(format_report(results))
+    broken = [epoch for epoch, result in results.items() if result['missing_parents'] or result['duplicates']]
+    logger.info(f"Verified {len(results)} epochs - {len(broken)} with missing parents or duplicates"
+                + (f": {', '.join(map(str, broken))}" if broken else ""))
+    sys.exit(1 if broken else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,276 @@
+#!/usr/bin/env python3
+"""
+Persistent per-epoch slot completion index.
+
+The get_slots collector records every slot as it is written to a
+slot_data CSV (produced) or confirmed skipped (-32007/-32009). State lives in
+the epoch directory as two files:
+
+    slot_completion.log  append-only 5-byte records (slot offset, status)
+    slot_completion.idx  bitmap snapshot: header + produced bitmap + skipped bitmap
+
+Readers load the snapshot (2 x 54KB for a 432,000-slot epoch) and replay the
+log tail written since, instead of re-parsing every run*/slot_data_thread_*.csv
+(or .parquet) and solana*rpc*errors.log. get_epoch_data_csv.py, 999_slots_progressing.py and
+999_monitor_get_slots.py all read it.
+"""
+import glob
+import os
+import struct
+import threading
+
+from slot_output import find_output_files, read_column
+
+SNAPSHOT_FILE = "slot_completion.idx"
+LOG_FILE = "slot_completion.log"
+
+SLOTS_PER_EPOCH = 432000
+
+STATUS_PRODUCED = 1
+STATUS_SKIPPED = 2
+
+SNAPSHOT_MAGIC = b"SLCI"
+SNAPSHOT_VERSION = 1
+SNAPSHOT_HEADER = struct.Struct("<4sHIQIQ")  # magic, version, epoch, start_slot, slot_count, log_offset
+LOG_RECORD = struct.Struct("<IB")             # slot offset within the epoch, status
+
+SNAPSHOT_EVERY = 5000  # log appends between bitmap snapshots
+
+def _popcount(bitmap):
+    return bin(int.from_bytes(bitmap, "little")).count("1")
+
+class SlotCompletionIndex:
+    """Produced/skipped bitmaps for one epoch, backed by an append-only log and snapshot"""
+
+    def __init__(self, epoch_dir, epoch_number, start_slot, slot_count=SLOTS_PER_EPOCH):
+        self.epoch_dir = epoch_dir
+        self.epoch_number = epoch_number
+        self.start_slot = start_slot
+        self.slot_count = slot_count
+        self.produced = bytearray((slot_count + 7) // 8)
+        self.skipped = bytearray((slot_count + 7) // 8)
+        self._lock = threading.Lock()
+        self._log = None
+        self._appends_since_snapshot = 0
+
+    @property
+    def snapshot_path(self):
+        return os.path.join(self.epoch_dir, SNAPSHOT_FILE)
+
+    @property
+    def log_path(self):
+        return os.path.join(self.epoch_dir, LOG_FILE)
+
+    @staticmethod
+    def exists(epoch_dir):
+        return os.path.exists(os.path.join(epoch_dir, SNAPSHOT_FILE))
+
+    @classmethod
+    def load(cls, epoch_dir):
+        """Load the index for an epoch directory, or return None if it has not been built"""
+        snapshot_path = os.path.join(epoch_dir, SNAPSHOT_FILE)
+        if not os.path.exists(snapshot_path):
+            return None
+
+        with open(snapshot_path, "rb") as f:
+            header = f.read(SNAPSHOT_HEADER.size)
+            magic, version, epoch_number, start_slot, slot_count, log_offset = SNAPSHOT_HEADER.unpack(header)
+            if magic != SNAPSHOT_MAGIC or version != SNAPSHOT_VERSION:
+                raise ValueError(f"Unrecognised slot completion snapshot: {snapshot_path}")
+            index = cls(epoch_dir, epoch_number, start_slot, slot_count)
+            bitmap_size = len(index.produced)
+            index.produced[:] = f.read(bitmap_size)
+            index.skipped[:] = f.read(bitmap_size)
+
+        index._replay_log(log_offset)
+        return index
+
+    @classmethod
+    def open_or_build(cls, epoch_dir, epoch_number, start_slot, slot_count=SLOTS_PER_EPOCH, logger=None):
+        """Load the index, building it once from existing run*/ outputs if it does not exist yet"""
+        index = cls.load(epoch_dir)
+        if index is not None:
+            if index.start_slot != start_slot:
+                raise ValueError(f"Slot completion index in {epoch_dir} starts at {index.start_slot}, expected {start_slot}")
+            return index
+
+        index = cls(epoch_dir, epoch_number, start_slot, slot_count)
+        index.rebuild(logger)
+        return index
+
+    def rebuild(self, logger=None):
+        """Reset the index from the slot_data CSVs and RPC error logs already on disk"""
+        produced, skipped = scan_epoch_outputs(self.epoch_dir, self.start_slot, self.end_slot, logger)
+        with self._lock:
+            self.produced[:] = bytes(len(self.produced))
+            self.skipped[:] = bytes(len(self.skipped))
+            for slot in produced:
+                self._set(self.produced, slot - self.start_slot)
+            for slot in skipped - produced:
+                self._set(self.skipped, slot - self.start_slot)
+            if os.path.exists(self.log_path):
+                os.remove(self.log_path)
+            self._write_snapshot(0)
+        if logger:
+            logger.info(f"Built slot completion index for epoch {self.epoch_number}: "
+                        f"{len(produced):,} produced, {len(skipped - produced):,} skipped")
+
+    @property
+    def end_slot(self):
+        return self.start_slot + self.slot_count - 1
+
+    @staticmethod
+    def _set(bitmap, offset):
+        bitmap[offset >> 3] |= 1 << (offset & 7)
+
+    @staticmethod
+    def _get(bitmap, offset):
+        return bitmap[offset >> 3] & (1 << (offset & 7))
+
+    def _replay_log(self, log_offset):
+        if not os.path.exists(self.log_path):
+            return
+        with open(self.log_path, "rb") as f:
+            f.seek(log_offset)
+            data = f.read()
+        # Ignore a partially written trailing record
+        data = data[:len(data) - len(data) % LOG_RECORD.size]
+        for offset, status in LOG_RECORD.iter_unpack(data):
+            if offset >= self.slot_count:
+                continue
+            self._set(self.produced if status == STATUS_PRODUCED else self.skipped, offset)
+
+    def _write_snapshot(self, log_offset):
+        tmp_path = self.snapshot_path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(SNAPSHOT_HEADER.pack(SNAPSHOT_MAGIC, SNAPSHOT_VERSION, self.epoch_number,
+                                         self.start_slot, self.slot_count, log_offset))
+            f.write(self.produced)
+            f.write(self.skipped)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.snapshot_path)
+
+    def _record(self, slot, status):
+        offset = slot - self.start_slot
+        if not 0 <= offset < self.slot_count:
+            return
+        with self._lock:
+            self._set(self.produced if status == STATUS_PRODUCED else self.skipped, offset)
+            if self._log is None:
+                self._log = open(self.log_path, "ab")
+            self._log.write(LOG_RECORD.pack(offset, status))
+            self._log.flush()
+            self._appends_since_snapshot += 1
+            if self._appends_since_snapshot >= SNAPSHOT_EVERY:
+                self._write_snapshot(self._log.tell())
+                self._appends_since_snapshot = 0
+
+    def mark_produced(self, slot):
+        """Record a slot whose block has been written to a slot_data CSV"""
+        self._record(slot, STATUS_PRODUCED)
+
+    def mark_skipped(self, slot):
+        """Record a slot the RPC confirmed was skipped (-32007/-32009)"""
+        self._record(slot, STATUS_SKIPPED)
+
+    def mark_skipped_many(self, slots):
+        """Record many skipped slots (e.g. from a getBlocks pre-pass) with one log write"""
+        records = []
+        with self._lock:
+            for slot in slots:
+                offset = slot - self.start_slot
+                if 0 <= offset < self.slot_count:
+                    self._set(self.skipped, offset)
+                    records.append(LOG_RECORD.pack(offset, STATUS_SKIPPED))
+            if not records:
+                return
+            if self._log is None:
+                self._log = open(self.log_path, "ab")
+            self._log.write(b"".join(records))
+            self._log.flush()
+            self._write_snapshot(self._log.tell())
+            self._appends_since_snapshot = 0
+
+    def is_complete(self, slot):
+        offset = slot - self.start_slot
+        if not 0 <= offset < self.slot_count:
+            return False
+        return bool(self._get(self.produced, offset) or self._get(self.skipped, offset))
+
+    def missing_slots(self, start_slot=None, end_slot=None):
+        """Slots in [start_slot, end_slot] that are neither produced nor skipped"""
+        start_offset = max(0, (start_slot if start_slot is not None else self.start_slot) - self.start_slot)
+        end_offset = min(self.slot_count - 1, (end_slot if end_slot is not None else self.end_slot) - self.start_slot)
+        missing = []
+        with self._lock:
+            done = bytes(p | s for p, s in zip(self.produced, self.skipped))
+        offset = start_offset
+        while offset <= end_offset:
+            byte_index = offset >> 3
+            # Skip whole bytes that are fully complete
+            if offset & 7 == 0 and done[byte_index] == 0xFF and offset + 7 <= end_offset:
+                offset += 8
+                continue
+            if not done[byte_index] & (1 << (offset & 7)):
+                missing.append(self.start_slot + offset)
+            offset += 1
+        return missing
+
+    def counts(self):
+        """Return (produced, skipped) slot counts"""
+        with self._lock:
+            produced = _popcount(self.produced)
+            skipped = _popcount(bytes(s & ~p & 0xFF for p, s in zip(self.produced, self.skipped)))
+        return produced, skipped
+
+    def close(self):
+        """Flush a final snapshot so the next reader replays no log"""
+        with self._lock:
+            if self._log is not None:
+                self._write_snapshot(self._log.tell())
+                self._log.close()
+                self._log = None
+                self._appends_since_snapshot = 0
+
+def scan_epoch_outputs(epoch_dir, start_slot, end_slot, logger=None):
+    """Scan slot_data CSVs and RPC error logs in an epoch directory and its run*/ directories.
+
+    Returns (produced_slots, skipped_slots) as sets. This is the slow path the
+    index replaces; it is only used to build the index the first time.
+    """
+    produced = set()
+    skipped = set()
+    directories = [epoch_dir] + sorted(glob.glob(os.path.join(epoch_dir, "run*")))
+
+    for directory in directories:
+        if not os.path.isdir(directory):
+            continue
+        for file in find_output_files(directory, "slot_data_thread"):
+            try:
+                for value in read_column(file, 'block_slot'):
+                    try:
+                        slot = int(value)
+                    except (TypeError, ValueError):
+                        continue
+                    if start_slot <= slot <= end_slot:
+                        produced.add(slot)
+            except (OSError, KeyError) as e:
+                if logger:
+                    logger.warning(f"Error reading {file}: {e}")
+
+        for file in glob.glob(os.path.join(directory, "solana*rpc*errors.log")):
+            try:
+                with open(file, "r") as f:
+                    for line in f:
+                        if "-32007" in line or "-32009" in line:
+                            first_column = line.split(',')[0]
+                            if first_column.isdigit():
+                                slot = int(first_column)
+                                if start_slot <= slot <= end_slot:
+                                    skipped.add(slot)
+            except OSError as e:
+                if logger:
+                    logger.warning(f"Error reading error log {file}: {e}")
+
+    return produced, skipped
@@ -0,0 +1,260 @@
+#!/usr/bin/env python3
+"""
+slot_data / epoch_votes output files for the get_slots collector.
+
+The collector writes each task's blocks through a SlotOutput, which holds the
+slot_data and epoch_votes files (plus vote_latency files with --vote-latency)
+for that task in one of two formats:
+
+    csv      slot_data_*.csv / epoch_votes_*.csv via csv.DictWriter (default)
+    parquet  slot_data_*.parquet / epoch_votes_*.parquet, typed and
+             dictionary-encoded (the repeated pubkeys and block hashes in the
+             vote rows compress to a small fraction of the CSV), zstd-compressed,
+             written in row groups of PARQUET_ROW_GROUP_ROWS
+
+A CSV row is durable once flushed, so produced slots are reported to the
+on_durable callback at every commit(). A Parquet file is only readable once
+its footer is written, so those slots are reported when the file is closed;
+parquet files are written as *.tmp and renamed on close, so a crashed task
+leaves nothing a reader would pick up.
+
+find_output_files(), read_column(), count_rows() and open_as_csv() let the
+loader and monitors read either format. Parquet support needs pyarrow; CSV
+works without it.
+"""
+import csv
+import glob
+import io
+import os
+
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+
+OUTPUT_FORMATS = ("csv", "parquet")
+PARQUET_ROW_GROUP_ROWS = 100000
+
+SLOT_DATA_FIELDNAMES = ["identity_pubkey", "epoch", "block_slot", "block_hash", "block_time", "rewards", "post_balance", "reward_type", "commission",
+                        "total_user_tx", "total_vote_tx", "total_cu", "total_signature_fees", "total_priority_fees", "total_fees",
+                        "total_tx", "total_signatures", "total_validator_fees", "total_validator_signature_fees", "total_validator_priority_fees",
+                        "block_height", "parent_slot", "previous_block_hash"]
+VOTE_DATA_FIELDNAMES = ["epoch", "block_slot", "block_hash", "identity_pubkey", "vote_account_pubkey"]
+VOTE_LATENCY_FIELDNAMES = ["epoch", "block_slot", "block_hash", "identity_pubkey", "vote_account_pubkey",
+                           "block_voted_on", "signature", "latency"]
+
+def _schemas():
+    slot_types = {
+        "identity_pubkey": pa.string(), "epoch": pa.int32(), "block_slot": pa.int64(), "block_hash": pa.string(),
+        "block_time": pa.int64(), "rewards": pa.int64(), "post_balance": pa.int64(), "reward_type": pa.string(),
+        "commission": pa.int32(), "total_user_tx": pa.int64(), "total_vote_tx": pa.int64(), "total_cu": pa.int64(),
+        "total_signature_fees": pa.int64(), "total_priority_fees": pa.int64(), "total_fees": pa.int64(),
+        "total_tx": pa.int64(), "total_signatures": pa.int64(),
+        "total_validator_fees": pa.int64(), "total_validator_signature_fees": pa.int64(),
+        "total_validator_priority_fees": pa.int64(),
+        "block_height": pa.int64(), "parent_slot": pa.int64(), "previous_block_hash": pa.string(),
+    }
+    vote_types = {
+        "epoch": pa.int32(), "block_slot": pa.int64(), "block_hash": pa.string(),
+        "identity_pubkey": pa.string(), "vote_account_pubkey": pa.string(),
+        "block_voted_on": pa.int64(), "signature": pa.string(), "latency": pa.int64(),
+    }
+    return (pa.schema([(name, slot_types[name]) for name in SLOT_DATA_FIELDNAMES]),
+            pa.schema([(name, vote_types[name]) for name in VOTE_DATA_FIELDNAMES]),
+            pa.schema([(name, vote_types[name]) for name in VOTE_LATENCY_FIELDNAMES]))
+
+class _CsvFile:
+    durable_on_flush = True
+
+    def __init__(self, path, fieldnames):
+        self.path = path
+        self._file = open(path, 'w', newline='')
+        self._writer = csv.DictWriter(self._file, fieldnames=fieldnames)
+        self._writer.writeheader()
+
+    def writerows(self, rows):
+        self._writer.writerows(rows)
+
+    def flush(self):
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+class _ParquetFile:
+    durable_on_flush = False
+
+    def __init__(self, path, schema):
+        self.path = path
+        self._tmp_path = path + ".tmp"
+        self._schema = schema
+        self._columns = {name: [] for name in schema.names}
+        self._rows = 0
+        self._writer = pq.ParquetWriter(self._tmp_path, schema, compression="zstd", use_dictionary=True)
+
+    def writerows(self, rows):
+        for row in rows:
+            for name, values in self._columns.items():
+                values.append(row.get(name))
+        self._rows += len(rows)
+        if self._rows >= PARQUET_ROW_GROUP_ROWS:
+            self._write_row_group()
+
+    def _write_row_group(self):
+        if not self._rows:
+            return
+        table = pa.Table.from_pydict(self._columns, schema=self._schema)
+        self._writer.write_table(table, row_group_size=PARQUET_ROW_GROUP_ROWS)
+        self._columns = {name: [] for name in self._schema.names}
+        self._rows = 0
+
+    def flush(self):
+        # Row groups are written as they fill; the file is not readable before close() anyway
+        pass
+
+    def close(self):
+        self._write_row_group()
+        self._writer.close()
+        os.replace(self._tmp_path, self.path)
+
+class SlotOutput:
+    """The slot_data and epoch_votes files for one collector task"""
+
+    def __init__(self, slot_base, vote_base, output_format="csv", on_durable=None, report_rows=True, latency_base=None):
+        if output_format not in OUTPUT_FORMATS:
+            raise ValueError(f"Unknown output format {output_format!r}; expected one of {OUTPUT_FORMATS}")
+        self.latency_file = None
+        if output_format == "parquet":
+            if pa is None:
+                raise RuntimeError("pyarrow is required for --output-format parquet (pip install pyarrow)")
+            slot_schema, vote_schema, latency_schema = _schemas()
+            self.slot_file = _ParquetFile(slot_base + ".parquet", slot_schema)
+            self.vote_file = _ParquetFile(vote_base + ".parquet", vote_schema)
+            if latency_base is not None:
+                self.latency_file = _ParquetFile(latency_base + ".parquet", latency_schema)
+        else:
+            self.slot_file = _CsvFile(slot_base + ".csv", SLOT_DATA_FIELDNAMES)
+            self.vote_file = _CsvFile(vote_base + ".csv", VOTE_DATA_FIELDNAMES)
+            if latency_base is not None:
+                self.latency_file = _CsvFile(latency_base + ".csv", VOTE_LATENCY_FIELDNAMES)
+        self.output_format = output_format
+        self.on_durable = on_durable
+        # Parquet holds uncommitted blocks until close; don't pin their vote rows unless the callback needs them
+        self.report_rows = report_rows
+        self._uncommitted = []
+        self._closed = False
+
+    @property
+    def slot_path(self):
+        return self.slot_file.path
+
+    @property
+    def vote_path(self):
+        return self.vote_file.path
+
+    def add(self, slot, slot_row, vote_rows, latency_rows=()):
+        """Write one produced block; it is reported to on_durable once committed to disk"""
+        if slot_row:
+            self.slot_file.writerows([slot_row])
+        self.vote_file.writerows(vote_rows)
+        if self.latency_file is not None and latency_rows:
+            self.latency_file.writerows(latency_rows)
+        if self.report_rows:
+            self._uncommitted.append((slot, slot_row, vote_rows))
+        else:
+            self._uncommitted.append((slot, None, ()))
+
+    def commit(self):
+        """Flush written blocks and report them if the format makes them durable on flush"""
+        self.slot_file.flush()
+        self.vote_file.flush()
+        if self.latency_file is not None:
+            self.latency_file.flush()
+        if self.slot_file.durable_on_flush:
+            self._report()
+
+    def _report(self):
+        uncommitted, self._uncommitted = self._uncommitted, []
+        if self.on_durable is not None:
+            for slot, slot_row, vote_rows in uncommitted:
+                self.on_durable(slot, slot_row, vote_rows)
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        self.slot_file.close()
+        self.vote_file.close()
+        if self.latency_file is not None:
+            self.latency_file.close()
+        self._report()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+def find_output_files(directory, kind):
+    """slot_data or epoch_votes files in a directory, in either format"""
+    return sorted(glob.glob(os.path.join(directory, f"{kind}_*.csv")) +
+                  glob.glob(os.path.join(directory, f"{kind}_*.parquet")))
+
+def read_column(path, column):
+    """Read one column of a slot_data/epoch_votes file as a list"""
+    if path.endswith(".parquet"):
+        if pa is None:
+            raise RuntimeError(f"pyarrow is required to read {path}")
+        return pq.read_table(path, columns=[column]).column(column).to_pylist()
+    with open(path, "r") as f:
+        return [row[column] for row in csv.DictReader(f)]
+
+def count_rows(path):
+    """Data rows in a slot_data/epoch_votes file"""
+    if path.endswith(".parquet"):
+        if pa is None:
+            raise RuntimeError(f"pyarrow is required to read {path}")
+        return pq.ParquetFile(path).metadata.num_rows
+    with open(path, "r") as f:
+        return max(0, sum(1 for _ in f) - 1)
+
+class _ParquetCsvReader(io.RawIOBase):
+    """Raw byte stream of a Parquet file as CSV, converted one row group at a time"""
+
+    def __init__(self, path):
+        self._file = pq.ParquetFile(path)
+        self._next_group = 0
+        self._pending = memoryview(b"")
+
+    def readable(self):
+        return True
+
+    def _fill(self):
+        while not self._pending and self._next_group < self._file.num_row_groups:
+            buffer = io.BytesIO()
+            options = pa_csv.WriteOptions(include_header=self._next_group == 0)
+            pa_csv.write_csv(self._file.read_row_group(self._next_group), buffer, write_options=options)
+            self._next_group += 1
+            self._pending = memoryview(buffer.getvalue())
+        if not self._pending and self._next_group == 0:
+            # No row groups at all: still hand COPY ... HEADER its header line
+            self._next_group = 1
+            self._pending = memoryview((",".join(self._file.schema_arrow.names) + "\n").encode())
+
+    def readinto(self, target):
+        self._fill()
+        count = min(len(target), len(self._pending))
+        target[:count] = self._pending[:count]
+        self._pending = self._pending[count:]
+        return count
+
+def open_as_csv(path):
+    """Return a readable text stream of CSV with a header row, for COPY ... FROM STDIN WITH CSV HEADER"""
+    if not path.endswith(".parquet"):
+        return open(path, "r")
+    if pa is None:
+        raise RuntimeError(f"pyarrow is required to read {path}")
+    return io.TextIOWrapper(io.BufferedReader(_ParquetCsvReader(path)), encoding="utf-8")
@@ -1,3 +1,4 @@
+import argparse
 import sys
 import os
 from sqlalchemy import create_engine
@@ -17,19 +18,48 @@ sys.path.insert(0, current_dir)
 from db_operations import get_validator_stats, get_epoch_aggregate_data, write_validator_stats_to_json, write_epoch_aggregate_data_to_json, get_min_max_epochs
 from epoch_aggregation import generate_last_ten_epochs_data, generate_ten_epoch_validator_rewards, generate_ten_epoch_aggregate_data, generate_weighted_average_validator_rewards
 from stake_statistics import calculate_stake_statistics, calculate_stake_statistics_metro
+from rolling_windows import update_rolling_windows
 from visualizations import plot_votes_cast_metrics, plot_latency_and_consensus_charts, plot_epoch_comparison_charts, plot_epoch_metrics_with_stake_colors
-from utils import get_output_path
+from epoch_pool import run_epochs
 
 # Initialize logger
 logger = setup_logging('build_leaderboard')
 
-def main(start_epoch=None, end_epoch=None):
+DEBUG = True
+
+def process_epoch(epoch, max_epoch, engine):
+    """Build one epoch's JSON and stake statistics files; returns False when epoch_aggregate_data is missing"""
+    print(f"Processing epoch: {epoch}")
+    try:
+        logger.info(f"get_validator_stats for epoch {epoch}")
+        validator_stats = get_validator_stats(epoch, engine, debug=DEBUG)
+        logger.info(f"write_validator_stats_to_json for epoch {epoch}")
+        write_validator_stats_to_json(epoch, validator_stats)
+        epoch_aggregate_data = get_epoch_aggregate_data(epoch, engine)
+        if epoch_aggregate_data is not None:
+            logger.info(f"write_epoch_aggregate_data_to_json for epoch {epoch}")
+            write_epoch_aggregate_data_to_json(epoch, epoch_aggregate_data)
+        else:
+            logger.warning(f"Skipping epoch_aggregate_data for epoch {epoch} due to missing data")
+
+        logger.info(f"calculate_stake_statistics for epoch {epoch}")
+        # Writes the epoch{epoch}_*_stats.csv files itself
+        calculate_stake_statistics(epoch, max_epoch, engine)
+
+        logger.info(f"calculate_stake_statistics_metro for epoch {epoch}")
+        calculate_stake_statistics_metro(epoch, max_epoch, engine)
+        return epoch_aggregate_data is not None
+
+    except Exception as e:
+        logger.error(f"Failed to process epoch {epoch}: {str(e)}")
+        return None
+
+def main(start_epoch=None, end_epoch=None, jobs=1):
     engine = create_engine(
         f"postgresql+psycopg2://{db_params['user']}@{db_params['host']}:{db_params['port']}/{db_params['database']}?sslmode={db_params['sslmode']}"
     )
     
     min_epoch, max_epoch = get_min_max_epochs(engine)
-    DEBUG = True
     if DEBUG:
         print("\nAvailable epoch range:")
         print(f"Minimum epoch: {min_epoch}")
@@ -73,42 +103,7 @@ def main(start_epoch=None, end_epoch=None):
                     print("Please enter a valid integer.")
 
     epochs = range(start_epoch, end_epoch + 1)
-    missing_data_epochs = []
-
-    for epoch in epochs:
-        print(f"Processing epoch: {epoch}")
-        try:
-            logger.info(f"get_validator_stats for epoch {epoch}")
-            validator_stats = get_validator_stats(epoch, engine, debug=DEBUG)
-            logger.info(f"write_validator_stats_to_json for epoch {epoch}")
-            write_validator_stats_to_json(epoch, validator_stats)
-            epoch_aggregate_data = get_epoch_aggregate_data(epoch, engine)
-            if epoch_aggregate_data is not None:
-                logger.info(f"write_epoch_aggregate_data_to_json for epoch {epoch}")
-                write_epoch_aggregate_data_to_json(epoch, epoch_aggregate_data)
-            else:
-                logger.warning(f"Skipping epoch_aggregate_data for epoch {epoch} due to missing data")
-                missing_data_epochs.append(epoch)
-
-            logger.info(f"calculate_stake_statistics for epoch {epoch}")
-            country_df, continent_df, region_df = calculate_stake_statistics(epoch, max_epoch, engine)
-            
-            logger.info(f"country_df epoch{epoch}_country_stats.csv")
-            country_df.to_csv(get_output_path(f'epoch{epoch}_country_stats.csv', 'csv'), index=True)
-            logger.info(f"continent_df epoch{epoch}_continent_stats.csv")
-            continent_df.to_csv(get_output_path(f'epoch{epoch}_continent_stats.csv', 'csv'), index=True)
-            logger.info(f"region_df epoch{epoch}_region_stats.csv")
-            region_df.to_csv(get_output_path(f'epoch{epoch}_region_stats.csv', 'csv'), index=True)
-
-            logger.info(f"calculate_stake_statistics_metro for epoch {epoch}")
-            country_df_metro, metro_df = calculate_stake_statistics_metro(epoch, max_epoch, engine)
-            logger.info(f"country_df epoch{epoch}_country_stats_metro.csv")
-            country_df_metro.to_csv(get_output_path(f'epoch{epoch}_country_stats_metro.csv', 'csv'), index=True)
-            logger.info(f"metro_df epoch{epoch}_metro_stats_metro.csv")
-            metro_df.to_csv(get_output_path(f'epoch{epoch}_metro_stats_metro.csv', 'csv'), index=True)
-
-        except Exception as e:
-            logger.error(f"Failed to process epoch {epoch}: {str(e)}")
+    missing_data_epochs = run_epochs(process_epoch, epochs, max_epoch, engine, jobs, logger)
 
     if max_epoch not in epochs:
         try:
@@ -122,6 +117,8 @@ def main(start_epoch=None, end_epoch=None):
     if missing_data_epochs:
         logger.warning(f"Missing epoch_aggregate_data for epochs: {missing_data_epochs}")
 
+    # Advance the stored rolling windows and re-read end_epoch before the ten-epoch files use them
+    update_rolling_windows(engine, end_epoch)
     generate_last_ten_epochs_data(end_epoch, engine)
     generate_ten_epoch_validator_rewards(end_epoch, engine)
     generate_ten_epoch_aggregate_data(end_epoch, engine)
@@ -135,20 +132,24 @@ def main(start_epoch=None, end_epoch=None):
     print("Processing complete.")
 
 if __name__ == '__main__':
-    if len(sys.argv) > 2:
+    parser = argparse.ArgumentParser(description='Build leaderboard JSON, CSV and chart files for a range of epochs')
+    parser.add_argument('epochs', nargs='*', help='[start_epoch] end_epoch (prompted for when omitted)')
+    parser.add_argument('--jobs', type=int, default=1, help='Epochs to build in parallel worker processes (default: 1)')
+    args = parser.parse_args()
+    if len(args.epochs) >= 2:
         try:
-            start_epoch = int(sys.argv[1])
-            end_epoch = int(sys.argv[2])
-            main(start_epoch, end_epoch)
+            start_epoch = int(args.epochs[0])
+            end_epoch = int(args.epochs[1])
+            main(start_epoch, end_epoch, jobs=args.jobs)
         except ValueError:
             print("Error: Please provide valid integer epochs as command-line arguments (start_epoch end_epoch).")
-            main()
-    elif len(sys.argv) == 2:
+            main(jobs=args.jobs)
+    elif len(args.epochs) == 1:
         try:
-            end_epoch = int(sys.argv[1])
-            main(end_epoch=end_epoch)
+            end_epoch = int(args.epochs[0])
+            main(end_epoch=end_epoch, jobs=args.jobs)
         except ValueError:
             print("Error: Please provide a valid integer epoch as a command-line argument.")
-            main()
+            main(jobs=args.jobs)
     else:
-        main()
\ No newline at end of file
+        main(jobs=args.jobs)
@@ -1,6 +1,8 @@
 import json
 import os
 import sys
+import numpy as np
+import pandas as pd
 from sqlalchemy import create_engine, text
 from datetime import datetime
 
@@ -17,10 +19,49 @@ if current_dir not in sys.path:
 
 # Import from current package
 from utils import format_lamports_to_sol, format_number, CLIENT_TYPE_MAP, add_trillium_attribution, decimal_default, format_elapsed_time, ensure_directory, get_output_path
+from epoch_pool import atomic_write
+from stats_export import stream_frames, records, format_lamport_columns, format_number_columns, format_text_columns, map_column, write_json_records
 
 # Initialize logger
 logger = setup_logging('db_operations')
 
+VALIDATOR_LAMPORT_FIELDS = [
+    ('total_block_rewards_before_burn', 5), ('total_block_rewards_after_burn', 5),
+    ('validator_priority_fees', 5), ('validator_signature_fees', 5),
+    ('validator_inflation_reward', 5), ('delegator_inflation_reward', 5),
+    ('vote_cost', 5), ('mev_earned', 5), ('mev_to_validator', 5),
+    ('mev_to_jito_block_engine', 5), ('mev_to_jito_tip_router', 5),
+    ('mev_to_stakers', 5), ('avg_mev_per_block', 7), ('avg_priority_fees_per_block', 7),
+    ('avg_rewards_per_block', 7), ('avg_signature_fees_per_block', 7),
+    ('activated_stake', 0), ('rewards', 5), ('total_inflation_reward', 5)
+]
+
+VALIDATOR_NUMBER_FIELDS = [
+    ('avg_cu_per_block', 0), ('avg_tx_per_block', 0), ('avg_user_tx_per_block', 0),
+    ('avg_vote_tx_per_block', 0), ('avg_votes_cast_per_block', 0),
+    ('mean_vote_latency', 3), ('avg_credit_per_voted_slot', 5),
+    ('avg_latency_per_voted_slot', 5), ('median_vote_latency', 5),
+    ('delegator_inflation_apy', 5), ('delegator_compound_inflation_apy', 5),
+    ('delegator_mev_apy', 5), ('delegator_compound_mev_apy', 5),
+    ('delegator_total_apy', 5), ('delegator_compound_total_apy', 5),
+    ('total_overall_apy', 5), ('compound_overall_apy', 5),
+    ('validator_inflation_apy', 5), ('validator_mev_apy', 5),
+    ('validator_block_rewards_apy', 5), ('validator_total_apy', 5),
+    ('validator_compound_inflation_apy', 5), ('validator_compound_mev_apy', 5),
+    ('validator_compound_block_rewards_apy', 5), ('validator_compound_total_apy', 5)
+]
+
+DURATION_NANOSECOND_FIELDS = [
+    'slot_duration_min', 'slot_duration_max', 'slot_duration_mean',
+    'slot_duration_median', 'slot_duration_stddev'
+]
+
+DURATION_MILLISECOND_FIELDS = [
+    'slot_duration_confidence_interval_lower_ms', 'slot_duration_confidence_interval_upper_ms',
+    'slot_duration_ci_lower_90_ms', 'slot_duration_ci_upper_90_ms',
+    'slot_duration_ci_lower_95_ms', 'slot_duration_ci_upper_95_ms'
+]
+
 def get_validator_stats(epoch, engine, debug=False):
     query = """
     SELECT 
@@ -62,108 +103,43 @@ def get_validator_stats(epoch, engine, debug=False):
     WHERE vs.epoch = :epoch
         AND vs.activated_stake > 0;
     """
-    with engine.connect() as conn:
-        results = conn.execute(text(query), {"epoch": epoch}).fetchall()
-        columns = conn.execute(text(query), {"epoch": epoch}).keys()
-
-    data = []
-    for row in results:
-        record = dict(zip(columns, row))
-        if debug and record['identity_pubkey'] == '5pPRHniefFjkiaArbGX3Y8NUysJmQ9tMZg3FrFGwHzSm':
-            logger.info(f"Debug - Epoch: {record['epoch']}, Name: {record['name']}, "
-                        f"Identity Pubkey: {record['identity_pubkey']}, Commission: {record['commission']}, "
-                        f"Validator Inflation Reward: {record['validator_inflation_reward']}")
-
-        lamport_fields = [
-            ('total_block_rewards_before_burn', 5), ('total_block_rewards_after_burn', 5),
-            ('validator_priority_fees', 5), ('validator_signature_fees', 5),
-            ('validator_inflation_reward', 5), ('delegator_inflation_reward', 5),
-            ('vote_cost', 5), ('mev_earned', 5), ('mev_to_validator', 5),
-            ('mev_to_jito_block_engine', 5), ('mev_to_jito_tip_router', 5),
-            ('mev_to_stakers', 5), ('avg_mev_per_block', 7), ('avg_priority_fees_per_block', 7),
-            ('avg_rewards_per_block', 7), ('avg_signature_fees_per_block', 7),
-            ('activated_stake', 0), ('rewards', 5), ('total_inflation_reward', 5)
-        ]
-        for field, precision in lamport_fields:
-            if field in record and record[field] is not None:
-                record[field] = format_lamports_to_sol(record[field], precision)
+    # One execution through a server-side cursor; each chunk is formatted a column at a time
+    for frame in stream_frames(engine, query, {"epoch": epoch}):
+        if debug:
+            for record in records(frame[frame['identity_pubkey'] == '5pPRHniefFjkiaArbGX3Y8NUysJmQ9tMZg3FrFGwHzSm']):
+                logger.info(f"Debug - Epoch: {record['epoch']}, Name: {record['name']}, "
+                            f"Identity Pubkey: {record['identity_pubkey']}, Commission: {record['commission']}, "
+                            f"Validator Inflation Reward: {record['validator_inflation_reward']}")
 
-        number_fields = [
-            ('avg_cu_per_block', 0), ('avg_tx_per_block', 0), ('avg_user_tx_per_block', 0),
-            ('avg_vote_tx_per_block', 0), ('avg_votes_cast_per_block', 0),
-            ('mean_vote_latency', 3), ('avg_credit_per_voted_slot', 5),
-            ('avg_latency_per_voted_slot', 5), ('median_vote_latency', 5),
-            ('delegator_inflation_apy', 5), ('delegator_compound_inflation_apy', 5),
-            ('delegator_mev_apy', 5), ('delegator_compound_mev_apy', 5),
-            ('delegator_total_apy', 5), ('delegator_compound_total_apy', 5),
-            ('total_overall_apy', 5), ('compound_overall_apy', 5),
-            ('validator_inflation_apy', 5), ('validator_mev_apy', 5),
-            ('validator_block_rewards_apy', 5), ('validator_total_apy', 5),
-            ('validator_compound_inflation_apy', 5), ('validator_compound_mev_apy', 5),
-            ('validator_compound_block_rewards_apy', 5), ('validator_compound_total_apy', 5)
-        ]
-        for field, precision in number_fields:
-            if field in record and record[field] is not None:
-                record[field] = format_number(record[field], precision)
+        format_lamport_columns(frame, VALIDATOR_LAMPORT_FIELDS)
+        format_number_columns(frame, VALIDATOR_NUMBER_FIELDS)
 
-        # Format slot duration fields - nanoseconds to milliseconds
-        duration_fields_nanoseconds = [
-            'slot_duration_min', 'slot_duration_max', 'slot_duration_mean',
-            'slot_duration_median', 'slot_duration_stddev'
-        ]
-        for field in duration_fields_nanoseconds:
-            if field in record and record[field] is not None:
-                # Convert from nanoseconds to milliseconds
-                milliseconds = float(record[field]) / 1000000.0
-                record[field] = f"{milliseconds:.5f}"
-
-        # Format slot duration fields - already in milliseconds
-        duration_fields_milliseconds = [
-            'slot_duration_confidence_interval_lower_ms', 'slot_duration_confidence_interval_upper_ms',
-            'slot_duration_ci_lower_90_ms', 'slot_duration_ci_upper_90_ms',
-            'slot_duration_ci_lower_95_ms', 'slot_duration_ci_upper_95_ms'
-        ]
-        for field in duration_fields_milliseconds:
-            if field in record and record[field] is not None:
-                record[field] = f"{float(record[field]):.5f}"
+        # Format slot duration fields - nanoseconds to milliseconds, then those already in milliseconds
+        format_text_columns(frame, DURATION_NANOSECOND_FIELDS, "%.5f", divisor=1000000.0)
+        format_text_columns(frame, DURATION_MILLISECOND_FIELDS, "%.5f")
 
         # Format p-value - extremely small number, use scientific notation or high precision
-        if 'slot_duration_p_value' in record and record['slot_duration_p_value'] is not None:
-            p_value = float(record['slot_duration_p_value'])
-            if p_value < 0.0001:  # Use scientific notation for very small values
-                record['slot_duration_p_value'] = f"{p_value:.2e}"
-            else:
-                record['slot_duration_p_value'] = f"{p_value:.7f}"
-        else:
-            record['slot_duration_p_value'] = "N/A"
+        p_value = pd.to_numeric(frame['slot_duration_p_value'], errors='coerce')
+        small = (p_value < 0.0001).to_numpy()
+        format_text_columns(frame, ['slot_duration_p_value'], "%.7f", missing="N/A")
+        if small.any():
+            frame.loc[small, 'slot_duration_p_value'] = np.char.mod("%.2e", p_value[small].to_numpy()).tolist()
 
         # Format coefficient with appropriate precision
-        if 'slot_duration_coef' in record and record['slot_duration_coef'] is not None:
-            record['slot_duration_coef'] = f"{float(record['slot_duration_coef']):.7f}"
-        else:
-            record['slot_duration_coef'] = "N/A"
+        format_text_columns(frame, ['slot_duration_coef'], "%.7f", missing="N/A")
 
         # Handle boolean field (slot_duration_is_lagging remains as boolean)
 
-        if 'client_type' in record:
-            record['client_type'] = CLIENT_TYPE_MAP.get(record['client_type'], 'Unknown')
+        map_column(frame, 'client_type', CLIENT_TYPE_MAP, 'Unknown')
 
-        if epoch > 0:
-            if (record['activated_stake'] is not None and 
-                record['leader_slots'] is not None and 
-                float(record['leader_slots']) > 0):
-                try:
-                    avg_stake_per_leader_slot = float(record['activated_stake']) / float(record['leader_slots'])
-                    record['avg_stake_per_leader_slot'] = int(avg_stake_per_leader_slot)
-                except (ValueError, TypeError):
-                    record['avg_stake_per_leader_slot'] = None
-            else:
-                record['avg_stake_per_leader_slot'] = None
-        else:
-            record['avg_stake_per_leader_slot'] = None
+        # activated_stake is in SOL at this point
+        stake = pd.to_numeric(frame['activated_stake'], errors='coerce')
+        leader_slots = pd.to_numeric(frame['leader_slots'], errors='coerce')
+        per_slot = (stake / leader_slots).where((leader_slots > 0) & stake.notna() & (epoch > 0))
+        frame['avg_stake_per_leader_slot'] = pd.Series(
+            [None if pd.isna(value) else int(value) for value in per_slot.tolist()], index=frame.index, dtype=object)
 
-        data.append(record)
-    return data
+        yield from records(frame)
 
 def get_epoch_aggregate_data(epoch, engine):
     query = """
@@ -262,15 +238,14 @@ def get_epoch_aggregate_data(epoch, engine):
 
 def write_validator_stats_to_json(epoch, data):
     filename = get_output_path(f"epoch{epoch}_validator_rewards.json", 'json')
-    data_with_attribution = add_trillium_attribution(data)
-    with open(filename, 'w') as f:
-        json.dump(data_with_attribution, f, indent=4, default=decimal_default)
-    logger.info(f"File created - {filename}")
+    # data may be the get_validator_stats generator: records are attributed and written as they stream in
+    count = write_json_records(filename, (add_trillium_attribution(record) for record in data), default=decimal_default)
+    logger.info(f"File created - {filename} ({count} validators)")
 
 def write_epoch_aggregate_data_to_json(epoch, data):
     filename = get_output_path(f"epoch{epoch}_epoch_aggregate_data.json", 'json')
     data_with_attribution = add_trillium_attribution(data)
-    with open(filename, 'w') as f:
+    with atomic_write(filename) as f:
         json.dump(data_with_attribution, f, indent=4, default=decimal_default)
     logger.info(f"File created - {filename}")
 
@@ -278,4 +253,21 @@ def get_min_max_epochs(engine):
     query = "SELECT MIN(epoch), MAX(epoch) FROM validator_stats"
     with engine.connect() as conn:
         result = conn.execute(text(query)).fetchone()
-    return result[0], result[1]
\ No newline at end of file
+    return result[0], result[1]
+
+def get_latest_validator_info(engine):
+    """One validator_info row per identity: {identity_pubkey: {details, icon_url, keybase_username, logo, name, website}}"""
+    query = """
+    SELECT DISTINCT ON (identity_pubkey)
+        identity_pubkey,
+        details,
+        icon_url,
+        keybase_username,
+        COALESCE(logo, 'no-image-available12.webp') AS logo,
+        name,
+        website
+    FROM validator_info
+    ORDER BY identity_pubkey
+    """
+    with engine.connect() as conn:
+        return {row['identity_pubkey']: dict(row) for row in conn.execute(text(query)).mappings()}
@@ -1,7 +1,6 @@
 import json
 import os
 import sys
-from decimal import Decimal
 from sqlalchemy import text
 
 # Import from parent directory
@@ -17,11 +16,98 @@ if current_dir not in sys.path:
 
 # Import from current package
 from utils import format_lamports_to_sol, format_number, add_trillium_attribution, decimal_default, format_elapsed_time, ensure_directory, get_output_path
-from db_operations import get_epoch_aggregate_data
+from db_operations import get_epoch_aggregate_data, get_latest_validator_info
+from rolling_windows import rolling_windows, LATEST_FIELDS
 
 # Initialize logger
 logger = setup_logging('epoch_aggregation')
 
+# Ten-epoch validator rewards: (output field, ValidatorWindow statistic, metric), in the
+# order the old GROUP BY query returned them
+TEN_EPOCH_STATISTICS = [
+    ('activated_stake', 'average', 'activated_stake'),
+    ('avg_cu_per_block', 'per_block', 'cu'),
+    ('avg_mev_per_block', 'per_block', 'mev_earned'),
+    ('avg_priority_fees_per_block', 'per_block', 'validator_priority_fees'),
+    ('avg_rewards_per_block', 'per_block', 'rewards'),
+    ('avg_signature_fees_per_block', 'per_block', 'validator_signature_fees'),
+    ('avg_tx_per_block', 'per_block', 'tx_included_in_blocks'),
+    ('avg_user_tx_per_block', 'per_block', 'user_tx_included_in_blocks'),
+    ('avg_vote_tx_per_block', 'per_block', 'vote_tx_included_in_blocks'),
+    ('average_blocks_produced', 'average', 'blocks_produced'),
+    ('commission', 'average', 'commission'),
+    ('cu', 'average', 'cu'),
+    ('epoch_credits', 'average', 'epoch_credits'),
+    ('median_credits', 'median', 'epoch_credits'),
+    ('mev_commission', 'average', 'mev_commission'),
+    ('mev_earned', 'average', 'mev_earned'),
+    ('mev_to_validator', 'average', 'mev_to_validator'),
+    ('mev_to_jito_block_engine', 'average', 'mev_to_jito_block_engine'),
+    ('mev_to_jito_tip_router', 'average', 'mev_to_jito_tip_router'),
+    ('rewards', 'average', 'rewards'),
+    ('signatures', 'average', 'signatures'),
+    ('avg_skip_rate', 'average', 'skip_rate'),
+    ('stake_percentage', 'average', 'stake_percentage'),
+    ('total_block_rewards_before_burn', 'average', 'total_block_rewards_before_burn'),
+    ('tx_included_in_blocks', 'average', 'tx_included_in_blocks'),
+    ('user_tx_included_in_blocks', 'average', 'user_tx_included_in_blocks'),
+    ('total_block_rewards_after_burn', 'average', 'total_block_rewards_after_burn'),
+    ('validator_priority_fees', 'average', 'validator_priority_fees'),
+    ('validator_signature_fees', 'average', 'validator_signature_fees'),
+    ('validator_inflation_reward', 'average', 'validator_inflation_reward'),
+    ('delegator_inflation_reward', 'average', 'delegator_inflation_reward'),
+    ('vote_cost', 'average', 'vote_cost'),
+    ('vote_tx_included_in_blocks', 'average', 'vote_tx_included_in_blocks'),
+    ('votes_cast', 'average', 'votes_cast'),
+    ('leader_slots', 'average', 'leader_slots'),
+    ('jito_rank', 'average', 'jito_rank'),
+]
+TEN_EPOCH_VOTE_STATISTICS = [
+    (metric, 'average', metric) for metric in (
+        'vote_credits', 'voted_slots', 'avg_credit_per_voted_slot', 'max_vote_latency',
+        'mean_vote_latency', 'median_vote_latency', 'vote_credits_rank',
+    )
+]
+
+# Recency-weighted rewards: (output field, metric)
+WEIGHTED_AVERAGE_FIELDS = [
+    ('average_activated_stake', 'activated_stake'), ('average_blocks_produced', 'blocks_produced'),
+    ('average_commission', 'commission'), ('average_cu', 'cu'), ('average_epoch_credits', 'epoch_credits'),
+    ('average_leader_slots', 'leader_slots'), ('average_mev_commission', 'mev_commission'),
+    ('average_mev_earned', 'mev_earned'), ('average_mev_to_validator', 'mev_to_validator'),
+    ('average_mev_to_jito_block_engine', 'mev_to_jito_block_engine'),
+    ('average_mev_to_jito_tip_router', 'mev_to_jito_tip_router'), ('average_rewards', 'rewards'),
+    ('average_signatures', 'signatures'), ('average_stake_percentage', 'stake_percentage'),
+    ('average_total_block_rewards_after_burn', 'total_block_rewards_after_burn'),
+    ('average_total_block_rewards_before_burn', 'total_block_rewards_before_burn'),
+    ('average_tx_included_in_blocks', 'tx_included_in_blocks'),
+    ('average_user_tx_included_in_blocks', 'user_tx_included_in_blocks'),
+    ('average_validator_priority_fees', 'validator_priority_fees'),
+    ('average_validator_signature_fees', 'validator_signature_fees'),
+    ('average_validator_inflation_reward', 'validator_inflation_reward'),
+    ('average_delegator_inflation_reward', 'delegator_inflation_reward'),
+    ('average_vote_cost', 'vote_cost'), ('average_vote_tx_included_in_blocks', 'vote_tx_included_in_blocks'),
+    ('average_votes_cast', 'votes_cast'), ('average_jito_rank', 'jito_rank'),
+    ('avg_cu_per_block', 'avg_cu_per_block'), ('avg_mev_per_block', 'avg_mev_per_block'),
+    ('avg_priority_fees_per_block', 'avg_priority_fees_per_block'), ('avg_rewards_per_block', 'avg_rewards_per_block'),
+    ('avg_signature_fees_per_block', 'avg_signature_fees_per_block'), ('avg_skip_rate', 'skip_rate'),
+    ('avg_tx_per_block', 'avg_tx_per_block'), ('avg_user_tx_per_block', 'avg_user_tx_per_block'),
+    ('avg_vote_tx_per_block', 'avg_vote_tx_per_block'), ('average_vote_credits', 'vote_credits'),
+    ('average_voted_slots', 'voted_slots'), ('avg_credit_per_voted_slot', 'avg_credit_per_voted_slot'),
+    ('average_max_vote_latency', 'max_vote_latency'), ('average_mean_vote_latency', 'mean_vote_latency'),
+    ('average_median_vote_latency', 'median_vote_latency'), ('average_vote_credits_rank', 'vote_credits_rank'),
+]
+
+# validator_info columns and the value used when a validator has none
+VALIDATOR_INFO_DEFAULTS = {
+    'details': ' ',
+    'icon_url': ' ',
+    'keybase_username': ' ',
+    'logo': 'no-image-available12.webp',
+    'name': ' ',
+    'website': ' ',
+}
+
 def generate_last_ten_epochs_data(max_epoch, engine):
     last_ten_epochs = range(max_epoch - 9, max_epoch + 1)
     last_ten_epochs_data = []
@@ -48,127 +134,43 @@ def generate_last_ten_epochs_data(max_epoch, engine):
     logger.info(f"File created - {filename}")
 
 def generate_ten_epoch_validator_rewards(max_epoch, engine):
-    last_ten_epochs = range(max_epoch - 9, max_epoch + 1)
     last_thirty_epochs = range(max_epoch - 29, max_epoch + 1)
+    windows = rolling_windows(engine, max_epoch, (10, 30))
+    thirty_epoch_windows = windows[30]
 
-    query = """
-    WITH latest_validator_info AS (
-        SELECT DISTINCT ON (identity_pubkey)
-            identity_pubkey,
-            details,
-            icon_url,
-            keybase_username,
-            COALESCE(logo, 'no-image-available12.webp') AS logo,
-            name,
-            website
-        FROM validator_info
-        ORDER BY identity_pubkey
-    ),
-    thirty_epoch_data AS (
-        SELECT 
-            identity_pubkey,
-            MAX(commission) as max_commission_30_epochs,
-            AVG(epoch_credits) as average_epoch_credits_30_epochs
-        FROM validator_stats
-        WHERE epoch BETWEEN :thirty_start AND :thirty_end
-        GROUP BY identity_pubkey
-    ),
-    epoch_aggregate_30_epochs AS (
-        SELECT AVG(total_blocks_produced) as average_total_blocks_produced_30_epochs
-        FROM epoch_aggregate_data
-        WHERE epoch BETWEEN :thirty_start AND :thirty_end
-    )
-    SELECT 
-        vs.identity_pubkey,
-        AVG(vs.activated_stake) as activated_stake,
-        SUM(vs.cu) / NULLIF(SUM(vs.blocks_produced), 0) as avg_cu_per_block,
-        SUM(vs.mev_earned) / NULLIF(SUM(vs.blocks_produced), 0) as avg_mev_per_block,
-        SUM(vs.validator_priority_fees) / NULLIF(SUM(vs.blocks_produced), 0) as avg_priority_fees_per_block,
-        SUM(vs.rewards) / NULLIF(SUM(vs.blocks_produced), 0) as avg_rewards_per_block,
-        SUM(vs.validator_signature_fees) / NULLIF(SUM(vs.blocks_produced), 0) as avg_signature_fees_per_block,
-        SUM(vs.tx_included_in_blocks) / NULLIF(SUM(vs.blocks_produced), 0) as avg_tx_per_block,
-        SUM(vs.user_tx_included_in_blocks) / NULLIF(SUM(vs.blocks_produced), 0) as avg_user_tx_per_block,
-        SUM(vs.vote_tx_included_in_blocks) / NULLIF(SUM(vs.blocks_produced), 0) as avg_vote_tx_per_block,
-        AVG(vs.blocks_produced) as average_blocks_produced,
-        AVG(vs.commission) as commission,
-        AVG(vs.cu) as cu,
-        AVG(vs.epoch_credits) as epoch_credits,
-        PERCENTILE_CONT(0.5) WITHIN GROUP (ORDER BY vs.epoch_credits) as median_credits,
-        AVG(vs.mev_commission) as mev_commission,
-        AVG(vs.mev_earned) as mev_earned,
-        AVG(vs.mev_to_validator) as mev_to_validator,
-        AVG(vs.mev_to_jito_block_engine) as mev_to_jito_block_engine,
-        AVG(vs.mev_to_jito_tip_router) as mev_to_jito_tip_router,
-        AVG(vs.rewards) as rewards,
-        AVG(vs.signatures) as signatures,
-        AVG(vs.skip_rate) AS avg_skip_rate,
-        AVG(vs.stake_percentage) as stake_percentage,
-        AVG(vs.total_block_rewards_before_burn) as total_block_rewards_before_burn,
-        AVG(vs.tx_included_in_blocks) as tx_included_in_blocks,
-        AVG(vs.user_tx_included_in_blocks) as user_tx_included_in_blocks,
-        AVG(vs.total_block_rewards_after_burn) as total_block_rewards_after_burn,
-        AVG(vs.validator_priority_fees) as validator_priority_fees,
-        AVG(vs.validator_signature_fees) as validator_signature_fees,
-        AVG(vs.validator_inflation_reward) as validator_inflation_reward,
-        AVG(vs.delegator_inflation_reward) as delegator_inflation_reward,
-        AVG(vs.vote_cost) as vote_cost,
-        AVG(vs.vote_tx_included_in_blocks) as vote_tx_included_in_blocks,
-        AVG(vs.votes_cast) as votes_cast,
-        AVG(vs.leader_slots) as leader_slots,
-        AVG(vs.jito_rank) as jito_rank,
-        MIN(vs.epoch) as min_epoch,
-        MAX(vs.epoch) as max_epoch,
-        MAX(vs.vote_account_pubkey) as vote_account_pubkey,
-        MAX(vs.ip) as ip,
-        MAX(vs.client_type) as client_type,
-        MAX(vs.version) as version,
-        MAX(vs.asn) as asn,
-        MAX(vs.asn_org) as asn_org,
-        MAX(vs.city) as city,
-        MAX(vs.continent) as continent,
-        MAX(vs.country) as country,
-        MAX(vs.region) as region,
-        MAX(vs.superminority) as superminority,
-        COALESCE(MAX(vi.details), ' ') as details,
-        COALESCE(MAX(vi.icon_url), ' ') as icon_url,
-        COALESCE(MAX(vi.keybase_username), ' ') as keybase_username,
-        COALESCE(MAX(vi.logo), 'no-image-available12.webp') AS logo,
-        COALESCE(MAX(vi.name), ' ') as name,
-        COALESCE(MAX(vi.website), ' ') as website,
-        ted.max_commission_30_epochs,
-        ted.average_epoch_credits_30_epochs,
-        ead.average_total_blocks_produced_30_epochs,
-        AVG(vt.vote_credits) as vote_credits,
-        AVG(vt.voted_slots) as voted_slots,
-        AVG(vt.avg_credit_per_voted_slot) as avg_credit_per_voted_slot,
-        AVG(vt.max_vote_latency) as max_vote_latency,
-        AVG(vt.mean_vote_latency) as mean_vote_latency,
-        AVG(vt.median_vote_latency) as median_vote_latency,
-        AVG(vt.vote_credits_rank) as vote_credits_rank
-    FROM validator_stats vs
-    LEFT JOIN latest_validator_info vi ON vs.identity_pubkey = vi.identity_pubkey
-    LEFT JOIN thirty_epoch_data ted ON vs.identity_pubkey = ted.identity_pubkey
-    CROSS JOIN epoch_aggregate_30_epochs ead
-    LEFT JOIN votes_table vt ON vs.epoch = vt.epoch AND vs.vote_account_pubkey = vt.vote_account_pubkey
-    WHERE vs.epoch BETWEEN :ten_start AND :ten_end
-        AND vs.activated_stake != 0
-    GROUP BY vs.identity_pubkey, ted.max_commission_30_epochs, ted.average_epoch_credits_30_epochs, ead.average_total_blocks_produced_30_epochs;
-    """
+    validator_info = get_latest_validator_info(engine)
     with engine.connect() as conn:
-        results = conn.execute(
-            text(query),
-            {"thirty_start": min(last_thirty_epochs), "thirty_end": max(last_thirty_epochs),
-             "ten_start": min(last_ten_epochs), "ten_end": max(last_ten_epochs)}
-        ).fetchall()
-        columns = conn.execute(
-            text(query),
-            {"thirty_start": min(last_thirty_epochs), "thirty_end": max(last_thirty_epochs),
-             "ten_start": min(last_ten_epochs), "ten_end": max(last_ten_epochs)}
-        ).keys()
+        average_total_blocks_produced_30_epochs = conn.execute(
+            text("""
+            SELECT AVG(total_blocks_produced)
+            FROM epoch_aggregate_data
+            WHERE epoch BETWEEN :thirty_start AND :thirty_end
+            """),
+            {"thirty_start": min(last_thirty_epochs), "thirty_end": max(last_thirty_epochs)}
+        ).scalar()
 
     data = []
-    for row in results:
-        record = dict(zip(columns, row))
+    for identity_pubkey, window in windows[10].items():
+        staked_epochs = window.staked_epochs()
+        if not staked_epochs:
+            continue
+        info = validator_info.get(identity_pubkey, {})
+        thirty = thirty_epoch_windows.get(identity_pubkey)
+        record = {'identity_pubkey': identity_pubkey}
+        for field, statistic, metric in TEN_EPOCH_STATISTICS:
+            record[field] = getattr(window, statistic)(metric)
+        record['min_epoch'] = min(staked_epochs)
+        record['max_epoch'] = max(staked_epochs)
+        for field in LATEST_FIELDS:
+            record[field] = window.latest.get(field)
+        for field, default in VALIDATOR_INFO_DEFAULTS.items():
+            record[field] = info.get(field) if info.get(field) is not None else default
+        record['max_commission_30_epochs'] = thirty.maximum('commission') if thirty else None
+        record['average_epoch_credits_30_epochs'] = thirty.average_all('epoch_credits') if thirty else None
+        record['average_total_blocks_produced_30_epochs'] = average_total_blocks_produced_30_epochs
+        for field, statistic, metric in TEN_EPOCH_VOTE_STATISTICS:
+            record[field] = getattr(window, statistic)(metric)
+
         if record['identity_pubkey'] == '5pPRHniefFjkiaArbGX3Y8NUysJmQ9tMZg3FrFGwHzSm':
             logger.info(f"Debug - Name: {record['name']}, Identity Pubkey: {record['identity_pubkey']}, "
                         f"Commission: {record['commission']}, Validator Inflation Reward: {record['validator_inflation_reward']}")
@@ -333,9 +335,8 @@ def generate_ten_epoch_aggregate_data(max_epoch, engine):
     WHERE epoch BETWEEN :thirty_start AND :thirty_end
     """
     with engine.connect() as conn:
-        result = conn.execute(text(query), {"ten_start": min(last_ten_epochs), "ten_end": max(last_ten_epochs)}).fetchone()
-        columns = conn.execute(text(query), {"ten_start": min(last_ten_epochs), "ten_end": max(last_ten_epochs)}).keys()
-        data = dict(zip(columns, result))
+        result = conn.execute(text(query), {"ten_start": min(last_ten_epochs), "ten_end": max(last_ten_epochs)})
+        data = dict(zip(result.keys(), result.fetchone()))
 
         data = {f"average_{k}" if k.startswith(("median", "total")) else k: v for k, v in data.items()}
 
@@ -419,180 +420,29 @@ def generate_ten_epoch_aggregate_data(max_epoch, engine):
     logger.info(f"File created - {filename}")
 
 def generate_weighted_average_validator_rewards(max_epoch, engine):
-    weights = [Decimal('0.2649'), Decimal('0.1987'), Decimal('0.1490'), Decimal('0.1118'), Decimal('0.0838'), 
-               Decimal('0.0629'), Decimal('0.0471'), Decimal('0.0354'), Decimal('0.0265'), Decimal('0.0199')]
     epochs = range(max_epoch - 9, max_epoch + 1)
+    windows = rolling_windows(engine, max_epoch, (10,))
 
-    query = """
-    WITH latest_validator_info AS (
-        SELECT DISTINCT ON (identity_pubkey)
-            identity_pubkey,
-            name,
-            website,
-            details,
-            keybase_username,
-            icon_url,
-            COALESCE(logo, 'no-image-available12.webp') AS logo            
-        FROM validator_info
-        ORDER BY identity_pubkey
-    )
-    SELECT 
-        vs.identity_pubkey,
-        vs.epoch,
-        vs.activated_stake,
-        vs.blocks_produced,
-        vs.commission,
-        vs.cu,
-        vs.epoch_credits,
-        vs.leader_slots,
-        vs.mev_commission,
-        vs.mev_earned,
-        vs.mev_to_validator,
-        vs.mev_to_jito_block_engine,
-        vs.mev_to_jito_tip_router,
-        vs.rewards,
-        vs.signatures,
-        vs.stake_percentage,
-        vs.total_block_rewards_after_burn,
-        vs.total_block_rewards_before_burn,
-        vs.tx_included_in_blocks,
-        vs.user_tx_included_in_blocks,
-        vs.validator_priority_fees,
-        vs.validator_signature_fees,
-        vs.validator_inflation_reward,
-        vs.delegator_inflation_reward,
-        vs.vote_cost,
-        vs.vote_tx_included_in_blocks,
-        vs.votes_cast,
-        vs.avg_cu_per_block,
-        vs.avg_mev_per_block,
-        vs.avg_priority_fees_per_block,
-        vs.avg_rewards_per_block,
-        vs.avg_signature_fees_per_block,
-        vs.skip_rate,
-        vs.avg_tx_per_block,
-        vs.avg_user_tx_per_block,
-        vs.avg_vote_tx_per_block,
-        vs.vote_account_pubkey,
-        vs.ip,
-        vs.client_type,
-        vs.version,
-        vs.asn,
-        vs.asn_org,
-        vs.city,
-        vs.continent,
-        vs.country,
-        vs.region,
-        vs.superminority,
-        vs.jito_rank,
-        vt.vote_credits,
-        vt.voted_slots,
-        vt.avg_credit_per_voted_slot,
-        vt.max_vote_latency,
-        vt.mean_vote_latency,
-        vt.median_vote_latency,
-        vt.vote_credits_rank,
-        COALESCE(vi.name, ' ') AS name,
-        COALESCE(vi.website, ' ') AS website,
-        COALESCE(vi.details, ' ') AS details,
-        COALESCE(vi.keybase_username, ' ') AS keybase_username,
-        COALESCE(vi.icon_url, ' ') AS icon_url,
-        COALESCE(vi.logo, 'no-image-available12.webp') AS logo
-    FROM validator_stats vs
-    LEFT JOIN latest_validator_info vi ON vs.identity_pubkey = vi.identity_pubkey
-    LEFT JOIN votes_table vt ON vs.epoch = vt.epoch AND vs.vote_account_pubkey = vt.vote_account_pubkey
-    WHERE vs.epoch BETWEEN :epoch_start AND :epoch_end
-        AND vs.activated_stake != 0;
-    """
-    with engine.connect() as conn:
-        results = conn.execute(text(query), {"epoch_start": min(epochs), "epoch_end": max(epochs)}).fetchall()
-        columns = conn.execute(text(query), {"epoch_start": min(epochs), "epoch_end": max(epochs)}).keys()
-
-    validator_data = {}
-    for row in results:
-        record = dict(zip(columns, row))
-        identity_pubkey = record['identity_pubkey']
-        epoch = record['epoch']
-        if identity_pubkey not in validator_data:
-            validator_data[identity_pubkey] = {
-                'weighted_sum': {col: Decimal('0') for col in columns if col not in ['identity_pubkey', 'epoch']},
-                'total_weight': Decimal('0'),
-                'latest': {col: record[col] for col in columns if col not in ['identity_pubkey', 'epoch']}
-            }
-        weight = weights[max_epoch - epoch]
-        validator_data[identity_pubkey]['total_weight'] += weight
-        for col in validator_data[identity_pubkey]['weighted_sum'].keys():
-            val = record[col]
-            if isinstance(val, (int, float, Decimal)) and val is not None:
-                validator_data[identity_pubkey]['weighted_sum'][col] += Decimal(str(val)) * weight
+    validator_info = get_latest_validator_info(engine)
 
     weighted_avg_data = []
-    for identity_pubkey, data in validator_data.items():
-        wsum = data['weighted_sum']
-        tw = data['total_weight']
+    for identity_pubkey, window in windows[10].items():
+        if not window.staked_epochs():
+            continue
+        info = validator_info.get(identity_pubkey, {})
         avg_record = {
             'identity_pubkey': identity_pubkey,
             'epoch_range': f"{min(epochs)}-{max(epochs)}",
-            'average_activated_stake': wsum['activated_stake'] / tw,
-            'average_blocks_produced': wsum['blocks_produced'] / tw,
-            'average_commission': wsum['commission'] / tw,
-            'average_cu': wsum['cu'] / tw,
-            'average_epoch_credits': wsum['epoch_credits'] / tw,
-            'average_leader_slots': wsum['leader_slots'] / tw,
-            'average_mev_commission': wsum['mev_commission'] / tw,
-            'average_mev_earned': wsum['mev_earned'] / tw,
-            'average_mev_to_validator': wsum['mev_to_validator'] / tw,
-            'average_mev_to_jito_block_engine': wsum['mev_to_jito_block_engine'] / tw,
-            'average_mev_to_jito_tip_router': wsum['mev_to_jito_tip_router'] / tw,
-            'average_rewards': wsum['rewards'] / tw,
-            'average_signatures': wsum['signatures'] / tw,
-            'average_stake_percentage': wsum['stake_percentage'] / tw,
-            'average_total_block_rewards_after_burn': wsum['total_block_rewards_after_burn'] / tw,
-            'average_total_block_rewards_before_burn': wsum['total_block_rewards_before_burn'] / tw,
-            'average_tx_included_in_blocks': wsum['tx_included_in_blocks'] / tw,
-            'average_user_tx_included_in_blocks': wsum['user_tx_included_in_blocks'] / tw,
-            'average_validator_priority_fees': wsum['validator_priority_fees'] / tw,
-            'average_validator_signature_fees': wsum['validator_signature_fees'] / tw,
-            'average_validator_inflation_reward': wsum['validator_inflation_reward'] / tw,
-            'average_delegator_inflation_reward': wsum['delegator_inflation_reward'] / tw,
-            'average_vote_cost': wsum['vote_cost'] / tw,
-            'average_vote_tx_included_in_blocks': wsum['vote_tx_included_in_blocks'] / tw,
-            'average_votes_cast': wsum['votes_cast'] / tw,
-            'average_jito_rank': wsum['jito_rank'] / tw if wsum['jito_rank'] is not None else None,
-            'avg_cu_per_block': wsum['avg_cu_per_block'] / tw,
-            'avg_mev_per_block': wsum['avg_mev_per_block'] / tw,
-            'avg_priority_fees_per_block': wsum['avg_priority_fees_per_block'] / tw,
-            'avg_rewards_per_block': wsum['avg_rewards_per_block'] / tw,
-            'avg_signature_fees_per_block': wsum['avg_signature_fees_per_block'] / tw,
-            'avg_skip_rate': wsum['skip_rate'] / tw,
-            'avg_tx_per_block': wsum['avg_tx_per_block'] / tw,
-            'avg_user_tx_per_block': wsum['avg_user_tx_per_block'] / tw,
-            'avg_vote_tx_per_block': wsum['avg_vote_tx_per_block'] / tw,
-            'average_vote_credits': wsum['vote_credits'] / tw if wsum['vote_credits'] is not None else None,
-            'average_voted_slots': wsum['voted_slots'] / tw if wsum['voted_slots'] is not None else None,
-            'avg_credit_per_voted_slot': wsum['avg_credit_per_voted_slot'] / tw if wsum['avg_credit_per_voted_slot'] is not None else None,
-            'average_max_vote_latency': wsum['max_vote_latency'] / tw if wsum['max_vote_latency'] is not None else None,
-            'average_mean_vote_latency': wsum['mean_vote_latency'] / tw if wsum['mean_vote_latency'] is not None else None,
-            'average_median_vote_latency': wsum['median_vote_latency'] / tw if wsum['median_vote_latency'] is not None else None,
-            'average_vote_credits_rank': wsum['vote_credits_rank'] / tw if wsum['vote_credits_rank'] is not None else None,
-            'vote_account_pubkey': data['latest']['vote_account_pubkey'],
-            'ip': data['latest']['ip'],
-            'client_type': data['latest']['client_type'],
-            'version': data['latest']['version'],
-            'name': data['latest']['name'],
-            'website': data['latest']['website'],
-            'details': data['latest']['details'],
-            'keybase_username': data['latest']['keybase_username'],
-            'icon_url': data['latest']['icon_url'],
-            'logo': data['latest']['logo'],
-            'asn': data['latest']['asn'],
-            'asn_org': data['latest']['asn_org'],
-            'city': data['latest']['city'],
-            'continent': data['latest']['continent'],
-            'country': data['latest']['country'],
-            'region': data['latest']['region'],
-            'superminority': data['latest']['superminority']
         }
+        for field, metric in WEIGHTED_AVERAGE_FIELDS:
+            avg_record[field] = window.weighted_average(metric)
+        for field in ('vote_account_pubkey', 'ip', 'client_type', 'version'):
+            avg_record[field] = window.latest.get(field)
+        for field in ('name', 'website', 'details', 'keybase_username', 'icon_url', 'logo'):
+            default = VALIDATOR_INFO_DEFAULTS[field]
+            avg_record[field] = info.get(field) if info.get(field) is not None else default
+        for field in ('asn', 'asn_org', 'city', 'continent', 'country', 'region', 'superminority'):
+            avg_record[field] = window.latest.get(field)
         lamport_fields = [
             ('average_activated_stake', 0), ('average_mev_earned', 5),
             ('average_mev_to_validator', 5), ('average_mev_to_jito_block_engine', 5),
@@ -0,0 +1,423 @@
+#!/usr/bin/env python3
+"""
+Persisted per-validator rolling-window aggregates.
+
+The ten-epoch and recency-weighted leaderboard files used to rescan
+validator_stats (joined to votes_table) over 10- and 30-epoch windows every
+time an epoch finished. For every tracked window size, validator_rolling_window
+now keeps one row per validator with:
+
+    - sums and non-null counts of every ROLLING_METRICS column over the rows
+      with stake, so averages and per-block ratios are a single division
+    - sums weighted by RECENCY_DECAY ** age, so the recency-weighted average
+      is a single division as well
+    - a per-epoch sketch (epoch, staked, epoch_credits, commission) for the
+      statistics that cannot be subtracted: medians, maxima and the epoch range
+
+To move a window forward by one epoch, the weighted sums are decayed, the new
+epoch's rows are added and the rows of the epoch that fell out are subtracted.
+That reads two epochs of data whatever the window size. Each epoch's rows are
+kept in validator_rolling_epoch, so the subtraction uses exactly what was added.
+The end epoch is re-read and replaced on every run, so a rerun after a late
+enrichment picks up the new values. A window size that is not tracked yet is
+built once from its epochs and then advanced with the others.
+
+Usage:
+    python3 rolling_windows.py 812                 # advance the tracked windows to 812
+    python3 rolling_windows.py 812 --window 60     # also start tracking a 60-epoch window
+    python3 rolling_windows.py 812 --rebuild       # drop the stored state and rebuild
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from decimal import Decimal
+
+from psycopg2.extras import execute_values
+
+# Import from parent directory
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import importlib
+logging_config = importlib.import_module('999_logging_config')
+setup_logging = logging_config.setup_logging
+
+# Add current directory to path for imports
+current_dir = os.path.dirname(os.path.abspath(__file__))
+if current_dir not in sys.path:
+    sys.path.insert(0, current_dir)
+
+from utils import decimal_default
+
+# Initialize logger
+logger = setup_logging('rolling_windows')
+
+ROLLING_WINDOWS = (10, 30)
+# Weight of an epoch relative to the next one; over ten epochs this is the
+# 0.2649, 0.1987, ... series the recency-weighted file always used
+RECENCY_DECAY = Decimal('0.75')
+
+ROLLING_STATS_METRICS = (
+    'activated_stake', 'blocks_produced', 'commission', 'cu', 'epoch_credits', 'leader_slots',
+    'mev_commission', 'mev_earned', 'mev_to_validator', 'mev_to_jito_block_engine', 'mev_to_jito_tip_router',
+    'rewards', 'signatures', 'skip_rate', 'stake_percentage', 'total_block_rewards_after_burn',
+    'total_block_rewards_before_burn', 'tx_included_in_blocks', 'user_tx_included_in_blocks',
+    'validator_priority_fees', 'validator_signature_fees', 'validator_inflation_reward',
+    'delegator_inflation_reward', 'vote_cost', 'vote_tx_included_in_blocks', 'votes_cast', 'jito_rank',
+    'avg_cu_per_block', 'avg_mev_per_block', 'avg_priority_fees_per_block', 'avg_rewards_per_block',
+    'avg_signature_fees_per_block', 'avg_tx_per_block', 'avg_user_tx_per_block', 'avg_vote_tx_per_block',
+)
+ROLLING_VOTE_METRICS = (
+    'vote_credits', 'voted_slots', 'avg_credit_per_voted_slot', 'max_vote_latency',
+    'mean_vote_latency', 'median_vote_latency', 'vote_credits_rank',
+)
+ROLLING_METRICS = ROLLING_STATS_METRICS + ROLLING_VOTE_METRICS
+SKETCH_METRICS = ('epoch_credits', 'commission')
+LATEST_FIELDS = (
+    'vote_account_pubkey', 'ip', 'client_type', 'version', 'asn', 'asn_org',
+    'city', 'continent', 'country', 'region', 'superminority',
+)
+
+_INDEX = {metric: i for i, metric in enumerate(ROLLING_METRICS)}
+_SKETCH_INDEX = [_INDEX[metric] for metric in SKETCH_METRICS]
+_BLOCKS = _INDEX['blocks_produced']
+ZERO = Decimal(0)
+ONE = Decimal(1)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS validator_rolling_epoch (
+    epoch INTEGER NOT NULL,
+    identity_pubkey TEXT NOT NULL,
+    staked BOOLEAN NOT NULL,
+    metric_values NUMERIC[] NOT NULL,
+    latest JSONB NOT NULL
+);
+CREATE INDEX IF NOT EXISTS validator_rolling_epoch_epoch_idx ON validator_rolling_epoch (epoch);
+CREATE TABLE IF NOT EXISTS validator_rolling_window (
+    window_size INTEGER NOT NULL,
+    identity_pubkey TEXT NOT NULL,
+    sketch_epochs INTEGER[] NOT NULL,
+    sketch_staked BOOLEAN[] NOT NULL,
+    sketch_epoch_credits NUMERIC[] NOT NULL,
+    sketch_commission NUMERIC[] NOT NULL,
+    sums NUMERIC[] NOT NULL,
+    counts INTEGER[] NOT NULL,
+    weighted_sums NUMERIC[] NOT NULL,
+    total_weight NUMERIC NOT NULL,
+    latest_epoch INTEGER,
+    latest JSONB,
+    PRIMARY KEY (window_size, identity_pubkey)
+);
+CREATE TABLE IF NOT EXISTS validator_rolling_window_meta (
+    window_size INTEGER PRIMARY KEY,
+    end_epoch INTEGER NOT NULL,
+    metrics TEXT[] NOT NULL,
+    decay NUMERIC NOT NULL,
+    updated_at TIMESTAMP NOT NULL DEFAULT NOW()
+);
+"""
+
+SNAPSHOT_QUERY = f"""
+SELECT
+    vs.identity_pubkey,
+    vs.epoch,
+    COALESCE(vs.activated_stake != 0, FALSE) AS staked,
+    {', '.join(f'vs.{metric}' for metric in ROLLING_STATS_METRICS)},
+    {', '.join(f'vt.{metric}' for metric in ROLLING_VOTE_METRICS)},
+    {', '.join(f'vs.{field}' for field in LATEST_FIELDS)}
+FROM validator_stats vs
+LEFT JOIN votes_table vt ON vs.epoch = vt.epoch AND vs.vote_account_pubkey = vt.vote_account_pubkey
+WHERE vs.epoch = ANY(%s)
+"""
+
+def _as_decimal(value):
+    if value is None or isinstance(value, Decimal):
+        return value
+    if isinstance(value, float):
+        return Decimal(str(value))
+    return Decimal(value)
+
+class ValidatorWindow:
+    """One validator's running sums over a window, plus the per-epoch sketch"""
+
+    def __init__(self):
+        self.sketch = []
+        self.latest_epoch = None
+        self.latest = None
+        self._reset_sums()
+
+    def _reset_sums(self):
+        self.sums = [ZERO] * len(ROLLING_METRICS)
+        self.counts = [0] * len(ROLLING_METRICS)
+        self.weighted_sums = [ZERO] * len(ROLLING_METRICS)
+        self.total_weight = ZERO
+
+    def _accumulate(self, values, weight, sign):
+        for i, value in enumerate(values):
+            if value is not None:
+                self.sums[i] += sign * value
+                self.counts[i] += sign
+                self.weighted_sums[i] += sign * value * weight
+        self.total_weight += sign * weight
+
+    def add(self, row, weight):
+        epoch, staked, values, latest = row
+        self.sketch.append((epoch, staked) + tuple(values[i] for i in _SKETCH_INDEX))
+        if staked:
+            self._accumulate(values, weight, 1)
+        if self.latest_epoch is None or epoch >= self.latest_epoch:
+            self.latest_epoch, self.latest = epoch, latest
+
+    def remove(self, row, weight):
+        """Subtract a row added earlier; returns False, changing nothing, if the sketch has no entry for it"""
+        epoch, staked, values, _ = row
+        entry = (epoch, staked) + tuple(values[i] for i in _SKETCH_INDEX)
+        if entry not in self.sketch:
+            entry = next((item for item in self.sketch if item[:2] == entry[:2]), None)
+            if entry is None:
+                return False
+        self.sketch.remove(entry)
+        if staked:
+            self._accumulate(values, weight, -1)
+            if not self.staked_epochs():
+                # Nothing left to average; drop the rounding residue of the weighted sums
+                self._reset_sums()
+        return True
+
+    def decay(self, factor):
+        self.weighted_sums = [value * factor for value in self.weighted_sums]
+        self.total_weight *= factor
+
+    def staked_epochs(self):
+        return [item[0] for item in self.sketch if item[1]]
+
+    def _sketch_values(self, metric, staked_only):
+        position = 2 + SKETCH_METRICS.index(metric)
+        return [item[position] for item in self.sketch if item[position] is not None and (item[1] or not staked_only)]
+
+    def average(self, metric):
+        """AVG(metric) over the staked rows"""
+        i = _INDEX[metric]
+        return self.sums[i] / self.counts[i] if self.counts[i] else None
+
+    def per_block(self, metric):
+        """SUM(metric) / NULLIF(SUM(blocks_produced), 0) over the staked rows"""
+        i = _INDEX[metric]
+        if not self.counts[i] or not self.counts[_BLOCKS] or not self.sums[_BLOCKS]:
+            return None
+        return self.sums[i] / self.sums[_BLOCKS]
+
+    def weighted_average(self, metric):
+        """Recency-weighted average over the staked rows; NULLs weigh in as zero"""
+        return self.weighted_sums[_INDEX[metric]] / self.total_weight if self.total_weight else None
+
+    def median(self, metric):
+        """PERCENTILE_CONT(0.5) of a sketch metric over the staked rows"""
+        values = sorted(self._sketch_values(metric, staked_only=True))
+        if not values:
+            return None
+        middle = len(values) // 2
+        if len(values) % 2:
+            return float(values[middle])
+        return (float(values[middle - 1]) + float(values[middle])) / 2
+
+    def maximum(self, metric):
+        """MAX of a sketch metric over every row, staked or not"""
+        values = self._sketch_values(metric, staked_only=False)
+        return max(values) if values else None
+
+    def average_all(self, metric):
+        """AVG of a sketch metric over every row, staked or not"""
+        values = self._sketch_values(metric, staked_only=False)
+        return sum(values) / len(values) if values else None
+
+def _read_validator_stats(cur, epochs):
+    """Rows each epoch contributes, straight from validator_stats: {epoch: [(identity, row)]}"""
+    snapshots = {epoch: [] for epoch in epochs}
+    cur.execute(SNAPSHOT_QUERY, (list(epochs),))
+    first_latest = 3 + len(ROLLING_METRICS)
+    for record in cur.fetchall():
+        identity, epoch, staked = record[:3]
+        values = [_as_decimal(value) for value in record[3:first_latest]]
+        latest = dict(zip(LATEST_FIELDS, record[first_latest:]))
+        snapshots[epoch].append((identity, (epoch, staked, values, latest)))
+    return snapshots
+
+def _store_snapshots(cur, snapshots):
+    cur.execute("DELETE FROM validator_rolling_epoch WHERE epoch = ANY(%s)", (list(snapshots),))
+    execute_values(cur, """
+        INSERT INTO validator_rolling_epoch (epoch, identity_pubkey, staked, metric_values, latest) VALUES %s
+    """, [(row[0], identity, row[1], row[2], json.dumps(row[3], default=decimal_default))
+          for rows in snapshots.values() for identity, row in rows],
+        template="(%s, %s, %s, %s::numeric[], %s::jsonb)", page_size=1000)
+
+def _snapshots(cur, epochs):
+    """Stored rows for epochs, reading and storing the epochs that have none yet from validator_stats"""
+    snapshots = {epoch: [] for epoch in epochs}
+    if not snapshots:
+        return snapshots
+    cur.execute("""
+        SELECT epoch, identity_pubkey, staked, metric_values, latest
+        FROM validator_rolling_epoch WHERE epoch = ANY(%s)
+    """, (list(snapshots),))
+    for epoch, identity, staked, values, latest in cur.fetchall():
+        snapshots[epoch].append((identity, (epoch, staked, values, latest)))
+    missing = [epoch for epoch, rows in snapshots.items() if not rows]
+    if missing:
+        fresh = _read_validator_stats(cur, missing)
+        _store_snapshots(cur, fresh)
+        snapshots.update(fresh)
+    return snapshots
+
+def _apply(windows, rows, weight, remove=False):
+    """Add (or remove) rows; returns how many removed rows the windows had no record of"""
+    mismatched = 0
+    for identity, row in rows:
+        if remove:
+            if identity not in windows or not windows[identity].remove(row, weight):
+                mismatched += 1
+            elif not windows[identity].sketch:
+                del windows[identity]
+        else:
+            windows.setdefault(identity, ValidatorWindow()).add(row, weight)
+    return mismatched
+
+def _build_window(cur, size, end_epoch):
+    windows = {}
+    for epoch, rows in sorted(_snapshots(cur, range(end_epoch - size + 1, end_epoch + 1)).items()):
+        _apply(windows, rows, RECENCY_DECAY ** (end_epoch - epoch))
+    return windows
+
+def _advance_window(cur, windows, size, stored_end, end_epoch):
+    """Move a window forward epoch by epoch; returns how many expiring rows it had no record of"""
+    mismatched = 0
+    for epoch in range(stored_end + 1, end_epoch + 1):
+        for window in windows.values():
+            window.decay(RECENCY_DECAY)
+        _apply(windows, _snapshots(cur, [epoch])[epoch], ONE)
+        mismatched += _apply(windows, _snapshots(cur, [epoch - size])[epoch - size], RECENCY_DECAY ** size, remove=True)
+    return mismatched
+
+def _load_windows(cur, sizes):
+    windows = {size: {} for size in sizes}
+    cur.execute("""
+        SELECT window_size, identity_pubkey, sketch_epochs, sketch_staked, sketch_epoch_credits, sketch_commission,
+               sums, counts, weighted_sums, total_weight, latest_epoch, latest
+        FROM validator_rolling_window WHERE window_size = ANY(%s)
+    """, (list(sizes),))
+    for (size, identity, epochs, staked, credits, commission,
+         sums, counts, weighted_sums, total_weight, latest_epoch, latest) in cur.fetchall():
+        window = ValidatorWindow()
+        window.sketch = list(zip(epochs, staked, credits, commission))
+        window.sums, window.counts, window.weighted_sums = sums, counts, weighted_sums
+        window.total_weight, window.latest_epoch, window.latest = total_weight, latest_epoch, latest
+        windows[size][identity] = window
+    return windows
+
+def _store_window(cur, size, end_epoch, windows):
+    cur.execute("DELETE FROM validator_rolling_window WHERE window_size = %s", (size,))
+    execute_values(cur, """
+        INSERT INTO validator_rolling_window (
+            window_size, identity_pubkey, sketch_epochs, sketch_staked, sketch_epoch_credits, sketch_commission,
+            sums, counts, weighted_sums, total_weight, latest_epoch, latest
+        ) VALUES %s
+    """, [(size, identity, [item[0] for item in window.sketch], [item[1] for item in window.sketch],
+           [item[2] for item in window.sketch], [item[3] for item in window.sketch],
+           window.sums, window.counts, window.weighted_sums, window.total_weight,
+           window.latest_epoch, json.dumps(window.latest, default=decimal_default))
+          for identity, window in windows.items()],
+        template="(%s, %s, %s::integer[], %s::boolean[], %s::numeric[], %s::numeric[], "
+                 "%s::numeric[], %s::integer[], %s::numeric[], %s, %s, %s::jsonb)", page_size=1000)
+    cur.execute("""
+        INSERT INTO validator_rolling_window_meta (window_size, end_epoch, metrics, decay, updated_at)
+        VALUES (%s, %s, %s, %s, NOW())
+        ON CONFLICT (window_size) DO UPDATE
+        SET end_epoch = EXCLUDED.end_epoch, metrics = EXCLUDED.metrics, decay = EXCLUDED.decay, updated_at = NOW()
+    """, (size, end_epoch, list(ROLLING_METRICS), RECENCY_DECAY))
+
+def update_rolling_windows(engine, end_epoch, window_sizes=ROLLING_WINDOWS, rebuild=False):
+    """Advance every tracked window, and window_sizes, to end_epoch; returns {size: {identity: ValidatorWindow}}"""
+    start = time.time()
+    conn = engine.raw_connection()
+    try:
+        cur = conn.cursor()
+        cur.execute(SCHEMA)
+        cur.execute("LOCK TABLE validator_rolling_window_meta IN EXCLUSIVE MODE")
+        cur.execute("SELECT window_size, end_epoch, metrics, decay FROM validator_rolling_window_meta")
+        stored = cur.fetchall()
+        meta = {size: stored_end for size, stored_end, _, _ in stored}
+        sizes = sorted(set(meta) | set(window_sizes))
+        # State written with another metric list or decay can't be advanced
+        if rebuild or any(tuple(metrics) != ROLLING_METRICS or decay != RECENCY_DECAY for _, _, metrics, decay in stored):
+            logger.info("🧹 Dropping stored rolling window state, rebuilding from validator_stats")
+            cur.execute("TRUNCATE validator_rolling_epoch, validator_rolling_window, validator_rolling_window_meta")
+            meta = {}
+
+        # Replace what the end epoch contributed with what validator_stats holds now
+        previous = _snapshots(cur, [end_epoch])[end_epoch] if end_epoch in meta.values() else []
+        current = _read_validator_stats(cur, [end_epoch])
+        _store_snapshots(cur, current)
+
+        windows = _load_windows(cur, list(meta))
+        for size in sizes:
+            stored_end = meta.get(size)
+            if stored_end is None or stored_end > end_epoch or end_epoch - stored_end >= size:
+                windows[size] = _build_window(cur, size, end_epoch)
+                action = "built"
+            else:
+                mismatched = 0
+                if stored_end == end_epoch:
+                    mismatched += _apply(windows[size], previous, ONE, remove=True)
+                    _apply(windows[size], current[end_epoch], ONE)
+                mismatched += _advance_window(cur, windows[size], size, stored_end, end_epoch)
+                action = f"advanced from {stored_end}"
+                if mismatched:
+                    # The stored sums no longer match the stored snapshots; subtracting further would skew them
+                    logger.warning(f"⚠️ {mismatched} rows leaving the {size}-epoch window were never added to it - rebuilding")
+                    windows[size] = _build_window(cur, size, end_epoch)
+                    action = "rebuilt"
+            _store_window(cur, size, end_epoch, windows[size])
+            logger.info(f"📈 {size}-epoch window {action} to {end_epoch}: {len(windows[size])} validators")
+
+        cur.execute("DELETE FROM validator_rolling_epoch WHERE epoch <= %s", (end_epoch - max(sizes),))
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+    logger.info(f"✅ Rolling windows at epoch {end_epoch} updated in {time.time() - start:.1f}s")
+    return {size: windows[size] for size in sizes}
+
+def rolling_windows(engine, end_epoch, window_sizes=ROLLING_WINDOWS):
+    """Stored windows ending at end_epoch, updating the store first when it is behind"""
+    conn = engine.raw_connection()
+    try:
+        cur = conn.cursor()
+        cur.execute("SELECT to_regclass('validator_rolling_window_meta') IS NOT NULL")
+        if cur.fetchone()[0]:
+            cur.execute("""
+                SELECT COUNT(*) FROM validator_rolling_window_meta
+                WHERE window_size = ANY(%s) AND end_epoch = %s AND metrics = %s AND decay = %s
+            """, (list(window_sizes), end_epoch, list(ROLLING_METRICS), RECENCY_DECAY))
+            if cur.fetchone()[0] == len(set(window_sizes)):
+                return _load_windows(cur, window_sizes)
+    finally:
+        conn.close()
+    return update_rolling_windows(engine, end_epoch, window_sizes)
+
+def main():
+    from sqlalchemy import create_engine
+    from db_config import db_params
+
+    parser = argparse.ArgumentParser(description='Advance the stored per-validator rolling windows to an epoch')
+    parser.add_argument('epoch', type=int, help='End epoch of the windows')
+    parser.add_argument('--window', type=int, action='append', default=[], help='Also track a window of this many epochs (repeatable)')
+    parser.add_argument('--rebuild', action='store_true', help='Drop the stored state and rebuild every window')
+    args = parser.parse_args()
+
+    engine = create_engine(f"postgresql+psycopg2://{db_params['user']}@{db_params['host']}:{db_params['port']}/{db_params['database']}?sslmode={db_params['sslmode']}")
+    update_rolling_windows(engine, args.epoch, tuple(ROLLING_WINDOWS) + tuple(args.window), args.rebuild)
+
+if __name__ == "__main__":
+    main()
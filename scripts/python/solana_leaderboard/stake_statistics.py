@@ -21,6 +21,7 @@ if current_dir not in sys.path:
 
 # Import from current package
 from utils import format_lamports_to_sol, format_number, ensure_directory, get_output_path
+from epoch_pool import atomic_to_csv
 from visualizations import get_persistent_color_map, get_color_map
 
 # Initialize logger
@@ -225,25 +226,25 @@ def calculate_stake_statistics(epoch, max_epoch, engine):
             logger.error(f"Figure traceback: {traceback.format_exc()}")
 
         try:
-            country_df.to_csv(get_output_path(f'epoch{epoch}_country_stats.csv', 'csv'), index=True)
+            atomic_to_csv(country_df, get_output_path(f'epoch{epoch}_country_stats.csv', 'csv'), index=True)
             logger.info(f"country_df epoch{epoch}_country_stats.csv")
         except Exception as e:
             logger.error(f"Error writing country_df to CSV for epoch {epoch}: {e}")
-            pd.DataFrame().to_csv(get_output_path(f'epoch{epoch}_country_stats.csv', 'csv'))
+            atomic_to_csv(pd.DataFrame(), get_output_path(f'epoch{epoch}_country_stats.csv', 'csv'))
 
         try:
-            continent_df.to_csv(get_output_path(f'epoch{epoch}_continent_stats.csv', 'csv'), index=True)
+            atomic_to_csv(continent_df, get_output_path(f'epoch{epoch}_continent_stats.csv', 'csv'), index=True)
             logger.info(f"continent_df epoch820_continent_stats.csv")
         except Exception as e:
             logger.error(f"Error writing continent_df to CSV for epoch {epoch}: {e}")
-            pd.DataFrame().to_csv(get_output_path(f'epoch{epoch}_continent_stats.csv', 'csv'))
+            atomic_to_csv(pd.DataFrame(), get_output_path(f'epoch{epoch}_continent_stats.csv', 'csv'))
 
         try:
-            region_df.to_csv(get_output_path(f'epoch{epoch}_region_stats.csv', 'csv'), index=True)
+            atomic_to_csv(region_df, get_output_path(f'epoch{epoch}_region_stats.csv', 'csv'), index=True)
             logger.info(f"region_df epoch{epoch}_region_stats.csv")
         except Exception as e:
             logger.error(f"Error writing region_df to CSV for epoch {epoch}: {e}")
-            pd.DataFrame().to_csv(get_output_path(f'epoch{epoch}_region_stats.csv', 'csv'))
+            atomic_to_csv(pd.DataFrame(), get_output_path(f'epoch{epoch}_region_stats.csv', 'csv'))
 
         return country_df, continent_df, region_df
 
@@ -258,9 +259,9 @@ def calculate_stake_statistics(epoch, max_epoch, engine):
         }, index=['Unknown'])
         empty_df.index.name = 'Area'
 
-        empty_df.to_csv(get_output_path(f'epoch{epoch}_country_stats.csv', 'csv'), index=True)
-        empty_df.to_csv(get_output_path(f'epoch{epoch}_continent_stats.csv', 'csv'), index=True)
-        empty_df.to_csv(get_output_path(f'epoch{epoch}_region_stats.csv', 'csv'), index=True)
+        atomic_to_csv(empty_df, get_output_path(f'epoch{epoch}_country_stats.csv', 'csv'), index=True)
+        atomic_to_csv(empty_df, get_output_path(f'epoch{epoch}_continent_stats.csv', 'csv'), index=True)
+        atomic_to_csv(empty_df, get_output_path(f'epoch{epoch}_region_stats.csv', 'csv'), index=True)
 
         return empty_df.copy(), empty_df.copy(), empty_df.copy()
 
@@ -529,14 +530,14 @@ def calculate_stake_statistics_metro(epoch, max_epoch, engine):
 
         logger.debug("Writing CSV files")
         try:
-            country_df.to_csv(get_output_path(f'epoch{epoch}_country_stats_metro.csv', 'csv'), index=True)
+            atomic_to_csv(country_df, get_output_path(f'epoch{epoch}_country_stats_metro.csv', 'csv'), index=True)
             logger.info(f"country_df epoch{epoch}_country_stats_metro.csv")
-            metro_df.to_csv(get_output_path(f'epoch{epoch}_metro_stats_metro.csv', 'csv'), index=True)
+            atomic_to_csv(metro_df, get_output_path(f'epoch{epoch}_metro_stats_metro.csv', 'csv'), index=True)
             logger.info(f"metro_df epoch{epoch}_metro_stats_metro.csv")
         except Exception as e:
             logger.error(f"Error writing CSVs for epoch {epoch}: {e}")
-            country_df.to_csv(get_output_path(f'epoch{epoch}_country_stats_metro.csv', 'csv'), index=True)
-            metro_df.to_csv(get_output_path(f'epoch{epoch}_metro_stats_metro.csv', 'csv'), index=True)
+            atomic_to_csv(country_df, get_output_path(f'epoch{epoch}_country_stats_metro.csv', 'csv'), index=True)
+            atomic_to_csv(metro_df, get_output_path(f'epoch{epoch}_metro_stats_metro.csv', 'csv'), index=True)
 
         logger.debug("Returning DataFrames")
         return country_df, metro_df
@@ -558,8 +559,8 @@ def calculate_stake_statistics_metro(epoch, max_epoch, engine):
         
         logger.debug("Writing fallback CSV files")
         try:
-            empty_df.to_csv(get_output_path(f'epoch{epoch}_country_stats_metro.csv', 'csv'), index=True)
-            empty_df.to_csv(get_output_path(f'epoch{epoch}_metro_stats_metro.csv', 'csv'), index=True)
+            atomic_to_csv(empty_df, get_output_path(f'epoch{epoch}_country_stats_metro.csv', 'csv'), index=True)
+            atomic_to_csv(empty_df, get_output_path(f'epoch{epoch}_metro_stats_metro.csv', 'csv'), index=True)
         except Exception as csv_e:
             logger.error(f"Error writing fallback CSVs for epoch {epoch}: {csv_e}")
         
@@ -9,6 +9,7 @@ sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 import importlib
 logging_config = importlib.import_module('999_logging_config')
 setup_logging = logging_config.setup_logging
+from epoch_pool import atomic_write
 
 # Initialize logger
 logger = setup_logging('utils')
@@ -150,6 +151,6 @@ def save_chart_html(fig, chart_title, output_filename):
     </body>
     </html>
     """
-    with open(output_filename, "w") as f:
+    with atomic_write(output_filename) as f:
         f.write(html_full)
     logger.info(f"HTML file created - {output_filename}")
\ No newline at end of file
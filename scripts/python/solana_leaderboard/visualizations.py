@@ -21,6 +21,7 @@ if current_dir not in sys.path:
 
 # Import from current package
 from utils import save_chart_html, ensure_directory, get_output_path
+from epoch_pool import atomic_write, file_lock
 
 # Initialize logger
 logger = setup_logging('visualizations')
@@ -57,26 +58,29 @@ def get_persistent_color_map(items, filename='country_colors.json'):
         '#CD853F', '#BC8F8F', '#2F4F4F', '#D3D3D3', '#00BFFF', '#8A2BE2'
     ]
 
-    color_map = {}
     filename = get_output_path(filename, 'json')
-    if os.path.exists(filename):
-        with open(filename, 'r') as f:
-            color_map = json.load(f)
-    else:
+    # Epoch workers share this file: hold the lock across read and write so a new
+    # country gets one colour, and never read a half-written file
+    with file_lock(filename):
         color_map = {}
-
-    for item in items:
-        if item not in color_map:
-            if item == 'Unknown':
-                color_map[item] = '#CCCCCC'
-            else:
-                available_colors = [c for c in colors if c not in color_map.values()]
-                if not available_colors:
-                    available_colors = colors
-                color_map[item] = random.choice(available_colors)
-
-    with open(filename, 'w') as f:
-        json.dump(color_map, f)
+        if os.path.exists(filename):
+            with open(filename, 'r') as f:
+                color_map = json.load(f)
+
+        known = len(color_map)
+        for item in items:
+            if item not in color_map:
+                if item == 'Unknown':
+                    color_map[item] = '#CCCCCC'
+                else:
+                    available_colors = [c for c in colors if c not in color_map.values()]
+                    if not available_colors:
+                        available_colors = colors
+                    color_map[item] = random.choice(available_colors)
+
+        if len(color_map) != known or not os.path.exists(filename):
+            with atomic_write(filename) as f:
+                json.dump(color_map, f)
     return color_map
 
 def plot_votes_cast_metrics(epoch, max_epoch):
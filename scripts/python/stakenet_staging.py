@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Typed, column-oriented staging of per-epoch stakenet rows for validator_stats.
+
+92_update_validator_aggregate_info.py used to build one StringIO CSV buffer per
+vote account, rewrite each buffer line by line to patch in Jito Kobe MEV
+values, COPY every buffer separately into an all-TEXT temp table with '[NULL]'
+sentinels and cast everything back with NULLIF in the UPDATE. StakenetStaging
+keeps one Python list per column instead: history entries are appended once,
+Kobe values are merged by vote account in a single pass, and the whole epoch
+goes to Postgres as one COPY into a typed table, with None written as NULL.
+"""
+import csv
+import io
+
+STAKENET_COLUMNS = (
+    ("vote_account_pubkey", "TEXT"),
+    ("epoch", "INTEGER"),
+    ("commission", "INTEGER"),
+    ("epoch_credits", "BIGINT"),
+    ("mev_commission", "INTEGER"),
+    ("mev_earned", "DOUBLE PRECISION"),
+    ("activated_stake", "BIGINT"),
+    ("jito_rank", "INTEGER"),
+    ("superminority", "INTEGER"),
+    ("ip", "TEXT"),
+    ("client_type", "INTEGER"),
+    ("version", "TEXT"),
+)
+
+LAMPORTS_PER_MEV_UNIT = 10_000_000    # validator history stores mev_earned in 1/100 SOL
+
+class StakenetStaging:
+    """One epoch's stakenet values, one list per column"""
+
+    def __init__(self, epoch):
+        self.epoch = epoch
+        self.columns = {name: [] for name, _ in STAKENET_COLUMNS}
+        self._rows = {}
+
+    def __len__(self):
+        return len(self._rows)
+
+    def __contains__(self, vote_pubkey):
+        return vote_pubkey in self._rows
+
+    def add_history(self, vote_pubkey, entry):
+        """Append a decoded validator-history entry (see validator_history.decode_entry)"""
+        self._rows[vote_pubkey] = len(self._rows)
+        mev_earned = entry.get('mev_earned')
+        values = {
+            "vote_account_pubkey": vote_pubkey,
+            "epoch": self.epoch,
+            "commission": entry.get('commission'),
+            "epoch_credits": entry.get('epoch_credits'),
+            "mev_commission": entry.get('mev_commission'),
+            "mev_earned": mev_earned * LAMPORTS_PER_MEV_UNIT if mev_earned is not None else None,
+            "activated_stake": entry.get('activated_stake_lamports'),
+            "jito_rank": entry.get('rank'),
+            "superminority": entry.get('is_superminority') or 0,
+            "ip": entry.get('ip'),
+            "client_type": entry.get('client_type'),
+            "version": entry.get('version'),
+        }
+        for name, column in self.columns.items():
+            column.append(values[name])
+
+    def merge_kobe(self, jito_data):
+        """Overwrite MEV commission/rewards with Jito Kobe values keyed by vote account; returns rows updated"""
+        mev_commission = self.columns["mev_commission"]
+        mev_earned = self.columns["mev_earned"]
+        merged = 0
+        for vote_pubkey, row in self._rows.items():
+            validator = jito_data.get(vote_pubkey)
+            if validator is not None:
+                mev_commission[row] = validator.get('mev_commission_bps')
+                mev_earned[row] = validator.get('mev_rewards')
+                merged += 1
+        return merged
+
+    def get(self, vote_pubkey, name):
+        row = self._rows.get(vote_pubkey)
+        return None if row is None else self.columns[name][row]
+
+    def create_table(self, cursor, table="temp_validator_stats"):
+        cursor.execute(f"DROP TABLE IF EXISTS {table}")
+        cursor.execute(f"CREATE TEMPORARY TABLE {table} ("
+                       + ", ".join(f"{name} {sql_type}" for name, sql_type in STAKENET_COLUMNS) + ")")
+
+    def copy_to(self, cursor, table="temp_validator_stats"):
+        """Send every row in a single COPY; None becomes an unquoted empty field, i.e. NULL"""
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows(zip(*(self.columns[name] for name, _ in STAKENET_COLUMNS)))
+        buffer.seek(0)
+        cursor.copy_expert(f"COPY {table} ({', '.join(name for name, _ in STAKENET_COLUMNS)}) FROM STDIN WITH (FORMAT csv)", buffer)
+        return len(self)
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Streaming, column-at-a-time export of per-epoch query results to JSON.
+
+get_validator_stats (93_save.py and solana_leaderboard/db_operations.py) used
+to run its four-way join twice, once for fetchall() and once more only to read
+the column names, then format every record field by field in Python. Here:
+
+    - stream_frames() executes the query once through a named server-side
+      cursor (SQLAlchemy stream_results) and yields DataFrames of CHUNK_ROWS
+      rows, so a backfill never holds more than one chunk per epoch
+    - the format_* helpers convert whole columns at once with numpy and give
+      the same values as format_lamports_to_sol / format_number: integer
+      lamports are rounded exactly (half-even, as Decimal formatting does),
+      NUMERIC and float lamports go through the same Decimal division
+    - write_json_records() writes records as they arrive, producing the same
+      text json.dump(records, indent=4) would, and renames the file into
+      place once complete
+
+Frames keep dtype=object so untouched columns reach JSON exactly as the
+driver returned them (ints stay ints, NULLs stay null). Duplicate column names
+keep the last value, as dict(zip(columns, row)) did.
+"""
+import json
+from decimal import Decimal
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import text
+
+from epoch_pool import atomic_write
+
+CHUNK_ROWS = 2000
+LAMPORTS_PER_SOL = 1_000_000_000
+
+def stream_frames(engine, query, params, chunk_rows=CHUNK_ROWS):
+    """Execute query once with a server-side cursor and yield DataFrames of up to chunk_rows rows"""
+    with engine.connect() as conn:
+        result = conn.execution_options(stream_results=True, max_row_buffer=chunk_rows).execute(text(query), params)
+        columns = list(result.keys())
+        names = list(dict.fromkeys(columns))
+        last = {name: position for position, name in enumerate(columns)}
+        for rows in result.partitions(chunk_rows):
+            frame = pd.DataFrame(rows, columns=range(len(columns)), dtype=object)
+            frame = frame[[last[name] for name in names]]
+            frame.columns = names
+            yield frame
+
+def _apply(frame, field, convert):
+    """Replace the non-null values of frame[field] with convert(values); returns the non-null mask"""
+    if field not in frame:
+        return None
+    column = frame[field].to_numpy(dtype=object, copy=True)
+    mask = pd.notna(column)
+    if mask.any():
+        column[mask] = np.array(convert(column[mask]), dtype=object)
+        frame[field] = pd.Series(column, index=frame.index, dtype=object)
+    return mask
+
+def _round(values, precision, divisor=1):
+    """values / divisor rounded like float(f"{value:.{precision}f}"), or truncated to int for precision 0"""
+    kind = pd.api.types.infer_dtype(values, skipna=True)
+    if kind == "integer":
+        # Exact integer arithmetic, half-even like Decimal formatting
+        numbers = values.astype(np.int64)
+        if precision == 0:
+            return (np.sign(numbers) * (np.abs(numbers) // divisor)).tolist()
+        scale = divisor // 10 ** precision
+        if scale <= 1:
+            return (numbers / divisor).tolist()
+        quotient, remainder = np.divmod(numbers, scale)
+        round_up = (2 * remainder > scale) | ((2 * remainder == scale) & (quotient % 2 == 1))
+        return ((quotient + round_up) / 10 ** precision).tolist()
+    if kind == "decimal" or divisor != 1:
+        # NUMERIC columns, and float lamports: divide exactly in Decimal as format_lamports_to_sol
+        # does; a float division would round first and can land on the other side of a tie
+        values = [value if isinstance(value, Decimal) else Decimal(value) for value in values]
+        divisor = Decimal(divisor)
+        if precision == 0:
+            return [int(value / divisor) for value in values]
+        return [float(f"{value / divisor:.{precision}f}") for value in values]
+    numbers = values.astype(float)
+    if precision == 0:
+        return np.trunc(numbers).astype(np.int64).tolist()
+    # printf rounding works on the exact binary value, as f-string formatting does
+    return np.char.mod(f"%.{precision}f", numbers).astype(float).tolist()
+
+def format_lamport_columns(frame, fields):
+    """Lamports -> SOL for (field, precision) pairs, like format_lamports_to_sol"""
+    for field, precision in fields:
+        _apply(frame, field, lambda values, precision=precision: _round(values, precision, LAMPORTS_PER_SOL))
+
+def format_number_columns(frame, fields):
+    """Round (field, precision) columns, truncating to int for precision 0, like format_number"""
+    for field, precision in fields:
+        _apply(frame, field, lambda values, precision=precision: _round(values, precision))
+
+def _text(values, pattern, divisor, exact_decimal):
+    if exact_decimal and divisor == 1 and pd.api.types.infer_dtype(values, skipna=True) == "decimal":
+        return [format(value, pattern[1:]) for value in values]
+    return np.char.mod(pattern, values.astype(float) / divisor).tolist()
+
+def format_text_columns(frame, fields, pattern, divisor=1.0, missing=None, exact_decimal=False):
+    """Render columns as strings with a printf pattern after dividing by divisor; NULLs become missing
+
+    Values are converted to float first unless exact_decimal is set, in which case
+    Decimal values are formatted directly.
+    """
+    for field in fields:
+        mask = _apply(frame, field, lambda values: _text(values, pattern, divisor, exact_decimal))
+        if mask is not None and missing is not None:
+            frame.loc[~mask, field] = missing
+
+def map_column(frame, field, mapping, default):
+    """Replace values through mapping (NULL included), using default for unknown values"""
+    if field in frame:
+        frame[field] = pd.Series([mapping.get(value, default) for value in frame[field].tolist()], index=frame.index, dtype=object)
+
+def records(frame):
+    """Plain-Python dicts for a formatted frame"""
+    return frame.to_dict("records")
+
+def write_json_records(filename, records_iter, default=None):
+    """Stream dicts into filename as a JSON array, matching json.dump(list, f, indent=4); returns the count"""
+    count = 0
+    with atomic_write(filename) as f:
+        for record in records_iter:
+            body = json.dumps(record, indent=4, default=default).replace("\n", "\n    ")
+            f.write(("[\n    " if count == 0 else ",\n    ") + body)
+            count += 1
+        f.write("\n]" if count else "[]")
+    return count
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+In-process reader for Jito stakenet ValidatorHistory accounts.
+
+Replaces one `validator-history-cli history --print-json <vote>` subprocess
+per vote account (and a JSON parse of its full history) with:
+
+    1. one getProgramAccounts call, sliced to the 32-byte vote_account field,
+       mapping every vote account to its ValidatorHistory account
+    2. getMultipleAccounts in batches of MULTIPLE_ACCOUNTS_BATCH
+    3. a decoder that walks the account's circular buffer in place
+       (struct.unpack_from on a memoryview, newest entry first) and unpacks
+       only the entry for the requested epoch
+
+Account layout (8-byte Anchor discriminator, then #[zero_copy] ValidatorHistory):
+
+    12   vote_account        Pubkey
+    304  history.idx         u64, ring-buffer index of the newest entry
+    312  history.is_empty    u8
+    320  history.arr         512 x 128-byte ValidatorHistoryEntry
+
+Unset entry fields hold their type's maximum value and come back as None.
+Entries carry mev_earned in 1/100 SOL; it is returned as that exact integer.
+"""
+import base64
+import struct
+
+from rpc_client import RpcClient
+
+VALIDATOR_HISTORY_PROGRAM_ID = "HistoryJTGbKQD2mRgLZ3XhqHnN811Qpez8X9kCcGHoa"
+ACCOUNT_SIZE = 65856
+VOTE_ACCOUNT_OFFSET = 12
+HISTORY_IDX_OFFSET = 304
+HISTORY_EMPTY_OFFSET = 312
+HISTORY_ARR_OFFSET = 320
+MAX_ITEMS = 512
+ENTRY_SIZE = 128
+ENTRY_EPOCH_OFFSET = 8
+
+MULTIPLE_ACCOUNTS_BATCH = 100
+
+# activated_stake_lamports, epoch, mev_commission, epoch_credits, commission, client_type,
+# version (major, minor, patch), ip, merkle_root_upload_authority, is_superminority, rank,
+# vote_account_last_update_slot, mev_earned
+ENTRY = struct.Struct("<QHHIBBBBH4sBBIQI")
+EPOCH = struct.Struct("<H")
+IDX = struct.Struct("<Q")
+
+BASE58_ALPHABET = "123456789ABCDEFGHJKLMNPQRSTUVWXYZabcdefghijkmnopqrstuvwxyz"
+
+def b58encode(raw):
+    """Base58-encode a public key"""
+    value = int.from_bytes(raw, "big")
+    digits = []
+    while value:
+        value, remainder = divmod(value, 58)
+        digits.append(BASE58_ALPHABET[remainder])
+    leading_zeros = len(raw) - len(raw.lstrip(b"\0"))
+    return "1" * leading_zeros + "".join(reversed(digits))
+
+def _unset(value, bits):
+    return None if value == (1 << bits) - 1 else value
+
+def decode_entry(data, epoch):
+    """Return the history entry for epoch from raw account data as a dict, or None"""
+    data = memoryview(data)
+    if len(data) < HISTORY_ARR_OFFSET + MAX_ITEMS * ENTRY_SIZE or data[HISTORY_EMPTY_OFFSET]:
+        return None
+    newest = IDX.unpack_from(data, HISTORY_IDX_OFFSET)[0]
+    for back in range(MAX_ITEMS):
+        offset = HISTORY_ARR_OFFSET + ((newest - back) % MAX_ITEMS) * ENTRY_SIZE
+        entry_epoch = EPOCH.unpack_from(data, offset + ENTRY_EPOCH_OFFSET)[0]
+        if entry_epoch == epoch:
+            break
+        if entry_epoch < epoch:
+            # Entries are written in epoch order, so an older one means the epoch was never recorded
+            return None
+    else:
+        return None
+
+    (stake, _, mev_commission, epoch_credits, commission, client_type, major, minor, patch, ip,
+     _, is_superminority, rank, _, mev_earned) = ENTRY.unpack_from(data, offset)
+    return {
+        'epoch': epoch,
+        'activated_stake_lamports': _unset(stake, 64),
+        'mev_commission': _unset(mev_commission, 16),
+        'epoch_credits': _unset(epoch_credits, 32),
+        'commission': _unset(commission, 8),
+        'client_type': _unset(client_type, 8),
+        'version': None if major == 0xFF else f"{major}.{minor}.{patch}",
+        'ip': None if ip == b"\xff\xff\xff\xff" else ".".join(str(octet) for octet in ip),
+        'is_superminority': _unset(is_superminority, 8),
+        'rank': _unset(rank, 32),
+        'mev_earned': _unset(mev_earned, 32),
+    }
+
+def history_accounts(rpc_client):
+    """Map vote account -> ValidatorHistory account address with one sliced getProgramAccounts call"""
+    accounts = rpc_client.call("getProgramAccounts", [VALIDATOR_HISTORY_PROGRAM_ID, {
+        "encoding": "base64",
+        "filters": [{"dataSize": ACCOUNT_SIZE}],
+        "dataSlice": {"offset": VOTE_ACCOUNT_OFFSET, "length": 32},
+    }], timeout=(10, 120))
+    return {b58encode(base64.b64decode(account['account']['data'][0])): account['pubkey'] for account in accounts}
+
+def fetch_epoch_entries(vote_pubkeys, epoch, rpc_client=None, logger=None):
+    """Fetch and decode the given epoch's history entry for each vote account
+
+    Returns (entries, missing): entries maps vote account -> entry dict (None when the
+    account has no entry for the epoch); missing lists vote accounts with no history account.
+    """
+    rpc_client = rpc_client or RpcClient(logger=logger)
+    by_vote = history_accounts(rpc_client)
+    wanted = [(vote, by_vote[vote]) for vote in vote_pubkeys if vote in by_vote]
+    missing = [vote for vote in vote_pubkeys if vote not in by_vote]
+    if logger:
+        logger.info(f"Found {len(by_vote):,} validator history accounts; {len(wanted):,} of {len(vote_pubkeys):,} "
+                    f"vote accounts have one")
+
+    entries = {}
+    for start in range(0, len(wanted), MULTIPLE_ACCOUNTS_BATCH):
+        batch = wanted[start:start + MULTIPLE_ACCOUNTS_BATCH]
+        result = rpc_client.call("getMultipleAccounts", [[address for _, address in batch], {"encoding": "base64"}],
+                                 timeout=(10, 120))
+        for (vote, _), account in zip(batch, result['value']):
+            entries[vote] = decode_entry(base64.b64decode(account['data'][0]), epoch) if account else None
+    return entries, missing